@@ -12,7 +12,10 @@ from documents.serializers import (
     BatchCreateSerializer,
     BatchDocumentSerializer,
 )
+from extraction.models import ExtractionDeadLetter
+from extraction.serializers import ExtractionDeadLetterSerializer, DeadLetterRedriveSerializer
 from extraction.services.batch_processor import BatchProcessor, BatchProcessorError
+from extraction.services.dead_letter_service import DeadLetterService
 
 logger = logging.getLogger(__name__)
 
@@ -314,3 +317,67 @@ class BatchDocumentViewSet(viewsets.ReadOnlyModelViewSet):
         return BatchDocument.objects.filter(
             batch__user=self.request.user
         ).select_related('batch', 'document')
+
+
+class DeadLetterViewSet(viewsets.ReadOnlyModelViewSet):
+    """ViewSet for extraction tasks that exhausted their retries (admin only).
+
+    Endpoints:
+    - GET /api/v1/dead-letters/ - List dead letters (?status=, ?signature=, ?batch_id=)
+    - GET /api/v1/dead-letters/{id}/ - Dead letter details incl. traceback
+    - GET /api/v1/dead-letters/clusters/ - Failures grouped by signature
+    - POST /api/v1/dead-letters/redrive/ - Bulk re-drive within worker capacity
+    """
+
+    serializer_class = ExtractionDeadLetterSerializer
+    permission_classes = [permissions.IsAdminUser]
+
+    def get_queryset(self):
+        """Return dead letters, filtered by query params."""
+        queryset = ExtractionDeadLetter.objects.select_related('document')
+
+        for param in ('status', 'signature', 'batch_id', 'stage'):
+            value = self.request.query_params.get(param)
+            if value:
+                queryset = queryset.filter(**{param: value})
+
+        return queryset
+
+    @action(detail=False, methods=['get'])
+    def clusters(self, request):
+        """Group dead letters by failure signature.
+
+        GET /api/v1/dead-letters/clusters/?status=open
+        """
+        status_filter = request.query_params.get('status', 'open')
+        return Response(DeadLetterService().clusters(status=status_filter))
+
+    @action(detail=False, methods=['post'])
+    def redrive(self, request):
+        """Re-queue dead-lettered documents.
+
+        POST /api/v1/dead-letters/redrive/
+        Body: {
+            "signature": "...",        # optional, one failure cluster
+            "ids": [1, 2],             # optional, specific dead letters
+            "batch_id": "uuid",        # optional, one batch
+            "limit": 50,               # optional
+            "respect_capacity": true,  # cap by free worker capacity
+            "dry_run": false
+        }
+        """
+        serializer = DeadLetterRedriveSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        result = DeadLetterService().redrive(
+            dead_letter_ids=data.get('ids'),
+            signature=data.get('signature'),
+            batch_id=data.get('batch_id'),
+            limit=data.get('limit'),
+            respect_capacity=data['respect_capacity'],
+            dry_run=data['dry_run'],
+        )
+
+        response_status = status.HTTP_202_ACCEPTED if result['requeued'] else status.HTTP_200_OK
+        return Response(result, status=response_status)
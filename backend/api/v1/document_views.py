@@ -5,10 +5,12 @@ from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser
 from django.shortcuts import get_object_or_404
 from django.db.models import Q
+from django.conf import settings
 from django.http import FileResponse
 import logging
+import time
 
-from documents.models import Document, ExtractionResult, AuditLog
+from documents.models import Document, AuditLog
 from documents.serializers import (
     DocumentListSerializer,
     DocumentDetailSerializer,
@@ -22,8 +24,10 @@ from extraction.serializers import (
     ExtractionConfigSerializer,
     ExtractionSummarySerializer,
 )
+from extraction.async_executor import AsyncExecutor
+from extraction.idempotency import IdempotencyLock, build_idempotency_key, get_extraction_config
 from extraction.services import GermanOCRService, GermanNERService
-from extraction.services.base_service import ExtractionServiceError
+from extraction.services.eta_estimator import ETAEstimator
 
 logger = logging.getLogger(__name__)
 
@@ -61,146 +65,169 @@ class DocumentViewSet(viewsets.ModelViewSet):
 
     @action(detail=True, methods=['post'])
     def process(self, request, pk=None):
-        """Process document with OCR/NER extraction.
+        """Queue document for OCR/NER extraction.
 
-        POST /api/v1/documents/{id}/process/
+        POST /api/v1/documents/{id}/process/?wait=10
+
+        Extraction runs in a worker via AsyncExecutor, so the request
+        returns 202 Accepted with a job handle right away. With ?wait=N the
+        request blocks up to N seconds (capped by PROCESS_WAIT_MAX_SECONDS)
+        and returns the processed document if it finished in time.
         """
         document = self.get_object()
 
-        # Validate document status
-        if document.status != 'uploaded':
+        # Validate document status (processing = attach to the running job)
+        if document.status not in ('uploaded', 'processing'):
             return Response(
                 {'detail': f'Document status is {document.status}, not uploaded'},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        try:
-            # Update status
-            document.status = 'processing'
-            document.save()
-
-            # Get extraction config (or use defaults)
-            try:
-                config = ExtractionConfig.objects.get(language='de')
-                config_dict = {
-                    'ocr_use_cuda': config.ocr_use_cuda,
-                    'ocr_confidence_threshold': config.ocr_confidence_threshold,
-                    'ner_model': config.ner_model,
-                    'ner_confidence_threshold': config.ner_confidence_threshold,
-                    'max_file_size_mb': config.max_file_size_mb,
-                }
-            except ExtractionConfig.DoesNotExist:
-                config_dict = {'max_file_size_mb': 50}
-
-            # OCR processing
-            ocr_service = GermanOCRService(config_dict)
-            ocr_result = ocr_service.process(document.file.path)
-
-            # NER processing
-            ner_service = GermanNERService(config_dict)
-            ner_result = ner_service.process(ocr_result['text'], document)
-
-            # Create/update ExtractionResult
-            extraction_result, created = ExtractionResult.objects.get_or_create(
-                document=document,
-                defaults={
-                    'ocr_text': ocr_result['text'],
-                    'confidence_scores': {
-                        'ocr': ocr_result['confidence'],
-                        'ner': ner_result['confidence'],
-                    },
-                    'processing_time_ms': ocr_result['processing_time_ms'] + ner_result['processing_time_ms'],
-                    'extracted_data': {
-                        'entities': ner_result['summary'],
-                        'entity_count': len(ner_result['entities']),
-                    }
-                }
+        wait_seconds = self._get_wait_seconds(request)
+        if wait_seconds is None:
+            return Response(
+                {'detail': 'wait must be a number of seconds'},
+                status=status.HTTP_400_BAD_REQUEST
             )
 
-            if not created:
-                extraction_result.ocr_text = ocr_result['text']
-                extraction_result.confidence_scores = {
-                    'ocr': ocr_result['confidence'],
-                    'ner': ner_result['confidence'],
-                }
-                extraction_result.processing_time_ms = ocr_result['processing_time_ms'] + ner_result['processing_time_ms']
-                extraction_result.extracted_data = {
-                    'entities': ner_result['summary'],
-                    'entity_count': len(ner_result['entities']),
-                }
-                extraction_result.save()
-
-            # Create MaterialExtraction if needed
-            if ner_result['entities']:
-                material_data = self._extract_material_specs(ner_result['entities'])
-                MaterialExtraction.objects.update_or_create(
-                    document=document,
-                    defaults={
-                        'materials': material_data.get('materials', {}),
-                        'complexity_level': material_data.get('complexity_level', ''),
-                        'surface_finish': material_data.get('surface_finish', ''),
-                        'extraction_confidence': ner_result['confidence'],
-                        'requires_manual_review': ner_result['confidence'] < 0.8,
-                    }
-                )
-
-            # Update document status
-            document.status = 'completed'
-            document.save()
-
-            # Log processing
-            AuditLog.objects.create(
-                document=document,
-                user=request.user,
-                action='processed',
-                details={
-                    'ocr_confidence': ocr_result['confidence'],
-                    'ner_confidence': ner_result['confidence'],
-                    'entity_count': len(ner_result['entities']),
-                }
+        job_id = AsyncExecutor.process_document(
+            document_id=document.id,
+            user_id=request.user.id
+        )
+        if not job_id:
+            logger.error(f"Failed to queue document {document.id} for processing")
+            return Response(
+                {'detail': 'Processing queue unavailable, please retry later'},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE
             )
 
-            serializer = DocumentDetailSerializer(document)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+        return self._processing_response(document, job_id, wait_seconds)
 
-        except ExtractionServiceError as e:
-            document.status = 'error'
-            document.save()
+    @action(detail=True, methods=['post'])
+    def reprocess(self, request, pk=None):
+        """Run extraction again for a completed or failed document.
 
-            # Log error
-            AuditLog.objects.create(
-                document=document,
-                user=request.user,
-                action='processed',
-                details={'error': str(e)}
+        POST /api/v1/documents/{id}/reprocess/?wait=10
+
+        Starts a new processing epoch, so the result of the earlier run is
+        not reused. Responds like process/.
+        """
+        document = self.get_object()
+
+        if document.status not in ('completed', 'error'):
+            return Response(
+                {'detail': f'Document status is {document.status}, not completed or error'},
+                status=status.HTTP_400_BAD_REQUEST
             )
 
+        wait_seconds = self._get_wait_seconds(request)
+        if wait_seconds is None:
             return Response(
-                {'detail': f'Extraction failed: {str(e)}'},
+                {'detail': 'wait must be a number of seconds'},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        except Exception as e:
-            logger.exception(f"Unexpected error processing document {pk}")
-            document.status = 'error'
-            document.save()
+
+        # Queued again: the job handle must not report the earlier result
+        previous_status = document.status
+        Document.objects.filter(pk=document.pk).update(status='uploaded')
+
+        job_id = AsyncExecutor.process_document(
+            document_id=document.id,
+            user_id=request.user.id,
+            force=True
+        )
+        if not job_id:
+            Document.objects.filter(pk=document.pk).update(status=previous_status)
+            logger.error(f"Failed to queue document {document.id} for reprocessing")
             return Response(
-                {'detail': 'Unexpected error during processing'},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+                {'detail': 'Processing queue unavailable, please retry later'},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE
             )
 
-    def _extract_material_specs(self, entities):
-        """Extract material specifications from entities."""
-        material_data = {}
-        materials = {}
+        return self._processing_response(document, job_id, wait_seconds)
 
-        for entity in entities:
-            if entity['type'] == 'MATERIAL':
-                materials[entity['text'].lower()] = 1.0
-            elif entity['type'] == 'QUANTITY':
-                material_data['quantity'] = entity['text']
+    @action(detail=True, methods=['get'])
+    def processing_status(self, request, pk=None):
+        """Get processing status (job handle) for document.
 
-        material_data['materials'] = materials
-        return material_data
+        GET /api/v1/documents/{id}/processing_status/?wait=10
+        """
+        document = self.get_object()
+
+        wait_seconds = self._get_wait_seconds(request)
+        if wait_seconds is None:
+            return Response(
+                {'detail': 'wait must be a number of seconds'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        job_id = IdempotencyLock(
+            build_idempotency_key(document, get_extraction_config())
+        ).holder()
+        return self._processing_response(document, job_id, wait_seconds)
+
+    def _get_wait_seconds(self, request):
+        """Parse ?wait= and clamp it to PROCESS_WAIT_MAX_SECONDS.
+
+        Returns:
+            Seconds to wait (0 if not given), or None if invalid
+        """
+        raw = request.query_params.get('wait')
+        if not raw:
+            return 0.0
+        try:
+            wait_seconds = float(raw)
+        except ValueError:
+            return None
+        if wait_seconds != wait_seconds:  # NaN
+            return None
+        max_wait = getattr(settings, 'PROCESS_WAIT_MAX_SECONDS', 30)
+        return min(max(wait_seconds, 0.0), max_wait)
+
+    def _processing_response(self, document, job_id, wait_seconds):
+        """Build the job handle response, long-polling up to wait_seconds."""
+        deadline = time.monotonic() + wait_seconds
+        poll_seconds = getattr(settings, 'PROCESS_WAIT_POLL_SECONDS', 0.5)
+
+        document.refresh_from_db(fields=['status'])
+        while document.status not in ('completed', 'error') and time.monotonic() < deadline:
+            time.sleep(min(poll_seconds, max(deadline - time.monotonic(), 0)))
+            document.refresh_from_db(fields=['status'])
+
+        if document.status == 'completed':
+            document = self.get_queryset().get(pk=document.pk)
+            serializer = DocumentDetailSerializer(document)
+            return Response(serializer.data, status=status.HTTP_200_OK)
+
+        if document.status == 'error':
+            return Response(
+                {
+                    'detail': 'Extraction failed',
+                    'document_id': str(document.id),
+                    'job_id': job_id,
+                    'status': document.status,
+                },
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        status_url = self.reverse_action(
+            'processing-status', args=[document.pk]
+        )
+        response = Response(
+            {
+                'document_id': str(document.id),
+                'job_id': job_id,
+                'status': 'queued' if document.status == 'uploaded' else document.status,
+                'status_url': status_url,
+                'estimated_seconds': round(
+                    ETAEstimator().estimate_document_ms(document) / 1000, 1
+                ),
+            },
+            status=status.HTTP_202_ACCEPTED
+        )
+        response['Location'] = status_url
+        response['Retry-After'] = '2'
+        return response
 
     @action(detail=True, methods=['get'])
     def extraction_summary(self, request, pk=None):
@@ -51,26 +51,90 @@ class PriceCalculationRequestSerializer(serializers.Serializer):
         default=True,
         help_text="Include detailed calculation breakdown in response"
     )
-    extraction_result_id = serializers.UUIDField(
+    extraction_result_id = serializers.IntegerField(
         required=False,
         allow_null=True,
         help_text="Optional: Link to ExtractionResult for Pauschalen context"
     )
+    trace = serializers.BooleanField(
+        default=False,
+        help_text="Return per-step timings, DB queries and cache hits"
+    )
+    preview = serializers.BooleanField(
+        default=False,
+        help_text="Calculate without saving Pauschalen applications or explanations"
+    )
 
     def validate_extracted_data(self, value: Dict[str, Any]) -> Dict[str, Any]:
         """Validate extracted_data has minimum required fields."""
         required_fields = []  # Made flexible - engine handles missing fields
 
-        # Validate numeric fields if present
-        numeric_fields = ['material_quantity', 'labor_hours', 'distanz_km', 'material_cost_eur']
-        for field in numeric_fields:
-            if field in value:
-                try:
-                    Decimal(str(value[field]))
-                except (ValueError, TypeError):
-                    raise serializers.ValidationError(
-                        {field: f"Muss eine gültige Zahl sein. Erhalten: {value[field]}"}
-                    )
+        validate_numeric_fields(value)
+        return value
+
+
+def validate_numeric_fields(value: Dict[str, Any]) -> None:
+    """Validate numeric fields of extracted_data if present."""
+    numeric_fields = ['material_quantity', 'labor_hours', 'distanz_km', 'material_cost_eur']
+    for field in numeric_fields:
+        if field in value:
+            try:
+                Decimal(str(value[field]))
+            except (ArithmeticError, ValueError, TypeError):
+                raise serializers.ValidationError(
+                    {field: f"Muss eine gültige Zahl sein. Erhalten: {value[field]}"}
+                )
+
+
+class BatchPriceCalculationRequestSerializer(serializers.Serializer):
+    """
+    Request serializer for batch price calculation.
+
+    POST /api/v1/calculate/batch/
+    {
+        "items": [
+            {"holzart": "eiche", "material_sku": "EICHE-25MM", "material_quantity": 10, "labor_hours": 4},
+            {"holzart": "buche", "oberflaeche": "oelen", "labor_hours": 2}
+        ],
+        "customer_type": "bestehende_kunden",
+        "breakdown": false
+    }
+    """
+
+    MAX_ITEMS = 1000
+
+    items = serializers.ListField(
+        child=serializers.JSONField(),
+        min_length=1,
+        max_length=MAX_ITEMS,
+        help_text="extracted_data per position (e.g. Leistungsverzeichnis lines)"
+    )
+    customer_type = serializers.ChoiceField(
+        choices=[
+            ('neue_kunden', 'Neue Kunden'),
+            ('bestehende_kunden', 'Bestehende Kunden'),
+            ('vip_kunden', 'VIP Kunden'),
+            ('gross_kunden', 'Großkunden'),
+        ],
+        default='neue_kunden',
+        help_text="Customer tier applied to all positions"
+    )
+    breakdown = serializers.BooleanField(
+        default=False,
+        help_text="Include detailed calculation breakdown per position"
+    )
+
+    def validate_items(self, value):
+        """Validate every position is an object with valid numeric fields."""
+        for idx, item in enumerate(value):
+            if not isinstance(item, dict):
+                raise serializers.ValidationError(
+                    f"Position {idx + 1} muss ein Objekt sein"
+                )
+            try:
+                validate_numeric_fields(item)
+            except serializers.ValidationError as e:
+                raise serializers.ValidationError({idx: e.detail})
 
         return value
 
@@ -128,7 +192,7 @@ class PriceCalculationResponseSerializer(serializers.Serializer):
         allow_null=True,
         help_text="ID of CalculationExplanation for transparency features"
     )
-    extraction_result_id = serializers.UUIDField(
+    extraction_result_id = serializers.IntegerField(
         required=False,
         allow_null=True,
         help_text="ID of ExtractionResult for benchmark comparison"
@@ -173,6 +237,141 @@ class PriceCalculationResponseSerializer(serializers.Serializer):
     calculated_at = serializers.DateTimeField(
         help_text="Timestamp of calculation"
     )
+    trace = serializers.JSONField(
+        required=False,
+        help_text="Span tree with duration_ms, queries and cache hits (if trace=true)"
+    )
+    preview = serializers.BooleanField(
+        default=False,
+        help_text="True if nothing was saved"
+    )
+
+
+class PriceScenarioRequestSerializer(serializers.Serializer):
+    """
+    Request serializer for what-if price matrices.
+
+    POST /api/v1/calculate/scenarios/
+    {
+        "base_data": {"material_sku": "EICHE-25MM", "labor_hours": 12},
+        "holzarten": ["eiche", "buche", "nussbaum"],
+        "oberflaechen": ["oelen", "lackieren"],
+        "komplexitaeten": ["gedrechselt", "hand_geschnitzt"],
+        "material_quantities": [10, 100, 500],
+        "customer_type": "bestehende_kunden",
+        "select": [0, 17]
+    }
+    """
+
+    base_data = serializers.JSONField(
+        required=False,
+        default=dict,
+        help_text="extracted_data shared by all combinations"
+    )
+    holzarten = serializers.ListField(
+        child=serializers.CharField(max_length=50), required=False, max_length=100
+    )
+    oberflaechen = serializers.ListField(
+        child=serializers.CharField(max_length=50), required=False, max_length=100
+    )
+    komplexitaeten = serializers.ListField(
+        child=serializers.CharField(max_length=50), required=False, max_length=100
+    )
+    material_quantities = serializers.ListField(
+        child=serializers.FloatField(min_value=0), required=False, max_length=100
+    )
+    customer_type = serializers.ChoiceField(
+        choices=[
+            ('neue_kunden', 'Neue Kunden'),
+            ('bestehende_kunden', 'Bestehende Kunden'),
+            ('vip_kunden', 'VIP Kunden'),
+            ('gross_kunden', 'Großkunden'),
+        ],
+        default='neue_kunden'
+    )
+    select = serializers.ListField(
+        child=serializers.IntegerField(min_value=0),
+        required=False,
+        help_text="Row indexes to re-price exactly"
+    )
+
+    def validate_base_data(self, value):
+        """Validate base_data is an object with valid numeric fields."""
+        if not isinstance(value, dict):
+            raise serializers.ValidationError("Muss ein Objekt sein")
+        validate_numeric_fields(value)
+        return value
+
+
+CUSTOMER_TYPE_CHOICES = [
+    ('neue_kunden', 'Neue Kunden'),
+    ('bestehende_kunden', 'Bestehende Kunden'),
+    ('vip_kunden', 'VIP Kunden'),
+    ('gross_kunden', 'Großkunden'),
+]
+
+
+class RepricingSessionRequestSerializer(serializers.Serializer):
+    """
+    Request serializer for opening a repricing session.
+
+    POST /api/v1/calculate/reprice/
+    {
+        "extracted_data": {"holzart": "eiche", "material_sku": "EICHE-25MM", "labor_hours": 12},
+        "customer_type": "neue_kunden",
+        "breakdown": true
+    }
+    """
+
+    extracted_data = serializers.JSONField(
+        help_text="Extracted data from document (holzart, oberflaeche, etc.)"
+    )
+    customer_type = serializers.ChoiceField(
+        choices=CUSTOMER_TYPE_CHOICES,
+        default='neue_kunden',
+        help_text="Customer tier for discount calculation"
+    )
+    breakdown = serializers.BooleanField(
+        default=True,
+        help_text="Include detailed calculation breakdown in responses"
+    )
+
+    def validate_extracted_data(self, value):
+        """Validate extracted_data is an object with valid numeric fields."""
+        if not isinstance(value, dict):
+            raise serializers.ValidationError("Muss ein Objekt sein")
+        validate_numeric_fields(value)
+        return value
+
+
+class RepricingChangeSerializer(serializers.Serializer):
+    """
+    Request serializer for repricing a session.
+
+    PATCH /api/v1/calculate/reprice/{session_id}/
+    {
+        "changes": {"holzart": "buche", "oberflaeche": null},
+        "customer_type": "bestehende_kunden"
+    }
+    """
+
+    changes = serializers.JSONField(
+        required=False,
+        default=dict,
+        help_text="extracted_data fields to change (null removes a field)"
+    )
+    customer_type = serializers.ChoiceField(
+        choices=CUSTOMER_TYPE_CHOICES,
+        required=False,
+        help_text="New customer tier"
+    )
+
+    def validate_changes(self, value):
+        """Validate changes is an object with valid numeric fields."""
+        if not isinstance(value, dict):
+            raise serializers.ValidationError("Muss ein Objekt sein")
+        validate_numeric_fields({k: v for k, v in value.items() if v is not None})
+        return value
 
 
 class MultiMaterialCalculationSerializer(serializers.Serializer):
@@ -261,6 +460,7 @@ class ApplicablePauschaleSerializer(serializers.Serializer):
     calculated_amount_eur = serializers.DecimalField(
         max_digits=10, decimal_places=2,
         required=False,
+        allow_null=True,
         help_text="Calculated amount if applies=true"
     )
     reason = serializers.CharField(
@@ -15,6 +15,7 @@ from .document_views import (
 from .batch_views import (
     BatchViewSet,
     BatchDocumentViewSet,
+    DeadLetterViewSet,
 )
 from .health_views import (
     health_check,
@@ -25,6 +26,10 @@ from .health_views import (
 # Phase 4D new views
 from .views.calculation_views import (
     PriceCalculationView,
+    BatchPriceCalculationView,
+    PriceScenarioView,
+    RepricingSessionView,
+    RepricingView,
     MultiMaterialCalculationView,
     ApplicablePauschaleView,
 )
@@ -64,6 +69,7 @@ router.register(r'proposals', ProposalViewSet, basename='proposal')
 router.register(r'proposal-templates', ProposalTemplateViewSet, basename='proposal-template')
 router.register(r'batches', BatchViewSet, basename='batch')
 router.register(r'batch-documents', BatchDocumentViewSet, basename='batch-document')
+router.register(r'dead-letters', DeadLetterViewSet, basename='dead-letter')
 router.register(r'health', HealthCheckViewSet, basename='health')
 
 # Phase 4D new routes - Configuration
@@ -86,6 +92,10 @@ urlpatterns = [
 
     # Phase 4D - Pricing & Calculation Endpoints
     path('calculate/price/', PriceCalculationView.as_view(), name='calculate-price'),
+    path('calculate/batch/', BatchPriceCalculationView.as_view(), name='calculate-batch'),
+    path('calculate/scenarios/', PriceScenarioView.as_view(), name='calculate-scenarios'),
+    path('calculate/reprice/', RepricingSessionView.as_view(), name='calculate-reprice'),
+    path('calculate/reprice/<str:session_id>/', RepricingView.as_view(), name='calculate-reprice-session'),
     path('calculate/multi-material/', MultiMaterialCalculationView.as_view(), name='calculate-multi-material'),
     path('pauschalen/applicable/', ApplicablePauschaleView.as_view(), name='pauschalen-applicable'),
 
@@ -13,6 +13,10 @@ from drf_spectacular.types import OpenApiTypes
 from api.v1.serializers.calculation_serializers import (
     PriceCalculationRequestSerializer,
     PriceCalculationResponseSerializer,
+    BatchPriceCalculationRequestSerializer,
+    PriceScenarioRequestSerializer,
+    RepricingSessionRequestSerializer,
+    RepricingChangeSerializer,
     MultiMaterialCalculationSerializer,
     ApplicablePauschaleSerializer,
     ApplicablePauschaleRequestSerializer,
@@ -20,8 +24,10 @@ from api.v1.serializers.calculation_serializers import (
 from api.v1.permissions import HasActiveBetriebskennzahl
 from extraction.services.calculation_engine import CalculationEngine, CalculationError
 from extraction.services.multi_material_calculation_service import calculate_multi_material_cost
+from extraction.services.scenario_engine import PricingScenarioEngine
+from extraction.services.incremental_pricing import IncrementalPricingService, RepricingSessionNotFound
 from documents.services.pauschale_calculation_service import PauschaleCalculationService
-from documents.models_pauschalen import BetriebspauschaleRegel
+from documents.services.pauschale_index import PauschaleIndexService
 from documents.models import ExtractionResult
 from documents.transparency_models import CalculationExplanation, CalculationFactor
 from decimal import Decimal
@@ -134,10 +140,15 @@ class PriceCalculationView(views.APIView):
         },
         "customer_type": "bestehende_kunden",
         "breakdown": true,
-        "extraction_result_id": "uuid-optional"
+        "extraction_result_id": "uuid-optional",
+        "trace": false,
+        "preview": false
     }
 
-    Returns complete pricing with TIER 1/2/3 factors and Pauschalen.
+    Returns complete pricing with TIER 1/2/3 factors and Pauschalen
+    (plus per-step timings if trace=true). With preview=true nothing is
+    saved; a later call with preview=false commits the Pauschalen
+    applications, replacing earlier ones of the ExtractionResult.
     """
 
     permission_classes = [IsAuthenticated, HasActiveBetriebskennzahl]
@@ -154,6 +165,8 @@ class PriceCalculationView(views.APIView):
         serializer = PriceCalculationRequestSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
+        preview = serializer.validated_data.get('preview', False)
+
         try:
             # Initialize calculation engine for user
             engine = CalculationEngine(user=request.user)
@@ -183,18 +196,23 @@ class PriceCalculationView(views.APIView):
                 customer_type=serializer.validated_data.get('customer_type', 'neue_kunden'),
                 breakdown=serializer.validated_data.get('breakdown', True),
                 extraction_result=extraction_result,
+                trace=serializer.validated_data.get('trace', False),
+                preview=preview,
             )
 
             # Create CalculationExplanation for transparency (Phase 4A integration)
-            explanation = create_calculation_explanation(
-                extraction_result=extraction_result,
-                calculation_result=result,
-                user=request.user
-            )
+            explanation = None
+            if not preview:
+                explanation = create_calculation_explanation(
+                    extraction_result=extraction_result,
+                    calculation_result=result,
+                    user=request.user
+                )
 
             # Add transparency IDs to result
             result['calculation_id'] = str(explanation.id) if explanation else None
             result['extraction_result_id'] = str(extraction_result.id) if extraction_result else None
+            result['preview'] = preview
 
             # Log calculation
             logger.info(
@@ -231,6 +249,276 @@ class PriceCalculationView(views.APIView):
             )
 
 
+class BatchPriceCalculationView(views.APIView):
+    """
+    Calculate prices for many positions in one request.
+
+    POST /api/v1/calculate/batch/
+    {
+        "items": [
+            {"holzart": "eiche", "material_sku": "EICHE-25MM", "material_quantity": 10, "labor_hours": 4},
+            {"holzart": "buche", "oberflaeche": "oelen", "labor_hours": 2}
+        ],
+        "customer_type": "bestehende_kunden",
+        "breakdown": false
+    }
+
+    Returns per-position results (in request order) plus the total. Positions
+    that fail are reported with status 'error' and left out of the total.
+    """
+
+    permission_classes = [IsAuthenticated, HasActiveBetriebskennzahl]
+
+    @extend_schema(
+        request=BatchPriceCalculationRequestSerializer,
+        responses={200: OpenApiTypes.OBJECT},
+        summary="Calculate prices for many positions",
+        description="Price up to 1000 positions (e.g. a Leistungsverzeichnis) with one configuration load",
+        tags=['Pricing'],
+    )
+    def post(self, request):
+        """Calculate batch of positions."""
+        serializer = BatchPriceCalculationRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        try:
+            engine = CalculationEngine(user=request.user)
+            result = engine.calculate_many(
+                serializer.validated_data['items'],
+                customer_type=serializer.validated_data['customer_type'],
+                breakdown=serializer.validated_data['breakdown'],
+            )
+
+            logger.info(
+                f"Batch price calculated for user {request.user.id}: "
+                f"{result['succeeded']}/{result['count']} positions, "
+                f"{result['total_price_eur']} EUR"
+            )
+
+            return Response(result, status=status.HTTP_200_OK)
+
+        except CalculationError as e:
+            logger.warning(f"Batch calculation error for user {request.user.id}: {e}")
+            return Response(
+                {
+                    'detail': str(e),
+                    'error_code': 'calculation_error'
+                },
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        except Exception as e:
+            logger.exception(f"Unexpected error in batch price calculation for user {request.user.id}")
+            return Response(
+                {
+                    'detail': 'Ein unerwarteter Fehler ist aufgetreten bei der Preisberechnung.',
+                    'error_code': 'internal_error'
+                },
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class PriceScenarioView(views.APIView):
+    """
+    What-if price matrix over wood type × surface × complexity × quantity.
+
+    POST /api/v1/calculate/scenarios/
+    {
+        "base_data": {"material_sku": "EICHE-25MM", "labor_hours": 12},
+        "holzarten": ["eiche", "buche", "nussbaum"],
+        "oberflaechen": ["oelen", "lackieren"],
+        "komplexitaeten": ["gedrechselt", "hand_geschnitzt"],
+        "material_quantities": [10, 100, 500],
+        "select": [0, 17]
+    }
+
+    Returns one row per combination with an approximate price; selected
+    rows also carry the exact price from the 8-step workflow.
+    """
+
+    permission_classes = [IsAuthenticated, HasActiveBetriebskennzahl]
+
+    @extend_schema(
+        request=PriceScenarioRequestSerializer,
+        responses={200: OpenApiTypes.OBJECT},
+        summary="Calculate price matrix",
+        description="Vectorized what-if pricing over parameter combinations, exact prices for selected rows",
+        tags=['Pricing'],
+    )
+    def post(self, request):
+        """Calculate price matrix."""
+        serializer = PriceScenarioRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        try:
+            engine = PricingScenarioEngine(user=request.user)
+            result = engine.evaluate_grid(
+                base_data=data['base_data'],
+                holzarten=data.get('holzarten'),
+                oberflaechen=data.get('oberflaechen'),
+                komplexitaeten=data.get('komplexitaeten'),
+                material_quantities=data.get('material_quantities'),
+                customer_type=data['customer_type'],
+                select=data.get('select'),
+            )
+            return Response(result, status=status.HTTP_200_OK)
+
+        except ValueError as e:
+            return Response(
+                {
+                    'detail': str(e),
+                    'error_code': 'invalid_grid'
+                },
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        except CalculationError as e:
+            logger.warning(f"Scenario calculation error for user {request.user.id}: {e}")
+            return Response(
+                {
+                    'detail': str(e),
+                    'error_code': 'calculation_error'
+                },
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        except Exception as e:
+            logger.exception(f"Unexpected error in scenario calculation for user {request.user.id}")
+            return Response(
+                {
+                    'detail': 'Ein unerwarteter Fehler ist aufgetreten bei der Preisberechnung.',
+                    'error_code': 'internal_error'
+                },
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class RepricingSessionView(views.APIView):
+    """
+    Open a repricing session for interactive price changes.
+
+    POST /api/v1/calculate/reprice/
+    {
+        "extracted_data": {"holzart": "eiche", "material_sku": "EICHE-25MM", "labor_hours": 12},
+        "customer_type": "neue_kunden"
+    }
+
+    Returns the full price plus a session_id for
+    PATCH /api/v1/calculate/reprice/{session_id}/.
+    """
+
+    permission_classes = [IsAuthenticated, HasActiveBetriebskennzahl]
+
+    @extend_schema(
+        request=RepricingSessionRequestSerializer,
+        responses={201: OpenApiTypes.OBJECT},
+        summary="Open repricing session",
+        description="Calculate a price and keep intermediate step values for incremental repricing",
+        tags=['Pricing'],
+    )
+    def post(self, request):
+        """Open repricing session."""
+        serializer = RepricingSessionRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        try:
+            service = IncrementalPricingService(user=request.user)
+            result = service.start(
+                extracted_data=serializer.validated_data['extracted_data'],
+                customer_type=serializer.validated_data['customer_type'],
+                breakdown=serializer.validated_data['breakdown'],
+            )
+            return Response(result, status=status.HTTP_201_CREATED)
+
+        except CalculationError as e:
+            logger.warning(f"Repricing error for user {request.user.id}: {e}")
+            return Response(
+                {
+                    'detail': str(e),
+                    'error_code': 'calculation_error'
+                },
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        except Exception:
+            logger.exception(f"Unexpected error in repricing session for user {request.user.id}")
+            return Response(
+                {
+                    'detail': 'Ein unerwarteter Fehler ist aufgetreten bei der Preisberechnung.',
+                    'error_code': 'internal_error'
+                },
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class RepricingView(views.APIView):
+    """
+    Reprice a session after single field changes.
+
+    PATCH /api/v1/calculate/reprice/{session_id}/
+    {
+        "changes": {"holzart": "buche"},
+        "customer_type": "bestehende_kunden"
+    }
+
+    Only the workflow steps depending on the changed fields are
+    recomputed; 'recomputed' lists them.
+    """
+
+    permission_classes = [IsAuthenticated, HasActiveBetriebskennzahl]
+
+    @extend_schema(
+        request=RepricingChangeSerializer,
+        responses={200: OpenApiTypes.OBJECT},
+        summary="Reprice session",
+        description="Apply field changes and recompute only the dependent pricing steps",
+        tags=['Pricing'],
+    )
+    def patch(self, request, session_id):
+        """Reprice session."""
+        serializer = RepricingChangeSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        try:
+            service = IncrementalPricingService(user=request.user)
+            result = service.reprice(
+                session_id,
+                changes=serializer.validated_data['changes'],
+                customer_type=serializer.validated_data.get('customer_type'),
+            )
+            return Response(result, status=status.HTTP_200_OK)
+
+        except RepricingSessionNotFound as e:
+            return Response(
+                {
+                    'detail': str(e),
+                    'error_code': 'session_not_found'
+                },
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        except CalculationError as e:
+            logger.warning(f"Repricing error for user {request.user.id}: {e}")
+            return Response(
+                {
+                    'detail': str(e),
+                    'error_code': 'calculation_error'
+                },
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        except Exception:
+            logger.exception(f"Unexpected error in repricing for user {request.user.id}")
+            return Response(
+                {
+                    'detail': 'Ein unerwarteter Fehler ist aufgetreten bei der Preisberechnung.',
+                    'error_code': 'internal_error'
+                },
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
 class MultiMaterialCalculationView(views.APIView):
     """
     Calculate price for multi-material projects (Phase 4C).
@@ -372,21 +660,22 @@ class ApplicablePauschaleView(views.APIView):
             if params_serializer.validated_data.get('material_menge'):
                 context['material_menge'] = float(params_serializer.validated_data['material_menge'])
 
-            # Get all active Pauschalen for user
-            pauschalen = BetriebspauschaleRegel.objects.filter(
-                user=request.user,
-                is_active=True
-            )
+            # Active Pauschalen of the user, shared with PauschaleCalculationService
+            index = PauschaleIndexService.get(request.user)
+            anwendbar = {
+                pauschale.id
+                for pauschale in index.anwendbare(params_serializer.validated_data.get('auftragswert'))
+            }
 
             # Check applicability for each
             results = []
-            for pauschale in pauschalen:
-                applies = self._check_applicability(pauschale, context)
+            for pauschale in index.regeln:
+                applies = pauschale.id in anwendbar
                 calculated_amount = None
                 reason = None
 
                 if applies:
-                    calculated_amount, reason = self._calculate_amount(pauschale, context)
+                    calculated_amount, reason = self._calculate_amount(index, pauschale, context)
 
                 results.append({
                     'regel_id': pauschale.id,
@@ -416,25 +705,7 @@ class ApplicablePauschaleView(views.APIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
-    def _check_applicability(self, pauschale, context):
-        """Check if Pauschale applies to given context."""
-        # Always applicable for 'fest', 'prozent', 'pro_einheit'
-        if pauschale.berechnungsart in ['fest', 'prozent', 'pro_einheit']:
-            return True
-
-        # For konditional, evaluate DSL regel
-        if pauschale.berechnungsart == 'konditional' and pauschale.dsl_regel:
-            try:
-                from documents.services.bauteil_regel_engine import BauteilRegelEngine
-                engine = BauteilRegelEngine()
-                return engine.evaluate(pauschale.dsl_regel, context)
-            except Exception as e:
-                logger.warning(f"Error evaluating DSL for Pauschale {pauschale.id}: {e}")
-                return False
-
-        return False
-
-    def _calculate_amount(self, pauschale, context):
+    def _calculate_amount(self, index, pauschale, context):
         """Calculate Pauschale amount for given context."""
         try:
             if pauschale.berechnungsart == 'fest':
@@ -459,15 +730,9 @@ class ApplicablePauschaleView(views.APIView):
                 return float(amount), f'{pauschale.betrag} EUR × {quantity} {pauschale.einheit}'
 
             elif pauschale.berechnungsart == 'konditional':
-                # For conditional, use DSL to calculate
-                from documents.services.bauteil_regel_engine import BauteilRegelEngine
-                engine = BauteilRegelEngine()
-                result = engine.evaluate(pauschale.dsl_regel, context)
-
-                if isinstance(result, (int, float)):
-                    return float(result), 'Berechnet via DSL-Regel'
-                else:
-                    return float(pauschale.betrag), 'Standard-Betrag (DSL gab boolean zurück)'
+                # Compiled DSL rule from the index
+                result = index.berechne_konditional(pauschale, context)
+                return float(result), 'Berechnet via DSL-Regel'
 
         except Exception as e:
             logger.warning(f"Error calculating Pauschale amount for {pauschale.id}: {e}")
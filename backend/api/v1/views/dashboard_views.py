@@ -286,6 +286,7 @@ def system_health(request):
     - Database connectivity
     - Redis cache
     - Recent error rates
+    - Worker replica recommendation
     """
     try:
         health_status = {
@@ -362,6 +363,19 @@ def system_health(request):
                 'message': f'Could not check error rate: {str(e)}'
             }
 
+        # Worker scaling recommendation (queue backlog / learned durations)
+        try:
+            from extraction.services.eta_estimator import ETAEstimator
+            health_status['components']['workers'] = {
+                'status': 'healthy',
+                **ETAEstimator().recommend_worker_replicas(),
+            }
+        except Exception as e:
+            health_status['components']['workers'] = {
+                'status': 'unknown',
+                'message': f'Could not estimate queue backlog: {str(e)}'
+            }
+
         return Response(health_status, status=status.HTTP_200_OK)
 
     except Exception as e:
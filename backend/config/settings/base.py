@@ -341,6 +341,9 @@ NER_CONFIDENCE_THRESHOLD = config('NER_CONFIDENCE_THRESHOLD', default='0.6', cas
 # Processing Configuration
 MAX_FILE_SIZE_MB = config('MAX_FILE_SIZE_MB', default='50', cast=int)
 ALLOWED_DOCUMENT_TYPES = ['pdf', 'jpg', 'jpeg', 'png', 'docx', 'txt']
+EXTRACTION_WORKER_CONCURRENCY = config('EXTRACTION_WORKER_CONCURRENCY', default='2', cast=int)  # ETA + autoscaling
+PROCESS_WAIT_MAX_SECONDS = config('PROCESS_WAIT_MAX_SECONDS', default='30', cast=int)  # Cap for ?wait= long-poll
+PROCESS_WAIT_POLL_SECONDS = 0.5
 
 # Document Retention (DSGVO Art. 5 - Storage Limitation)
 DOCUMENT_RETENTION_DAYS = config('DOCUMENT_RETENTION_DAYS', default='365', cast=int)
@@ -354,6 +357,7 @@ GCP_PROJECT_ID = config('GCP_PROJECT_ID', default='')
 GCP_CREDENTIALS = config('GCP_CREDENTIALS', default='')
 GCS_BUCKET_NAME = config('GCS_BUCKET_NAME', default='draftcraft-documents')
 CLOUD_TASKS_QUEUE = config('CLOUD_TASKS_QUEUE', default='document-processing')
+CLOUD_TASKS_DISPATCH_CONCURRENCY = config('CLOUD_TASKS_DISPATCH_CONCURRENCY', default='10', cast=int)  # Bulk task creation
 
 # ============================================================================
 # Agentic RAG Configuration (Phase 2 Enhancement)
@@ -380,6 +384,21 @@ CACHES = {
     }
 }
 
+# Fraction of price calculations traced into the 'pricing' histogram
+# (manage.py pricing_trace_histogram); explicit trace requests always trace
+PRICING_TRACE_SAMPLE_RATE = config('PRICING_TRACE_SAMPLE_RATE', default='0.0', cast=float)
+
+# Bauteil rule traces (documents.services.bauteil_regel_trace): fraction of
+# calculate_bauteil_kosten() calls traced in full, and the number of traces
+# kept in the cache ring buffer. Failing rules and trace=True always trace
+BAUTEIL_REGEL_TRACE_SAMPLE_RATE = config('BAUTEIL_REGEL_TRACE_SAMPLE_RATE', default='0.0', cast=float)
+BAUTEIL_REGEL_TRACE_BUFFER_SIZE = config('BAUTEIL_REGEL_TRACE_BUFFER_SIZE', default=1000, cast=int)
+
+# Bulk repricing after catalog changes: extractions per chunk and the pause
+# between chunks, so repricing does not crowd out live pricing requests
+REPRICING_CHUNK_SIZE = config('REPRICING_CHUNK_SIZE', default=100, cast=int)
+REPRICING_CHUNK_PAUSE_SECONDS = config('REPRICING_CHUNK_PAUSE_SECONDS', default='0.5', cast=float)
+
 # Agent Settings - Intelligent routing configuration
 AGENT_SETTINGS = {
     'ALWAYS_ENABLED': True,  # Agent always integrated, routing decides usage
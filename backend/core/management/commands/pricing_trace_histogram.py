@@ -0,0 +1,53 @@
+"""
+Django management command to export aggregated calculation traces.
+
+Usage:
+    python manage.py pricing_trace_histogram
+    python manage.py pricing_trace_histogram --format prometheus
+    python manage.py pricing_trace_histogram --reset
+
+Output:
+    Span duration histograms of traced price calculations (requests with
+    trace=true plus the PRICING_TRACE_SAMPLE_RATE sample).
+"""
+
+import json
+
+from django.core.management.base import BaseCommand
+
+from core.tracing import TraceHistogram
+
+
+class Command(BaseCommand):
+    help = "Export span duration histograms of traced price calculations"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--name',
+            type=str,
+            default='pricing',
+            help='Histogram name (default: pricing)',
+        )
+        parser.add_argument(
+            '--format',
+            choices=['json', 'prometheus'],
+            default='json',
+            help='Output format (default: json)',
+        )
+        parser.add_argument(
+            '--reset',
+            action='store_true',
+            help='Clear the histogram after exporting',
+        )
+
+    def handle(self, *args, **options):
+        histogram = TraceHistogram(options['name'])
+
+        if options['format'] == 'prometheus':
+            self.stdout.write(histogram.to_prometheus(), ending='')
+        else:
+            self.stdout.write(json.dumps(histogram.export(), indent=2))
+
+        if options['reset']:
+            histogram.reset()
+            self.stderr.write(f"Histogram '{options['name']}' reset")
@@ -0,0 +1,99 @@
+"""Fixed-point money arithmetic for the pricing services.
+
+Amounts are plain ints counting nano-euros (Money, 10^-9 EUR); factors,
+quantities and percentages are ints at micro scale (Rate, 10^-6). Adding
+amounts is int addition, multiplying by a rate is one int multiplication
+and one division. Decimals and floats appear only at the edges: input
+values are converted once with to_money()/to_rate(), results are
+converted with to_float() (API floats) or to_decimal() (DecimalFields).
+
+Rounding policy:
+- Internally, every product is rounded to the nearest nano-euro (halves
+  upwards). Over the few dozen operations of one calculation the error
+  stays below 10^-7 EUR, so results agree with exact Decimal arithmetic
+  to the cent. Inputs are converted half-even.
+- to_decimal() rounds half-up to cents (kaufmännische Rundung) for
+  amounts that are stored or printed; callers that keep an existing
+  Decimal rounding mode pass it explicitly.
+
+Example:
+    >>> price = to_money('45.90')
+    >>> price = apply(price * 10, to_rate('1.3'))
+    >>> to_float(price), to_decimal(price)
+    (596.7, Decimal('596.70'))
+"""
+from decimal import ROUND_HALF_EVEN, ROUND_HALF_UP, Decimal
+from typing import NewType, Union
+
+Money = NewType('Money', int)
+Rate = NewType('Rate', int)
+
+SCALE = 10 ** 9  # Money units per EUR
+RATE_SCALE = 10 ** 6  # Rate units per 1.0
+
+ZERO = Money(0)
+ONE = Rate(RATE_SCALE)
+
+Number = Union[int, float, str, Decimal]
+
+# Floats below this convert exactly through float multiplication
+_FAST_FLOAT_LIMIT = 10 ** 6
+_HALF_RATE = RATE_SCALE // 2
+
+# The hot functions below return plain ints instead of calling Money()/Rate():
+# NewType calls cost a function call each and pricing runs them per step.
+
+
+def _scaled(value: Number, scale: int) -> int:
+    """value × scale as int, rounded half-even."""
+    if type(value) is int:
+        return value * scale
+    if type(value) is float and -_FAST_FLOAT_LIMIT < value < _FAST_FLOAT_LIMIT:
+        return round(value * scale)
+    if not isinstance(value, Decimal):
+        value = Decimal(str(value))
+    return int((value * scale).to_integral_value(ROUND_HALF_EVEN))
+
+
+def to_money(value: Number) -> Money:
+    """Amount in EUR (int, float, str or Decimal) as Money."""
+    return _scaled(value, SCALE)
+
+
+def to_rate(value: Number) -> Rate:
+    """Factor or quantity (e.g. 1.3 or 12.5 hours) as Rate."""
+    if type(value) is float and -_FAST_FLOAT_LIMIT < value < _FAST_FLOAT_LIMIT:
+        return round(value * RATE_SCALE)
+    return _scaled(value, RATE_SCALE)
+
+
+def percent(value: Number) -> Rate:
+    """Percentage (e.g. 7.5) as the Rate 0.075."""
+    return (_scaled(value, RATE_SCALE) + 50) // 100
+
+
+def apply(amount: Money, rate: Rate) -> Money:
+    """amount × rate."""
+    return (amount * rate + _HALF_RATE) // RATE_SCALE
+
+
+def times(amount: Money, quantity: Number) -> Money:
+    """amount × quantity; exact for whole quantities."""
+    if type(quantity) is int:
+        return amount * quantity
+    return (amount * to_rate(quantity) + _HALF_RATE) // RATE_SCALE
+
+
+def to_float(amount: Money) -> float:
+    """Amount in EUR as float (API responses, breakdowns)."""
+    return amount / SCALE
+
+
+def rate_to_float(rate: Rate) -> float:
+    """Rate as float."""
+    return rate / RATE_SCALE
+
+
+def to_decimal(amount: Money, places: int = 2, rounding: str = ROUND_HALF_UP) -> Decimal:
+    """Amount in EUR rounded to ``places`` decimals (half-up by default)."""
+    return Decimal(amount).scaleb(-9).quantize(Decimal(1).scaleb(-places), rounding=rounding)
@@ -0,0 +1,303 @@
+"""Lightweight opt-in tracing: nested spans with wall time, DB queries and cache hits.
+
+Usage:
+    with Trace('calculate_project_price') as trace:
+        with span('step_1_base_material'):
+            ...
+    trace.to_dict()
+
+span() and record_cache() are no-ops unless a Trace is active in the
+current context, so library code can be instrumented unconditionally.
+Aggregated span durations can be collected in a TraceHistogram.
+"""
+import contextvars
+import logging
+import time
+from contextlib import ExitStack, contextmanager, nullcontext
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from django.core.cache import cache
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+_active_trace: contextvars.ContextVar = contextvars.ContextVar('active_trace', default=None)
+
+
+class Span:
+    """One timed section of a trace."""
+
+    __slots__ = ('name', 'attrs', 'children', 'duration_ms', 'queries', 'cache_hits', 'cache_misses')
+
+    def __init__(self, name: str, attrs: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.attrs = attrs or {}
+        self.children: List['Span'] = []
+        self.duration_ms = 0.0
+        self.queries = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {
+            'name': self.name,
+            'duration_ms': round(self.duration_ms, 3),
+            'queries': self.queries,
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+        }
+        if self.attrs:
+            data['attrs'] = self.attrs
+        if self.children:
+            data['spans'] = [child.to_dict() for child in self.children]
+        return data
+
+
+class Trace:
+    """Collects nested spans while active (context manager).
+
+    Queries are counted on all database connections via execute
+    wrappers; cache lookups are reported by instrumented code through
+    record_cache(). Counts of a span include its children.
+    """
+
+    def __init__(self, name: str, **attrs):
+        self.root = Span(name, attrs)
+        self._stack: List[Span] = []
+        self._queries = 0
+        self._cache_hits = 0
+        self._cache_misses = 0
+        self._exit_stack: Optional[ExitStack] = None
+        self._token = None
+        self._root_context = None
+
+    def __enter__(self) -> 'Trace':
+        self._exit_stack = ExitStack()
+        for connection in connections.all():
+            self._exit_stack.enter_context(connection.execute_wrapper(self._count_query))
+        self._token = _active_trace.set(self)
+        self._root_context = self._timed(self.root)
+        self._root_context.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._root_context.__exit__(exc_type, exc, tb)
+        _active_trace.reset(self._token)
+        self._exit_stack.close()
+        return False
+
+    @contextmanager
+    def span(self, name: str, **attrs) -> Iterator[Span]:
+        """Time a child span of the current span."""
+        child = Span(name, attrs)
+        (self._stack[-1] if self._stack else self.root).children.append(child)
+        with self._timed(child):
+            yield child
+
+    def record_cache(self, hit: bool) -> None:
+        if hit:
+            self._cache_hits += 1
+        else:
+            self._cache_misses += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        return self.root.to_dict()
+
+    def durations(self) -> List[Tuple[str, float]]:
+        """(span path, duration_ms) of every span, e.g. 'calc/step_1'."""
+        result = []
+
+        def walk(span_: Span, prefix: str):
+            path = f"{prefix}/{span_.name}" if prefix else span_.name
+            result.append((path, span_.duration_ms))
+            for child in span_.children:
+                walk(child, path)
+
+        walk(self.root, '')
+        return result
+
+    @contextmanager
+    def _timed(self, span_: Span) -> Iterator[Span]:
+        self._stack.append(span_)
+        queries, hits, misses = self._queries, self._cache_hits, self._cache_misses
+        start = time.perf_counter()
+        try:
+            yield span_
+        finally:
+            span_.duration_ms = (time.perf_counter() - start) * 1000
+            span_.queries = self._queries - queries
+            span_.cache_hits = self._cache_hits - hits
+            span_.cache_misses = self._cache_misses - misses
+            self._stack.pop()
+
+    def _count_query(self, execute, sql, params, many, context):
+        self._queries += 1
+        return execute(sql, params, many, context)
+
+
+def active_trace() -> Optional[Trace]:
+    """Trace active in the current context, if any."""
+    return _active_trace.get()
+
+
+def span(name: str, **attrs):
+    """Child span of the active trace, or a no-op context."""
+    trace = _active_trace.get()
+    if trace is None:
+        return nullcontext()
+    return trace.span(name, **attrs)
+
+
+def record_cache(hit: bool) -> None:
+    """Report a cache lookup to the active trace (no-op without one)."""
+    trace = _active_trace.get()
+    if trace is not None:
+        trace.record_cache(hit)
+
+
+class TraceHistogram:
+    """Span durations aggregated into fixed buckets in the Django cache.
+
+    Shared by all processes through Redis, so production traffic builds
+    one histogram per span path that can be exported and compared
+    between releases. On Redis a trace is written in one pipelined round
+    trip and the span paths are kept in a Redis set; other cache backends
+    (local development, tests) fall back to one cache call per counter.
+    """
+
+    BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+    KEY = 'trace_histogram:{name}:{path}:{field}'
+    PATHS_KEY = 'trace_histogram:{name}:paths'
+    TIMEOUT = 7 * 24 * 3600
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def observe(self, trace: Trace) -> None:
+        """Add every span duration of a finished trace."""
+        try:
+            counts = self._counts(trace)
+            client = self._redis()
+            if client is not None:
+                self._observe_redis(client, counts)
+            else:
+                self._observe_cache(counts)
+        except Exception as e:
+            # Metrics must never break the traced operation
+            logger.warning(f"Could not record trace histogram '{self.name}': {e}")
+
+    def export(self) -> Dict[str, Dict[str, Any]]:
+        """Histogram per span path.
+
+        Returns:
+            {path: {'count', 'sum_ms', 'buckets': {'<=1': n, ..., '+Inf': n}}}
+            with cumulative bucket counts
+        """
+        paths = self._paths()
+        labels = [str(b) for b in self.BUCKETS_MS] + ['inf']
+        keys = {
+            (path, field): self._key(path, field)
+            for path in paths
+            for field in [f'le_{label}' for label in labels] + ['count', 'sum_us']
+        }
+        values = cache.get_many(list(keys.values()))
+
+        result = {}
+        for path in sorted(paths):
+            cumulative = 0
+            buckets = {}
+            for label in labels:
+                cumulative += values.get(keys[(path, f'le_{label}')], 0)
+                buckets['+Inf' if label == 'inf' else f'<={label}'] = cumulative
+            result[path] = {
+                'count': values.get(keys[(path, 'count')], 0),
+                'sum_ms': round(values.get(keys[(path, 'sum_us')], 0) / 1000, 3),
+                'buckets': buckets,
+            }
+        return result
+
+    def to_prometheus(self, metric: str = 'trace_span_duration_ms') -> str:
+        """Export in Prometheus text exposition format."""
+        lines = [f'# TYPE {metric} histogram']
+        for path, data in self.export().items():
+            labels = f'trace="{self.name}",span="{path}"'
+            for bucket, count in data['buckets'].items():
+                le = '+Inf' if bucket == '+Inf' else bucket[2:]
+                lines.append(f'{metric}_bucket{{{labels},le="{le}"}} {count}')
+            lines.append(f'{metric}_sum{{{labels}}} {data["sum_ms"]}')
+            lines.append(f'{metric}_count{{{labels}}} {data["count"]}')
+        return '\n'.join(lines) + '\n'
+
+    def reset(self) -> None:
+        paths = self._paths()
+        labels = [str(b) for b in self.BUCKETS_MS] + ['inf']
+        cache.delete_many([
+            self._key(path, field)
+            for path in paths
+            for field in [f'le_{label}' for label in labels] + ['count', 'sum_us']
+        ] + [self.PATHS_KEY.format(name=self.name)])
+
+    def _key(self, path: str, field: str) -> str:
+        return self.KEY.format(name=self.name, path=path, field=field)
+
+    def _counts(self, trace: Trace) -> Dict[str, Dict[str, int]]:
+        """Counter increments of a trace, summed per span path and field."""
+        counts: Dict[str, Dict[str, int]] = {}
+        for path, duration_ms in trace.durations():
+            bucket = next((b for b in self.BUCKETS_MS if duration_ms <= b), 'inf')
+            fields = counts.setdefault(path, {})
+            for field, amount in ((f'le_{bucket}', 1), ('count', 1), ('sum_us', int(duration_ms * 1000))):
+                fields[field] = fields.get(field, 0) + amount
+        return counts
+
+    @staticmethod
+    def _redis():
+        """Raw client of a django-redis default cache, or None."""
+        try:
+            from django_redis import get_redis_connection
+
+            return get_redis_connection('default')
+        except (ImportError, NotImplementedError):
+            return None
+
+    def _observe_redis(self, client, counts: Dict[str, Dict[str, int]]) -> None:
+        """All increments and the path set update in one round trip.
+
+        Keys go through cache.make_key, and django-redis stores integers
+        unencoded, so export() reads the counters through the cache API.
+        """
+        pipe = client.pipeline(transaction=False)
+        for path, fields in counts.items():
+            for field, amount in fields.items():
+                key = cache.make_key(self._key(path, field))
+                pipe.incrby(key, amount)
+                pipe.expire(key, self.TIMEOUT)
+        paths_key = cache.make_key(self.PATHS_KEY.format(name=self.name))
+        pipe.sadd(paths_key, *counts)
+        pipe.expire(paths_key, self.TIMEOUT)
+        pipe.execute()
+
+    def _observe_cache(self, counts: Dict[str, Dict[str, int]]) -> None:
+        for path, fields in counts.items():
+            for field, amount in fields.items():
+                self._incr(self._key(path, field), amount)
+
+        key = self.PATHS_KEY.format(name=self.name)
+        known = cache.get(key) or []
+        missing = [p for p in counts if p not in known]
+        if missing:
+            cache.set(key, known + missing, timeout=self.TIMEOUT)
+
+    def _paths(self) -> List[str]:
+        client = self._redis()
+        if client is not None:
+            members = client.smembers(cache.make_key(self.PATHS_KEY.format(name=self.name)))
+            return [path.decode() for path in members]
+        return cache.get(self.PATHS_KEY.format(name=self.name)) or []
+
+    def _incr(self, key: str, amount: int) -> None:
+        if not cache.add(key, amount, timeout=self.TIMEOUT):
+            try:
+                cache.incr(key, amount)
+            except ValueError:
+                cache.set(key, amount, timeout=self.TIMEOUT)
@@ -0,0 +1,157 @@
+"""Versioned caching of values built from the database.
+
+Used by the pricing snapshot, the catalog snapshot, the Pauschalen index
+and the compiled rule caches:
+
+- LocalLRU is a bounded, thread-safe key -> (version, value) memory of
+  one process. A value is only returned for the version it was stored
+  with, so a stale entry is never read.
+- VersionedCache adds a version token per key in the Django cache.
+  Invalidating a key deletes its token, and the next read issues a new
+  one. Values are stored in the Django cache under key + token and in a
+  LocalLRU. A warm read costs one cache read. Without a working cache,
+  every read builds a fresh value.
+
+Example:
+    >>> snapshots = VersionedCache('snapshot:version:{key}', 'snapshot:v1:{key}:{version}', max_entries=128)
+    >>> snapshot = snapshots.get(user_id, lambda version: build(user_id, version))
+    >>> snapshots.invalidate([user_id])
+"""
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Generic, Hashable, Iterable, Optional, TypeVar
+
+from django.core.cache import cache
+
+T = TypeVar('T')
+
+
+class LocalLRU(Generic[T]):
+    """Process-local memory of the latest version of each key."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[Hashable, tuple]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, version: Any) -> Optional[T]:
+        """Value stored for this version of a key, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: Hashable, version: Any, value: T) -> None:
+        """Store a value, evicting the least recently used keys."""
+        with self._lock:
+            self._entries[key] = (version, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, keys: Iterable[Hashable]) -> None:
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class VersionedCache(Generic[T]):
+    """Values in the Django cache and process memory under a per-key version token."""
+
+    def __init__(
+        self,
+        version_key: str,
+        value_key: str,
+        timeout: int = 24 * 3600,
+        max_entries: int = 128,
+    ):
+        """
+        Args:
+            version_key: Cache key of the token, with a {key} placeholder
+            value_key: Cache key of a value, with {key} and {version}
+            timeout: Lifetime of cached values in seconds
+            max_entries: Keys kept in process memory
+        """
+        self.version_key = version_key
+        self.value_key = value_key
+        self.timeout = timeout
+        self.local: LocalLRU[T] = LocalLRU(max_entries)
+
+    def get(
+        self,
+        key: Hashable,
+        build: Callable[[str], Optional[T]],
+        on_lookup: Optional[Callable[[bool], None]] = None,
+    ) -> Optional[T]:
+        """
+        Current value of a key.
+
+        Args:
+            key: Key of the value (user id, catalog id, ...)
+            build: Builds the value for a version token; None is not cached
+            on_lookup: Called with True on a cache hit, False otherwise
+
+        Returns:
+            The cached or freshly built value
+        """
+        version = self.current_version(key)
+        if version is None:
+            # No usable cache: always build
+            if on_lookup:
+                on_lookup(False)
+            return build(uuid.uuid4().hex)
+
+        value = self.local.get(key, version)
+        if value is not None:
+            if on_lookup:
+                on_lookup(True)
+            return value
+
+        value_key = self.value_key.format(key=key, version=version)
+        value = cache.get(value_key)
+        if on_lookup:
+            on_lookup(value is not None)
+        if value is None:
+            value = build(version)
+            if value is None:
+                return None
+            cache.set(value_key, value, timeout=self.timeout)
+
+        self.local.set(key, version, value)
+        return value
+
+    def current_version(self, key: Hashable) -> Optional[str]:
+        """Version token of a key, issuing one if none exists.
+
+        Returns:
+            Token, or None if the cache is unavailable
+        """
+        version_key = self.version_key.format(key=key)
+        version = cache.get(version_key)
+        if version is None:
+            # add() keeps a token another process issued in the meantime
+            cache.add(version_key, uuid.uuid4().hex, timeout=None)
+            version = cache.get(version_key)
+        return version
+
+    def invalidate(self, keys: Iterable[Hashable]) -> None:
+        """Drop the version tokens of keys; values cached under them are no longer read."""
+        keys = list(keys)
+        if not keys:
+            return
+        cache.delete_many([self.version_key.format(key=key) for key in keys])
+        self.local.discard(keys)
+
+    def clear_local(self) -> None:
+        """Empty this process's memory."""
+        self.local.clear()
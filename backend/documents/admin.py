@@ -1385,3 +1385,6 @@ class UserProjectBenchmarkAdmin(admin.ModelAdmin):
 
 # Import Pauschalen Admin (Phase 4C)
 from .admin_pauschalen import BetriebspauschaleRegelAdmin, PauschaleAnwendungAdmin
+
+# Import Standardbauteile Admin (Phase 4B)
+from . import admin_bauteile  # noqa: F401
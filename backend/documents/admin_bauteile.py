@@ -25,6 +25,9 @@ from .models_bauteile import (
     GeometrieBerechnung,
     CompanyProfile,
 )
+from .forms import BauteilRegelAdminForm
+from .services.bauteil_regel_analyse import analysiere_regel, messe_auswertungszeit
+from .services.bauteil_regel_engine import BauteilRegelEngine
 
 
 # =============================================================================
@@ -34,6 +37,7 @@ from .models_bauteile import (
 class BauteilRegelInline(admin.TabularInline):
     """Inline admin for BauteilRegel."""
     model = BauteilRegel
+    form = BauteilRegelAdminForm
     extra = 1
     fields = ('name', 'regel_definition', 'prioritaet', 'ist_aktiv')
     classes = ('collapse',)
@@ -167,8 +171,8 @@ class StandardBauteilAdmin(admin.ModelAdmin):
     def preis_display(self, obj):
         """Format price with unit."""
         return format_html(
-            '<strong>{:.2f} €</strong> / {}',
-            obj.einzelpreis,
+            '<strong>{} €</strong> / {}',
+            f'{obj.einzelpreis:.2f}',
             obj.get_einheit_display()
         )
     preis_display.short_description = 'Preis'
@@ -279,6 +283,7 @@ class StandardBauteilAdmin(admin.ModelAdmin):
 class BauteilRegelAdmin(admin.ModelAdmin):
     """Admin for BauteilRegel with JSON editor."""
 
+    form = BauteilRegelAdminForm
     list_display = (
         'name',
         'bauteil_link',
@@ -288,7 +293,7 @@ class BauteilRegelAdmin(admin.ModelAdmin):
     )
     list_filter = ('ist_aktiv', 'bauteil__kategorie')
     search_fields = ('name', 'bauteil__name', 'bauteil__artikel_nr')
-    readonly_fields = ('id', 'erstellt_am', 'aktualisiert_am', 'regel_preview')
+    readonly_fields = ('id', 'erstellt_am', 'aktualisiert_am', 'regel_preview', 'regel_analyse')
     autocomplete_fields = ['bauteil']
 
     fieldsets = (
@@ -296,7 +301,7 @@ class BauteilRegelAdmin(admin.ModelAdmin):
             'fields': ('id', 'bauteil', 'name')
         }),
         ('Regel-Definition', {
-            'fields': ('regel_definition', 'regel_preview'),
+            'fields': ('regel_definition', 'regel_preview', 'regel_analyse'),
             'description': '''
                 <strong>Level 1 DSL Beispiele:</strong><br>
                 <code>{"operation": "MULTIPLY", "faktor": 3, "komponente": "Tür", "attribut": "anzahl"}</code><br>
@@ -368,6 +373,35 @@ class BauteilRegelAdmin(admin.ModelAdmin):
             return format_html('<span style="color: red;">Fehler: {}</span>', str(e))
     regel_preview.short_description = 'Regel-Vorschau'
 
+    def regel_analyse(self, obj):
+        """Depth, size, inputs, folded form and measured evaluation time."""
+        if obj is None or obj.regel_definition is None:
+            return '-'
+        analyse = analysiere_regel(obj.regel_definition)
+        if not analyse.gueltig:
+            return format_html(
+                '<span style="color: red;">Ungültig: {}</span>', '; '.join(analyse.fehler)
+            )
+        eingaben = ', '.join(sorted(f'{k}.{a}' for k, a in analyse.eingaben)) or '-'
+        quellen = ', '.join(sorted(analyse.quellen)) or '-'
+        return format_html(
+            'Tiefe {} (max {}) · {} Operationen (max {}, gefaltet {})<br>'
+            'Eingaben: {}<br>Quellen: {}<br>Auswertung: {}<br>'
+            'Gefaltet: <code>{}</code>',
+            analyse.tiefe, BauteilRegelEngine.MAX_DEPTH,
+            analyse.knoten, BauteilRegelEngine.MAX_NODES, analyse.knoten_gefaltet,
+            eingaben, quellen, self._format_auswertungszeit(obj),
+            json.dumps(analyse.gefaltet, ensure_ascii=False),
+        )
+    regel_analyse.short_description = 'Analyse'
+
+    def _format_auswertungszeit(self, obj):
+        """Measured evaluation time of the compiled rule (detail page only, it runs the rule)."""
+        sekunden = messe_auswertungszeit(obj.regel_definition, wiederholungen=50)
+        if sekunden is None:
+            return '-'
+        return f'{sekunden * 1_000_000:.1f} µs'
+
 
 # =============================================================================
 # BAUTEIL KATALOG ADMIN
@@ -689,10 +723,10 @@ class GeometrieBerechnungAdmin(admin.ModelAdmin):
         länge = obj.get_final_laenge()
         if obj.manuell_ueberschrieben:
             return format_html(
-                '<strong style="color: #e74c3c;">{:.2f} lfm</strong> (manuell)',
-                länge
+                '<strong style="color: #e74c3c;">{} lfm</strong> (manuell)',
+                f'{länge:.2f}'
             )
-        return format_html('<strong>{:.2f} lfm</strong>', länge)
+        return format_html('<strong>{} lfm</strong>', f'{länge:.2f}')
     länge_display.short_description = 'Länge'
 
     def checkbox_status(self, obj):
@@ -4,3 +4,6 @@ class DocumentsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'documents'
     verbose_name = 'Document Management'
+
+    def ready(self):
+        from documents import signals  # noqa: F401
@@ -21,6 +21,8 @@ from .transparency_models import (
     CalculationFactor,
     UserProjectBenchmark,
 )
+from .models_bauteile import BauteilRegel
+from .services.bauteil_regel_analyse import analysiere_regel
 
 
 # =============================================================================
@@ -284,3 +286,23 @@ class UserProjectBenchmarkAdminForm(forms.ModelForm):
             'average_margin_percent': 'Average profit margin for this project type',
             'last_calculated': 'When these statistics were last updated',
         }
+
+
+# =============================================================================
+# BAUTEIL FORMS
+# =============================================================================
+
+
+class BauteilRegelAdminForm(forms.ModelForm):
+    """Admin form for component rules; rejects invalid and over-budget rules on save."""
+
+    class Meta:
+        model = BauteilRegel
+        fields = '__all__'
+
+    def clean_regel_definition(self):
+        regel_definition = self.cleaned_data.get('regel_definition')
+        analyse = analysiere_regel(regel_definition)
+        if not analyse.gueltig:
+            raise forms.ValidationError(list(analyse.fehler))
+        return regel_definition
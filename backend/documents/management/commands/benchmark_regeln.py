@@ -0,0 +1,147 @@
+"""
+Django management command to benchmark and fuzz the Bauteil rule engine.
+
+Usage:
+    python manage.py benchmark_regeln
+    python manage.py benchmark_regeln --groessen 10 100 --ausgabe bench.json
+    python manage.py benchmark_regeln --vergleich baseline.json --toleranz 0.2
+    python manage.py benchmark_regeln --nur fuzz --fuzz-faelle 5000
+
+Output:
+    JSON with throughput of execute_rule (interpreted and compiled),
+    calculate_bauteil_kosten per synthetic catalog size and
+    calculate_all_pauschalen, plus the fuzz report. Synthetic data is
+    written inside a transaction that is rolled back.
+
+Exits with an error if the fuzzer finds evaluator mismatches or, with
+--vergleich, if a throughput drops by more than --toleranz.
+"""
+
+import json
+import platform
+import random
+import time
+import uuid
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from documents.services import regel_benchmark
+
+TEILE = ('execute_rule', 'bauteil_kosten', 'pauschalen', 'fuzz')
+
+
+class Command(BaseCommand):
+    help = "Benchmark and fuzz the Bauteil rule engine on synthetic catalogs"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--groessen',
+            type=int,
+            nargs='+',
+            default=[10, 100, 1000, 10000],
+            help='Synthetic catalog sizes (default: 10 100 1000 10000)',
+        )
+        parser.add_argument(
+            '--aufrufe',
+            type=int,
+            default=20,
+            help='calculate_bauteil_kosten calls per catalog size (default: 20)',
+        )
+        parser.add_argument(
+            '--fuzz-faelle',
+            type=int,
+            default=500,
+            help='Random rule cases for the fuzzer (default: 500)',
+        )
+        parser.add_argument(
+            '--langsam-ms',
+            type=float,
+            default=5.0,
+            help='Report rules slower than this per evaluation (default: 5)',
+        )
+        parser.add_argument(
+            '--nur',
+            choices=TEILE,
+            nargs='+',
+            default=list(TEILE),
+            help='Run only these parts',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Random seed (default: 0)',
+        )
+        parser.add_argument(
+            '--ausgabe',
+            type=str,
+            help='Write the JSON result to this file instead of stdout',
+        )
+        parser.add_argument(
+            '--vergleich',
+            type=str,
+            help='Baseline JSON to compare throughput against',
+        )
+        parser.add_argument(
+            '--toleranz',
+            type=float,
+            default=0.25,
+            help='Allowed throughput drop against the baseline (default: 0.25)',
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        teile = options['nur']
+        start = time.perf_counter()
+
+        ergebnis = {
+            'meta': {
+                'erstellt_am': timezone.now().isoformat(),
+                'python': platform.python_version(),
+                'seed': options['seed'],
+                'groessen': options['groessen'],
+            },
+        }
+
+        if 'execute_rule' in teile:
+            ergebnis['execute_rule'] = regel_benchmark.benchmark_execute_rule(rng)
+
+        if 'bauteil_kosten' in teile or 'pauschalen' in teile:
+            # Synthetic rows are never committed
+            with transaction.atomic():
+                if 'bauteil_kosten' in teile:
+                    ergebnis['calculate_bauteil_kosten'] = regel_benchmark.benchmark_bauteil_kosten(
+                        options['groessen'], rng, aufrufe=options['aufrufe'],
+                    )
+                if 'pauschalen' in teile:
+                    user = User.objects.create_user(username=f'benchmark-{uuid.uuid4().hex[:8]}')
+                    ergebnis['calculate_all_pauschalen'] = regel_benchmark.benchmark_pauschalen(user, rng)
+                transaction.set_rollback(True)
+
+        if 'fuzz' in teile:
+            ergebnis['fuzz'] = regel_benchmark.fuzz(
+                rng, faelle=options['fuzz_faelle'], langsam_ms=options['langsam_ms'],
+            )
+
+        ergebnis['meta']['dauer_s'] = round(time.perf_counter() - start, 2)
+        ausgabe = json.dumps(ergebnis, indent=2, ensure_ascii=False, default=str)
+        if options['ausgabe']:
+            with open(options['ausgabe'], 'w', encoding='utf-8') as datei:
+                datei.write(ausgabe)
+            self.stderr.write(f"Benchmark written to {options['ausgabe']}")
+        else:
+            self.stdout.write(ausgabe)
+
+        meldungen = []
+        if options['vergleich']:
+            with open(options['vergleich'], encoding='utf-8') as datei:
+                basis = json.load(datei)
+            meldungen = regel_benchmark.vergleiche(ergebnis, basis, toleranz=options['toleranz'])
+        elif ergebnis.get('fuzz', {}).get('abweichungen_gesamt'):
+            meldungen = [f"fuzz: {ergebnis['fuzz']['abweichungen_gesamt']} evaluator mismatches"]
+
+        if meldungen:
+            raise CommandError("Benchmark regressions:\n" + "\n".join(meldungen))
@@ -0,0 +1,45 @@
+"""
+Django management command to show stored Bauteil rule traces.
+
+Usage:
+    python manage.py regel_trace 42-1f3a9c0e
+    python manage.py regel_trace --letzte 10
+
+Output:
+    Traces as JSON: per traced component the rules tried in priority
+    order with result or error and the evaluated operations. The trace id
+    is the one in BauteilKostenPosition.berechnungsgrundlage.
+"""
+
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from documents.services.bauteil_regel_trace import RegelTraceService
+
+
+class Command(BaseCommand):
+    help = "Show stored Bauteil rule execution traces"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'trace_id',
+            nargs='?',
+            help='Trace id to show',
+        )
+        parser.add_argument(
+            '--letzte',
+            type=int,
+            default=10,
+            help='Without a trace id: show the most recent traces (default: 10)',
+        )
+
+    def handle(self, *args, **options):
+        if options['trace_id']:
+            trace = RegelTraceService.get(options['trace_id'])
+            if trace is None:
+                raise CommandError(f"Trace {options['trace_id']} not found (unknown or overwritten)")
+            self.stdout.write(json.dumps(trace, indent=2, ensure_ascii=False))
+        else:
+            traces = RegelTraceService.letzte(options['letzte'])
+            self.stdout.write(json.dumps(traces, indent=2, ensure_ascii=False))
@@ -0,0 +1,18 @@
+# Generated by Django 5.0 on 2026-10-18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0007_add_performance_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='extractionresult',
+            name='stage_timings',
+            field=models.JSONField(blank=True, default=dict, help_text='Per-stage processing time in ms (ocr, ner)'),
+        ),
+    ]
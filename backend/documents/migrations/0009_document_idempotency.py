@@ -0,0 +1,23 @@
+# Generated by Django 5.0 on 2026-10-18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0008_extractionresult_stage_timings'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='idempotency_key',
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='processing_epoch',
+            field=models.PositiveIntegerField(default=0, help_text='Incremented on explicit reprocessing'),
+        ),
+    ]
@@ -77,6 +77,10 @@ class Document(models.Model):
     # Processing status
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='uploaded')
 
+    # Task idempotency (document id + config hash + processing epoch)
+    idempotency_key = models.CharField(max_length=64, blank=True, db_index=True)
+    processing_epoch = models.PositiveIntegerField(default=0, help_text='Incremented on explicit reprocessing')
+
     # Metadata
     document_type = models.CharField(max_length=50, default='pdf')  # pdf, gaeb, etc.
     created_at = models.DateTimeField(auto_now_add=True)
@@ -118,6 +122,7 @@ class ExtractionResult(models.Model):
     # Quality metrics
     confidence_scores = models.JSONField(default=dict)  # per entity type
     processing_time_ms = models.IntegerField(default=0)
+    stage_timings = models.JSONField(default=dict, blank=True, help_text='Per-stage processing time in ms (ocr, ner)')
 
     # Errors (if any)
     error_messages = models.JSONField(default=list, blank=True)
@@ -0,0 +1,194 @@
+"""
+Catalog snapshot for StandardbauteilIntegrationService.
+
+An immutable, versioned copy of what a component calculation reads from
+one BauteilKatalog: the active components in the catalog, their active
+rules ordered by priority, the catalog prices and an index of the rules
+by the component attributes they require. It is loaded with three
+queries (components, rules via Prefetch, positions) however large the
+catalog is, and a calculation on a warm snapshot needs no query for the
+catalog contents.
+
+Caching works like the pricing snapshot:
+- A per-catalog version token lives in the Django cache. Saving or
+  deleting a catalog, catalog position, component or rule deletes the
+  token (see documents.signals); the next read issues a new one.
+- Snapshots are stored in the Django cache under catalog + token and in
+  process memory.
+- Without a working cache every call builds a fresh snapshot.
+
+bulk_create/update() on these models bypass the signals; call
+KatalogSnapshotService.invalidate_kataloge() after bulk imports.
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from django.db.models import Prefetch
+
+from core import money
+from core.money import Money
+from core.versioned_cache import VersionedCache
+
+from ..models_bauteile import BauteilKatalog, BauteilKatalogPosition, BauteilRegel, StandardBauteil
+from .bauteil_regel_index import RegelIndex
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class KatalogSnapshot:
+    """Components, rules and prices of one catalog version."""
+
+    katalog_id: str
+    version: str
+    # Active components in the catalog, ordered like StandardBauteil.Meta.ordering
+    bauteile: Tuple[StandardBauteil, ...]
+    # bauteil id -> active rules ordered by prioritaet
+    regeln: Dict[str, Tuple[BauteilRegel, ...]]
+    # bauteil id -> price of the active catalog position
+    preise: Dict[str, Money]
+    # Active rules indexed by the component attributes they require
+    regel_index: RegelIndex
+
+    def bauteile_mit_regeln(self, gewerk: str) -> List[Tuple[StandardBauteil, List[BauteilRegel]]]:
+        """
+        Components of a trade with their rules.
+
+        Components without rules are skipped, except edges ('kante'),
+        which are priced from geometry.
+
+        Args:
+            gewerk: Trade type
+
+        Returns:
+            List of (StandardBauteil, List[BauteilRegel]) tuples
+        """
+        result = []
+        for bauteil in self.bauteile:
+            if gewerk not in bauteil.gewerke:
+                continue
+            regeln = list(self.regeln.get(str(bauteil.id), ()))
+            if not regeln and bauteil.kategorie != 'kante':
+                continue
+            result.append((bauteil, regeln))
+        return result
+
+    def erfuellbare_regeln(
+        self,
+        extracted_components: Dict[str, Any],
+        gewerk: str,
+    ) -> List[Tuple[StandardBauteil, List[BauteilRegel]]]:
+        """Components of a trade with the rules the extracted data can satisfy (see RegelIndex)."""
+        return self.regel_index.erfuellbare_regeln(extracted_components, gewerk)
+
+    def preis(self, bauteil: StandardBauteil) -> Money:
+        """Catalog price of a component, or its standard price."""
+        preis = self.preise.get(str(bauteil.id))
+        return preis if preis is not None else money.to_money(bauteil.einzelpreis)
+
+    def erstes_bauteil(self, kategorie: str) -> Optional[StandardBauteil]:
+        """First active component of a category (e.g. the ABS edge)."""
+        for bauteil in self.bauteile:
+            if bauteil.kategorie == kategorie:
+                return bauteil
+        return None
+
+
+class KatalogSnapshotService:
+    """Load, cache and invalidate catalog snapshots."""
+
+    VERSION_KEY = 'katalog_snapshot:version:{key}'
+    SNAPSHOT_KEY = 'katalog_snapshot:v2:{key}:{version}'
+    SNAPSHOT_TIMEOUT = 24 * 3600
+    LOCAL_MAX_ENTRIES = 128
+
+    # katalog id -> snapshot (latest version seen by this process)
+    _cache: VersionedCache[KatalogSnapshot] = VersionedCache(
+        VERSION_KEY, SNAPSHOT_KEY, timeout=SNAPSHOT_TIMEOUT, max_entries=LOCAL_MAX_ENTRIES,
+    )
+
+    # ===== LOADING =====
+
+    @classmethod
+    def get(cls, katalog: BauteilKatalog) -> KatalogSnapshot:
+        """
+        Current snapshot of a catalog.
+
+        Args:
+            katalog: BauteilKatalog instance
+
+        Returns:
+            KatalogSnapshot
+        """
+        katalog_id = str(katalog.id)
+        return cls._cache.get(katalog_id, lambda version: cls.build(katalog_id, version=version))
+
+    @classmethod
+    def build(cls, katalog_id: str, version: str) -> KatalogSnapshot:
+        """
+        Read a catalog from the database (three queries).
+
+        Args:
+            katalog_id: BauteilKatalog id
+            version: Version token to stamp on the snapshot
+
+        Returns:
+            KatalogSnapshot
+        """
+        aktive_regeln = BauteilRegel.objects.filter(ist_aktiv=True).order_by('prioritaet')
+        bauteile = tuple(
+            StandardBauteil.objects.filter(
+                kataloge=katalog_id,
+                ist_aktiv=True,
+            ).prefetch_related(
+                Prefetch('regeln', queryset=aktive_regeln, to_attr='aktive_regeln')
+            )
+        )
+
+        preise = {
+            str(bauteil_id): money.to_money(katalog_einzelpreis or einzelpreis)
+            for bauteil_id, katalog_einzelpreis, einzelpreis in BauteilKatalogPosition.objects.filter(
+                katalog_id=katalog_id,
+                ist_aktiv_in_katalog=True,
+            ).values_list('bauteil_id', 'katalog_einzelpreis', 'bauteil__einzelpreis')
+        }
+
+        regeln = {str(bauteil.id): tuple(bauteil.aktive_regeln) for bauteil in bauteile}
+        return KatalogSnapshot(
+            katalog_id=str(katalog_id),
+            version=version,
+            bauteile=bauteile,
+            regeln=regeln,
+            preise=preise,
+            regel_index=RegelIndex.build((bauteil, regeln[str(bauteil.id)]) for bauteil in bauteile),
+        )
+
+    # ===== INVALIDATION =====
+
+    @classmethod
+    def invalidate_kataloge(cls, katalog_ids: Iterable) -> None:
+        """
+        Drop the version tokens of catalogs.
+
+        The next get() issues a new token, so snapshots cached under the
+        old one (Redis or any process) are no longer read.
+        """
+        katalog_ids = [str(katalog_id) for katalog_id in katalog_ids]
+        if not katalog_ids:
+            return
+        cls._cache.invalidate(katalog_ids)
+        logger.debug(f"Invalidated snapshots of {len(katalog_ids)} catalog(s)")
+
+    @classmethod
+    def invalidate_bauteil(cls, bauteil_id) -> None:
+        """Drop the snapshots of every catalog containing a component."""
+        cls.invalidate_kataloge(
+            BauteilKatalogPosition.objects.filter(bauteil_id=bauteil_id).values_list('katalog_id', flat=True)
+        )
+
+    @classmethod
+    def clear_local(cls) -> None:
+        """Empty this process's snapshot memory."""
+        cls._cache.clear_local()
@@ -0,0 +1,327 @@
+"""
+Bauteil Regel-Analyse
+
+Static analysis of BauteilRegel DSL definitions.
+
+Level 2 rules nest IF_THEN_ELSE, ADD and SUBTRACT without limit, and both
+the interpreter and the compiler recurse over the definition. A badly
+authored rule could exhaust the stack or make every pricing call slow.
+This module measures a rule without evaluating it:
+
+- depth and node count, checked against BauteilRegelEngine.MAX_DEPTH and
+  MAX_NODES (the walk is iterative, so any depth can be measured)
+- referenced inputs: component attributes and context sources
+- constant folding of literal subtrees (FIXED arithmetic, comparisons of
+  two literals, IF_THEN_ELSE with a literal condition)
+
+The admin rejects rules over budget when they are saved, compile_regel()
+refuses them, and the interpreter enforces the same depth plus a per-call
+step budget for rules that reach it some other way.
+"""
+
+import logging
+import time
+from dataclasses import dataclass
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+
+from .bauteil_regel_engine import BauteilRegelEngine, InvalidRuleError, RuleBudgetError
+
+logger = logging.getLogger(__name__)
+
+_COMPARISONS = {
+    'GREATER_THAN': lambda left, right: left > right,
+    'LESS_THAN': lambda left, right: left < right,
+    'EQUALS': lambda left, right: left == right,
+    'GREATER_EQUAL': lambda left, right: left >= right,
+    'LESS_EQUAL': lambda left, right: left <= right,
+}
+
+
+@dataclass(frozen=True)
+class RegelAnalyse:
+    """Static measurements of one rule definition."""
+
+    tiefe: int
+    knoten: int
+    # Component attributes read anywhere in the rule
+    eingaben: FrozenSet[Tuple[str, str]]
+    # Context sources ('quelle') read anywhere in the rule
+    quellen: FrozenSet[str]
+    # Definition after constant folding (the original if nothing folds)
+    gefaltet: Dict[str, Any]
+    knoten_gefaltet: int
+    fehler: Tuple[str, ...]
+
+    @property
+    def gueltig(self) -> bool:
+        return not self.fehler
+
+
+def analysiere_regel(regel_definition: Any) -> RegelAnalyse:
+    """
+    Measure, budget-check, validate and fold a rule definition.
+
+    Args:
+        regel_definition: Rule definition dict (see BauteilRegelEngine)
+
+    Returns:
+        RegelAnalyse; ``fehler`` lists budget violations and invalid nodes
+    """
+    if not isinstance(regel_definition, dict):
+        return RegelAnalyse(
+            tiefe=0, knoten=0, eingaben=frozenset(), quellen=frozenset(), gefaltet=regel_definition,
+            knoten_gefaltet=0, fehler=(f"Rule definition must be a dict, got {type(regel_definition).__name__}",),
+        )
+
+    tiefe, knoten, eingaben, quellen = regel_struktur(regel_definition)
+    fehler = _budget_fehler(tiefe, knoten)
+    gefaltet = regel_definition
+
+    if not fehler:
+        # Local import: the compiler imports this module
+        from .bauteil_regel_compiler import compile_regel
+        try:
+            compile_regel(regel_definition)
+        except InvalidRuleError as e:
+            fehler.append(str(e))
+        else:
+            gefaltet = falte_konstanten(regel_definition)
+
+    return RegelAnalyse(
+        tiefe=tiefe,
+        knoten=knoten,
+        eingaben=frozenset(eingaben),
+        quellen=frozenset(quellen),
+        gefaltet=gefaltet,
+        knoten_gefaltet=knoten if gefaltet is regel_definition else regel_struktur(gefaltet)[1],
+        fehler=tuple(fehler),
+    )
+
+
+def regel_struktur(regel_definition: Dict[str, Any]) -> Tuple[int, int, set, set]:
+    """
+    Depth, node count and referenced inputs of a rule, without recursion.
+
+    Every operation counts as a node, including the comparisons inside
+    conditions; the root is at depth 1.
+
+    Returns:
+        (tiefe, knoten, eingaben, quellen)
+    """
+    tiefe = 0
+    knoten = 0
+    eingaben = set()
+    quellen = set()
+
+    stapel: List[Tuple[Any, int]] = [(regel_definition, 1)]
+    while stapel:
+        regel, ebene = stapel.pop()
+        if not isinstance(regel, dict):
+            continue
+        knoten += 1
+        tiefe = max(tiefe, ebene)
+
+        operation = regel.get('operation')
+        if operation == 'MULTIPLY':
+            if regel.get('komponente') is not None and regel.get('attribut') is not None:
+                eingaben.add((regel['komponente'], regel['attribut']))
+        elif operation in BauteilRegelEngine.COMPARISON_OPERATIONS:
+            for operand in (regel.get('links'), regel.get('rechts')):
+                if isinstance(operand, dict):
+                    if 'komponente' in operand and 'attribut' in operand:
+                        eingaben.add((operand['komponente'], operand['attribut']))
+                    elif 'quelle' in operand:
+                        quellen.add(operand['quelle'])
+
+        stapel.extend((kind, ebene + 1) for kind in _kinder(regel))
+
+    return tiefe, knoten, eingaben, quellen
+
+
+def pruefe_budget(regel_definition: Dict[str, Any]) -> None:
+    """
+    Reject rules that exceed MAX_DEPTH or MAX_NODES.
+
+    Raises:
+        RuleBudgetError: If the rule is over budget
+    """
+    tiefe, knoten, _, _ = regel_struktur(regel_definition)
+    fehler = _budget_fehler(tiefe, knoten)
+    if fehler:
+        raise RuleBudgetError('; '.join(fehler))
+
+
+def falte_konstanten(regel_definition: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Replace literal subtrees by FIXED values.
+
+    Folds ADD and SUBTRACT of FIXED terms, comparisons and AND/OR of two
+    literals, and IF_THEN_ELSE whose condition is literal. Folded values
+    are exact Decimal strings, so folded rules give the same results.
+    Call only on rules within budget (the folding recurses).
+
+    Args:
+        regel_definition: Valid rule definition
+
+    Returns:
+        Folded definition, or the same object if nothing folds
+    """
+    if not isinstance(regel_definition, dict):
+        return regel_definition
+
+    operation = regel_definition.get('operation')
+
+    if operation == 'ADD':
+        terme = regel_definition.get('terme', [])
+        gefaltet = [falte_konstanten(term) for term in terme]
+        werte = [_fester_wert(term) for term in gefaltet]
+        if werte and all(wert is not None for wert in werte):
+            return _fixed(sum(werte, Decimal('0')))
+        if any(neu is not alt for neu, alt in zip(gefaltet, terme)):
+            return dict(regel_definition, terme=gefaltet)
+        return regel_definition
+
+    if operation == 'SUBTRACT':
+        minuend = falte_konstanten(regel_definition.get('minuend'))
+        subtrahend = falte_konstanten(regel_definition.get('subtrahend'))
+        links, rechts = _fester_wert(minuend), _fester_wert(subtrahend)
+        if links is not None and rechts is not None:
+            return _fixed(links - rechts)
+        if minuend is not regel_definition.get('minuend') or subtrahend is not regel_definition.get('subtrahend'):
+            return dict(regel_definition, minuend=minuend, subtrahend=subtrahend)
+        return regel_definition
+
+    if operation == 'IF_THEN_ELSE':
+        bedingung = _feste_bedingung(regel_definition.get('bedingung'))
+        if bedingung is not None:
+            return falte_konstanten(regel_definition['dann'] if bedingung else regel_definition['sonst'])
+        dann = falte_konstanten(regel_definition.get('dann'))
+        sonst = falte_konstanten(regel_definition.get('sonst'))
+        if dann is not regel_definition.get('dann') or sonst is not regel_definition.get('sonst'):
+            return dict(regel_definition, dann=dann, sonst=sonst)
+        return regel_definition
+
+    if operation in BauteilRegelEngine.COMPARISON_OPERATIONS or operation in BauteilRegelEngine.LOGICAL_OPERATIONS:
+        bedingung = _feste_bedingung(regel_definition)
+        if bedingung is not None:
+            return _fixed(Decimal('1' if bedingung else '0'))
+
+    return regel_definition
+
+
+def messe_auswertungszeit(regel_definition: Any, wiederholungen: int = 200) -> Optional[float]:
+    """
+    Mean evaluation time of a compiled rule in seconds.
+
+    Every referenced component attribute and context source is set to 1,
+    so all inputs are present; which branches run depends on the rule.
+
+    Args:
+        regel_definition: Rule definition dict
+        wiederholungen: Number of timed evaluations
+
+    Returns:
+        Seconds per evaluation, or None if the rule is invalid
+    """
+    from .bauteil_regel_compiler import compile_regel
+
+    try:
+        compiled = compile_regel(regel_definition)
+    except InvalidRuleError:
+        return None
+
+    _, _, eingaben, quellen = regel_struktur(regel_definition)
+    components: Dict[str, Dict[str, int]] = {}
+    for komponente, attribut in eingaben:
+        components.setdefault(komponente, {})[attribut] = 1
+    context = {quelle: 1 for quelle in quellen}
+
+    start = time.perf_counter()
+    try:
+        for _ in range(wiederholungen):
+            compiled(components, context)
+    except Exception as e:
+        logger.debug(f"Timing run failed: {e}")
+        return None
+    return (time.perf_counter() - start) / wiederholungen
+
+
+# =====================
+# HELPERS
+# =====================
+
+def _kinder(regel: Dict[str, Any]) -> List[Any]:
+    """Child operations of a node."""
+    operation = regel.get('operation')
+    if operation == 'ADD':
+        terme = regel.get('terme', [])
+        return list(terme) if isinstance(terme, list) else []
+    if operation == 'SUBTRACT':
+        return [regel.get('minuend'), regel.get('subtrahend')]
+    if operation == 'IF_THEN_ELSE':
+        return [regel.get('bedingung'), regel.get('dann'), regel.get('sonst')]
+    if operation in BauteilRegelEngine.LOGICAL_OPERATIONS:
+        bedingungen = regel.get('bedingungen', [])
+        return list(bedingungen) if isinstance(bedingungen, list) else []
+    return []
+
+
+def _budget_fehler(tiefe: int, knoten: int) -> List[str]:
+    fehler = []
+    if tiefe > BauteilRegelEngine.MAX_DEPTH:
+        fehler.append(f"Rule is nested {tiefe} levels deep (max {BauteilRegelEngine.MAX_DEPTH})")
+    if knoten > BauteilRegelEngine.MAX_NODES:
+        fehler.append(f"Rule has {knoten} operations (max {BauteilRegelEngine.MAX_NODES})")
+    return fehler
+
+
+def _fixed(wert: Decimal) -> Dict[str, Any]:
+    return {'operation': 'FIXED', 'wert': str(wert)}
+
+
+def _fester_wert(regel: Any) -> Optional[Decimal]:
+    """Value of a FIXED node, or None."""
+    if not isinstance(regel, dict) or regel.get('operation') != 'FIXED':
+        return None
+    return _literal(regel.get('wert'))
+
+
+def _literal(wert: Any) -> Optional[Decimal]:
+    """Decimal of a literal operand, or None for references and unreadable values."""
+    if not isinstance(wert, (int, float, str)):
+        return None
+    try:
+        result = Decimal(str(wert))
+    except InvalidOperation:
+        # Unreadable strings are evaluated as 0 with a warning; left
+        # unfolded so the warning still shows
+        return None
+    return result if result.is_finite() else None
+
+
+def _feste_bedingung(bedingung: Any) -> Optional[bool]:
+    """Result of a condition over literals only, or None."""
+    if not isinstance(bedingung, dict):
+        return None
+    operation = bedingung.get('operation')
+
+    if operation in _COMPARISONS:
+        links = _literal(bedingung.get('links'))
+        rechts = _literal(bedingung.get('rechts'))
+        if links is None or rechts is None:
+            return None
+        return _COMPARISONS[operation](links, rechts)
+
+    if operation in BauteilRegelEngine.LOGICAL_OPERATIONS:
+        bedingungen = bedingung.get('bedingungen')
+        if not isinstance(bedingungen, list) or not bedingungen:
+            return None
+        # Folded only if every condition is literal: the interpreter
+        # evaluates all of them, so a reference could still raise
+        ergebnisse = [_feste_bedingung(teil) for teil in bedingungen]
+        if any(ergebnis is None for ergebnis in ergebnisse):
+            return None
+        return all(ergebnisse) if operation == 'AND' else any(ergebnisse)
+
+    return None
@@ -0,0 +1,375 @@
+"""
+Bauteil Regel-Batch
+
+Columnar evaluation of BauteilRegeln over many extractions at once.
+
+Re-costing an archive with calculate_bauteil_kosten() runs every rule once
+per extraction in Python. For the nightly catalog re-costing this module
+gathers each referenced component attribute of N extractions into a NumPy
+column and evaluates a rule as array expressions: MULTIPLY, ADD and
+SUBTRACT are vectorized arithmetic, comparisons and AND/OR are boolean
+arrays and IF_THEN_ELSE is np.where. One call yields the quantities of all
+N extractions.
+
+Semantics follow the scalar evaluator row by row. Instead of raising
+ComponentNotFoundError, a rule returns an ``ok`` mask that is False where
+an input it needs is missing (an IF_THEN_ELSE branch only counts where it
+is taken), so the priority fallback works per row. Context sources missing
+in a row read as 0, like in the scalar evaluator.
+
+Arithmetic runs in float64 and quantities are rounded to 9 decimals (the
+Money resolution) before they become Decimals. For the quantities in our
+catalogs (counts and metres with up to 9 decimals, magnitudes far below
+1e6) this gives the exact Decimal results of the scalar evaluator.
+
+Example:
+    >>> spalten = RegelSpalten([{'Tür': {'anzahl': 2}}, {'Tür': {'anzahl': 3}}])
+    >>> werte, ok = compile_regel_batch(
+    ...     {'operation': 'MULTIPLY', 'faktor': 3, 'komponente': 'Tür', 'attribut': 'anzahl'}
+    ... )(spalten)
+    >>> werte.tolist()
+    [6.0, 9.0]
+"""
+
+import logging
+from decimal import Decimal, InvalidOperation
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from core.versioned_cache import LocalLRU
+
+from .bauteil_regel_analyse import falte_konstanten
+from .bauteil_regel_compiler import compile_regel
+from .bauteil_regel_engine import BauteilRegelEngine, InvalidRuleError
+
+logger = logging.getLogger(__name__)
+
+# (values, ok) over the N rows of a RegelSpalten
+Spalte = Tuple[np.ndarray, np.ndarray]
+BatchRegel = Callable[['RegelSpalten'], Spalte]
+
+MENGE_DEZIMALEN = 9
+
+_COMPARISONS = {
+    'GREATER_THAN': np.greater,
+    'LESS_THAN': np.less,
+    'EQUALS': np.equal,
+    'GREATER_EQUAL': np.greater_equal,
+    'LESS_EQUAL': np.less_equal,
+}
+
+
+class RegelSpalten:
+    """Columns of component attributes and context sources of N extractions."""
+
+    def __init__(
+        self,
+        extractions: Sequence[Mapping[str, Any]],
+        contexts: Optional[Sequence[Mapping[str, Any]]] = None,
+    ):
+        """
+        Args:
+            extractions: Component data of each extraction (as passed to
+                calculate_bauteil_kosten)
+            contexts: Optional context per extraction ('quelle' values)
+        """
+        if contexts is not None and len(contexts) != len(extractions):
+            raise ValueError("contexts must have one entry per extraction")
+        self.extractions = list(extractions)
+        self.contexts = list(contexts) if contexts is not None else None
+        self.n = len(self.extractions)
+        self._attribute: Dict[Tuple[str, str], Spalte] = {}
+        self._quellen: Dict[str, np.ndarray] = {}
+
+    def attribut(self, komponente: str, attribut: str) -> Spalte:
+        """
+        Column of one component attribute.
+
+        Returns:
+            (values, present): values are 0.0 where the attribute is
+            missing, None or not a number
+        """
+        key = (komponente, attribut)
+        spalte = self._attribute.get(key)
+        if spalte is None:
+            werte = np.zeros(self.n)
+            vorhanden = np.zeros(self.n, dtype=bool)
+            for zeile, extraction in enumerate(self.extractions):
+                daten = extraction.get(komponente)
+                if not isinstance(daten, Mapping):
+                    continue
+                wert = _zahl(daten.get(attribut))
+                if wert is not None:
+                    werte[zeile] = wert
+                    vorhanden[zeile] = True
+            spalte = self._attribute[key] = (werte, vorhanden)
+        return spalte
+
+    def quelle(self, name: str) -> np.ndarray:
+        """Column of one context source; 0.0 where missing."""
+        spalte = self._quellen.get(name)
+        if spalte is None:
+            spalte = np.zeros(self.n)
+            for zeile, context in enumerate(self.contexts or ()):
+                if name in context:
+                    wert = _zahl(context[name])
+                    spalte[zeile] = wert if wert is not None else 0.0
+            self._quellen[name] = spalte
+        return spalte
+
+    def eingaben(self) -> Dict[str, Dict[str, int]]:
+        """
+        Inputs present in at least one extraction, shaped like extracted
+        components, for selecting candidate rules with RegelIndex.
+        """
+        eingaben: Dict[str, Dict[str, int]] = {}
+        for extraction in self.extractions:
+            for komponente, daten in extraction.items():
+                if not isinstance(daten, Mapping):
+                    continue
+                for attribut, wert in daten.items():
+                    if wert is not None:
+                        eingaben.setdefault(komponente, {})[attribut] = 1
+        return eingaben
+
+
+def compile_regel_batch(regel_definition: Dict[str, Any]) -> BatchRegel:
+    """
+    Compile a rule definition for columnar evaluation.
+
+    The definition is validated and budget-checked by compile_regel() and
+    constant-folded first.
+
+    Args:
+        regel_definition: Rule definition dict (see BauteilRegelEngine)
+
+    Returns:
+        Function RegelSpalten -> (values, ok) with one entry per extraction
+
+    Raises:
+        InvalidRuleError: If the rule is invalid or over budget
+    """
+    compile_regel(regel_definition)
+    return _batch_node(falte_konstanten(regel_definition))
+
+
+def berechne_mengen(
+    regeln: Sequence[Any],
+    spalten: RegelSpalten,
+) -> Tuple[np.ndarray, np.ndarray, List[Optional[Any]]]:
+    """
+    Quantities of one component for all extractions.
+
+    Per row the first rule in priority order that succeeds gives the
+    quantity, like StandardbauteilIntegrationService._calculate_menge_aus_regeln.
+
+    Args:
+        regeln: BauteilRegeln ordered by priority
+        spalten: Columns of the extractions
+
+    Returns:
+        (mengen, gefunden, regel_pro_zeile): quantities rounded to 9
+        decimals, mask of rows where a rule succeeded, and the rule that
+        produced each row's quantity (None where none did)
+    """
+    mengen = np.zeros(spalten.n)
+    offen = np.ones(spalten.n, dtype=bool)
+    regel_pro_zeile: List[Optional[Any]] = [None] * spalten.n
+
+    for regel in regeln:
+        werte, ok = RegelBatchCache.get(regel)(spalten)
+        treffer = offen & ok
+        if treffer.any():
+            mengen[treffer] = werte[treffer]
+            for zeile in np.flatnonzero(treffer):
+                regel_pro_zeile[zeile] = regel
+            offen &= ~treffer
+        if not offen.any():
+            break
+
+    return np.round(mengen, MENGE_DEZIMALEN), ~offen, regel_pro_zeile
+
+
+def als_decimal(wert: float) -> Decimal:
+    """Decimal of a rounded batch quantity (6.0 -> Decimal('6'), 0.3 -> Decimal('0.3'))."""
+    result = Decimal(repr(float(wert)))
+    if result == result.to_integral_value():
+        return result.quantize(Decimal(1))
+    return result.normalize()
+
+
+# =====================
+# NODES
+# =====================
+
+def _batch_node(regel: Dict[str, Any]) -> BatchRegel:
+    operation = regel.get('operation')
+
+    if operation == 'MULTIPLY':
+        faktor = float(Decimal(str(regel['faktor'])))
+        komponente, attribut = regel['komponente'], regel['attribut']
+
+        def multiply(spalten):
+            werte, ok = spalten.attribut(komponente, attribut)
+            return faktor * werte, ok
+        return multiply
+
+    if operation == 'ADD':
+        terme = tuple(_batch_node(term) for term in regel['terme'])
+
+        def add(spalten):
+            summe, ok = terme[0](spalten)
+            ok = ok.copy()
+            for term in terme[1:]:
+                werte, term_ok = term(spalten)
+                summe = summe + werte
+                ok &= term_ok
+            return summe, ok
+        return add
+
+    if operation == 'SUBTRACT':
+        minuend = _batch_node(regel['minuend'])
+        subtrahend = _batch_node(regel['subtrahend'])
+
+        def subtract(spalten):
+            links, links_ok = minuend(spalten)
+            rechts, rechts_ok = subtrahend(spalten)
+            return links - rechts, links_ok & rechts_ok
+        return subtract
+
+    if operation == 'FIXED':
+        wert = float(Decimal(str(regel['wert'])))
+
+        def fixed(spalten):
+            return np.full(spalten.n, wert), np.ones(spalten.n, dtype=bool)
+        return fixed
+
+    if operation == 'IF_THEN_ELSE':
+        bedingung = _batch_bedingung(regel['bedingung'])
+        dann = _batch_node(regel['dann'])
+        sonst = _batch_node(regel['sonst'])
+
+        def if_then_else(spalten):
+            wahr, bedingung_ok = bedingung(spalten)
+            dann_werte, dann_ok = dann(spalten)
+            sonst_werte, sonst_ok = sonst(spalten)
+            return (
+                np.where(wahr, dann_werte, sonst_werte),
+                bedingung_ok & np.where(wahr, dann_ok, sonst_ok),
+            )
+        return if_then_else
+
+    if operation in BauteilRegelEngine.COMPARISON_OPERATIONS or operation in BauteilRegelEngine.LOGICAL_OPERATIONS:
+        bedingung = _batch_bedingung(regel)
+
+        def as_quantity(spalten):
+            wahr, ok = bedingung(spalten)
+            return wahr.astype(float), ok
+        return as_quantity
+
+    # compile_regel() has rejected anything else
+    raise InvalidRuleError(f"Unsupported operation '{operation}'")
+
+
+def _batch_bedingung(regel: Dict[str, Any]) -> BatchRegel:
+    operation = regel.get('operation')
+
+    if operation in BauteilRegelEngine.LOGICAL_OPERATIONS:
+        teile = tuple(_batch_bedingung(teil) for teil in regel['bedingungen'])
+        combine = np.logical_and if operation == 'AND' else np.logical_or
+
+        def logical(spalten):
+            # All conditions count for ok: the scalar evaluator evaluates every one
+            wahr, ok = teile[0](spalten)
+            ok = ok.copy()
+            for teil in teile[1:]:
+                teil_wahr, teil_ok = teil(spalten)
+                wahr = combine(wahr, teil_wahr)
+                ok &= teil_ok
+            return wahr, ok
+        return logical
+
+    compare = _COMPARISONS[operation]
+    links = _batch_wert(regel['links'])
+    rechts = _batch_wert(regel['rechts'])
+
+    def comparison(spalten):
+        links_werte, links_ok = links(spalten)
+        rechts_werte, rechts_ok = rechts(spalten)
+        return compare(links_werte, rechts_werte), links_ok & rechts_ok
+    return comparison
+
+
+def _batch_wert(value_spec: Any) -> BatchRegel:
+    """Operand of a comparison: literal, component attribute or context source."""
+    if isinstance(value_spec, dict):
+        if 'komponente' in value_spec and 'attribut' in value_spec:
+            komponente, attribut = value_spec['komponente'], value_spec['attribut']
+            return lambda spalten: spalten.attribut(komponente, attribut)
+        if 'quelle' in value_spec:
+            quelle = value_spec['quelle']
+            return lambda spalten: (spalten.quelle(quelle), np.ones(spalten.n, dtype=bool))
+        konstante = 0.0
+    else:
+        konstante = _zahl(value_spec)
+        if konstante is None:
+            # The scalar evaluator reads unknown literals as 0
+            konstante = 0.0
+
+    return lambda spalten: (np.full(spalten.n, konstante), np.ones(spalten.n, dtype=bool))
+
+
+def _zahl(wert: Any) -> Optional[float]:
+    """Float of an attribute value, or None if it is missing or not a number."""
+    if wert is None or isinstance(wert, bool):
+        return None
+    if isinstance(wert, (int, float)):
+        return float(wert)
+    try:
+        return float(Decimal(str(wert)))
+    except (InvalidOperation, ValueError):
+        return None
+
+
+# =====================
+# CACHE
+# =====================
+
+class RegelBatchCache:
+    """Batch-compiled BauteilRegeln of this process, keyed by id and aktualisiert_am."""
+
+    MAX_ENTRIES = 4096
+
+    # regel id -> batch function, versioned by aktualisiert_am
+    _compiled: LocalLRU[BatchRegel] = LocalLRU(MAX_ENTRIES)
+
+    @classmethod
+    def get(cls, regel) -> BatchRegel:
+        """
+        Batch function of a BauteilRegel.
+
+        Invalid rules yield ok=False for every row, so the next rule in
+        priority order is used, as in the scalar evaluator.
+        """
+        compiled = cls._compiled.get(regel.id, regel.aktualisiert_am)
+        if compiled is not None:
+            return compiled
+
+        try:
+            compiled = compile_regel_batch(regel.regel_definition)
+        except InvalidRuleError as e:
+            logger.warning(f"Rule '{regel.name}' ({regel.id}) is invalid: {e}")
+            compiled = _ungueltig
+
+        cls._compiled.set(regel.id, regel.aktualisiert_am, compiled)
+        return compiled
+
+    @classmethod
+    def clear(cls) -> None:
+        """Forget all batch-compiled rules of this process."""
+        cls._compiled.clear()
+
+
+def _ungueltig(spalten: RegelSpalten) -> Spalte:
+    return np.zeros(spalten.n), np.zeros(spalten.n, dtype=bool)
@@ -0,0 +1,385 @@
+"""
+Bauteil Regel-Compiler
+
+Compiles BauteilRegel DSL definitions into Python closures.
+
+BauteilRegelEngine.execute_rule() walks the JSON definition on every call:
+it dispatches on the operation string, re-checks SUPPORTED_OPERATIONS and
+converts every constant with Decimal(str(...)). compile_regel() does the
+validation, dispatch and constant conversion once and returns a function
+of (components, context) that only looks up component attributes and
+does the arithmetic.
+
+Compiled rules give the same results and raise the same errors as the
+interpreter, with one difference: a rule containing an invalid node is
+rejected as a whole, even if the node sits in a branch that a particular
+input would not reach. Rules over the depth/size budget are rejected, and
+literal subtrees are constant-folded before compiling (see
+bauteil_regel_analyse).
+
+Compiled rules are kept per process, keyed by BauteilRegel.id and
+aktualisiert_am, so an edited rule is recompiled on first use.
+
+Example:
+    >>> menge = RegelCompileCache.get(regel)({'Tür': {'anzahl': 2}}, {})
+    >>> print(menge)
+    6
+"""
+
+import logging
+from decimal import Decimal
+from typing import Any, Callable, Dict, Mapping, Optional
+
+from core.versioned_cache import LocalLRU
+
+from .bauteil_regel_analyse import falte_konstanten, pruefe_budget
+from .bauteil_regel_engine import BauteilRegelEngine, ComponentNotFoundError, InvalidRuleError
+
+logger = logging.getLogger(__name__)
+
+# (components, context) -> quantity
+CompiledRegel = Callable[[Mapping[str, Any], Mapping[str, Any]], Decimal]
+
+ZERO = Decimal('0')
+ONE = Decimal('1')
+
+_COMPARISONS = {
+    'GREATER_THAN': lambda left, right: left > right,
+    'LESS_THAN': lambda left, right: left < right,
+    'EQUALS': lambda left, right: left == right,
+    'GREATER_EQUAL': lambda left, right: left >= right,
+    'LESS_EQUAL': lambda left, right: left <= right,
+}
+
+
+def to_decimal(value: Any) -> Decimal:
+    """Decimal(str(value)) without the string round trip for ints and Decimals."""
+    value_type = type(value)
+    if value_type is Decimal:
+        return value
+    if value_type is int:
+        return Decimal(value)
+    return Decimal(str(value))
+
+
+def compile_regel(regel_definition: Dict[str, Any]) -> CompiledRegel:
+    """
+    Compile a rule definition.
+
+    Args:
+        regel_definition: Rule definition dict (see BauteilRegelEngine)
+
+    Returns:
+        Function (components, context) -> Decimal quantity. Raises
+        ComponentNotFoundError like the interpreter when a referenced
+        component or attribute is missing.
+
+    Raises:
+        InvalidRuleError: If any node of the rule is invalid
+        RuleBudgetError: If the rule exceeds MAX_DEPTH or MAX_NODES
+    """
+    if not isinstance(regel_definition, dict):
+        raise InvalidRuleError(f"Rule definition must be a dict, got {type(regel_definition).__name__}")
+    pruefe_budget(regel_definition)
+
+    # The original is compiled first so invalid nodes in literal-folded
+    # branches are still rejected
+    compiled = _compile_node(regel_definition)
+    gefaltet = falte_konstanten(regel_definition)
+    return compiled if gefaltet is regel_definition else _compile_node(gefaltet)
+
+
+# =====================
+# NODES
+# =====================
+
+def _compile_node(regel: Dict[str, Any]) -> CompiledRegel:
+    """Compile any operation; comparisons and logic yield 1 or 0."""
+    operation = regel.get('operation')
+
+    if operation not in BauteilRegelEngine.SUPPORTED_OPERATIONS:
+        raise InvalidRuleError(
+            f"Unsupported operation '{operation}'. "
+            f"Supported: {', '.join(BauteilRegelEngine.SUPPORTED_OPERATIONS)}"
+        )
+
+    if operation == 'MULTIPLY':
+        return _compile_multiply(regel)
+    if operation == 'ADD':
+        return _compile_add(regel)
+    if operation == 'SUBTRACT':
+        return _compile_subtract(regel)
+    if operation == 'FIXED':
+        return _compile_fixed(regel)
+    if operation == 'IF_THEN_ELSE':
+        return _compile_if_then_else(regel)
+
+    if operation in BauteilRegelEngine.COMPARISON_OPERATIONS:
+        condition = _compile_comparison(regel)
+    else:
+        condition = _compile_logical(regel)
+
+    def as_quantity(components, context):
+        return ONE if condition(components, context) else ZERO
+    return as_quantity
+
+
+def _compile_multiply(regel: Dict[str, Any]) -> CompiledRegel:
+    faktor = regel.get('faktor')
+    komponente_name = regel.get('komponente')
+    attribut = regel.get('attribut')
+
+    if faktor is None:
+        raise InvalidRuleError("MULTIPLY requires 'faktor' field")
+    if komponente_name is None:
+        raise InvalidRuleError("MULTIPLY requires 'komponente' field")
+    if attribut is None:
+        raise InvalidRuleError("MULTIPLY requires 'attribut' field")
+
+    faktor = _constant(faktor, 'faktor')
+
+    def multiply(components, context):
+        komponente_data = components.get(komponente_name)
+        if komponente_data is None:
+            raise ComponentNotFoundError(
+                f"Component '{komponente_name}' not found in extracted data. "
+                f"Available components: {list(components.keys())}"
+            )
+        attribut_wert = komponente_data.get(attribut)
+        if attribut_wert is None:
+            raise ComponentNotFoundError(
+                f"Attribute '{attribut}' not found in component '{komponente_name}'. "
+                f"Available attributes: {list(komponente_data.keys())}"
+            )
+        return faktor * to_decimal(attribut_wert)
+    return multiply
+
+
+def _compile_add(regel: Dict[str, Any]) -> CompiledRegel:
+    terme = regel.get('terme', [])
+
+    if not isinstance(terme, list):
+        raise InvalidRuleError("ADD requires 'terme' to be a list")
+    if len(terme) == 0:
+        raise InvalidRuleError("ADD requires at least one term")
+
+    compiled_terme = tuple(_compile_node(term) for term in terme)
+
+    def add(components, context):
+        result = ZERO
+        for term in compiled_terme:
+            result += term(components, context)
+        return result
+    return add
+
+
+def _compile_subtract(regel: Dict[str, Any]) -> CompiledRegel:
+    minuend = regel.get('minuend')
+    subtrahend = regel.get('subtrahend')
+
+    if minuend is None:
+        raise InvalidRuleError("SUBTRACT requires 'minuend' field")
+    if subtrahend is None:
+        raise InvalidRuleError("SUBTRACT requires 'subtrahend' field")
+
+    compiled_minuend = _compile_node(minuend)
+    compiled_subtrahend = _compile_node(subtrahend)
+
+    def subtract(components, context):
+        return compiled_minuend(components, context) - compiled_subtrahend(components, context)
+    return subtract
+
+
+def _compile_fixed(regel: Dict[str, Any]) -> CompiledRegel:
+    wert = regel.get('wert')
+
+    if wert is None:
+        raise InvalidRuleError("FIXED requires 'wert' field")
+
+    wert = _constant(wert, 'wert')
+
+    def fixed(components, context):
+        return wert
+    return fixed
+
+
+def _compile_if_then_else(regel: Dict[str, Any]) -> CompiledRegel:
+    bedingung = regel.get('bedingung')
+    dann = regel.get('dann')
+    sonst = regel.get('sonst')
+
+    if not all([bedingung, dann, sonst]):
+        raise InvalidRuleError("IF_THEN_ELSE requires 'bedingung', 'dann', 'sonst'")
+
+    if bedingung.get('operation') in BauteilRegelEngine.LOGICAL_OPERATIONS:
+        condition = _compile_logical(bedingung)
+    else:
+        condition = _compile_comparison(bedingung)
+    compiled_dann = _compile_node(dann)
+    compiled_sonst = _compile_node(sonst)
+
+    def if_then_else(components, context):
+        if condition(components, context):
+            return compiled_dann(components, context)
+        return compiled_sonst(components, context)
+    return if_then_else
+
+
+# =====================
+# CONDITIONS
+# =====================
+
+def _compile_comparison(regel: Dict[str, Any]) -> Callable[[Mapping, Mapping], bool]:
+    operation = regel.get('operation')
+    links = regel.get('links')
+    rechts = regel.get('rechts')
+
+    if not all([operation, links is not None, rechts is not None]):
+        raise InvalidRuleError("Comparison requires 'links' and 'rechts'")
+
+    compare = _COMPARISONS.get(operation)
+    if compare is None:
+        raise InvalidRuleError(f"Unknown comparison operation: {operation}")
+
+    left = _compile_value(links)
+    right = _compile_value(rechts)
+
+    def comparison(components, context):
+        return compare(left(components, context), right(components, context))
+    return comparison
+
+
+def _compile_logical(regel: Dict[str, Any]) -> Callable[[Mapping, Mapping], bool]:
+    operation = regel.get('operation')
+    bedingungen = regel.get('bedingungen', [])
+
+    if not bedingungen:
+        raise InvalidRuleError(f"{operation} requires 'bedingungen' list")
+    if operation not in BauteilRegelEngine.LOGICAL_OPERATIONS:
+        raise InvalidRuleError(f"Unknown logical operation: {operation}")
+
+    conditions = tuple(_compile_comparison(condition) for condition in bedingungen)
+    combine = all if operation == 'AND' else any
+
+    def logical(components, context):
+        # Every condition is evaluated, like the interpreter, so missing
+        # components raise regardless of the order of the conditions
+        return combine([condition(components, context) for condition in conditions])
+    return logical
+
+
+def _compile_value(value_spec: Any) -> CompiledRegel:
+    """Compile an operand: literal, component attribute or context source."""
+    if isinstance(value_spec, (int, float)):
+        constant = _constant(value_spec, 'value')
+        return lambda components, context: constant
+
+    if isinstance(value_spec, dict):
+        if 'komponente' in value_spec and 'attribut' in value_spec:
+            komponente_name = value_spec['komponente']
+            attribut = value_spec['attribut']
+
+            def attribute(components, context):
+                komponente_data = components.get(komponente_name)
+                if komponente_data is None:
+                    raise ComponentNotFoundError(
+                        f"Component '{komponente_name}' not found in extracted data"
+                    )
+                attribut_wert = komponente_data.get(attribut)
+                if attribut_wert is None:
+                    raise ComponentNotFoundError(
+                        f"Attribute '{attribut}' not found in component '{komponente_name}'"
+                    )
+                return to_decimal(attribut_wert)
+            return attribute
+
+        if 'quelle' in value_spec:
+            quelle_key = value_spec['quelle']
+
+            def source(components, context):
+                if quelle_key in context:
+                    return to_decimal(context[quelle_key])
+                # Hot path: one line per evaluation would flood the log
+                logger.debug(f"Context source '{quelle_key}' not found, using 0")
+                return ZERO
+            return source
+
+    elif isinstance(value_spec, str):
+        try:
+            constant = Decimal(value_spec)
+        except Exception:
+            logger.warning(f"Cannot convert string '{value_spec}' to Decimal, using 0")
+            constant = ZERO
+        return lambda components, context: constant
+
+    logger.warning(f"Unknown value spec type: {type(value_spec)}, using 0")
+    return lambda components, context: ZERO
+
+
+def _constant(value: Any, field: str) -> Decimal:
+    """Convert a rule constant once, rejecting values Decimal cannot read."""
+    try:
+        return to_decimal(value)
+    except Exception:
+        raise InvalidRuleError(f"Invalid number for '{field}': {value!r}")
+
+
+# =====================
+# CACHE
+# =====================
+
+class RegelCompileCache:
+    """Compiled BauteilRegeln of this process, keyed by id and aktualisiert_am."""
+
+    MAX_ENTRIES = 4096
+
+    # regel id -> compiled rule, versioned by aktualisiert_am
+    _compiled: LocalLRU[CompiledRegel] = LocalLRU(MAX_ENTRIES)
+
+    @classmethod
+    def get(cls, regel) -> CompiledRegel:
+        """
+        Compiled function of a BauteilRegel.
+
+        Invalid rules are cached too: the returned function raises the
+        InvalidRuleError from compilation on every call.
+
+        Args:
+            regel: BauteilRegel instance
+
+        Returns:
+            Function (components, context) -> Decimal quantity
+        """
+        compiled = cls._compiled.get(regel.id, regel.aktualisiert_am)
+        if compiled is not None:
+            return compiled
+
+        try:
+            compiled = compile_regel(regel.regel_definition)
+        except InvalidRuleError as e:
+            logger.warning(f"Rule '{regel.name}' ({regel.id}) is invalid: {e}")
+            compiled = _raising(e)
+
+        cls._compiled.set(regel.id, regel.aktualisiert_am, compiled)
+        return compiled
+
+    @classmethod
+    def execute(
+        cls,
+        regel,
+        components: Mapping[str, Any],
+        context: Optional[Mapping[str, Any]] = None,
+    ) -> Decimal:
+        """Run a BauteilRegel against extracted components."""
+        return cls.get(regel)(components, context or {})
+
+    @classmethod
+    def clear(cls) -> None:
+        """Forget all compiled rules of this process."""
+        cls._compiled.clear()
+
+
+def _raising(error: InvalidRuleError) -> CompiledRegel:
+    def invalid(components, context):
+        raise InvalidRuleError(str(error))
+    return invalid
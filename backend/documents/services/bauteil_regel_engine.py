@@ -36,13 +36,20 @@ Example Rules:
         "sonst": {"operation": "MULTIPLY", "faktor": 3, "komponente": "Tür", "attribut": "anzahl"}
     }
     → IF Türhöhe > 2.0m THEN 4 Topfbänder ELSE 3 Topfbänder
+
+Tracing: with a RegelTrace set as ``engine.trace`` every evaluated
+operation is recorded with its resolved values, result and timing (see
+bauteil_regel_trace).
 """
 
-from typing import Dict, Any, List, Union
+from typing import Any, Dict, FrozenSet, List, Optional, Set, Tuple, Union, TYPE_CHECKING
 from decimal import Decimal
 import logging
 from .level2_dsl_operations import execute_if_then_else, execute_comparison, execute_logical
 
+if TYPE_CHECKING:
+    from .bauteil_regel_trace import RegelTrace
+
 logger = logging.getLogger(__name__)
 
 
@@ -61,6 +68,11 @@ class ComponentNotFoundError(RegelEngineError):
     pass
 
 
+class RuleBudgetError(InvalidRuleError):
+    """Raised when a rule exceeds the depth, size or step budget."""
+    pass
+
+
 class BauteilRegelEngine:
     """
     Level 1 + Level 2 Rule Engine for component quantity calculation.
@@ -78,6 +90,13 @@ class BauteilRegelEngine:
 
     SUPPORTED_OPERATIONS = ARITHMETIC_OPERATIONS + CONDITIONAL_OPERATIONS + COMPARISON_OPERATIONS + LOGICAL_OPERATIONS
 
+    # Budgets: rules are checked against MAX_DEPTH and MAX_NODES when saved
+    # (see bauteil_regel_analyse); execute_rule() enforces MAX_DEPTH and
+    # MAX_STEPS (operations evaluated per call) for rules that bypass it
+    MAX_DEPTH = 16
+    MAX_NODES = 256
+    MAX_STEPS = 256
+
     def __init__(self, extracted_components: Dict[str, Any]):
         """
         Initialize rule engine with extracted component data.
@@ -91,6 +110,10 @@ class BauteilRegelEngine:
                 }
         """
         self.components = extracted_components
+        # Set to a RegelTrace to record evaluated operations
+        self.trace: Optional['RegelTrace'] = None
+        self._depth = 0
+        self._steps = 0
         logger.debug(f"RegelEngine initialized with components: {list(self.components.keys())}")
 
     def execute_rule(self, regel_definition: Dict[str, Any]) -> Decimal:
@@ -106,6 +129,8 @@ class BauteilRegelEngine:
         Raises:
             InvalidRuleError: If rule format is invalid
             ComponentNotFoundError: If referenced component doesn't exist
+            RuleBudgetError: If the rule is nested deeper than MAX_DEPTH or
+                evaluates more than MAX_STEPS operations
 
         Examples:
             >>> engine = BauteilRegelEngine({'Tür': {'anzahl': 2}})
@@ -118,6 +143,23 @@ class BauteilRegelEngine:
             >>> print(result)
             6
         """
+        if self._depth == 0:
+            self._steps = 0
+        if self._depth >= self.MAX_DEPTH:
+            raise RuleBudgetError(f"Rule is nested deeper than {self.MAX_DEPTH} levels")
+
+        self._depth += 1
+        try:
+            if self.trace is None:
+                return self._execute(regel_definition)
+            with self.trace.knoten(regel_definition.get('operation')) as knoten:
+                result = knoten['wert'] = self._execute(regel_definition)
+            return result
+        finally:
+            self._depth -= 1
+
+    def _execute(self, regel_definition: Dict[str, Any]) -> Decimal:
+        """Dispatch one operation; conditions charge their own steps."""
         operation = regel_definition.get('operation')
 
         if operation not in self.SUPPORTED_OPERATIONS:
@@ -128,6 +170,9 @@ class BauteilRegelEngine:
 
         logger.debug(f"Executing rule: {operation}")
 
+        if operation not in self.COMPARISON_OPERATIONS and operation not in self.LOGICAL_OPERATIONS:
+            self.charge_steps()
+
         if operation == 'MULTIPLY':
             return self._execute_multiply(regel_definition)
         elif operation == 'ADD':
@@ -145,6 +190,18 @@ class BauteilRegelEngine:
             result = execute_logical(regel_definition, self)
             return Decimal('1' if result else '0')
 
+    def charge_steps(self, steps: int = 1) -> None:
+        """
+        Count evaluated operations against the per-call step budget.
+
+        Raises:
+            RuleBudgetError: If the current execute_rule() call evaluated
+                more than MAX_STEPS operations
+        """
+        self._steps += steps
+        if self._steps > self.MAX_STEPS:
+            raise RuleBudgetError(f"Rule evaluation exceeded {self.MAX_STEPS} steps")
+
     def _execute_multiply(self, regel: Dict[str, Any]) -> Decimal:
         """
         Execute MULTIPLY operation.
@@ -179,6 +236,8 @@ class BauteilRegelEngine:
                 f"Available attributes: {list(komponente_data.keys())}"
             )
 
+        if self.trace is not None:
+            self.trace.wert(f'{komponente_name}.{attribut}', attribut_wert)
         result = Decimal(str(faktor)) * Decimal(str(attribut_wert))
         logger.debug(f"MULTIPLY: {faktor} × {attribut_wert} = {result}")
         return result
@@ -294,10 +353,38 @@ class BauteilRegelEngine:
             'referenced_components': list(set(referenced_components))
         }
 
+    @classmethod
+    def required_inputs(cls, regel_definition: Dict[str, Any]) -> FrozenSet[Tuple[str, str]]:
+        """
+        Component attributes a rule reads on every evaluation.
+
+        A rule cannot succeed unless all of these (komponente, attribut)
+        pairs are present in the extracted data. Inputs read only in one
+        branch of an IF_THEN_ELSE are not included, and context sources
+        ('quelle') are optional, so a rule whose inputs are present may
+        still fail.
+
+        Args:
+            regel_definition: Rule definition dict
+
+        Returns:
+            Frozen set of (komponente, attribut) pairs
+
+        Examples:
+            >>> BauteilRegelEngine.required_inputs(
+            ...     {'operation': 'MULTIPLY', 'faktor': 3, 'komponente': 'Tür', 'attribut': 'anzahl'}
+            ... )
+            frozenset({('Tür', 'anzahl')})
+        """
+        inputs: Set[Tuple[str, str]] = set()
+        cls({})._extract_referenced_components(regel_definition, [], inputs)
+        return frozenset(inputs)
+
     def _extract_referenced_components(
         self,
         regel: Dict[str, Any],
-        components_list: List[str]
+        components_list: List[str],
+        required_inputs: Optional[Set[Tuple[str, str]]] = None
     ) -> None:
         """
         Recursively extract all component references from a rule.
@@ -305,25 +392,59 @@ class BauteilRegelEngine:
         Args:
             regel: Rule definition
             components_list: List to append component names to (modified in-place)
+            required_inputs: Optional set to add the (komponente, attribut)
+                pairs to that every evaluation reads (modified in-place)
         """
+        if not isinstance(regel, dict):
+            return
+
         operation = regel.get('operation')
 
         if operation == 'MULTIPLY':
             komponente = regel.get('komponente')
             if komponente:
                 components_list.append(komponente)
+                if required_inputs is not None and regel.get('attribut') is not None:
+                    required_inputs.add((komponente, regel['attribut']))
 
         elif operation in ['ADD']:
             for term in regel.get('terme', []):
-                self._extract_referenced_components(term, components_list)
+                self._extract_referenced_components(term, components_list, required_inputs)
 
         elif operation == 'SUBTRACT':
             minuend = regel.get('minuend')
             subtrahend = regel.get('subtrahend')
             if minuend:
-                self._extract_referenced_components(minuend, components_list)
+                self._extract_referenced_components(minuend, components_list, required_inputs)
             if subtrahend:
-                self._extract_referenced_components(subtrahend, components_list)
+                self._extract_referenced_components(subtrahend, components_list, required_inputs)
+
+        elif operation == 'IF_THEN_ELSE':
+            bedingung = regel.get('bedingung')
+            if bedingung:
+                self._extract_referenced_components(bedingung, components_list, required_inputs)
+
+            # Only inputs read by both branches are needed on every evaluation
+            branch_inputs = []
+            for branch in (regel.get('dann'), regel.get('sonst')):
+                inputs: Set[Tuple[str, str]] = set()
+                if branch:
+                    self._extract_referenced_components(branch, components_list, inputs)
+                branch_inputs.append(inputs)
+            if required_inputs is not None:
+                required_inputs.update(branch_inputs[0] & branch_inputs[1])
+
+        elif operation in self.COMPARISON_OPERATIONS:
+            for operand in (regel.get('links'), regel.get('rechts')):
+                if isinstance(operand, dict) and 'komponente' in operand and 'attribut' in operand:
+                    components_list.append(operand['komponente'])
+                    if required_inputs is not None:
+                        required_inputs.add((operand['komponente'], operand['attribut']))
+
+        elif operation in self.LOGICAL_OPERATIONS:
+            # All conditions are evaluated, not short-circuited
+            for bedingung in regel.get('bedingungen', []):
+                self._extract_referenced_components(bedingung, components_list, required_inputs)
 
         # FIXED doesn't reference components
 
@@ -0,0 +1,131 @@
+"""
+Bauteil Regel-Index
+
+Index from extracted inputs to the BauteilRegeln that need them.
+
+calculate_bauteil_kosten used to try every rule of every component in the
+catalog and rely on ComponentNotFoundError to skip the ones whose inputs
+were not extracted. With catalogs of thousands of Standardbauteile most of
+that work is wasted: a typical extraction names a handful of components.
+
+RegelIndex maps each (komponente, attribut) pair to the rules that read it
+on every evaluation (BauteilRegelEngine.required_inputs). Given the
+extracted components, it counts the hits per rule and returns only the
+rules whose required inputs are all present, plus the rules that need no
+input at all. The work is proportional to the number of rules that
+reference the extracted inputs, not to the catalog size.
+
+The index is a pre-filter: a selected rule may still fail (an input read
+only in one IF_THEN_ELSE branch, an invalid definition), and callers keep
+falling back to the next rule in priority order. A rule that is not
+selected would have raised ComponentNotFoundError.
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Mapping, Sequence, Tuple
+
+from ..models_bauteile import BauteilRegel, StandardBauteil
+from .bauteil_regel_engine import BauteilRegelEngine
+
+logger = logging.getLogger(__name__)
+
+# (komponente, attribut)
+Eingabe = Tuple[str, str]
+
+
+@dataclass(frozen=True)
+class RegelIndex:
+    """Rules of a catalog indexed by their required inputs."""
+
+    # Entry number -> (component, rule); entries are numbered in catalog
+    # order and, per component, by rule priority
+    eintraege: Tuple[Tuple[StandardBauteil, BauteilRegel], ...]
+    # Entry number -> number of required inputs
+    anzahl_eingaben: Tuple[int, ...]
+    # (komponente, attribut) -> entry numbers of the rules requiring it
+    nach_eingabe: Dict[Eingabe, Tuple[int, ...]]
+    # Entry numbers of rules without required inputs (FIXED, context only)
+    ohne_eingaben: Tuple[int, ...]
+
+    @classmethod
+    def build(
+        cls,
+        bauteile: Iterable[Tuple[StandardBauteil, Sequence[BauteilRegel]]],
+    ) -> 'RegelIndex':
+        """
+        Index the rules of components.
+
+        Args:
+            bauteile: (StandardBauteil, rules ordered by priority) pairs in
+                catalog order
+
+        Returns:
+            RegelIndex
+        """
+        eintraege = []
+        anzahl_eingaben = []
+        nach_eingabe: Dict[Eingabe, List[int]] = {}
+        ohne_eingaben = []
+
+        for bauteil, regeln in bauteile:
+            for regel in regeln:
+                nummer = len(eintraege)
+                eingaben = BauteilRegelEngine.required_inputs(regel.regel_definition)
+                eintraege.append((bauteil, regel))
+                anzahl_eingaben.append(len(eingaben))
+                if not eingaben:
+                    ohne_eingaben.append(nummer)
+                for eingabe in eingaben:
+                    nach_eingabe.setdefault(eingabe, []).append(nummer)
+
+        return cls(
+            eintraege=tuple(eintraege),
+            anzahl_eingaben=tuple(anzahl_eingaben),
+            nach_eingabe={eingabe: tuple(nummern) for eingabe, nummern in nach_eingabe.items()},
+            ohne_eingaben=tuple(ohne_eingaben),
+        )
+
+    def erfuellbare_regeln(
+        self,
+        extracted_components: Mapping[str, Any],
+        gewerk: str,
+    ) -> List[Tuple[StandardBauteil, List[BauteilRegel]]]:
+        """
+        Components of a trade with the rules their extracted inputs satisfy.
+
+        Args:
+            extracted_components: Component data from OCR/NER extraction
+            gewerk: Trade type
+
+        Returns:
+            List of (StandardBauteil, List[BauteilRegel]) tuples in catalog
+            order, rules ordered by priority; components without a
+            satisfiable rule are left out
+        """
+        treffer: Dict[int, int] = {}
+        for komponente, attribute in extracted_components.items():
+            if not isinstance(attribute, dict):
+                continue
+            for attribut, wert in attribute.items():
+                # The engine treats None like a missing attribute
+                if wert is None:
+                    continue
+                for nummer in self.nach_eingabe.get((komponente, attribut), ()):
+                    treffer[nummer] = treffer.get(nummer, 0) + 1
+
+        anzahl_eingaben = self.anzahl_eingaben
+        nummern = [nummer for nummer, anzahl in treffer.items() if anzahl == anzahl_eingaben[nummer]]
+        nummern.extend(self.ohne_eingaben)
+        nummern.sort()
+
+        result: List[Tuple[StandardBauteil, List[BauteilRegel]]] = []
+        for nummer in nummern:
+            bauteil, regel = self.eintraege[nummer]
+            if result and result[-1][0] is bauteil:
+                result[-1][1].append(regel)
+            elif gewerk in bauteil.gewerke:
+                result.append((bauteil, [regel]))
+
+        logger.debug(f"{len(nummern)} of {len(self.eintraege)} rules satisfiable by extracted components")
+        return result
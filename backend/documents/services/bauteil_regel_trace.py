@@ -0,0 +1,189 @@
+"""
+Sampled execution traces of Bauteil rules.
+
+calculate_bauteil_kosten() runs rules as compiled closures and keeps only
+the quantity of the first rule that succeeds. When a quantity looks wrong
+the trace answers which rule of the priority list fired, which ones threw
+and what values were resolved:
+
+- RegelTrace records the operations BauteilRegelEngine evaluates while it
+  is set as ``engine.trace``: one node per operation in evaluation order
+  with its depth, result, resolved inputs and time. A resolved input of
+  None means a missing context source that was read as 0.
+- verfolge_regel() re-runs one rule definition through the traced
+  interpreter. Traces are only recorded for calls that need them (a rule
+  failed, the call was sampled or tracing was requested), so the compiled
+  hot path is unchanged.
+- RegelTraceService stores traces in a fixed-size ring buffer in the
+  Django cache (BAUTEIL_REGEL_TRACE_BUFFER_SIZE slots, shared by all
+  processes). The trace id encodes the slot; a trace that has been
+  overwritten by newer ones is gone. Without a working cache traces are
+  dropped and positions carry no trace id.
+"""
+
+import logging
+import random
+import time
+import uuid
+from contextlib import contextmanager
+from decimal import Decimal
+from typing import Any, Dict, Iterator, List, Mapping, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+class RegelTrace:
+    """Evaluated operations of a rule, in evaluation order."""
+
+    def __init__(self):
+        self._knoten: List[Dict[str, Any]] = []
+        self._offen: List[Dict[str, Any]] = []
+
+    @contextmanager
+    def knoten(self, operation: Optional[str]) -> Iterator[Dict[str, Any]]:
+        """Record one operation; the caller sets the node's 'wert'."""
+        knoten = {'op': operation, 'tiefe': len(self._offen)}
+        self._knoten.append(knoten)
+        self._offen.append(knoten)
+        start = time.perf_counter()
+        try:
+            yield knoten
+        except Exception as e:
+            knoten['fehler'] = f'{type(e).__name__}: {e}'
+            raise
+        finally:
+            knoten['ms'] = round((time.perf_counter() - start) * 1000, 4)
+            if 'wert' in knoten:
+                knoten['wert'] = _text(knoten['wert'])
+            self._offen.pop()
+
+    def wert(self, name: str, wert: Any) -> None:
+        """Record an input resolved by the current operation."""
+        if self._offen:
+            self._offen[-1].setdefault('werte', {})[name] = _text(wert)
+
+    def to_list(self) -> List[Dict[str, Any]]:
+        return self._knoten
+
+
+def verfolge_regel(
+    regel_definition: Dict[str, Any],
+    components: Mapping[str, Any],
+    context: Optional[Mapping[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Evaluate a rule with tracing.
+
+    Args:
+        regel_definition: Rule definition dict
+        components: Extracted components
+        context: Optional calculation context ('quelle' values)
+
+    Returns:
+        {'menge': str or None, 'fehler': str or None, 'ms': float,
+        'knoten': [...]} with the evaluated operations
+    """
+    from .bauteil_regel_engine import BauteilRegelEngine
+
+    engine = BauteilRegelEngine(components)
+    engine.context = context or {}
+    engine.trace = RegelTrace()
+
+    menge, fehler = None, None
+    start = time.perf_counter()
+    try:
+        menge = engine.execute_rule(regel_definition)
+    except Exception as e:
+        # Not only RegelEngineError: the interpreter can fail where the
+        # compiler rejected the rule up front (e.g. a non-numeric constant)
+        fehler = f'{type(e).__name__}: {e}'
+
+    return {
+        'menge': _text(menge),
+        'fehler': fehler,
+        'ms': round((time.perf_counter() - start) * 1000, 4),
+        'knoten': engine.trace.to_list(),
+    }
+
+
+class RegelTraceService:
+    """Ring buffer of rule traces in the Django cache."""
+
+    COUNTER_KEY = 'regel_trace:counter'
+    SLOT_KEY = 'regel_trace:v1:{slot}'
+    TIMEOUT = 7 * 24 * 3600
+
+    @classmethod
+    def groesse(cls) -> int:
+        return max(1, getattr(settings, 'BAUTEIL_REGEL_TRACE_BUFFER_SIZE', 1000))
+
+    @classmethod
+    def sample(cls) -> bool:
+        """Whether to trace a call that needs no trace otherwise."""
+        rate = getattr(settings, 'BAUTEIL_REGEL_TRACE_SAMPLE_RATE', 0.0)
+        return rate > 0 and random.random() < rate
+
+    @classmethod
+    def speichere(cls, trace: Dict[str, Any]) -> Optional[str]:
+        """
+        Store a trace in the next ring buffer slot.
+
+        Args:
+            trace: JSON-serializable trace dict
+
+        Returns:
+            Trace id, or None if the cache is unavailable
+        """
+        try:
+            cache.add(cls.COUNTER_KEY, 0, timeout=None)
+            nummer = cache.incr(cls.COUNTER_KEY)
+            if nummer is None:
+                return None
+            trace_id = f'{nummer}-{uuid.uuid4().hex[:8]}'
+            cache.set(
+                cls.SLOT_KEY.format(slot=nummer % cls.groesse()),
+                dict(trace, trace_id=trace_id, erstellt_am=timezone.now().isoformat()),
+                timeout=cls.TIMEOUT,
+            )
+            return trace_id
+        except Exception as e:
+            # Tracing must never break the traced calculation
+            logger.warning(f"Could not store rule trace: {e}")
+            return None
+
+    @classmethod
+    def get(cls, trace_id: str) -> Optional[Dict[str, Any]]:
+        """Stored trace, or None if unknown or already overwritten."""
+        try:
+            nummer = int(str(trace_id).split('-', 1)[0])
+        except ValueError:
+            return None
+        trace = cache.get(cls.SLOT_KEY.format(slot=nummer % cls.groesse()))
+        if trace is None or trace.get('trace_id') != trace_id:
+            return None
+        return trace
+
+    @classmethod
+    def letzte(cls, anzahl: int = 20) -> List[Dict[str, Any]]:
+        """Most recent traces, newest first."""
+        nummer = cache.get(cls.COUNTER_KEY) or 0
+        anzahl = min(anzahl, nummer, cls.groesse())
+        keys = [cls.SLOT_KEY.format(slot=(nummer - i) % cls.groesse()) for i in range(anzahl)]
+        traces = cache.get_many(keys)
+        return [traces[key] for key in keys if key in traces]
+
+    @classmethod
+    def clear(cls) -> None:
+        """Drop all stored traces."""
+        cache.delete_many([cls.SLOT_KEY.format(slot=slot) for slot in range(cls.groesse())] + [cls.COUNTER_KEY])
+
+
+def _text(wert: Any) -> Any:
+    """JSON-friendly value: Decimals as strings, everything else unchanged."""
+    if isinstance(wert, Decimal):
+        return str(wert)
+    return wert
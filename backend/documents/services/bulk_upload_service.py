@@ -509,6 +509,7 @@ class BulkUploadService:
             result.add_error(0, 'headers', headers, f'Missing columns: {missing}')
             return result
 
+        changed_skus = []
         with transaction.atomic():
             for row_num, row_data in enumerate(rows[1:], start=2):
                 try:
@@ -575,6 +576,7 @@ class BulkUploadService:
                                 is_enabled=is_enabled
                             )
                             result.created_count += 1
+                        changed_skus.append(sku)
                     else:
                         result.created_count += 1
 
@@ -584,6 +586,11 @@ class BulkUploadService:
             if dry_run:
                 transaction.set_rollback(True)
 
+        if changed_skus:
+            # Existing extractions were priced with the old standardkosten
+            from extraction.services.bulk_repricing import BulkRepricingService
+            BulkRepricingService.enqueue(user, skus=changed_skus, trigger='materialliste')
+
         result.success = not result.has_errors or result.total_processed > 0
         return result
 
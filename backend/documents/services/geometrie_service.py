@@ -9,15 +9,56 @@ Features:
 - User-editable checkboxes for selective edge application
 - Support for complex geometries (Korpus, Türen, Einlegeböden, Schubladen)
 - Company-specific default preferences
+- Vectorized path for large furniture lists (NumPy, one pass over all
+  components, bulk_create into GeometrieBerechnung)
 """
 
-from typing import Dict, Any, List, Tuple
-from decimal import Decimal
+from typing import Dict, Any, List, Sequence, TYPE_CHECKING
+from decimal import Decimal, InvalidOperation
 from dataclasses import dataclass
 import logging
 
+import numpy as np
+
+if TYPE_CHECKING:
+    from ..models_bauteile import GeometrieBerechnung
+
 logger = logging.getLogger(__name__)
 
+# Component type codes of the structured component array
+TYP_KORPUS, TYP_TUER, TYP_EINLEGEBODEN, TYP_SCHUBLADE, TYP_GENERISCH = range(5)
+
+TYP_CODES = {
+    'korpus': TYP_KORPUS,
+    'tür': TYP_TUER,
+    'tuer': TYP_TUER,
+    'einlegeboden': TYP_EINLEGEBODEN,
+    'schublade': TYP_SCHUBLADE,
+}
+
+# Dimensions in the order the generic calculation reads them
+MASS_FELDER = ('höhe', 'breite', 'tiefe', 'länge')
+
+# Edges per component type: (kanten_typ, ist_sichtbar); the edge's slot is
+# its bit in KOMPONENTEN_DTYPE['kanten_maske']
+KANTEN_PRO_TYP = {
+    TYP_KORPUS: (('korpus_außen', True), ('korpus_innen', False)),
+    TYP_TUER: (('tür_außen', True),),
+    TYP_EINLEGEBODEN: (('einlegeboden_vorder', True), ('einlegeboden_seite', False)),
+    TYP_SCHUBLADE: (('schublade_außen', True),),
+    TYP_GENERISCH: (('sonstiges', True),),
+}
+
+KANTEN_TYPEN = tuple(kanten_typ for kanten in KANTEN_PRO_TYP.values() for kanten_typ, _ in kanten)
+
+KOMPONENTEN_DTYPE = np.dtype([
+    ('typ', 'i1'),
+    ('maße', 'f8', (len(MASS_FELDER),)),
+    ('maß_vorhanden', '?', (len(MASS_FELDER),)),
+    ('anzahl', 'f8'),
+    ('kanten_maske', 'u1'),
+])
+
 
 @dataclass
 class KantenBerechnung:
@@ -32,6 +73,43 @@ class KantenBerechnung:
     ist_sichtbar: bool = True   # Is this edge typically visible?
 
 
+@dataclass
+class KantenArray:
+    """
+    Edges of a component array from the vectorized path.
+
+    One entry per edge, in the order calculate_abs_kanten() returns them
+    (by component, then edge). Lengths are float64 rounded to 9 decimals.
+    """
+    komponente: np.ndarray     # index into the component list
+    kanten_typ: np.ndarray     # index into KANTEN_TYPEN
+    laenge: np.ndarray         # lfm
+    ist_aktiviert: np.ndarray
+    ist_sichtbar: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.laenge)
+
+    def gesamt_laenge(self, nur_aktivierte: bool = True) -> Decimal:
+        """Total edge length in lfm (like calculate_total_kanten_länge)."""
+        laengen = self.laenge[self.ist_aktiviert] if nur_aktivierte else self.laenge
+        return _als_decimal(round(float(laengen.sum()), LAENGE_DEZIMALEN))
+
+
+LAENGE_DEZIMALEN = 9
+
+# Edge formulas for documentation, as written by the per-type methods
+KANTEN_FORMELN = {
+    'korpus_außen': '2 × ({höhe}m + {breite}m) × {anzahl} Korpus',
+    'korpus_innen': '2 × {tiefe}m × {anzahl} Korpus (Fachboden-Auflagen)',
+    'tür_außen': '2 × ({höhe}m + {breite}m) × {anzahl} Türen',
+    'einlegeboden_vorder': '{breite}m × {anzahl} Einlegeböden',
+    'einlegeboden_seite': '2 × {tiefe}m × {anzahl} Einlegeböden',
+    'schublade_außen': '2 × ({höhe}m + {breite}m) × {anzahl} Schubladen',
+    'sonstiges': '2 × ({erstes}m + {zweites}m) × {anzahl}',
+}
+
+
 class GeometrieServiceError(Exception):
     """Base exception for geometry service errors."""
     pass
@@ -316,6 +394,214 @@ class GeometrieService:
             ist_sichtbar=True
         )]
 
+    # =====================
+    # VECTORIZED PATH
+    # =====================
+
+    def komponenten_array(
+        self,
+        komponenten: Sequence[Dict[str, Any]],
+        apply_visibility_defaults: bool = True
+    ) -> np.ndarray:
+        """
+        Convert extracted components to a structured array (KOMPONENTEN_DTYPE).
+
+        Components without dimensions are left out, like in
+        calculate_abs_kanten(); use indizes() of the result rows to map
+        them back. The edge mask has one bit per edge of the type (see
+        KANTEN_PRO_TYP) and holds the visibility defaults, or all edges if
+        apply_visibility_defaults is False.
+
+        Args:
+            komponenten: Component dicts (see calculate_abs_kanten)
+            apply_visibility_defaults: Apply standard visibility rules?
+
+        Returns:
+            Structured array with an extra 'index' field (position in
+            komponenten)
+
+        Raises:
+            InvalidComponentError: If a dimension or count is not a number
+        """
+        dtype = np.dtype(KOMPONENTEN_DTYPE.descr + [('index', 'i8')])
+        zeilen = []
+
+        for index, komponente in enumerate(komponenten):
+            typ = komponente.get('typ', '').lower()
+            maße = komponente.get('maße', {})
+            if not maße:
+                logger.warning(f"Component '{typ}' has no dimensions, skipping")
+                continue
+
+            typ_code = TYP_CODES.get(typ, TYP_GENERISCH)
+            werte = [_als_float(maße.get(feld, 0), feld) if feld in maße else 0.0 for feld in MASS_FELDER]
+            vorhanden = [feld in maße for feld in MASS_FELDER]
+            zeilen.append((
+                typ_code,
+                werte,
+                vorhanden,
+                _als_float(komponente.get('anzahl', 1), 'anzahl'),
+                self._kanten_maske(typ_code, apply_visibility_defaults),
+                index,
+            ))
+
+        return np.array(zeilen, dtype=dtype)
+
+    def calculate_abs_kanten_array(
+        self,
+        komponenten: Sequence[Dict[str, Any]],
+        apply_visibility_defaults: bool = True
+    ) -> KantenArray:
+        """
+        Vectorized calculate_abs_kanten() for large furniture lists.
+
+        Args:
+            komponenten: Component dicts (see calculate_abs_kanten)
+            apply_visibility_defaults: Apply standard visibility rules?
+
+        Returns:
+            KantenArray with the edges calculate_abs_kanten() returns
+
+        Examples:
+            >>> service = GeometrieService()
+            >>> kanten = service.calculate_abs_kanten_array(
+            ...     [{'typ': 'Tür', 'maße': {'höhe': 2.0, 'breite': 1.0}, 'anzahl': 2}]
+            ... )
+            >>> kanten.gesamt_laenge()
+            Decimal('12.0')
+        """
+        return self.berechne_kanten(self.komponenten_array(komponenten, apply_visibility_defaults))
+
+    def berechne_kanten(self, array: np.ndarray) -> KantenArray:
+        """
+        Compute every edge length of a component array in one pass.
+
+        Args:
+            array: Structured array from komponenten_array() (or built by
+                the caller with KOMPONENTEN_DTYPE plus 'index')
+
+        Returns:
+            KantenArray
+        """
+        typ = array['typ']
+        maße = array['maße']
+        vorhanden = array['maß_vorhanden']
+        anzahl = array['anzahl']
+        höhe, breite, tiefe = maße[:, 0], maße[:, 1], maße[:, 2]
+
+        # Generic components: perimeter of the first two given dimensions
+        erste_zwei = vorhanden & (np.cumsum(vorhanden, axis=1) <= 2)
+        generisch_summe = np.where(erste_zwei, maße, 0.0).sum(axis=1)
+        generisch_ok = vorhanden.sum(axis=1) >= 2
+        if (~generisch_ok & (typ == TYP_GENERISCH)).any():
+            logger.warning("Not enough dimensions for generic calculation, skipping component(s)")
+
+        umfang = 2 * (höhe + breite) * anzahl
+        laenge = (
+            np.select(
+                [typ == TYP_EINLEGEBODEN, typ == TYP_GENERISCH],
+                [breite * anzahl, 2 * generisch_summe * anzahl],
+                default=umfang,
+            ),
+            2 * tiefe * anzahl,
+        )
+        hat_kante = (
+            (typ != TYP_GENERISCH) | generisch_ok,
+            (typ == TYP_KORPUS) | (typ == TYP_EINLEGEBODEN),
+        )
+
+        zeilen = [np.flatnonzero(hat) for hat in hat_kante]
+        slots = np.concatenate([np.full(len(z), slot, dtype=np.int8) for slot, z in enumerate(zeilen)])
+        zeilen_alle = np.concatenate(zeilen)
+        laengen = np.concatenate([laenge[slot][z] for slot, z in enumerate(zeilen)])
+
+        reihenfolge = np.lexsort((slots, array['index'][zeilen_alle]))
+        zeilen_alle, slots, laengen = zeilen_alle[reihenfolge], slots[reihenfolge], laengen[reihenfolge]
+        typen = typ[zeilen_alle]
+
+        return KantenArray(
+            komponente=array['index'][zeilen_alle],
+            kanten_typ=_KANTEN_INDEX[typen, slots],
+            laenge=np.round(laengen, LAENGE_DEZIMALEN),
+            ist_aktiviert=((array['kanten_maske'][zeilen_alle] >> slots) & 1).astype(bool),
+            ist_sichtbar=_KANTEN_SICHTBAR[typen, slots],
+        )
+
+    def als_kanten_berechnungen(
+        self,
+        kanten: KantenArray,
+        komponenten: Sequence[Dict[str, Any]]
+    ) -> List[KantenBerechnung]:
+        """
+        KantenBerechnung objects of a KantenArray, with formulas, for the
+        editable preview.
+        """
+        berechnungen = []
+        for index, kanten_index, laenge, aktiviert, sichtbar in zip(
+            kanten.komponente.tolist(), kanten.kanten_typ.tolist(), kanten.laenge.tolist(),
+            kanten.ist_aktiviert.tolist(), kanten.ist_sichtbar.tolist(),
+        ):
+            komponente = komponenten[index]
+            kanten_typ = KANTEN_TYPEN[kanten_index]
+            berechnungen.append(KantenBerechnung(
+                kanten_typ=kanten_typ,
+                formel=_formel(kanten_typ, komponente),
+                berechnete_laenge=_als_decimal(laenge),
+                komponenten_daten=komponente,
+                ist_aktiviert=aktiviert,
+                ist_sichtbar=sichtbar,
+            ))
+        return berechnungen
+
+    def speichere_geometrie_berechnungen(
+        self,
+        kanten: KantenArray,
+        komponenten: Sequence[Dict[str, Any]],
+        bauteil,
+        batch_size: int = 500
+    ) -> List['GeometrieBerechnung']:
+        """
+        Store the edges of a KantenArray as GeometrieBerechnung rows with
+        bulk_create.
+
+        Args:
+            kanten: Result of calculate_abs_kanten_array()
+            komponenten: The component dicts it was computed from
+            bauteil: Edge StandardBauteil (e.g. ABS-Kante)
+            batch_size: Rows per INSERT
+
+        Returns:
+            Created GeometrieBerechnung objects
+        """
+        from ..models_bauteile import GeometrieBerechnung
+
+        if not self.extraction_result_id:
+            raise GeometrieServiceError("extraction_result_id is required to store calculations")
+
+        objekte = [
+            GeometrieBerechnung(
+                extraction_result_id=self.extraction_result_id,
+                bauteil=bauteil,
+                kanten_typ=berechnung.kanten_typ,
+                formel=berechnung.formel,
+                berechnete_laenge=berechnung.berechnete_laenge,
+                ist_aktiviert=berechnung.ist_aktiviert,
+                komponenten_daten=berechnung.komponenten_daten,
+            )
+            for berechnung in self.als_kanten_berechnungen(kanten, komponenten)
+        ]
+        erstellt = GeometrieBerechnung.objects.bulk_create(objekte, batch_size=batch_size)
+        logger.info(f"Stored {len(erstellt)} edge calculations for extraction {self.extraction_result_id}")
+        return erstellt
+
+    def _kanten_maske(self, typ_code: int, apply_visibility_defaults: bool) -> int:
+        """Bit mask of the edges enabled by default for a component type."""
+        maske = 0
+        for slot, (kanten_typ, _) in enumerate(KANTEN_PRO_TYP[typ_code]):
+            if not apply_visibility_defaults or self.EDGE_VISIBILITY_DEFAULTS.get(kanten_typ, True):
+                maske |= 1 << slot
+        return maske
+
     def calculate_total_kanten_länge(
         self,
         berechnungen: List[KantenBerechnung],
@@ -414,6 +700,40 @@ class GeometrieService:
         return beschreibungen.get(kanten_typ, kanten_typ.replace('_', ' ').title())
 
 
+# Edge type index / visibility per (component type, slot); -1 = no edge
+_KANTEN_INDEX = np.full((len(KANTEN_PRO_TYP), 2), -1, dtype=np.int16)
+_KANTEN_SICHTBAR = np.zeros((len(KANTEN_PRO_TYP), 2), dtype=bool)
+for _typ, _kanten in KANTEN_PRO_TYP.items():
+    for _slot, (_kanten_typ, _sichtbar) in enumerate(_kanten):
+        _KANTEN_INDEX[_typ, _slot] = KANTEN_TYPEN.index(_kanten_typ)
+        _KANTEN_SICHTBAR[_typ, _slot] = _sichtbar
+
+
+def _als_float(wert: Any, feld: str) -> float:
+    """Float of a dimension or count, read like Decimal(str(wert))."""
+    try:
+        return float(Decimal(str(wert)))
+    except (InvalidOperation, ValueError):
+        raise InvalidComponentError(f"Invalid value for '{feld}': {wert!r}")
+
+
+def _als_decimal(wert: float) -> Decimal:
+    return Decimal(repr(float(wert)))
+
+
+def _formel(kanten_typ: str, komponente: Dict[str, Any]) -> str:
+    """Documentation formula of an edge, as written by the per-type methods."""
+    maße = komponente.get('maße', {})
+    dims = [Decimal(str(maße[key])) for key in MASS_FELDER if key in maße]
+    werte = {feld: Decimal(str(maße.get(feld, 0))) for feld in MASS_FELDER}
+    return KANTEN_FORMELN[kanten_typ].format(
+        anzahl=komponente.get('anzahl', 1),
+        erstes=dims[0] if dims else '',
+        zweites=dims[1] if len(dims) > 1 else '',
+        **werte,
+    )
+
+
 def calculate_abs_kanten_auto(
     komponenten: List[Dict[str, Any]],
     extraction_result_id: str = None
@@ -56,10 +56,20 @@ def execute_comparison(regel: Dict[str, Any], engine: 'BauteilRegelEngine') -> b
 
     Supported: GREATER_THAN, LESS_THAN, EQUALS, GREATER_EQUAL, LESS_EQUAL
     """
+    if engine.trace is None:
+        return _compare(regel, engine)
+    with engine.trace.knoten(regel.get('operation')) as knoten:
+        result = knoten['wert'] = _compare(regel, engine)
+    return result
+
+
+def _compare(regel: Dict[str, Any], engine: 'BauteilRegelEngine') -> bool:
     operation = regel.get('operation')
     links = regel.get('links')
     rechts = regel.get('rechts')
 
+    engine.charge_steps()
+
     if not all([operation, links is not None, rechts is not None]):
         from documents.services.bauteil_regel_engine import InvalidRuleError
         raise InvalidRuleError(f"Comparison requires 'links' and 'rechts'")
@@ -96,6 +106,14 @@ def execute_logical(regel: Dict[str, Any], engine: 'BauteilRegelEngine') -> bool
     Format:
     {"operation": "AND", "bedingungen": [cond1, cond2, ...]}
     """
+    if engine.trace is None:
+        return _combine(regel, engine)
+    with engine.trace.knoten(regel.get('operation')) as knoten:
+        result = knoten['wert'] = _combine(regel, engine)
+    return result
+
+
+def _combine(regel: Dict[str, Any], engine: 'BauteilRegelEngine') -> bool:
     operation = regel.get('operation')
     bedingungen = regel.get('bedingungen', [])
 
@@ -103,6 +121,7 @@ def execute_logical(regel: Dict[str, Any], engine: 'BauteilRegelEngine') -> bool
         from documents.services.bauteil_regel_engine import InvalidRuleError
         raise InvalidRuleError(f"{operation} requires 'bedingungen' list")
 
+    engine.charge_steps()
     results = [execute_comparison(cond, engine) for cond in bedingungen]
 
     if operation == 'AND':
@@ -151,6 +170,8 @@ def resolve_value(value_spec: Union[Dict, int, float, str], engine: 'BauteilRege
                     f"Attribute '{attribut}' not found in component '{komponente_name}'"
                 )
 
+            if engine.trace is not None:
+                engine.trace.wert(f'{komponente_name}.{attribut}', attribut_wert)
             return Decimal(str(attribut_wert))
 
         # Context source reference (for Pauschalen)
@@ -159,9 +180,13 @@ def resolve_value(value_spec: Union[Dict, int, float, str], engine: 'BauteilRege
             # Check if engine has context
             context = getattr(engine, 'context', {})
             if quelle_key in context:
+                if engine.trace is not None:
+                    engine.trace.wert(f'quelle:{quelle_key}', context[quelle_key])
                 return Decimal(str(context[quelle_key]))
             else:
                 logger.warning(f"Context source '{quelle_key}' not found, using 0")
+                if engine.trace is not None:
+                    engine.trace.wert(f'quelle:{quelle_key}', None)
                 return Decimal('0')
 
     # String literal
@@ -15,10 +15,16 @@ Created: December 2025
 
 from decimal import Decimal
 from typing import Dict, Any, List, Optional
+import json
 import logging
 
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+
+from core.tracing import span
 from documents.models_pauschalen import BetriebspauschaleRegel, PauschaleAnwendung
-from .bauteil_regel_engine import BauteilRegelEngine
+from .pauschale_index import PauschaleIndex, PauschaleIndexService
 
 logger = logging.getLogger(__name__)
 
@@ -29,6 +35,9 @@ class PauschaleCalculationService:
 
     Handles various calculation types including fixed amounts, per-unit calculations,
     percentages, and conditional rules using the DSL engine.
+
+    preview_pauschalen() calculates without side effects; commit_pauschalen()
+    persists a preview as PauschaleAnwendung rows in one bulk insert.
     """
 
     def __init__(self, user, extraction_result):
@@ -41,16 +50,32 @@ class PauschaleCalculationService:
         """
         self.user = user
         self.extraction_result = extraction_result
+        self._index: Optional[PauschaleIndex] = None
+
+    @property
+    def index(self) -> PauschaleIndex:
+        """The user's cached Pauschalen index (see pauschale_index)."""
+        if self._index is None:
+            self._index = PauschaleIndexService.get(self.user)
+        return self._index
 
     def calculate_all_pauschalen(
-        self, auftragswert: Decimal, context: Dict[str, Any]
+        self,
+        auftragswert: Decimal,
+        context: Dict[str, Any],
+        preview: bool = False,
     ) -> Dict[str, Any]:
         """
         Calculate all applicable Pauschalen for an order.
 
+        Without preview the applications are committed (see
+        commit_pauschalen), replacing earlier applications of the
+        extraction result.
+
         Args:
             auftragswert: Total order value (for range filtering)
             context: Calculation context (distance, quantities, etc.)
+            preview: Calculate only, write nothing
 
         Returns:
             Dict with 'pauschalen' list and 'total' sum
@@ -64,47 +89,47 @@ class PauschaleCalculationService:
             >>> print(result['total'])
             275.50
         """
-        pauschalen = BetriebspauschaleRegel.objects.filter(
-            user=self.user, ist_aktiv=True
-        )
+        result = self.preview_pauschalen(auftragswert, context)
+        if preview:
+            return result
+        return self.commit_pauschalen(result)
 
+    def preview_pauschalen(
+        self, auftragswert: Decimal, context: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        Calculate all applicable Pauschalen without database writes.
+
+        Args:
+            auftragswert: Total order value (for range filtering)
+            context: Calculation context (distance, quantities, etc.)
+
+        Returns:
+            Dict with 'pauschalen' list (anwendung_id None), 'total',
+            'berechnungsgrundlage' and 'preview': True. Each item's
+            'betrag' is a float for the API; 'betrag_exakt' keeps the
+            Decimal as a string, which commit_pauschalen stores.
+        """
         results = []
         total = Decimal('0')
 
-        for pauschale in pauschalen:
-            # Check if pauschale applies to this order value
-            if not pauschale.is_applicable_for_order(auftragswert):
-                logger.debug(
-                    f"Pauschale '{pauschale.name}' not applicable "
-                    f"for order value {auftragswert}"
-                )
-                continue
-
+        for pauschale in self.index.anwendbare(auftragswert):
             try:
-                betrag = self._calculate_pauschale(pauschale, context)
+                with span('pauschale', regel=pauschale.name):
+                    betrag = self._calculate_pauschale(pauschale, context)
                 if betrag > 0:
-                    # Create PauschaleAnwendung record
-                    anwendung = PauschaleAnwendung.objects.create(
-                        extraction_result=self.extraction_result,
-                        pauschale=pauschale,
-                        berechnungsgrundlage=context,
-                        berechneter_betrag=betrag,
-                    )
-
                     results.append(
                         {
                             "name": pauschale.name,
                             "typ": pauschale.pauschale_typ,
                             "betrag": float(betrag),
-                            "anwendung_id": str(anwendung.id),
+                            "betrag_exakt": str(betrag),
+                            "pauschale_id": str(pauschale.id),
+                            "anwendung_id": None,
                         }
                     )
                     total += betrag
 
-                    logger.info(
-                        f"Applied Pauschale '{pauschale.name}': {betrag} EUR"
-                    )
-
             except Exception as e:
                 logger.error(
                     f"Error calculating Pauschale '{pauschale.name}': {e}",
@@ -113,7 +138,78 @@ class PauschaleCalculationService:
                 # Continue with other Pauschalen even if one fails
                 continue
 
-        return {"pauschalen": results, "total": float(total)}
+        return {
+            "pauschalen": results,
+            "total": float(total),
+            "berechnungsgrundlage": json.loads(json.dumps(context, cls=DjangoJSONEncoder)),
+            "preview": True,
+        }
+
+    def commit_pauschalen(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Persist a preview as PauschaleAnwendung rows.
+
+        Earlier applications of the extraction result are replaced: one
+        DELETE and one bulk INSERT in a single transaction. Manually
+        overridden applications are kept with their manueller_betrag;
+        only their calculated amount and basis are refreshed.
+
+        Args:
+            result: Return value of preview_pauschalen
+
+        Returns:
+            The result with anwendung_id set and 'preview': False
+        """
+        anwendungen, neu, behalten = [], [], []
+
+        with transaction.atomic():
+            ueberschrieben = {
+                str(anwendung.pauschale_id): anwendung
+                for anwendung in PauschaleAnwendung.objects.filter(
+                    extraction_result=self.extraction_result, manuell_ueberschrieben=True
+                )
+            }
+            deleted, _ = PauschaleAnwendung.objects.filter(
+                extraction_result=self.extraction_result, manuell_ueberschrieben=False
+            ).delete()
+
+            for item in result["pauschalen"]:
+                betrag = Decimal(item["betrag_exakt"]).quantize(Decimal("0.01"))
+                anwendung = ueberschrieben.get(item["pauschale_id"])
+                if anwendung is None:
+                    anwendung = PauschaleAnwendung(
+                        extraction_result=self.extraction_result,
+                        pauschale_id=item["pauschale_id"],
+                        berechnungsgrundlage=result["berechnungsgrundlage"],
+                        berechneter_betrag=betrag,
+                    )
+                    neu.append(anwendung)
+                else:
+                    anwendung.berechnungsgrundlage = result["berechnungsgrundlage"]
+                    anwendung.berechneter_betrag = betrag
+                    anwendung.aktualisiert_am = timezone.now()
+                    behalten.append(anwendung)
+                anwendungen.append(anwendung)
+
+            PauschaleAnwendung.objects.bulk_create(neu)
+            if behalten:
+                PauschaleAnwendung.objects.bulk_update(
+                    behalten, ["berechnungsgrundlage", "berechneter_betrag", "aktualisiert_am"]
+                )
+
+        logger.info(
+            f"Committed {len(anwendungen)} Pauschalen for extraction "
+            f"{self.extraction_result.pk} (replaced {deleted}, kept {len(behalten)} manual overrides)"
+        )
+
+        return {
+            **result,
+            "pauschalen": [
+                dict(item, anwendung_id=str(anwendung.id))
+                for item, anwendung in zip(result["pauschalen"], anwendungen)
+            ],
+            "preview": False,
+        }
 
     def _calculate_pauschale(
         self, pauschale: BetriebspauschaleRegel, context: Dict[str, Any]
@@ -164,14 +260,8 @@ class PauschaleCalculationService:
                     f"but no konditional_regel defined"
                 )
 
-            # Create engine with empty components (pauschalen don't use components)
-            engine = BauteilRegelEngine({})
-            # Add context for resolution of variables
-            engine.context = context
-
             try:
-                result = engine.execute_rule(pauschale.konditional_regel)
-                return result
+                return self.index.berechne_konditional(pauschale, context)
 
             except Exception as e:
                 logger.error(
@@ -208,7 +298,7 @@ class PauschaleCalculationService:
         """
         Recalculate all Pauschalen for an extraction result.
 
-        Deletes existing applications and recalculates from scratch.
+        Replaces existing applications with freshly calculated ones.
 
         Args:
             extraction_result: ExtractionResult instance
@@ -218,14 +308,5 @@ class PauschaleCalculationService:
         Returns:
             Dict with 'pauschalen' list and 'total' sum
         """
-        # Delete existing applications
-        PauschaleAnwendung.objects.filter(
-            extraction_result=extraction_result
-        ).delete()
-
-        logger.info(
-            f"Deleted old Pauschalen applications for extraction {extraction_result.id}"
-        )
-
-        # Recalculate
+        self.extraction_result = extraction_result
         return self.calculate_all_pauschalen(auftragswert, context)
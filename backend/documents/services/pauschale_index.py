@@ -0,0 +1,233 @@
+"""
+Applicability index for Betriebspauschalen.
+
+PauschaleCalculationService and ApplicablePauschaleView both need the
+active BetriebspauschaleRegel rows of a user that apply to an order value.
+PauschaleIndex holds those rules once per user version:
+
+- The order-value bounds (min/max_auftragswert) of all rules split the
+  value axis into elementary ranges. For every boundary value and every
+  open range between two boundaries the applicable rules are precomputed,
+  so a lookup is one bisect over the boundaries.
+- Konditional rules are compiled with compile_regel() when the index is
+  built; invalid rules keep their compile error and price as 0.
+
+Caching works like the catalog snapshot: a per-user version token lives in
+the Django cache and is dropped when a rule is saved or deleted (see
+documents.signals). Indexes are stored in the Django cache under user +
+token and in process memory; compiled rules are rebuilt after unpickling.
+Without a working cache every call builds a fresh index (one query).
+"""
+
+import logging
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from datetime import date
+from decimal import Decimal
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from core.versioned_cache import VersionedCache
+
+from ..models_pauschalen import BetriebspauschaleRegel
+from .bauteil_regel_compiler import CompiledRegel, compile_regel
+from .bauteil_regel_engine import InvalidRuleError
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class PauschaleIndex:
+    """Active Pauschalen of one user, indexed by order-value range."""
+
+    user_id: int
+    version: str
+    # Active rules in model ordering (pauschale_typ, prioritaet, name)
+    regeln: Tuple[BetriebspauschaleRegel, ...]
+    # Sorted distinct order-value bounds
+    grenzen: Tuple[Decimal, ...]
+    # Rule positions per elementary range: entry 2*i is the open range
+    # below grenzen[i], entry 2*i+1 the value grenzen[i] itself, the last
+    # entry the range above all bounds
+    bereiche: Tuple[Tuple[int, ...], ...]
+    # regel id -> compiled konditional_regel (not pickled, see __setstate__)
+    kompiliert: Dict[str, CompiledRegel] = field(default_factory=dict, compare=False, repr=False)
+    # regel id -> compile error of an invalid konditional_regel
+    fehler: Dict[str, str] = field(default_factory=dict, compare=False)
+
+    @classmethod
+    def build(cls, user_id: int, version: str, regeln) -> 'PauschaleIndex':
+        """
+        Index a user's active rules.
+
+        Args:
+            user_id: User id
+            version: Version token to stamp on the index
+            regeln: Active BetriebspauschaleRegel instances in model ordering
+        """
+        regeln = tuple(regeln)
+        grenzen = tuple(sorted({
+            grenze for regel in regeln
+            for grenze in _grenzen(regel) if grenze is not None
+        }))
+
+        bereiche = []
+        for index in range(len(grenzen) + 1):
+            unten = grenzen[index - 1] if index > 0 else None
+            oben = grenzen[index] if index < len(grenzen) else None
+            bereiche.append(tuple(
+                position for position, regel in enumerate(regeln) if _gilt_zwischen(regel, unten, oben)
+            ))
+            if oben is not None:
+                bereiche.append(tuple(
+                    position for position, regel in enumerate(regeln) if _gilt_fuer(regel, oben)
+                ))
+
+        index = cls(user_id=user_id, version=version, regeln=regeln, grenzen=grenzen, bereiche=tuple(bereiche))
+        index._kompiliere()
+        return index
+
+    def anwendbare(
+        self,
+        auftragswert: Optional[Decimal] = None,
+        datum: Optional[date] = None,
+    ) -> List[BetriebspauschaleRegel]:
+        """
+        Rules that apply to an order value on a date.
+
+        Same result as filtering the rules with is_applicable_for_order().
+
+        Args:
+            auftragswert: Order value in EUR; None skips the range check
+            datum: Date to check (default: today)
+
+        Returns:
+            Applicable rules in model ordering
+        """
+        if auftragswert is None:
+            kandidaten = self.regeln
+        else:
+            wert = Decimal(str(auftragswert))
+            position = bisect_left(self.grenzen, wert)
+            bereich = 2 * position
+            if position < len(self.grenzen) and self.grenzen[position] == wert:
+                bereich += 1
+            kandidaten = [self.regeln[i] for i in self.bereiche[bereich]]
+
+        datum = datum or date.today()
+        return [
+            regel for regel in kandidaten
+            if not (regel.gueltig_ab and datum < regel.gueltig_ab)
+            and not (regel.gueltig_bis and datum > regel.gueltig_bis)
+        ]
+
+    def berechne_konditional(self, regel: BetriebspauschaleRegel, context: Mapping[str, Any]) -> Decimal:
+        """
+        Evaluate a konditional rule against the calculation context.
+
+        Raises:
+            ValueError: If the rule has no konditional_regel
+            RegelEngineError: If the rule is invalid or cannot be evaluated
+        """
+        regel_id = str(regel.id)
+        if regel_id in self.fehler:
+            raise InvalidRuleError(self.fehler[regel_id])
+        compiled = self.kompiliert.get(regel_id)
+        if compiled is None and regel.konditional_regel:
+            # Rule not in this index version (e.g. saved since)
+            compiled = compile_regel(regel.konditional_regel)
+        if compiled is None:
+            raise ValueError(
+                f"Pauschale '{regel.name}' has berechnungsart=konditional "
+                f"but no konditional_regel defined"
+            )
+        return compiled({}, context)
+
+    def _kompiliere(self) -> None:
+        """Compile the konditional rules (fills kompiliert and fehler)."""
+        for regel in self.regeln:
+            if regel.berechnungsart != 'konditional' or not regel.konditional_regel:
+                continue
+            try:
+                self.kompiliert[str(regel.id)] = compile_regel(regel.konditional_regel)
+            except InvalidRuleError as e:
+                logger.warning(f"Konditional rule of Pauschale '{regel.name}' ({regel.id}) is invalid: {e}")
+                self.fehler[str(regel.id)] = str(e)
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state['kompiliert'] = {}
+        state['fehler'] = {}
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._kompiliere()
+
+
+class PauschaleIndexService:
+    """Load, cache and invalidate Pauschalen indexes."""
+
+    VERSION_KEY = 'pauschale_index:version:{key}'
+    INDEX_KEY = 'pauschale_index:v1:{key}:{version}'
+    INDEX_TIMEOUT = 24 * 3600
+    LOCAL_MAX_ENTRIES = 256
+
+    # user id -> index (latest version seen by this process)
+    _cache: VersionedCache[PauschaleIndex] = VersionedCache(
+        VERSION_KEY, INDEX_KEY, timeout=INDEX_TIMEOUT, max_entries=LOCAL_MAX_ENTRIES,
+    )
+
+    @classmethod
+    def get(cls, user) -> PauschaleIndex:
+        """
+        Current index of a user's Pauschalen.
+
+        Args:
+            user: User instance
+
+        Returns:
+            PauschaleIndex
+        """
+        user_id = user.id
+        return cls._cache.get(user_id, lambda version: cls.build(user_id, version=version))
+
+    @classmethod
+    def build(cls, user_id: int, version: str) -> PauschaleIndex:
+        """Read a user's active rules (one query) and index them."""
+        regeln = BetriebspauschaleRegel.objects.filter(user_id=user_id, ist_aktiv=True)
+        return PauschaleIndex.build(user_id, version, regeln)
+
+    @classmethod
+    def invalidate_user(cls, user_id: int) -> None:
+        """Drop the version token of a user; the next get() rebuilds."""
+        cls._cache.invalidate([user_id])
+        logger.debug(f"Invalidated Pauschalen index of user {user_id}")
+
+    @classmethod
+    def clear_local(cls) -> None:
+        """Empty this process's index memory."""
+        cls._cache.clear_local()
+
+
+# =====================
+# HELPERS
+# =====================
+
+def _grenzen(regel: BetriebspauschaleRegel) -> Tuple[Optional[Decimal], Optional[Decimal]]:
+    """(min, max) order value; 0 and empty mean no bound, as in is_applicable_for_order()."""
+    return (regel.min_auftragswert or None, regel.max_auftragswert or None)
+
+
+def _gilt_fuer(regel: BetriebspauschaleRegel, wert: Decimal) -> bool:
+    minimum, maximum = _grenzen(regel)
+    return (minimum is None or wert >= minimum) and (maximum is None or wert <= maximum)
+
+
+def _gilt_zwischen(regel: BetriebspauschaleRegel, unten: Optional[Decimal], oben: Optional[Decimal]) -> bool:
+    """Whether a rule applies to every value strictly between two bounds (None = unbounded)."""
+    minimum, maximum = _grenzen(regel)
+    if minimum is not None and (unten is None or minimum > unten):
+        return False
+    if maximum is not None and (oben is None or maximum < oben):
+        return False
+    return True
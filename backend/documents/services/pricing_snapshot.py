@@ -0,0 +1,337 @@
+"""
+Pricing snapshot for CalculationEngine.
+
+An immutable, versioned copy of everything the 8-step workflow reads
+from the database for one user: company figures (TIER 2), the factor
+tables of the user's Handwerk template (TIER 1), the user's material
+list and active seasonal rules (TIER 3). All lookups are dicts or
+sorted indexes, so a price calculation on a warm snapshot needs no
+database query.
+
+Caching:
+- A per-user version token lives in the Django cache. Saving or
+  deleting any pricing model deletes the token (see documents.signals),
+  the next read issues a new one.
+- Snapshots are stored in the Django cache (Redis) under user + token
+  and in process memory, so a warm call costs one cache read.
+- Without a working cache every call builds a fresh snapshot.
+"""
+
+import logging
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Dict, Iterable, Optional, Tuple
+
+from core import money
+from core.money import Money, Rate
+from core.tracing import record_cache
+from core.versioned_cache import VersionedCache
+from documents.betriebskennzahl_models import (
+    HolzartKennzahl,
+    IndividuelleBetriebskennzahl,
+    KomplexitaetKennzahl,
+    MateriallistePosition,
+    OberflächenbearbeitungKennzahl,
+    SaisonaleMarge,
+)
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class MaterialPreis:
+    """Price data of one MateriallistePosition."""
+
+    sku: str
+    standardkosten_eur: Decimal
+    rabatt_ab_100: int
+    rabatt_ab_500: int
+    standardkosten: Money = field(init=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, 'standardkosten', money.to_money(self.standardkosten_eur))
+
+    def get_discount_percent(self, quantity: int) -> int:
+        """Same tiers as MateriallistePosition.get_discount_percent."""
+        if quantity >= 500:
+            return self.rabatt_ab_500
+        if quantity >= 100:
+            return self.rabatt_ab_100
+        return 0
+
+
+@dataclass(frozen=True)
+class FaktorEintrag:
+    """TIER 1 factor of a template (wood type, surface finish or technique)."""
+
+    preis_faktor: Decimal
+    zeit_faktor: Decimal = Decimal('1.0')
+    schwierigkeitsgrad_display: str = ''
+    preis_rate: Rate = field(init=False)
+    zeit_rate: Rate = field(init=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, 'preis_rate', money.to_rate(self.preis_faktor))
+        object.__setattr__(self, 'zeit_rate', money.to_rate(self.zeit_faktor))
+
+
+@dataclass(frozen=True)
+class SaisonaleRegel:
+    """Active SaisonaleMarge rule."""
+
+    name: str
+    adjustment_type: str
+    adjustment_type_display: str
+    value: Decimal
+    start_date: date
+    end_date: date
+    applicable_to: str
+    wert: int = field(init=False)  # value as Rate ('prozent') or Money
+
+    def __post_init__(self):
+        wert = money.percent(self.value) if self.adjustment_type == 'prozent' else money.to_money(self.value)
+        object.__setattr__(self, 'wert', wert)
+
+    def applies_on(self, day: date) -> bool:
+        return self.start_date <= day <= self.end_date
+
+
+@dataclass(frozen=True)
+class SaisonaleIndex:
+    """Seasonal rules by date, for lookups in O(log n).
+
+    The start dates and the days after the end dates of all rules cut the
+    calendar into segments in which the same rules run. ``breakpoints``
+    holds the segment starts in ascending order and ``segments[i]`` the
+    rules running from ``breakpoints[i]`` up to the day before
+    ``breakpoints[i + 1]``. A lookup is one bisect into the breakpoints.
+    """
+
+    breakpoints: Tuple[date, ...] = ()
+    segments: Tuple[Tuple[SaisonaleRegel, ...], ...] = ()
+
+    @classmethod
+    def build(cls, rules: Iterable[SaisonaleRegel]) -> 'SaisonaleIndex':
+        """Index rules; each segment keeps the order of ``rules``."""
+        rules = tuple(rule for rule in rules if rule.start_date <= rule.end_date)
+        points = sorted(
+            {rule.start_date for rule in rules}
+            | {rule.end_date + timedelta(days=1) for rule in rules if rule.end_date < date.max}
+        )
+        segments = tuple(
+            tuple(rule for rule in rules if rule.applies_on(point))
+            for point in points
+        )
+        return cls(breakpoints=tuple(points), segments=segments)
+
+    def rules_on(self, day: date) -> Tuple[SaisonaleRegel, ...]:
+        """Rules running on the given day."""
+        position = bisect_right(self.breakpoints, day) - 1
+        if position < 0:
+            return ()
+        return self.segments[position]
+
+
+@dataclass(frozen=True)
+class PricingSnapshot:
+    """Immutable pricing configuration of one user."""
+
+    user_id: int
+    version: str
+    is_active: bool
+
+    # TIER 2
+    betriebskosten_umlage: Decimal
+    gewinnmarge_prozent: Decimal
+    stundensatz_arbeit: Decimal
+
+    # Toggles
+    use_handwerk_standard: bool
+    use_custom_materials: bool
+    use_seasonal_adjustments: bool
+    use_customer_discounts: bool
+    use_bulk_discounts: bool
+
+    # TIER 1 (template)
+    template_id: Optional[str] = None
+    template_name: Optional[str] = None
+    template_version: Optional[str] = None
+    holzarten: Dict[str, FaktorEintrag] = field(default_factory=dict)
+    oberflaechen: Dict[str, FaktorEintrag] = field(default_factory=dict)
+    komplexitaeten: Dict[str, FaktorEintrag] = field(default_factory=dict)
+
+    # TIER 3 (user)
+    materialien: Dict[str, MaterialPreis] = field(default_factory=dict)
+    saisonale_regeln: Tuple[SaisonaleRegel, ...] = ()
+    saisonale_index: SaisonaleIndex = field(default_factory=SaisonaleIndex)
+
+    # TIER 2 as Money/Rate (core.money)
+    stundensatz: Money = field(init=False)
+    umlage: Money = field(init=False)
+    margen_faktor: Rate = field(init=False)  # 1 + gewinnmarge_prozent / 100
+
+    def __post_init__(self):
+        object.__setattr__(self, 'stundensatz', money.to_money(self.stundensatz_arbeit))
+        object.__setattr__(self, 'umlage', money.to_money(self.betriebskosten_umlage))
+        object.__setattr__(self, 'margen_faktor', money.ONE + money.percent(self.gewinnmarge_prozent))
+
+    @property
+    def has_template(self) -> bool:
+        return self.template_id is not None
+
+    def active_seasonal_rules(self, day: date) -> Tuple[SaisonaleRegel, ...]:
+        """Seasonal rules running on the given day, in start_date/name order.
+
+        Works for any date, e.g. a future delivery date of a quote.
+        """
+        return self.saisonale_index.rules_on(day)
+
+
+class PricingSnapshotService:
+    """Load, cache and invalidate pricing snapshots."""
+
+    VERSION_KEY = 'pricing_snapshot:version:{key}'
+    # Bump the schema when PricingSnapshot fields change, so processes
+    # never unpickle snapshots written by an older release
+    SNAPSHOT_KEY = 'pricing_snapshot:v2:{key}:{version}'
+    SNAPSHOT_TIMEOUT = 24 * 3600
+    LOCAL_MAX_ENTRIES = 512
+
+    # user_id -> snapshot (latest version seen by this process)
+    _cache: VersionedCache[PricingSnapshot] = VersionedCache(
+        VERSION_KEY, SNAPSHOT_KEY, timeout=SNAPSHOT_TIMEOUT, max_entries=LOCAL_MAX_ENTRIES,
+    )
+
+    # ===== LOADING =====
+
+    @classmethod
+    def get(cls, user) -> Optional[PricingSnapshot]:
+        """Current pricing snapshot of a user.
+
+        Args:
+            user: Django User instance
+
+        Returns:
+            PricingSnapshot, or None if the user has no Betriebskennzahl
+        """
+        return cls._cache.get(
+            user.id, lambda version: cls.build(user.id, version=version), on_lookup=record_cache,
+        )
+
+    @classmethod
+    def build(cls, user_id: int, version: str) -> Optional[PricingSnapshot]:
+        """Read a user's pricing configuration from the database.
+
+        Args:
+            user_id: User id
+            version: Version token to stamp on the snapshot
+
+        Returns:
+            PricingSnapshot, or None if the user has no Betriebskennzahl
+        """
+        try:
+            config = IndividuelleBetriebskennzahl.objects.select_related(
+                'handwerk_template'
+            ).get(user_id=user_id)
+        except IndividuelleBetriebskennzahl.DoesNotExist:
+            return None
+
+        template = config.handwerk_template
+        holzarten, oberflaechen, komplexitaeten = {}, {}, {}
+        if template is not None:
+            for row in HolzartKennzahl.objects.filter(template=template, is_enabled=True):
+                holzarten[row.holzart] = FaktorEintrag(preis_faktor=row.preis_faktor)
+            for row in OberflächenbearbeitungKennzahl.objects.filter(template=template, is_enabled=True):
+                oberflaechen[row.bearbeitung] = FaktorEintrag(
+                    preis_faktor=row.preis_faktor,
+                    zeit_faktor=row.zeit_faktor,
+                )
+            for row in KomplexitaetKennzahl.objects.filter(template=template, is_enabled=True):
+                komplexitaeten[row.technik] = FaktorEintrag(
+                    preis_faktor=row.preis_faktor,
+                    zeit_faktor=row.zeit_faktor,
+                    schwierigkeitsgrad_display=row.get_schwierigkeitsgrad_display(),
+                )
+
+        materialien = {
+            row.sku: MaterialPreis(
+                sku=row.sku,
+                standardkosten_eur=row.standardkosten_eur,
+                rabatt_ab_100=row.rabatt_ab_100,
+                rabatt_ab_500=row.rabatt_ab_500,
+            )
+            for row in MateriallistePosition.objects.filter(user_id=user_id, is_enabled=True)
+        }
+
+        saisonale_regeln = tuple(
+            SaisonaleRegel(
+                name=row.name,
+                adjustment_type=row.adjustment_type,
+                adjustment_type_display=row.get_adjustment_type_display(),
+                value=row.value,
+                start_date=row.start_date,
+                end_date=row.end_date,
+                applicable_to=row.applicable_to,
+            )
+            for row in SaisonaleMarge.objects.filter(
+                user_id=user_id, is_active=True
+            ).order_by('start_date', 'name')
+        )
+
+        return PricingSnapshot(
+            user_id=user_id,
+            version=version,
+            is_active=config.is_active,
+            betriebskosten_umlage=config.betriebskosten_umlage,
+            gewinnmarge_prozent=config.gewinnmarge_prozent,
+            stundensatz_arbeit=config.stundensatz_arbeit,
+            use_handwerk_standard=config.use_handwerk_standard,
+            use_custom_materials=config.use_custom_materials,
+            use_seasonal_adjustments=config.use_seasonal_adjustments,
+            use_customer_discounts=config.use_customer_discounts,
+            use_bulk_discounts=config.use_bulk_discounts,
+            template_id=str(template.id) if template else None,
+            template_name=template.name if template else None,
+            template_version=template.version if template else None,
+            holzarten=holzarten,
+            oberflaechen=oberflaechen,
+            komplexitaeten=komplexitaeten,
+            materialien=materialien,
+            saisonale_regeln=saisonale_regeln,
+            saisonale_index=SaisonaleIndex.build(saisonale_regeln),
+        )
+
+    # ===== INVALIDATION =====
+
+    @classmethod
+    def invalidate_user(cls, user_id: int) -> None:
+        """Drop the version token of one user."""
+        cls.invalidate_users([user_id])
+
+    @classmethod
+    def invalidate_users(cls, user_ids: Iterable[int]) -> None:
+        """Drop the version tokens of several users.
+
+        The next get() issues a new token, so snapshots cached under the
+        old one (Redis or any process) are no longer read.
+        """
+        user_ids = list(user_ids)
+        if not user_ids:
+            return
+        cls._cache.invalidate(user_ids)
+        logger.debug(f"Invalidated pricing snapshots of {len(user_ids)} user(s)")
+
+    @classmethod
+    def invalidate_template(cls, template_id) -> None:
+        """Drop the snapshots of all users on a Handwerk template."""
+        user_ids = IndividuelleBetriebskennzahl.objects.filter(
+            handwerk_template_id=template_id
+        ).values_list('user_id', flat=True)
+        cls.invalidate_users(user_ids)
+
+    @classmethod
+    def clear_local(cls) -> None:
+        """Empty this process's snapshot memory."""
+        cls._cache.clear_local()
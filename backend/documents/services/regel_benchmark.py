@@ -0,0 +1,407 @@
+"""
+Benchmark and fuzz harness for the Bauteil rule engine.
+
+Used by the ``benchmark_regeln`` management command and its tests:
+
+- Synthetic data: catalogs of N StandardBauteil with 1-3 random rules
+  each (bulk inserted), extraction payloads and Pauschalen rule sets.
+- Throughput: execute_rule (interpreter and compiled),
+  calculate_bauteil_kosten per catalog size and calculate_all_pauschalen.
+- Fuzzing: random valid rule trees within the rule budgets, evaluated by
+  the interpreter, the compiled closure and the NumPy batch path. The
+  three must agree (same quantity, or all raise RegelEngineError), and no
+  rule may take longer than a time limit per evaluation.
+
+Results are plain dicts (JSON-serializable); vergleiche() reports
+throughput regressions against an earlier result for CI. Random contexts
+lack most sources on purpose, so the interpreter's "Context source not
+found" warnings are silenced while benchmarks and the fuzzer run.
+"""
+
+import logging
+import random
+import statistics
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import date
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from ..models_bauteile import BauteilKatalog, BauteilKatalogPosition, BauteilRegel, StandardBauteil
+from ..models_pauschalen import BetriebspauschaleRegel
+from .bauteil_katalog_snapshot import KatalogSnapshotService
+from .bauteil_regel_batch import RegelSpalten, als_decimal, compile_regel_batch
+from .bauteil_regel_compiler import compile_regel
+from .bauteil_regel_engine import BauteilRegelEngine, RegelEngineError
+
+logger = logging.getLogger(__name__)
+
+# Component attributes of synthetic extractions
+ATTRIBUTE = {
+    'Tür': ('anzahl', 'höhe', 'breite'),
+    'Schublade': ('anzahl', 'breite'),
+    'Einlegeboden': ('anzahl', 'breite', 'tiefe'),
+    'Korpus': ('anzahl', 'höhe', 'breite', 'tiefe'),
+}
+QUELLEN = ('distanz_km', 'montage_stunden', 'material_menge')
+LITERALE = (0, 1, 2, 3, 0.5, 1.5, '2.25', '0.8')
+WERTE = (0, 1, 2, 3, 4, 0.8, 1.2, '2.4', None)
+
+# Metrics compared by vergleiche() (higher is better)
+DURCHSATZ_METRIKEN = ('pro_sekunde',)
+
+# Loggers that warn on every read of a missing context source
+QUELLEN_LOGGER = (f'{__package__}.level2_dsl_operations', f'{__package__}.bauteil_regel_compiler')
+
+
+@contextmanager
+def ohne_quellen_warnungen() -> Iterator[None]:
+    """Raise the rule evaluators' loggers to ERROR for the duration."""
+    loggers = [logging.getLogger(name) for name in QUELLEN_LOGGER]
+    levels = [lg.level for lg in loggers]
+    for lg in loggers:
+        lg.setLevel(logging.ERROR)
+    try:
+        yield
+    finally:
+        for lg, level in zip(loggers, levels):
+            lg.setLevel(level)
+
+
+# =====================
+# SYNTHETIC DATA
+# =====================
+
+def zufallsregel(rng: random.Random, max_tiefe: int = 5, max_knoten: int = 48) -> Dict[str, Any]:
+    """
+    Random valid rule tree within the budgets.
+
+    Covers every operation: MULTIPLY, FIXED, ADD, SUBTRACT, IF_THEN_ELSE
+    with the five comparisons and AND/OR over attributes, context sources
+    and literals.
+    """
+    knoten = [0]
+
+    def operand():
+        choice = rng.random()
+        if choice < 0.5:
+            komponente = rng.choice(list(ATTRIBUTE))
+            return {'komponente': komponente, 'attribut': rng.choice(ATTRIBUTE[komponente])}
+        if choice < 0.7:
+            return {'quelle': rng.choice(QUELLEN)}
+        return rng.choice(LITERALE)
+
+    def vergleich():
+        knoten[0] += 1
+        return {'operation': rng.choice(BauteilRegelEngine.COMPARISON_OPERATIONS),
+                'links': operand(), 'rechts': operand()}
+
+    def bedingung(tiefe):
+        # AND/OR group comparisons only; groups do not nest
+        if tiefe < max_tiefe and knoten[0] < max_knoten - 4 and rng.random() < 0.3:
+            knoten[0] += 1
+            teile = [vergleich() for _ in range(rng.randint(1, 3))]
+            return {'operation': rng.choice(BauteilRegelEngine.LOGICAL_OPERATIONS), 'bedingungen': teile}
+        return vergleich()
+
+    def regel(tiefe):
+        knoten[0] += 1
+        blatt = tiefe >= max_tiefe or knoten[0] >= max_knoten - 6
+        choice = rng.random()
+        if blatt or choice < 0.35:
+            if rng.random() < 0.2:
+                return {'operation': 'FIXED', 'wert': rng.choice(LITERALE)}
+            komponente = rng.choice(list(ATTRIBUTE))
+            return {'operation': 'MULTIPLY', 'faktor': rng.choice(LITERALE[1:]),
+                    'komponente': komponente, 'attribut': rng.choice(ATTRIBUTE[komponente])}
+        if choice < 0.6:
+            return {'operation': 'ADD', 'terme': [regel(tiefe + 1) for _ in range(rng.randint(1, 3))]}
+        if choice < 0.7:
+            return {'operation': 'SUBTRACT', 'minuend': regel(tiefe + 1), 'subtrahend': regel(tiefe + 1)}
+        return {'operation': 'IF_THEN_ELSE', 'bedingung': bedingung(tiefe + 1),
+                'dann': regel(tiefe + 1), 'sonst': regel(tiefe + 1)}
+
+    return regel(1)
+
+
+def zufallsextraktion(rng: random.Random) -> Dict[str, Dict[str, Any]]:
+    """Random extracted components; attributes may be missing or None."""
+    return {
+        komponente: {attribut: rng.choice(WERTE) for attribut in attribute if rng.random() < 0.8}
+        for komponente, attribute in ATTRIBUTE.items() if rng.random() < 0.7
+    }
+
+
+def zufallskontext(rng: random.Random) -> Dict[str, Any]:
+    """Random calculation context with some sources missing."""
+    return {quelle: rng.choice([0, 10, 45, 75, '2.5']) for quelle in QUELLEN if rng.random() < 0.7}
+
+
+def erzeuge_katalog(groesse: int, rng: random.Random) -> BauteilKatalog:
+    """
+    Synthetic Tischler catalog of ``groesse`` components with 1-3 rules each.
+
+    Rows are bulk inserted (signals do not fire); the catalog snapshot is
+    invalidated explicitly.
+    """
+    kennung = uuid.uuid4().hex[:8]
+    katalog = BauteilKatalog.objects.create(
+        name=f'Benchmark {groesse}', version=f'bench-{kennung}', gewerk='tischler',
+        gueltig_ab=date(2024, 1, 1), ist_standard=False,
+    )
+    bauteile = StandardBauteil.objects.bulk_create([
+        StandardBauteil(
+            artikel_nr=f'B-{kennung}-{index:05d}', name=f'Bauteil {index:05d}', kategorie='beschlag',
+            gewerke=['tischler'], einheit='stk', einzelpreis=Decimal(rng.randint(50, 5000)) / 100,
+        )
+        for index in range(groesse)
+    ], batch_size=1000)
+    BauteilKatalogPosition.objects.bulk_create([
+        BauteilKatalogPosition(katalog=katalog, bauteil=bauteil, position=index)
+        for index, bauteil in enumerate(bauteile)
+    ], batch_size=1000)
+    BauteilRegel.objects.bulk_create([
+        BauteilRegel(bauteil=bauteil, name=f'Regel {prioritaet}', prioritaet=prioritaet,
+                     regel_definition=zufallsregel(rng, max_tiefe=3, max_knoten=16))
+        for bauteil in bauteile
+        for prioritaet in range(rng.randint(1, 3))
+    ], batch_size=1000)
+    KatalogSnapshotService.invalidate_kataloge([katalog.id])
+    return katalog
+
+
+def erzeuge_pauschalen(user, anzahl: int, rng: random.Random) -> List[BetriebspauschaleRegel]:
+    """Synthetic Pauschalen of every berechnungsart with random order-value ranges."""
+    grenzen = [None, Decimal('500'), Decimal('1000'), Decimal('5000'), Decimal('20000')]
+    regeln = []
+    for index in range(anzahl):
+        berechnungsart = rng.choice(['fest', 'pro_einheit', 'prozent', 'konditional'])
+        regeln.append(BetriebspauschaleRegel.objects.create(
+            user=user,
+            name=f'Pauschale {index:03d}',
+            pauschale_typ=rng.choice(['anfahrt', 'montage', 'entsorgung', 'sonstiges']),
+            berechnungsart=berechnungsart,
+            betrag=Decimal(rng.randint(10, 300)),
+            prozentsatz=Decimal('2.50') if berechnungsart == 'prozent' else None,
+            konditional_regel=zufallsregel(rng, max_tiefe=3, max_knoten=12)
+            if berechnungsart == 'konditional' else None,
+            min_auftragswert=rng.choice(grenzen[:3]),
+            max_auftragswert=rng.choice(grenzen[2:]),
+        ))
+    return regeln
+
+
+# =====================
+# THROUGHPUT
+# =====================
+
+def messe(funktion: Callable[[int], Any], aufrufe: int) -> Dict[str, float]:
+    """
+    Time ``aufrufe`` calls of funktion(i).
+
+    Returns:
+        Calls per second and per-call median/p95 in milliseconds
+    """
+    dauern = []
+    for aufruf in range(aufrufe):
+        start = time.perf_counter()
+        funktion(aufruf)
+        dauern.append(time.perf_counter() - start)
+    gesamt = sum(dauern)
+    dauern.sort()
+    return {
+        'aufrufe': aufrufe,
+        'pro_sekunde': round(aufrufe / gesamt, 1) if gesamt else 0.0,
+        'median_ms': round(statistics.median(dauern) * 1000, 4),
+        'p95_ms': round(dauern[min(len(dauern) - 1, int(len(dauern) * 0.95))] * 1000, 4),
+    }
+
+
+@ohne_quellen_warnungen()
+def benchmark_execute_rule(rng: random.Random, regeln: int = 200, aufrufe: int = 2000) -> Dict[str, Any]:
+    """Evaluations per second of random rules, interpreted and compiled."""
+    definitionen = [zufallsregel(rng) for _ in range(regeln)]
+    kompiliert = [compile_regel(definition) for definition in definitionen]
+    faelle = [(zufallsextraktion(rng), zufallskontext(rng)) for _ in range(50)]
+
+    def interpretiert(i):
+        components, context = faelle[i % len(faelle)]
+        engine = BauteilRegelEngine(components)
+        engine.context = context
+        try:
+            engine.execute_rule(definitionen[i % regeln])
+        except RegelEngineError:
+            pass
+
+    def compiled(i):
+        components, context = faelle[i % len(faelle)]
+        try:
+            kompiliert[i % regeln](components, context)
+        except RegelEngineError:
+            pass
+
+    return {'interpretiert': messe(interpretiert, aufrufe), 'kompiliert': messe(compiled, aufrufe)}
+
+
+@ohne_quellen_warnungen()
+def benchmark_bauteil_kosten(
+    groessen: Sequence[int],
+    rng: random.Random,
+    aufrufe: int = 20,
+) -> Dict[str, Any]:
+    """calculate_bauteil_kosten() per catalog size on a warm snapshot."""
+    from .standardbauteil_integration import StandardbauteilIntegrationService
+
+    ergebnisse = {}
+    for groesse in groessen:
+        start = time.perf_counter()
+        katalog = erzeuge_katalog(groesse, rng)
+        aufbau_s = time.perf_counter() - start
+
+        service = StandardbauteilIntegrationService(extraction_result_id='benchmark', katalog_id=str(katalog.id))
+        extraktionen = [zufallsextraktion(rng) for _ in range(aufrufe)]
+        start = time.perf_counter()
+        service.calculate_bauteil_kosten(extraktionen[0])
+        kalt_ms = (time.perf_counter() - start) * 1000
+
+        ergebnis = messe(lambda i: service.calculate_bauteil_kosten(extraktionen[i]), aufrufe)
+        ergebnis.update({'kalt_ms': round(kalt_ms, 2), 'aufbau_s': round(aufbau_s, 2)})
+        ergebnisse[str(groesse)] = ergebnis
+        logger.info(f"calculate_bauteil_kosten, {groesse} components: {ergebnis['pro_sekunde']}/s")
+    return ergebnisse
+
+
+@ohne_quellen_warnungen()
+def benchmark_pauschalen(user, rng: random.Random, anzahl: int = 50, aufrufe: int = 200) -> Dict[str, Any]:
+    """calculate_all_pauschalen(preview=True) over random order values."""
+    from .pauschale_calculation_service import PauschaleCalculationService
+
+    erzeuge_pauschalen(user, anzahl, rng)
+    service = PauschaleCalculationService(user, None)
+    auftragswerte = [Decimal(rng.randint(100, 30000)) for _ in range(aufrufe)]
+    kontexte = [dict(zufallskontext(rng), auftragswert=wert) for wert in auftragswerte]
+
+    def berechne(i):
+        service.calculate_all_pauschalen(auftragswerte[i], kontexte[i], preview=True)
+
+    return messe(berechne, aufrufe)
+
+
+# =====================
+# FUZZING
+# =====================
+
+@ohne_quellen_warnungen()
+def fuzz(rng: random.Random, faelle: int = 500, langsam_ms: float = 5.0, max_berichte: int = 10) -> Dict[str, Any]:
+    """
+    Check interpreter, compiled and batch evaluation on random rules.
+
+    Args:
+        rng: Random source
+        faelle: Number of random (rule, extraction, context) cases
+        langsam_ms: Per-evaluation time above which a rule is reported
+        max_berichte: Maximum number of reported cases per category
+
+    Returns:
+        Dict with counts, 'abweichungen' (disagreeing cases) and 'langsam'
+    """
+    abweichungen = []
+    abweichungen_gesamt = 0
+    langsam = []
+    fehler = 0
+    max_ms = 0.0
+
+    for _ in range(faelle):
+        definition = zufallsregel(rng)
+        components, context = zufallsextraktion(rng), zufallskontext(rng)
+
+        start = time.perf_counter()
+        erwartet = _auswerten(lambda: _interpretiere(definition, components, context))
+        dauer_ms = (time.perf_counter() - start) * 1000
+        max_ms = max(max_ms, dauer_ms)
+
+        kompiliert = _auswerten(lambda: compile_regel(definition)(components, context))
+        werte, ok = compile_regel_batch(definition)(RegelSpalten([components], [context]))
+        batch = als_decimal(round(float(werte[0]), 9)) if ok[0] else None
+
+        if erwartet is None:
+            fehler += 1
+        if not (erwartet == kompiliert == batch):
+            abweichungen_gesamt += 1
+            if len(abweichungen) < max_berichte:
+                abweichungen.append({
+                    'regel': definition, 'komponenten': components, 'kontext': context,
+                    'interpretiert': _text(erwartet), 'kompiliert': _text(kompiliert), 'batch': _text(batch),
+                })
+        if dauer_ms > langsam_ms and len(langsam) < max_berichte:
+            langsam.append({'regel': definition, 'ms': round(dauer_ms, 3)})
+
+    return {
+        'faelle': faelle,
+        'fehler_faelle': fehler,
+        'abweichungen_gesamt': abweichungen_gesamt,
+        'abweichungen': abweichungen,
+        'langsam': langsam,
+        'max_ms': round(max_ms, 3),
+    }
+
+
+def _interpretiere(definition, components, context) -> Decimal:
+    engine = BauteilRegelEngine(components)
+    engine.context = context
+    return engine.execute_rule(definition)
+
+
+def _auswerten(funktion: Callable[[], Decimal]) -> Optional[Decimal]:
+    """Result, or None if the rule cannot be evaluated for this input."""
+    try:
+        return funktion()
+    except RegelEngineError:
+        return None
+
+
+def _text(wert: Optional[Decimal]) -> Optional[str]:
+    return None if wert is None else str(wert)
+
+
+# =====================
+# COMPARISON
+# =====================
+
+def vergleiche(aktuell: Dict[str, Any], basis: Dict[str, Any], toleranz: float = 0.25) -> List[str]:
+    """
+    Throughput regressions of a benchmark result against a baseline.
+
+    Every 'pro_sekunde' value present in both results is compared; a drop
+    by more than ``toleranz`` (fraction) is a regression. New fuzz
+    mismatches are always reported.
+
+    Returns:
+        Human-readable regression messages (empty if none)
+    """
+    meldungen = []
+    basiswerte = dict(_metriken(basis))
+    for pfad, wert in _metriken(aktuell):
+        basiswert = basiswerte.get(pfad)
+        if basiswert and wert < basiswert * (1 - toleranz):
+            meldungen.append(
+                f"{pfad}: {wert:.1f}/s vs {basiswert:.1f}/s baseline ({(wert / basiswert - 1) * 100:+.0f}%)"
+            )
+
+    abweichungen = aktuell.get('fuzz', {}).get('abweichungen_gesamt', 0)
+    if abweichungen:
+        meldungen.append(f"fuzz: {abweichungen} evaluator mismatches")
+    return meldungen
+
+
+def _metriken(ergebnis: Dict[str, Any], pfad: str = '') -> List[Tuple[str, float]]:
+    """(dotted path, value) of every throughput metric in a result."""
+    metriken = []
+    for schluessel, wert in ergebnis.items():
+        unterpfad = f'{pfad}.{schluessel}' if pfad else str(schluessel)
+        if isinstance(wert, dict):
+            metriken.extend(_metriken(wert, unterpfad))
+        elif schluessel in DURCHSATZ_METRIKEN and isinstance(wert, (int, float)):
+            metriken.append((unterpfad, float(wert)))
+    return metriken
@@ -5,21 +5,36 @@ Integrates component calculations into Phase 3 CalculationEngine.
 Extends material cost calculation with standardized components.
 
 Integration Point: Adds component costs to TIER 1 material calculations.
+
+Prices and sums are fixed-point Money (core.money) and converted to floats
+in export_bauteil_kosten_for_calculation_engine().
+
+Rule evaluation is traced (bauteil_regel_trace) when a rule fails, for a
+BAUTEIL_REGEL_TRACE_SAMPLE_RATE sample of calls and on request; positions
+of traced components link the trace in berechnungsgrundlage.
 """
 
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Sequence, Tuple
 from decimal import Decimal
 from dataclasses import dataclass
 import logging
 
+import numpy as np
+
+from core import money
+from core.money import Money
+
 from ..models_bauteile import (
     StandardBauteil,
     BauteilRegel,
     BauteilKatalog,
-    BauteilKatalogPosition,
     GeometrieBerechnung,
 )
+from .bauteil_katalog_snapshot import KatalogSnapshot, KatalogSnapshotService
+from .bauteil_regel_batch import RegelSpalten, als_decimal, berechne_mengen
+from .bauteil_regel_compiler import RegelCompileCache
 from .bauteil_regel_engine import BauteilRegelEngine, RegelEngineError
+from .bauteil_regel_trace import RegelTraceService, verfolge_regel
 from .geometrie_service import GeometrieService, calculate_abs_kanten_auto
 
 logger = logging.getLogger(__name__)
@@ -30,22 +45,23 @@ class BauteilKostenPosition:
     """Represents a single component cost position."""
     bauteil: StandardBauteil
     menge: Decimal
-    einzelpreis: Decimal
-    gesamtpreis: Decimal
+    einzelpreis: Money
+    gesamtpreis: Money
     berechnungsgrundlage: str  # How quantity was calculated
     regel_name: Optional[str] = None
+    trace_id: Optional[str] = None  # RegelTraceService id, if traced
 
 
 @dataclass
 class BauteilKostenSummary:
     """Summary of all component costs."""
     positionen: List[BauteilKostenPosition]
-    gesamt_beschlaege: Decimal
-    gesamt_verbinder: Decimal
-    gesamt_kanten: Decimal
-    gesamt_befestigung: Decimal
-    gesamt_sonstiges: Decimal
-    gesamt_netto: Decimal
+    gesamt_beschlaege: Money
+    gesamt_verbinder: Money
+    gesamt_kanten: Money
+    gesamt_befestigung: Money
+    gesamt_sonstiges: Money
+    gesamt_netto: Money
 
 
 class StandardbauteilIntegrationService:
@@ -77,12 +93,14 @@ class StandardbauteilIntegrationService:
         self.company_profile_id = company_profile_id
         self.katalog_id = katalog_id
         self.katalog = None
+        self.snapshot: Optional[KatalogSnapshot] = None
         logger.debug(f"StandardbauteilIntegrationService initialized for extraction: {extraction_result_id}")
 
     def calculate_bauteil_kosten(
         self,
         extracted_components: Dict[str, Any],
-        gewerk: str = 'tischler'
+        gewerk: str = 'tischler',
+        trace: bool = False
     ) -> BauteilKostenSummary:
         """
         Calculate complete component costs.
@@ -95,6 +113,8 @@ class StandardbauteilIntegrationService:
                     ...
                 }
             gewerk: Trade type (default: 'tischler')
+            trace: Trace the rule evaluation of every component (otherwise
+                only components with a failing rule, or a sample of calls)
 
         Returns:
             BauteilKostenSummary with all calculated positions
@@ -103,7 +123,7 @@ class StandardbauteilIntegrationService:
             >>> service = StandardbauteilIntegrationService(extraction_id='abc')
             >>> components = {'Tür': {'anzahl': 2}}
             >>> summary = service.calculate_bauteil_kosten(components)
-            >>> print(summary.gesamt_netto)
+            >>> money.to_float(summary.gesamt_netto)
         """
         # Step 1: Load appropriate catalog
         self.katalog = self._load_katalog(gewerk)
@@ -111,37 +131,33 @@ class StandardbauteilIntegrationService:
         if not self.katalog:
             logger.warning(f"No catalog found for gewerk '{gewerk}', skipping component calculation")
             return self._empty_summary()
+        self.snapshot = KatalogSnapshotService.get(self.katalog)
 
-        # Step 2: Get all active components with rules for this trade
-        bauteile_mit_regeln = self._get_bauteile_mit_regeln(gewerk)
+        # Step 2: Get the components whose rules the extracted data can satisfy
+        bauteile_mit_regeln = self._katalog_snapshot().erfuellbare_regeln(extracted_components, gewerk)
 
         # Step 3: Calculate quantities based on rules
         positionen = []
         regel_engine = BauteilRegelEngine(extracted_components)
+        grund = 'angefordert' if trace else ('stichprobe' if RegelTraceService.sample() else None)
+        verfolgt: Dict[str, Dict[str, Any]] = {}
 
         for bauteil, regeln in bauteile_mit_regeln:
             # Try to calculate quantity from rules
-            menge = self._calculate_menge_aus_regeln(regel_engine, regeln)
+            fehlgeschlagen: List[BauteilRegel] = []
+            menge, regel = self._calculate_menge_aus_regeln(regel_engine, regeln, fehlgeschlagen)
+
+            if grund or fehlgeschlagen:
+                verfolgt[str(bauteil.id)] = self._trace_bauteil(bauteil, regeln, regel, extracted_components)
 
             if menge is None or menge <= 0:
                 logger.debug(f"Skipping {bauteil.name}: No valid quantity calculated")
                 continue
 
-            # Get price (catalog-specific or standard)
-            einzelpreis = self._get_bauteil_preis(bauteil)
-            gesamtpreis = menge * einzelpreis
-
-            # Get rule name for documentation
-            regel_name = regeln[0].name if regeln else None
+            positionen.append(self._regel_position(bauteil, menge, regel))
 
-            positionen.append(BauteilKostenPosition(
-                bauteil=bauteil,
-                menge=menge,
-                einzelpreis=einzelpreis,
-                gesamtpreis=gesamtpreis,
-                berechnungsgrundlage=f"Regel: {regel_name}" if regel_name else "Manuell",
-                regel_name=regel_name
-            ))
+        if verfolgt:
+            self._speichere_trace(verfolgt, positionen, grund or 'fehler', gewerk)
 
         # Step 4: Add geometry-based calculations (ABS edges)
         geometrie_positionen = self._calculate_geometrie_kosten(extracted_components, gewerk)
@@ -152,11 +168,57 @@ class StandardbauteilIntegrationService:
 
         logger.info(
             f"Calculated {len(positionen)} component positions, "
-            f"total: {summary.gesamt_netto}€"
+            f"total: {money.to_float(summary.gesamt_netto)}€"
         )
 
         return summary
 
+    def calculate_bauteil_kosten_batch(
+        self,
+        extracted_components_list: Sequence[Dict[str, Any]],
+        gewerk: str = 'tischler'
+    ) -> List[BauteilKostenSummary]:
+        """
+        Calculate component costs of many extractions at once.
+
+        Gives the summaries calculate_bauteil_kosten() gives for each
+        extraction, but evaluates each rule once for all extractions as
+        NumPy column expressions (see bauteil_regel_batch). Used for
+        re-costing the project archive after catalog changes.
+
+        Args:
+            extracted_components_list: Component data of each extraction
+            gewerk: Trade type (default: 'tischler')
+
+        Returns:
+            One BauteilKostenSummary per extraction, in input order
+        """
+        self.katalog = self._load_katalog(gewerk)
+
+        if not self.katalog:
+            logger.warning(f"No catalog found for gewerk '{gewerk}', skipping component calculation")
+            return [self._empty_summary() for _ in extracted_components_list]
+        self.snapshot = KatalogSnapshotService.get(self.katalog)
+
+        spalten = RegelSpalten(extracted_components_list)
+        positionen: List[List[BauteilKostenPosition]] = [[] for _ in range(spalten.n)]
+
+        # Rules whose inputs no extraction has are never evaluated
+        for bauteil, regeln in self._katalog_snapshot().erfuellbare_regeln(spalten.eingaben(), gewerk):
+            mengen, gefunden, regel_pro_zeile = berechne_mengen(regeln, spalten)
+            for zeile in np.flatnonzero(gefunden & (mengen > 0)):
+                positionen[zeile].append(
+                    self._regel_position(bauteil, als_decimal(mengen[zeile]), regel_pro_zeile[zeile])
+                )
+
+        summaries = []
+        for zeile, extracted_components in enumerate(spalten.extractions):
+            positionen[zeile].extend(self._calculate_geometrie_kosten(extracted_components, gewerk))
+            summaries.append(self._create_summary(positionen[zeile]))
+
+        logger.info(f"Calculated component costs of {spalten.n} extractions in batch")
+        return summaries
+
     def _load_katalog(self, gewerk: str) -> Optional[BauteilKatalog]:
         """
         Load appropriate catalog for calculation.
@@ -222,53 +284,119 @@ class StandardbauteilIntegrationService:
         if not self.katalog:
             return []
 
-        # Get all components in catalog for this trade
-        bauteile = StandardBauteil.objects.filter(
-            kataloge=self.katalog,
-            ist_aktiv=True,
-            gewerke__contains=[gewerk]
-        ).prefetch_related('regeln')
-
-        result = []
-        for bauteil in bauteile:
-            # Get active rules for this component
-            regeln = list(bauteil.regeln.filter(ist_aktiv=True).order_by('prioritaet'))
-
-            # Skip if no rules (unless it's ABS-Kante which uses geometry)
-            if not regeln and bauteil.kategorie != 'kante':
-                continue
-
-            result.append((bauteil, regeln))
-
-        return result
+        return self._katalog_snapshot().bauteile_mit_regeln(gewerk)
 
     def _calculate_menge_aus_regeln(
         self,
         regel_engine: BauteilRegelEngine,
-        regeln: List[BauteilRegel]
-    ) -> Optional[Decimal]:
+        regeln: List[BauteilRegel],
+        fehlgeschlagen: Optional[List[BauteilRegel]] = None
+    ) -> Tuple[Optional[Decimal], Optional[BauteilRegel]]:
         """
         Calculate quantity from rules (uses first rule that succeeds).
 
+        Rules run as compiled closures (RegelCompileCache), so each rule
+        definition is validated and translated once per process.
+
         Args:
             regel_engine: Initialized rule engine
             regeln: List of rules (ordered by priority)
+            fehlgeschlagen: Optional list the rules that raised are
+                appended to (modified in-place)
 
         Returns:
-            Calculated quantity or None if no rule succeeded
+            (quantity, rule that calculated it), or (None, None) if no
+            rule succeeded
         """
         for regel in regeln:
             try:
-                menge = regel_engine.execute_rule(regel.regel_definition)
+                menge = RegelCompileCache.execute(regel, regel_engine.components)
                 logger.debug(f"Rule '{regel.name}' calculated quantity: {menge}")
-                return menge
+                return menge, regel
             except RegelEngineError as e:
                 logger.debug(f"Rule '{regel.name}' failed: {e}, trying next rule")
+                if fehlgeschlagen is not None:
+                    fehlgeschlagen.append(regel)
                 continue
 
-        return None
+        return None, None
+
+    def _trace_bauteil(
+        self,
+        bauteil: StandardBauteil,
+        regeln: List[BauteilRegel],
+        regel: Optional[BauteilRegel],
+        extracted_components: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        Trace the rules of a component that were tried, in priority order.
 
-    def _get_bauteil_preis(self, bauteil: StandardBauteil) -> Decimal:
+        Rules after the one that fired were not evaluated and are only
+        counted.
+        """
+        versucht = regeln[:regeln.index(regel) + 1] if regel is not None else regeln
+        return {
+            'bauteil_id': str(bauteil.id),
+            'artikel_nr': bauteil.artikel_nr,
+            'name': bauteil.name,
+            'regel': regel.name if regel else None,
+            'regeln': [
+                {
+                    'regel_id': str(r.id),
+                    'name': r.name,
+                    'prioritaet': r.prioritaet,
+                    **verfolge_regel(r.regel_definition, extracted_components),
+                }
+                for r in versucht
+            ],
+            'nicht_ausgewertet': len(regeln) - len(versucht),
+        }
+
+    def _speichere_trace(
+        self,
+        verfolgt: Dict[str, Dict[str, Any]],
+        positionen: List[BauteilKostenPosition],
+        grund: str,
+        gewerk: str
+    ) -> Optional[str]:
+        """Store the traced components of one call and link their positions."""
+        trace_id = RegelTraceService.speichere({
+            'grund': grund,
+            'extraction_result_id': str(self.extraction_result_id),
+            'katalog_id': str(self.katalog.id),
+            'gewerk': gewerk,
+            'bauteile': list(verfolgt.values()),
+        })
+        if trace_id is None:
+            return None
+
+        for position in positionen:
+            if str(position.bauteil.id) in verfolgt:
+                position.trace_id = trace_id
+                position.berechnungsgrundlage = f"{position.berechnungsgrundlage} (Trace {trace_id})"
+        logger.debug(f"Stored rule trace {trace_id} ({grund}, {len(verfolgt)} components)")
+        return trace_id
+
+    def _regel_position(
+        self,
+        bauteil: StandardBauteil,
+        menge: Decimal,
+        regel: Optional[BauteilRegel]
+    ) -> BauteilKostenPosition:
+        """Cost position of a rule-based quantity (catalog-specific or standard price)."""
+        einzelpreis = self._get_bauteil_preis(bauteil)
+        regel_name = regel.name if regel else None
+
+        return BauteilKostenPosition(
+            bauteil=bauteil,
+            menge=menge,
+            einzelpreis=einzelpreis,
+            gesamtpreis=money.times(einzelpreis, menge),
+            berechnungsgrundlage=f"Regel: {regel_name}" if regel_name else "Manuell",
+            regel_name=regel_name
+        )
+
+    def _get_bauteil_preis(self, bauteil: StandardBauteil) -> Money:
         """
         Get component price (catalog-specific or standard).
 
@@ -276,22 +404,18 @@ class StandardbauteilIntegrationService:
             bauteil: Component
 
         Returns:
-            Price per unit
+            Price per unit as Money
         """
         if not self.katalog:
-            return bauteil.einzelpreis
+            return money.to_money(bauteil.einzelpreis)
 
-        # Try to get catalog-specific price
-        try:
-            position = BauteilKatalogPosition.objects.get(
-                katalog=self.katalog,
-                bauteil=bauteil,
-                ist_aktiv_in_katalog=True
-            )
-            return position.get_preis()
-        except BauteilKatalogPosition.DoesNotExist:
-            # Fallback to standard price
-            return bauteil.einzelpreis
+        return self._katalog_snapshot().preis(bauteil)
+
+    def _katalog_snapshot(self) -> KatalogSnapshot:
+        """Snapshot of the loaded catalog."""
+        if self.snapshot is None or self.snapshot.katalog_id != str(self.katalog.id):
+            self.snapshot = KatalogSnapshotService.get(self.katalog)
+        return self.snapshot
 
     def _calculate_geometrie_kosten(
         self,
@@ -315,19 +439,13 @@ class StandardbauteilIntegrationService:
             return positionen
 
         # Find ABS-Kante component in catalog
-        abs_kante_bauteile = StandardBauteil.objects.filter(
-            kataloge=self.katalog,
-            kategorie='kante',
-            ist_aktiv=True
-        )
+        # (first one; could be extended to support multiple types)
+        abs_kante = self._katalog_snapshot().erstes_bauteil('kante')
 
-        if not abs_kante_bauteile.exists():
+        if abs_kante is None:
             logger.debug("No ABS edge components in catalog, skipping")
             return positionen
 
-        # Use first ABS-Kante component (could be extended to support multiple types)
-        abs_kante = abs_kante_bauteile.first()
-
         # Convert components to list format for GeometrieService
         komponenten_list = []
         for typ, daten in extracted_components.items():
@@ -340,20 +458,17 @@ class StandardbauteilIntegrationService:
         # Calculate ABS edge lengths
         try:
             geometrie_service = GeometrieService(self.extraction_result_id)
-            berechnungen = geometrie_service.calculate_abs_kanten(
+            kanten = geometrie_service.calculate_abs_kanten_array(
                 komponenten_list,
                 apply_visibility_defaults=True
             )
 
             # Calculate total activated edge length
-            gesamt_laenge = geometrie_service.calculate_total_kanten_länge(
-                berechnungen,
-                nur_aktivierte=True
-            )
+            gesamt_laenge = kanten.gesamt_laenge(nur_aktivierte=True)
 
             if gesamt_laenge > 0:
                 einzelpreis = self._get_bauteil_preis(abs_kante)
-                gesamtpreis = gesamt_laenge * einzelpreis
+                gesamtpreis = money.times(einzelpreis, gesamt_laenge)
 
                 positionen.append(BauteilKostenPosition(
                     bauteil=abs_kante,
@@ -364,7 +479,10 @@ class StandardbauteilIntegrationService:
                     regel_name="ABS-Kanten Automatik"
                 ))
 
-                logger.debug(f"ABS edges: {gesamt_laenge} lfm × {einzelpreis}€ = {gesamtpreis}€")
+                logger.debug(
+                    f"ABS edges: {gesamt_laenge} lfm × {money.to_float(einzelpreis)}€ "
+                    f"= {money.to_float(gesamtpreis)}€"
+                )
 
         except Exception as e:
             logger.error(f"Error calculating geometry costs: {e}", exc_info=True)
@@ -381,11 +499,11 @@ class StandardbauteilIntegrationService:
         Returns:
             BauteilKostenSummary
         """
-        gesamt_beschlaege = Decimal('0')
-        gesamt_verbinder = Decimal('0')
-        gesamt_kanten = Decimal('0')
-        gesamt_befestigung = Decimal('0')
-        gesamt_sonstiges = Decimal('0')
+        gesamt_beschlaege = money.ZERO
+        gesamt_verbinder = money.ZERO
+        gesamt_kanten = money.ZERO
+        gesamt_befestigung = money.ZERO
+        gesamt_sonstiges = money.ZERO
 
         for pos in positionen:
             kategorie = pos.bauteil.kategorie
@@ -417,12 +535,12 @@ class StandardbauteilIntegrationService:
         """Return empty summary."""
         return BauteilKostenSummary(
             positionen=[],
-            gesamt_beschlaege=Decimal('0'),
-            gesamt_verbinder=Decimal('0'),
-            gesamt_kanten=Decimal('0'),
-            gesamt_befestigung=Decimal('0'),
-            gesamt_sonstiges=Decimal('0'),
-            gesamt_netto=Decimal('0')
+            gesamt_beschlaege=money.ZERO,
+            gesamt_verbinder=money.ZERO,
+            gesamt_kanten=money.ZERO,
+            gesamt_befestigung=money.ZERO,
+            gesamt_sonstiges=money.ZERO,
+            gesamt_netto=money.ZERO
         )
 
     def export_bauteil_kosten_for_calculation_engine(
@@ -446,7 +564,8 @@ class StandardbauteilIntegrationService:
                         'einzelpreis': 2.50,
                         'gesamtpreis': 15.00,
                         'kategorie': 'Beschläge',
-                        'berechnungsgrundlage': 'Regel: Topfbänder pro Tür'
+                        'berechnungsgrundlage': 'Regel: Topfbänder pro Tür',
+                        'trace_id': None
                     },
                     ...
                 ],
@@ -468,23 +587,24 @@ class StandardbauteilIntegrationService:
                 'name': pos.bauteil.name,
                 'menge': float(pos.menge),
                 'einheit': pos.bauteil.get_einheit_display(),
-                'einzelpreis': float(pos.einzelpreis),
-                'gesamtpreis': float(pos.gesamtpreis),
+                'einzelpreis': money.to_float(pos.einzelpreis),
+                'gesamtpreis': money.to_float(pos.gesamtpreis),
                 'kategorie': pos.bauteil.get_kategorie_display(),
-                'berechnungsgrundlage': pos.berechnungsgrundlage
+                'berechnungsgrundlage': pos.berechnungsgrundlage,
+                'trace_id': pos.trace_id
             })
 
         return {
             'material_typ': 'Standardbauteile',
             'positionen': positionen_export,
             'kategorie_summen': {
-                'beschlaege': float(summary.gesamt_beschlaege),
-                'verbinder': float(summary.gesamt_verbinder),
-                'kanten': float(summary.gesamt_kanten),
-                'befestigung': float(summary.gesamt_befestigung),
-                'sonstiges': float(summary.gesamt_sonstiges)
+                'beschlaege': money.to_float(summary.gesamt_beschlaege),
+                'verbinder': money.to_float(summary.gesamt_verbinder),
+                'kanten': money.to_float(summary.gesamt_kanten),
+                'befestigung': money.to_float(summary.gesamt_befestigung),
+                'sonstiges': money.to_float(summary.gesamt_sonstiges)
             },
-            'gesamt_netto': float(summary.gesamt_netto)
+            'gesamt_netto': money.to_float(summary.gesamt_netto)
         }
 
 
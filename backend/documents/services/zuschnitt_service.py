@@ -0,0 +1,592 @@
+"""
+Zuschnitt-Service - Cut-list optimization
+
+Panel material is priced by area today (MultiMaterialCalculationService.
+_calculate_area_m2), but a workshop buys whole sheets. This service nests
+the panels of a furniture list onto standard sheets (default 2800 × 2070 mm)
+and reports, per material:
+
+- number of sheets
+- waste percentage (sheet area not covered by parts, kerf included)
+- cut plan per sheet: part placements and guillotine cuts in cutting order
+
+Packing is a guillotine heuristic (best area fit over the free rectangles
+of all open sheets, shorter-leftover-axis split, saw kerf between parts).
+An optional improvement phase re-packs with other part orders and split
+rules until a time limit and keeps the plan with the fewest sheets.
+
+The sheet count feeds step 1 of CalculationEngine as ``material_quantity``
+for a material SKU priced per sheet (see ZuschnittErgebnis.step1_eingabe).
+"""
+
+from typing import Dict, Any, Iterable, List, Optional, Sequence, Tuple
+from decimal import Decimal, InvalidOperation
+from dataclasses import dataclass, field
+import logging
+import random
+import time
+
+from .geometrie_service import (
+    InvalidComponentError,
+    MASS_FELDER,
+    TYP_CODES,
+    TYP_EINLEGEBODEN,
+    TYP_GENERISCH,
+    TYP_KORPUS,
+    TYP_SCHUBLADE,
+    TYP_TUER,
+)
+
+logger = logging.getLogger(__name__)
+
+# Standard sheet format (length × width in mm)
+STANDARD_PLATTENFORMAT = (2800.0, 2070.0)
+SCHNITTBREITE_MM = 4.0
+BESAEUMUNG_MM = 10.0
+STANDARD_MATERIAL = 'Standard'
+
+HORIZONTAL = 'horizontal'
+VERTIKAL = 'vertikal'
+
+# Split rules for the free rectangle left after placing a part
+KURZE_RESTACHSE = 'kurze_restachse'
+LANGE_RESTACHSE = 'lange_restachse'
+GROESSTE_RESTFLAECHE = 'groesste_restflaeche'
+SPLIT_REGELN = (KURZE_RESTACHSE, LANGE_RESTACHSE, GROESSTE_RESTFLAECHE)
+
+# Part orders tried in the improvement phase (first one is the fast heuristic)
+SORTIERUNGEN = {
+    'flaeche': lambda teil: (teil.laenge_mm * teil.breite_mm, max(teil.laenge_mm, teil.breite_mm)),
+    'lange_seite': lambda teil: (max(teil.laenge_mm, teil.breite_mm), min(teil.laenge_mm, teil.breite_mm)),
+    'umfang': lambda teil: (teil.laenge_mm + teil.breite_mm, teil.laenge_mm * teil.breite_mm),
+    'kurze_seite': lambda teil: (min(teil.laenge_mm, teil.breite_mm), max(teil.laenge_mm, teil.breite_mm)),
+}
+
+
+class ZuschnittError(Exception):
+    """Base exception for cut-list errors."""
+    pass
+
+
+@dataclass(frozen=True)
+class Zuschnittteil:
+    """One panel to cut (dimensions in mm)."""
+    bezeichnung: str
+    laenge_mm: float
+    breite_mm: float
+    material: str = STANDARD_MATERIAL
+    drehbar: bool = True         # False for panels with grain direction
+    komponente: Optional[int] = None  # index into the component list
+
+    @property
+    def flaeche_mm2(self) -> float:
+        return self.laenge_mm * self.breite_mm
+
+
+@dataclass(frozen=True)
+class Platzierung:
+    """A part placed on a sheet; lengths along x, widths along y."""
+    teil: Zuschnittteil
+    x_mm: float
+    y_mm: float
+    laenge_mm: float
+    breite_mm: float
+    gedreht: bool
+
+
+@dataclass(frozen=True)
+class Schnitt:
+    """A guillotine cut across one free rectangle."""
+    richtung: str      # HORIZONTAL (along x at y=position) or VERTIKAL
+    position_mm: float
+    von_mm: float
+    bis_mm: float
+
+
+@dataclass
+class Platte:
+    """One sheet with its placements and cuts in cutting order."""
+    laenge_mm: float
+    breite_mm: float
+    platzierungen: List[Platzierung] = field(default_factory=list)
+    schnitte: List[Schnitt] = field(default_factory=list)
+    # Free rectangles (x, y, laenge, breite) still available
+    frei: List[Tuple[float, float, float, float]] = field(default_factory=list, repr=False)
+
+    @property
+    def teileflaeche_mm2(self) -> float:
+        return sum(p.laenge_mm * p.breite_mm for p in self.platzierungen)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'platzierungen': [
+                {
+                    'bezeichnung': p.teil.bezeichnung,
+                    'komponente': p.teil.komponente,
+                    'x_mm': p.x_mm,
+                    'y_mm': p.y_mm,
+                    'laenge_mm': p.laenge_mm,
+                    'breite_mm': p.breite_mm,
+                    'gedreht': p.gedreht,
+                }
+                for p in self.platzierungen
+            ],
+            'schnitte': [
+                {'richtung': s.richtung, 'position_mm': s.position_mm, 'von_mm': s.von_mm, 'bis_mm': s.bis_mm}
+                for s in self.schnitte
+            ],
+            'belegung_prozent': round(100 * self.teileflaeche_mm2 / (self.laenge_mm * self.breite_mm), 2),
+        }
+
+
+@dataclass
+class ZuschnittPlan:
+    """Cut plan of one material."""
+    material: str
+    plattenformat: Tuple[float, float]
+    platten: List[Platte]
+    nicht_platzierbar: List[Zuschnittteil] = field(default_factory=list)
+
+    @property
+    def anzahl_platten(self) -> int:
+        return len(self.platten)
+
+    @property
+    def teileflaeche_m2(self) -> Decimal:
+        return _m2(sum(platte.teileflaeche_mm2 for platte in self.platten))
+
+    @property
+    def plattenflaeche_m2(self) -> Decimal:
+        return _m2(self.plattenformat[0] * self.plattenformat[1] * self.anzahl_platten)
+
+    @property
+    def verschnitt_prozent(self) -> Decimal:
+        """Share of bought sheet area that is not a part (0 without sheets)."""
+        if not self.platten:
+            return Decimal('0')
+        return _prozent(1 - self.teileflaeche_m2 / self.plattenflaeche_m2)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'material': self.material,
+            'plattenformat_mm': list(self.plattenformat),
+            'anzahl_platten': self.anzahl_platten,
+            'teileflaeche_m2': float(self.teileflaeche_m2),
+            'plattenflaeche_m2': float(self.plattenflaeche_m2),
+            'verschnitt_prozent': float(self.verschnitt_prozent),
+            'platten': [platte.to_dict() for platte in self.platten],
+            'nicht_platzierbar': [
+                {'bezeichnung': teil.bezeichnung, 'laenge_mm': teil.laenge_mm, 'breite_mm': teil.breite_mm}
+                for teil in self.nicht_platzierbar
+            ],
+        }
+
+
+@dataclass
+class ZuschnittErgebnis:
+    """Cut plans of all materials of a furniture list."""
+    plaene: Dict[str, ZuschnittPlan]
+    optimierungsdauer_ms: float = 0.0
+
+    @property
+    def platten_gesamt(self) -> int:
+        return sum(plan.anzahl_platten for plan in self.plaene.values())
+
+    @property
+    def verschnitt_prozent(self) -> Decimal:
+        plattenflaeche = sum((plan.plattenflaeche_m2 for plan in self.plaene.values()), Decimal('0'))
+        if not plattenflaeche:
+            return Decimal('0')
+        teileflaeche = sum((plan.teileflaeche_m2 for plan in self.plaene.values()), Decimal('0'))
+        return _prozent(1 - teileflaeche / plattenflaeche)
+
+    def step1_eingabe(self, material: Optional[str] = None, material_sku: Optional[str] = None) -> Dict[str, Any]:
+        """
+        extracted_data fields for step 1 pricing of a sheet material.
+
+        Args:
+            material: Material whose sheets are priced (optional if only one)
+            material_sku: SKU of the sheet in the user's material list
+
+        Returns:
+            {'material_quantity': sheets[, 'material_sku': sku]}
+
+        Raises:
+            ZuschnittError: If the material is ambiguous or unknown, or some
+                parts do not fit on a sheet (the count would underprice)
+        """
+        if material is None:
+            if len(self.plaene) != 1:
+                raise ZuschnittError(f"Material required, plan has {sorted(self.plaene)}")
+            material = next(iter(self.plaene))
+        if material not in self.plaene:
+            raise ZuschnittError(f"No cut plan for material '{material}'")
+
+        plan = self.plaene[material]
+        if plan.nicht_platzierbar:
+            teile = ', '.join(teil.bezeichnung for teil in plan.nicht_platzierbar)
+            raise ZuschnittError(f"Parts do not fit on a '{material}' sheet: {teile}")
+
+        eingabe: Dict[str, Any] = {'material_quantity': plan.anzahl_platten}
+        if material_sku:
+            eingabe['material_sku'] = material_sku
+        return eingabe
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'platten_gesamt': self.platten_gesamt,
+            'verschnitt_prozent': float(self.verschnitt_prozent),
+            'optimierungsdauer_ms': round(self.optimierungsdauer_ms, 1),
+            'materialien': {material: plan.to_dict() for material, plan in self.plaene.items()},
+        }
+
+
+class ZuschnittService:
+    """
+    Nests furniture panels onto standard sheets.
+
+    Example:
+        >>> service = ZuschnittService()
+        >>> ergebnis = service.optimiere_komponenten(komponenten, zeitlimit_s=0.5)
+        >>> extracted_data.update(ergebnis.step1_eingabe(material_sku='SP-19'))
+    """
+
+    def __init__(
+        self,
+        plattenformat: Tuple[float, float] = STANDARD_PLATTENFORMAT,
+        schnittbreite_mm: float = SCHNITTBREITE_MM,
+        besaeumung_mm: float = BESAEUMUNG_MM,
+        plattenformate: Optional[Dict[str, Tuple[float, float]]] = None,
+    ):
+        """
+        Initialize cut-list service.
+
+        Args:
+            plattenformat: Default sheet size (length, width) in mm
+            schnittbreite_mm: Saw kerf between parts
+            besaeumung_mm: Edge trim on every side of the sheet
+            plattenformate: Sheet size per material, overriding the default
+        """
+        self.plattenformat = (float(plattenformat[0]), float(plattenformat[1]))
+        self.schnittbreite_mm = float(schnittbreite_mm)
+        self.besaeumung_mm = float(besaeumung_mm)
+        self.plattenformate = plattenformate or {}
+
+    # =====================
+    # PARTS
+    # =====================
+
+    def teile_aus_komponenten(self, komponenten: Sequence[Dict[str, Any]]) -> List[Zuschnittteil]:
+        """
+        Panels of a component list (GeometrieService format, dimensions in m).
+
+        - Korpus: 2 sides (höhe × tiefe), top and bottom (breite × tiefe)
+        - Tür, Schublade: front (höhe × breite)
+        - Einlegeboden: breite × tiefe
+        - other types: länge × breite as in _calculate_area_m2, otherwise
+          the two largest dimensions (the smallest is the thickness)
+
+        Components may also use the multi-material format (component_typ,
+        material dict); the material key groups parts onto the same sheets.
+
+        Raises:
+            InvalidComponentError: If a dimension is not a number
+        """
+        teile = []
+        for index, komponente in enumerate(komponenten):
+            typ = str(komponente.get('typ') or komponente.get('component_typ') or '')
+            maße = komponente.get('maße') or {}
+            anzahl = int(komponente.get('anzahl', 1))
+            material = material_schluessel(komponente.get('material'))
+            drehbar = bool(komponente.get('drehbar', True))
+
+            for bezeichnung, laenge, breite in self._paneele(typ, maße):
+                teil = Zuschnittteil(
+                    bezeichnung=bezeichnung,
+                    laenge_mm=laenge,
+                    breite_mm=breite,
+                    material=material,
+                    drehbar=drehbar,
+                    komponente=index,
+                )
+                teile.extend([teil] * anzahl)
+
+        return teile
+
+    def _paneele(self, typ: str, maße: Dict[str, Any]) -> List[Tuple[str, float, float]]:
+        """(bezeichnung, laenge_mm, breite_mm) of one component."""
+        mm = {feld: _mm(maße[feld], feld) for feld in MASS_FELDER if maße.get(feld) is not None}
+        typ_code = TYP_CODES.get(typ.lower(), TYP_GENERISCH)
+
+        def fehlt(*felder):
+            missing = [feld for feld in felder if not mm.get(feld)]
+            if missing:
+                logger.warning(f"Component '{typ}' lacks {missing}, no panels")
+            return bool(missing)
+
+        if typ_code == TYP_KORPUS:
+            if fehlt('höhe', 'breite', 'tiefe'):
+                return []
+            return [
+                (f'{typ} Seite', mm['höhe'], mm['tiefe']),
+                (f'{typ} Seite', mm['höhe'], mm['tiefe']),
+                (f'{typ} Boden', mm['breite'], mm['tiefe']),
+                (f'{typ} Deckel', mm['breite'], mm['tiefe']),
+            ]
+        if typ_code in (TYP_TUER, TYP_SCHUBLADE):
+            return [] if fehlt('höhe', 'breite') else [(typ, mm['höhe'], mm['breite'])]
+        if typ_code == TYP_EINLEGEBODEN:
+            return [] if fehlt('breite', 'tiefe') else [(typ, mm['breite'], mm['tiefe'])]
+
+        if mm.get('länge') and mm.get('breite'):
+            return [(typ, mm['länge'], mm['breite'])]
+        dims = sorted((wert for wert in mm.values() if wert > 0), reverse=True)
+        if len(dims) < 2:
+            logger.warning(f"Not enough dimensions for panel of '{typ}': {maße}")
+            return []
+        return [(typ, dims[0], dims[1])]
+
+    # =====================
+    # OPTIMIZATION
+    # =====================
+
+    def optimiere_komponenten(
+        self,
+        komponenten: Sequence[Dict[str, Any]],
+        zeitlimit_s: float = 0.0,
+        seed: int = 0,
+    ) -> ZuschnittErgebnis:
+        """Cut plans for a component list (see optimiere)."""
+        return self.optimiere(self.teile_aus_komponenten(komponenten), zeitlimit_s=zeitlimit_s, seed=seed)
+
+    def optimiere(
+        self,
+        teile: Iterable[Zuschnittteil],
+        zeitlimit_s: float = 0.0,
+        seed: int = 0,
+        max_versuche: Optional[int] = None,
+    ) -> ZuschnittErgebnis:
+        """
+        Cut plans per material.
+
+        Without a time limit only the fast heuristic runs (largest parts
+        first, shorter-leftover-axis split). With a time limit the other
+        orders and split rules are tried, then random swaps of the best
+        order, until the limit; the plan with the fewest sheets (then the
+        least used last sheet, whose offcut is most reusable) wins.
+
+        Args:
+            teile: Parts to cut
+            zeitlimit_s: Time box for the improvement phase, shared by all materials
+            seed: Seed for the random swaps
+            max_versuche: Optional cap on packings per material (for
+                reproducible results independent of machine speed)
+
+        Returns:
+            ZuschnittErgebnis
+        """
+        start = time.perf_counter()
+        nach_material: Dict[str, List[Zuschnittteil]] = {}
+        for teil in teile:
+            nach_material.setdefault(teil.material, []).append(teil)
+
+        plaene = {}
+        for nummer, (material, material_teile) in enumerate(nach_material.items()):
+            # Remaining time is split evenly over the remaining materials
+            rest = zeitlimit_s - (time.perf_counter() - start)
+            budget = max(rest, 0.0) / (len(nach_material) - nummer) if zeitlimit_s > 0 else 0.0
+            plaene[material] = self._optimiere_material(
+                material, material_teile, budget, random.Random(seed), max_versuche,
+            )
+
+        dauer_ms = (time.perf_counter() - start) * 1000
+        ergebnis = ZuschnittErgebnis(plaene=plaene, optimierungsdauer_ms=dauer_ms)
+        logger.info(
+            f"Cut list: {ergebnis.platten_gesamt} sheets for {len(nach_material)} materials, "
+            f"waste {ergebnis.verschnitt_prozent}% ({dauer_ms:.0f}ms)"
+        )
+        return ergebnis
+
+    def _optimiere_material(
+        self,
+        material: str,
+        teile: List[Zuschnittteil],
+        zeitlimit_s: float,
+        rng: random.Random,
+        max_versuche: Optional[int],
+    ) -> ZuschnittPlan:
+        format_ = self.plattenformate.get(material, self.plattenformat)
+        ende = time.perf_counter() + zeitlimit_s
+        versuche = 0
+
+        def weiter() -> bool:
+            if max_versuche is not None and versuche >= max_versuche:
+                return False
+            return time.perf_counter() < ende
+
+        reihenfolgen = [sorted(teile, key=sortierung, reverse=True) for sortierung in SORTIERUNGEN.values()]
+        beste_reihenfolge, beste_regel = reihenfolgen[0], KURZE_RESTACHSE
+        bester = self._packe(beste_reihenfolge, format_, beste_regel)
+        versuche += 1
+
+        for reihenfolge in reihenfolgen:
+            for regel in SPLIT_REGELN:
+                if not weiter():
+                    break
+                if reihenfolge is reihenfolgen[0] and regel == KURZE_RESTACHSE:
+                    continue
+                kandidat = self._packe(reihenfolge, format_, regel)
+                versuche += 1
+                if _bewertung(kandidat) < _bewertung(bester):
+                    bester, beste_reihenfolge, beste_regel = kandidat, reihenfolge, regel
+
+        while len(teile) > 1 and weiter():
+            reihenfolge = list(beste_reihenfolge)
+            i, j = rng.randrange(len(reihenfolge)), rng.randrange(len(reihenfolge))
+            reihenfolge[i], reihenfolge[j] = reihenfolge[j], reihenfolge[i]
+            kandidat = self._packe(reihenfolge, format_, beste_regel)
+            versuche += 1
+            if _bewertung(kandidat) <= _bewertung(bester):
+                bester, beste_reihenfolge = kandidat, reihenfolge
+
+        logger.debug(f"Material '{material}': {bester.anzahl_platten} sheets after {versuche} packings")
+        return bester
+
+    def _packe(
+        self,
+        teile: Sequence[Zuschnittteil],
+        format_: Tuple[float, float],
+        split_regel: str,
+    ) -> ZuschnittPlan:
+        """Pack parts in the given order onto as many sheets as needed."""
+        laenge, breite = format_
+        rand = self.besaeumung_mm
+        nutzbar = (rand, rand, laenge - 2 * rand, breite - 2 * rand)
+        kerf = self.schnittbreite_mm
+
+        platten: List[Platte] = []
+        nicht_platzierbar = []
+
+        for teil in teile:
+            bester = None  # (rest, platte, frei_index, laenge, breite, gedreht)
+            for platte in platten:
+                for index, frei in enumerate(platte.frei):
+                    for l, b, gedreht in _ausrichtungen(teil):
+                        if l <= frei[2] and b <= frei[3]:
+                            rest = (frei[2] * frei[3] - l * b, min(frei[2] - l, frei[3] - b))
+                            if bester is None or rest < bester[0]:
+                                bester = (rest, platte, index, l, b, gedreht)
+
+            if bester is None:
+                if not any(l <= nutzbar[2] and b <= nutzbar[3] for l, b, _ in _ausrichtungen(teil)):
+                    logger.warning(
+                        f"Part '{teil.bezeichnung}' ({teil.laenge_mm}×{teil.breite_mm}mm) "
+                        f"does not fit a {laenge}×{breite}mm sheet"
+                    )
+                    nicht_platzierbar.append(teil)
+                    continue
+                platte = Platte(laenge_mm=laenge, breite_mm=breite, frei=[nutzbar])
+                platten.append(platte)
+                l, b, gedreht = next(
+                    (l, b, g) for l, b, g in _ausrichtungen(teil) if l <= nutzbar[2] and b <= nutzbar[3]
+                )
+                bester = (None, platte, 0, l, b, gedreht)
+
+            _, platte, index, l, b, gedreht = bester
+            x, y, w, h = platte.frei.pop(index)
+            platte.platzierungen.append(Platzierung(teil, x, y, l, b, gedreht))
+            platte.frei.extend(_teile_rest(platte, (x, y, w, h), l, b, kerf, split_regel))
+
+        return ZuschnittPlan(
+            material=teile[0].material if teile else STANDARD_MATERIAL,
+            plattenformat=format_,
+            platten=platten,
+            nicht_platzierbar=nicht_platzierbar,
+        )
+
+
+# =====================
+# HELPERS
+# =====================
+
+def material_schluessel(material: Any) -> str:
+    """Grouping key of a component material (string or MaterialSpecification dict)."""
+    if not material:
+        return STANDARD_MATERIAL
+    if isinstance(material, str):
+        return material
+    name = material.get('holzart') or material.get('material_typ') or STANDARD_MATERIAL
+    staerke = material.get('stärke_mm')
+    return f"{name} {staerke:g}mm" if isinstance(staerke, (int, float)) else str(name)
+
+
+def _ausrichtungen(teil: Zuschnittteil) -> List[Tuple[float, float, bool]]:
+    if teil.drehbar and teil.laenge_mm != teil.breite_mm:
+        return [(teil.laenge_mm, teil.breite_mm, False), (teil.breite_mm, teil.laenge_mm, True)]
+    return [(teil.laenge_mm, teil.breite_mm, False)]
+
+
+def _teile_rest(
+    platte: Platte,
+    frei: Tuple[float, float, float, float],
+    l: float,
+    b: float,
+    kerf: float,
+    split_regel: str,
+) -> List[Tuple[float, float, float, float]]:
+    """
+    Guillotine split of a free rectangle after placing an l × b part at its corner.
+
+    Records the cuts on the sheet and returns the leftover free rectangles.
+    """
+    x, y, w, h = frei
+    rest_w, rest_h = w - l, h - b
+
+    if split_regel == KURZE_RESTACHSE:
+        horizontal_zuerst = rest_w < rest_h
+    elif split_regel == LANGE_RESTACHSE:
+        horizontal_zuerst = rest_w >= rest_h
+    else:
+        # Keep the larger leftover rectangle in one piece
+        horizontal_zuerst = w * rest_h >= rest_w * h
+
+    if horizontal_zuerst:
+        # Full-length cut above the part, then a cut beside it
+        rechts = (x + l + kerf, y, rest_w - kerf, b)
+        oben = (x, y + b + kerf, w, rest_h - kerf)
+        if rest_h > 0:
+            platte.schnitte.append(Schnitt(HORIZONTAL, y + b, x, x + w))
+        if rest_w > 0:
+            platte.schnitte.append(Schnitt(VERTIKAL, x + l, y, y + b))
+    else:
+        # Full-width cut beside the part, then a cut above it
+        rechts = (x + l + kerf, y, rest_w - kerf, h)
+        oben = (x, y + b + kerf, l, rest_h - kerf)
+        if rest_w > 0:
+            platte.schnitte.append(Schnitt(VERTIKAL, x + l, y, y + h))
+        if rest_h > 0:
+            platte.schnitte.append(Schnitt(HORIZONTAL, y + b, x, x + l))
+
+    return [rest for rest in (rechts, oben) if rest[2] > 0 and rest[3] > 0]
+
+
+def _bewertung(plan: ZuschnittPlan) -> Tuple[int, int, float]:
+    """Lower is better: unplaced parts, sheets, then use of the last sheet."""
+    letzte = plan.platten[-1].teileflaeche_mm2 if plan.platten else 0.0
+    return (len(plan.nicht_platzierbar), plan.anzahl_platten, letzte)
+
+
+def _mm(wert: Any, feld: str) -> float:
+    """Dimension in m to mm."""
+    try:
+        return float(Decimal(str(wert)) * 1000)
+    except (InvalidOperation, ValueError) as e:
+        raise InvalidComponentError(f"Invalid dimension {feld}={wert!r}") from e
+
+
+def _m2(mm2: float) -> Decimal:
+    return Decimal(str(round(mm2 / 1_000_000, 4)))
+
+
+def _prozent(anteil: Decimal) -> Decimal:
+    return (anteil * 100).quantize(Decimal('0.01'))
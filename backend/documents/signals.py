@@ -0,0 +1,107 @@
+"""Signal handlers for the documents app.
+
+Snapshot and index invalidations run once the transaction commits.
+Invalidating earlier would let another process rebuild the cache from
+the old rows before the change is visible.
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from documents.betriebskennzahl_models import (
+    BetriebskennzahlTemplate,
+    HolzartKennzahl,
+    IndividuelleBetriebskennzahl,
+    KomplexitaetKennzahl,
+    MateriallistePosition,
+    OberflächenbearbeitungKennzahl,
+    SaisonaleMarge,
+)
+from documents.models_bauteile import (
+    BauteilKatalog,
+    BauteilKatalogPosition,
+    BauteilRegel,
+    StandardBauteil,
+)
+from documents.models_pauschalen import BetriebspauschaleRegel
+from documents.services.bauteil_katalog_snapshot import KatalogSnapshotService
+from documents.services.pauschale_index import PauschaleIndexService
+from documents.services.pricing_snapshot import PricingSnapshotService
+
+
+# ===== PRICING SNAPSHOT INVALIDATION =====
+
+@receiver([post_save, post_delete], sender=IndividuelleBetriebskennzahl)
+@receiver([post_save, post_delete], sender=MateriallistePosition)
+@receiver([post_save, post_delete], sender=SaisonaleMarge)
+def invalidate_user_pricing_snapshot(sender, instance, **kwargs):
+    """User-level pricing data changed."""
+    user_id = instance.user_id
+    transaction.on_commit(lambda: PricingSnapshotService.invalidate_user(user_id))
+
+
+@receiver([post_save, post_delete], sender=HolzartKennzahl)
+@receiver([post_save, post_delete], sender=OberflächenbearbeitungKennzahl)
+@receiver([post_save, post_delete], sender=KomplexitaetKennzahl)
+def invalidate_template_pricing_snapshots(sender, instance, **kwargs):
+    """Template factor changed, affects every user on the template."""
+    template_id = instance.template_id
+    transaction.on_commit(lambda: PricingSnapshotService.invalidate_template(template_id))
+
+
+@receiver(post_save, sender=BetriebskennzahlTemplate)
+def invalidate_template_users_pricing_snapshots(sender, instance, **kwargs):
+    """Template name/version changed."""
+    template_id = instance.id
+    transaction.on_commit(lambda: PricingSnapshotService.invalidate_template(template_id))
+
+
+@receiver(pre_delete, sender=BetriebskennzahlTemplate)
+def remember_template_users(sender, instance, **kwargs):
+    """Deleting a template nulls the users' FK before post_delete runs."""
+    instance._pricing_user_ids = list(
+        IndividuelleBetriebskennzahl.objects.filter(
+            handwerk_template=instance
+        ).values_list('user_id', flat=True)
+    )
+
+
+@receiver(post_delete, sender=BetriebskennzahlTemplate)
+def invalidate_deleted_template_pricing_snapshots(sender, instance, **kwargs):
+    user_ids = getattr(instance, '_pricing_user_ids', [])
+    transaction.on_commit(lambda: PricingSnapshotService.invalidate_users(user_ids))
+
+
+# ===== CATALOG SNAPSHOT INVALIDATION =====
+
+@receiver([post_save, post_delete], sender=BauteilKatalog)
+def invalidate_katalog_snapshot(sender, instance, **kwargs):
+    katalog_id = instance.id
+    transaction.on_commit(lambda: KatalogSnapshotService.invalidate_kataloge([katalog_id]))
+
+
+@receiver([post_save, post_delete], sender=BauteilKatalogPosition)
+def invalidate_position_katalog_snapshot(sender, instance, **kwargs):
+    katalog_id = instance.katalog_id
+    transaction.on_commit(lambda: KatalogSnapshotService.invalidate_kataloge([katalog_id]))
+
+
+@receiver([post_save, post_delete], sender=StandardBauteil)
+def invalidate_bauteil_katalog_snapshots(sender, instance, **kwargs):
+    """Component changed, affects every catalog containing it."""
+    bauteil_id = instance.id
+    transaction.on_commit(lambda: KatalogSnapshotService.invalidate_bauteil(bauteil_id))
+
+
+@receiver([post_save, post_delete], sender=BauteilRegel)
+def invalidate_regel_katalog_snapshots(sender, instance, **kwargs):
+    bauteil_id = instance.bauteil_id
+    transaction.on_commit(lambda: KatalogSnapshotService.invalidate_bauteil(bauteil_id))
+
+
+# ===== PAUSCHALEN INDEX INVALIDATION =====
+
+@receiver([post_save, post_delete], sender=BetriebspauschaleRegel)
+def invalidate_pauschale_index(sender, instance, **kwargs):
+    user_id = instance.user_id
+    transaction.on_commit(lambda: PauschaleIndexService.invalidate_user(user_id))
@@ -1,7 +1,7 @@
 """Django admin for extraction models."""
 from django.contrib import admin
 from django.utils.html import format_html
-from .models import ExtractionConfig, ExtractedEntity, MaterialExtraction
+from .models import ExtractionConfig, ExtractedEntity, MaterialExtraction, ExtractionDeadLetter, RepricingJob
 from .forms import (
     ExtractionConfigAdminForm,
     ExtractedEntityAdminForm,
@@ -192,3 +192,56 @@ class MaterialExtractionAdmin(admin.ModelAdmin):
             'border-radius: 3px;">Auto-Approved</span>'
         )
     requires_review_badge.short_description = 'Status'
+
+
+@admin.register(ExtractionDeadLetter)
+class ExtractionDeadLetterAdmin(admin.ModelAdmin):
+    """Admin for ExtractionDeadLetter model (failure triage)."""
+
+    list_display = ('document_name', 'stage', 'exception_class', 'signature_short', 'status', 'redrive_count', 'created_at')
+    list_filter = ('status', 'stage', 'exception_class', 'created_at')
+    search_fields = ('signature', 'exception_message', 'document__original_filename', 'file_hash')
+    readonly_fields = [field.name for field in ExtractionDeadLetter._meta.fields]
+    actions = ['redrive_selected']
+
+    def document_name(self, obj):
+        """Display document filename."""
+        return obj.document.original_filename
+    document_name.short_description = 'Document'
+
+    def signature_short(self, obj):
+        """Display shortened signature."""
+        return obj.signature[:12]
+    signature_short.short_description = 'Signature'
+
+    def redrive_selected(self, request, queryset):
+        """Re-queue selected dead letters within worker capacity."""
+        from .services.dead_letter_service import DeadLetterService
+
+        result = DeadLetterService().redrive(
+            dead_letter_ids=queryset.values_list('id', flat=True)
+        )
+        self.message_user(
+            request,
+            f"{result['requeued']} requeued, {result['failed']} failed, "
+            f"{result['deferred']} deferred (capacity {result['capacity']})"
+        )
+    redrive_selected.short_description = 'Re-drive selected (respects worker capacity)'
+
+    def has_add_permission(self, request):
+        """Dead letters are only created by failing tasks."""
+        return False
+
+
+@admin.register(RepricingJob)
+class RepricingJobAdmin(admin.ModelAdmin):
+    """Admin for RepricingJob model (bulk repricing reports)."""
+
+    list_display = ('id', 'user', 'trigger', 'status', 'processed_count', 'failed_count', 'total_count', 'created_at')
+    list_filter = ('status', 'trigger', 'created_at')
+    search_fields = ('user__username',)
+    readonly_fields = [field.name for field in RepricingJob._meta.fields]
+
+    def has_add_permission(self, request):
+        """Jobs are queued by catalog changes."""
+        return False
@@ -4,3 +4,6 @@ class ExtractionConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'extraction'
     verbose_name = 'Text Extraction (OCR/NER)'
+
+    def ready(self):
+        from extraction import signals  # noqa: F401
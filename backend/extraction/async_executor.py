@@ -1,11 +1,18 @@
 """Async task executor abstraction for Cloud Tasks or Celery fallback."""
 import json
 import logging
-from typing import Dict, Any, Optional
+import threading
+import uuid
+from typing import Dict, Any, List, Optional, Tuple
 from django.conf import settings
 
 logger = logging.getLogger(__name__)
 
+# Process-wide Cloud Tasks dispatcher and the settings it was built from
+_dispatcher = None
+_dispatcher_config = None
+_dispatcher_lock = threading.Lock()
+
 
 class AsyncExecutor:
     """Unified interface for async task execution.
@@ -18,25 +25,164 @@ class AsyncExecutor:
     def process_document(
         document_id: str,
         user_id: Optional[int] = None,
-        batch_id: Optional[str] = None
+        batch_id: Optional[str] = None,
+        force: bool = False
     ) -> Optional[str]:
         """Queue document for async processing.
 
+        Requests for a document that is already being processed with the
+        same idempotency key attach to the running task instead of queuing
+        a new one. With Celery the idempotency lock is taken here, so a
+        queued task that has not started yet is attached to as well.
+
         Args:
             document_id: UUID of document to process
             user_id: ID of user who uploaded (optional)
             batch_id: UUID of batch job (optional)
+            force: Start a new processing epoch, bypassing the result of
+                an earlier run with the same config
 
         Returns:
             Task ID/name, or None if failed
         """
+        payload, lock, running_task = AsyncExecutor._prepare_document_payload(
+            document_id, user_id, batch_id, force,
+            take_lock=not getattr(settings, 'CLOUD_TASKS_ENABLED', False)
+        )
+        if running_task:
+            return running_task
+
+        result = AsyncExecutor._execute_async_task('process_document', payload)
+        if not result and lock:
+            lock.release(payload['task_id'])
+        return result
+
+    @staticmethod
+    def process_documents(
+        document_ids: List[str],
+        user_id: Optional[int] = None,
+        batch_id: Optional[str] = None
+    ) -> Dict[str, Optional[str]]:
+        """Queue several documents for async processing.
+
+        With Cloud Tasks enabled, tasks are created concurrently over one
+        pooled HTTP client (AsyncCloudTasksDispatcher) instead of one
+        blocking call per document. The idempotency lock is then left to
+        the worker; documents it is already processing are attached to.
+
+        Args:
+            document_ids: UUIDs of documents to process
+            user_id: ID of user who uploaded (optional)
+            batch_id: UUID of batch job (optional)
+
+        Returns:
+            Mapping document_id -> Task ID/name (None if failed)
+        """
+        dispatcher = AsyncExecutor._get_dispatcher()
+        if dispatcher is None:
+            results = {}
+            for doc_id in document_ids:
+                try:
+                    results[str(doc_id)] = AsyncExecutor.process_document(
+                        document_id=doc_id,
+                        user_id=user_id,
+                        batch_id=batch_id
+                    )
+                except Exception as e:
+                    logger.error(f"Error queuing document {doc_id}: {str(e)}")
+                    results[str(doc_id)] = None
+            return results
+
+        results = {}
+        pending = []
+        for doc_id in document_ids:
+            payload, _, running_task = AsyncExecutor._prepare_document_payload(
+                doc_id, user_id, batch_id, take_lock=False
+            )
+            if running_task:
+                results[str(doc_id)] = running_task
+            else:
+                pending.append(payload)
+
+        try:
+            task_names = dispatcher.dispatch(pending)
+        except Exception as e:
+            logger.error(f"Bulk Cloud Tasks dispatch failed: {str(e)}")
+            task_names = [None] * len(pending)
+
+        for payload, task_name in zip(pending, task_names):
+            results[payload['document_id']] = task_name
+
+        return results
+
+    @staticmethod
+    def _prepare_document_payload(
+        document_id: str,
+        user_id: Optional[int] = None,
+        batch_id: Optional[str] = None,
+        force: bool = False,
+        take_lock: bool = True
+    ) -> Tuple[Dict[str, Any], Optional[Any], Optional[str]]:
+        """Build a process_document payload and take its idempotency lock.
+
+        The payload's task_id owns the lock and is passed to the Celery task
+        as lock_owner, so the task re-enters the lock. Cloud Tasks workers
+        are not guaranteed to pass it on, so for them the lock is only
+        checked, not taken: a lock taken here would make every run within
+        its TTL report 'in_progress'.
+
+        Args:
+            document_id: UUID of document to process
+            user_id: ID of user who uploaded (optional)
+            batch_id: UUID of batch job (optional)
+            force: Start a new processing epoch
+            take_lock: Take the lock for the queued task (False: only
+                attach to a task already holding it)
+
+        Returns:
+            Tuple of (payload, lock, running_task_id). lock is None unless
+            it was taken; running_task_id is set when another task already
+            holds the lock.
+        """
+        from django.db.models import F
+        from documents.models import Document
+        from extraction.idempotency import (
+            IdempotencyLock,
+            build_idempotency_key,
+            get_extraction_config,
+        )
+
+        task_id = str(uuid.uuid4())
+        lock = None
+        idempotency_key = None
+
+        try:
+            if force:
+                Document.objects.filter(id=document_id).update(
+                    processing_epoch=F('processing_epoch') + 1
+                )
+            document = Document.objects.get(id=document_id)
+            idempotency_key = build_idempotency_key(document, get_extraction_config())
+
+            lock = IdempotencyLock(idempotency_key)
+            holder = lock.acquire(task_id) if take_lock else lock.holder()
+            if holder:
+                logger.info(f"Document {document_id} already queued as task {holder}, attaching")
+                return {}, None, holder
+            if not take_lock:
+                lock = None
+        except Document.DoesNotExist:
+            # Let the task report the missing document
+            pass
+
         payload = {
             'document_id': str(document_id),
             'user_id': user_id,
             'batch_id': str(batch_id) if batch_id else None,
+            'task_id': task_id,
+            'idempotency_key': idempotency_key,
         }
-
-        return AsyncExecutor._execute_async_task('process_document', payload)
+        return payload, lock, None
 
     @staticmethod
     def process_batch(
@@ -88,6 +234,9 @@ class AsyncExecutor:
     ) -> Optional[str]:
         """Execute task via Google Cloud Tasks.
 
+        Uses the pooled dispatcher (retries, named tasks) when httpx is
+        installed, otherwise the blocking gRPC client.
+
         Args:
             task_name: Name of task
             payload: Task payload
@@ -96,8 +245,6 @@ class AsyncExecutor:
             Cloud Task ID, or None if failed
         """
         try:
-            from core.cloud_tasks_client import CloudTasksClient
-
             # Get GCP configuration from settings
             project_id = getattr(settings, 'GCP_PROJECT_ID', None)
             queue_name = getattr(settings, 'CLOUD_TASKS_QUEUE', 'document-processing')
@@ -110,19 +257,25 @@ class AsyncExecutor:
                 )
                 return AsyncExecutor._execute_celery_task(task_name, payload)
 
-            # Create Cloud Tasks client
-            client = CloudTasksClient(
-                project_id=project_id,
-                queue=queue_name,
-                webhook_url=webhook_url
-            )
+            dispatcher = AsyncExecutor._get_dispatcher()
+            if dispatcher is not None:
+                task_id = dispatcher.dispatch([payload])[0]
+            else:
+                from core.cloud_tasks_client import CloudTasksClient
 
-            # Create task
-            task_id = client.create_task(
-                payload=payload,
-                task_name=None,  # Auto-generate
-                in_seconds=0  # Immediate
-            )
+                # Create Cloud Tasks client
+                client = CloudTasksClient(
+                    project_id=project_id,
+                    queue=queue_name,
+                    webhook_url=webhook_url
+                )
+
+                # Create task
+                task_id = client.create_task(
+                    payload=payload,
+                    task_name=None,  # Auto-generate
+                    in_seconds=0  # Immediate
+                )
 
             if task_id:
                 logger.info(f"Created Cloud Task: {task_id} for {task_name}")
@@ -153,22 +306,25 @@ class AsyncExecutor:
             Celery task ID, or None if failed
         """
         try:
-            from extraction.tasks import (
-                process_document_async,
-                process_batch_async
-            )
-
             # Route to correct Celery task
             if task_name == 'process_document':
-                task = process_document_async.delay(
-                    document_id=payload['document_id'],
-                    user_id=payload.get('user_id'),
-                    batch_id=payload.get('batch_id')
+                from extraction.tasks import process_document_async
+
+                task = process_document_async.apply_async(
+                    kwargs={
+                        'document_id': payload['document_id'],
+                        'user_id': payload.get('user_id'),
+                        'batch_id': payload.get('batch_id'),
+                        'lock_owner': payload.get('task_id'),
+                    },
+                    task_id=payload.get('task_id')
                 )
                 logger.info(f"Created Celery task {task.id} for {task_name}")
                 return str(task.id)
 
             elif task_name == 'process_batch':
+                from extraction.tasks import process_batch_async
+
                 task = process_batch_async.delay(
                     batch_id=payload['batch_id'],
                     user_id=payload['user_id']
@@ -187,6 +343,54 @@ class AsyncExecutor:
             logger.error(f"Error executing Celery task: {str(e)}")
             return None
 
+    @staticmethod
+    def _get_dispatcher():
+        """The process-wide bulk Cloud Tasks dispatcher, if Cloud Tasks is configured.
+
+        Built once per configuration, so credentials are resolved once and
+        the pooled connections are reused by every later dispatch.
+
+        Returns:
+            AsyncCloudTasksDispatcher, or None to fall back to per-task queuing
+        """
+        global _dispatcher, _dispatcher_config
+
+        if not getattr(settings, 'CLOUD_TASKS_ENABLED', False):
+            return None
+
+        project_id = getattr(settings, 'GCP_PROJECT_ID', None)
+        webhook_url = getattr(settings, 'CLOUD_TASKS_WEBHOOK_URL', None)
+        if not project_id or not webhook_url:
+            return None
+
+        try:
+            import httpx  # noqa: F401
+            from core.cloud_tasks_dispatcher import AsyncCloudTasksDispatcher
+        except ImportError:
+            logger.warning("httpx not installed, creating Cloud Tasks one at a time")
+            return None
+
+        config = (
+            project_id,
+            getattr(settings, 'CLOUD_TASKS_QUEUE', 'document-processing'),
+            webhook_url,
+            getattr(settings, 'CLOUD_TASKS_API_BASE', None),
+            getattr(settings, 'CLOUD_TASKS_DISPATCH_CONCURRENCY', 10),
+        )
+        with _dispatcher_lock:
+            if _dispatcher is None or _dispatcher_config != config:
+                if _dispatcher is not None:
+                    _dispatcher.close()
+                _dispatcher = AsyncCloudTasksDispatcher(
+                    project_id=project_id,
+                    queue=config[1],
+                    webhook_url=webhook_url,
+                    api_base=config[3],
+                    max_concurrency=config[4],
+                )
+                _dispatcher_config = config
+            return _dispatcher
+
     @staticmethod
     def is_available() -> bool:
         """Check if async execution is available.
@@ -0,0 +1,153 @@
+"""Idempotency keys and short-lived locks for document processing tasks.
+
+A processing run is identified by document id + extraction config hash +
+the document's processing epoch. The epoch only changes when a user
+explicitly asks for reprocessing, so Celery retries, Cloud Tasks
+redelivery and repeated "process" clicks all map to the same key.
+"""
+import hashlib
+import json
+import logging
+from typing import Dict, Any, Optional
+
+from django.core.cache import cache
+
+from extraction.models import ExtractionConfig
+
+logger = logging.getLogger(__name__)
+
+
+LOCK_PREFIX = "idem:lock:"
+LOCK_TTL_SECONDS = 600  # Covers retry backoff (max 240s) with headroom
+
+
+def get_extraction_config() -> Dict[str, Any]:
+    """Load the German extraction config as a plain dictionary.
+
+    Returns:
+        Config dictionary passed to OCR/NER services
+    """
+    try:
+        config = ExtractionConfig.objects.get(language='de')
+        return {
+            'ocr_use_cuda': config.ocr_use_cuda,
+            'ocr_confidence_threshold': config.ocr_confidence_threshold,
+            'ner_model': config.ner_model,
+            'ner_confidence_threshold': config.ner_confidence_threshold,
+            'max_file_size_mb': config.max_file_size_mb,
+        }
+    except ExtractionConfig.DoesNotExist:
+        return {'max_file_size_mb': 50}
+
+
+def config_hash(config_dict: Dict[str, Any]) -> str:
+    """Stable short hash of an extraction config."""
+    canonical = json.dumps(config_dict, sort_keys=True, default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()[:16]
+
+
+def build_idempotency_key(document, config_dict: Dict[str, Any]) -> str:
+    """Build the idempotency key for processing a document.
+
+    Args:
+        document: Document instance
+        config_dict: Extraction config used for this run
+
+    Returns:
+        Hex digest identifying the processing run
+    """
+    raw = f"{document.id}:{config_hash(config_dict)}:{document.processing_epoch}"
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+class IdempotencyLock:
+    """Short-lived cache lock owned by one task id.
+
+    Uses cache.add (SET NX on Redis) so only one owner wins. If the cache
+    is unavailable the lock degrades to always-acquired, i.e. processing
+    proceeds without deduplication rather than blocking.
+    """
+
+    def __init__(self, key: str, ttl_seconds: int = LOCK_TTL_SECONDS):
+        """Initialize lock.
+
+        Args:
+            key: Idempotency key
+            ttl_seconds: Lock lifetime
+        """
+        self.key = key
+        self.cache_key = f"{LOCK_PREFIX}{key}"
+        self.ttl_seconds = ttl_seconds
+
+    def acquire(self, owner: str) -> Optional[str]:
+        """Try to take the lock.
+
+        Args:
+            owner: Task id claiming the lock
+
+        Returns:
+            None if acquired (or already held by owner), otherwise the
+            task id currently holding the lock
+        """
+        try:
+            if cache.add(self.cache_key, owner, timeout=self.ttl_seconds):
+                return None
+
+            holder = cache.get(self.cache_key)
+            if holder is None or holder == owner:
+                # Re-entry (Celery retry of the same task) or cache down
+                cache.set(self.cache_key, owner, timeout=self.ttl_seconds)
+                return None
+            return holder
+        except Exception as e:
+            logger.warning(f"Idempotency lock unavailable for {self.key}: {e}")
+            return None
+
+    def holder(self) -> Optional[str]:
+        """Task id holding the lock, if any."""
+        try:
+            return cache.get(self.cache_key)
+        except Exception:
+            return None
+
+    def release(self, owner: str) -> None:
+        """Release the lock if still held by owner.
+
+        Args:
+            owner: Task id that acquired the lock
+        """
+        try:
+            if cache.get(self.cache_key) == owner:
+                cache.delete(self.cache_key)
+        except Exception as e:
+            logger.warning(f"Failed to release idempotency lock {self.key}: {e}")
+
+
+def cached_result(document) -> Optional[Dict[str, Any]]:
+    """Result payload of a document already processed under its current key.
+
+    Args:
+        document: Document instance
+
+    Returns:
+        Task result dictionary, or None if no reusable result exists
+    """
+    if document.status != 'completed':
+        return None
+
+    from documents.models import ExtractionResult
+
+    try:
+        result = document.extraction_result
+    except ExtractionResult.DoesNotExist:
+        return None
+
+    return {
+        'status': 'success',
+        'document_id': str(document.id),
+        'ocr_confidence': result.confidence_scores.get('ocr'),
+        'ner_confidence': result.confidence_scores.get('ner'),
+        'entity_count': result.extracted_data.get('entity_count', 0),
+        'processing_time_ms': result.processing_time_ms,
+        'deduplicated': True,
+    }
@@ -0,0 +1,148 @@
+"""Management command to re-drive dead-lettered extraction tasks.
+
+Usage:
+    python manage.py redrive_dead_letters --clusters          # Show failure clusters
+    python manage.py redrive_dead_letters                     # Re-drive all open (one round)
+    python manage.py redrive_dead_letters --signature abc123  # Re-drive one cluster
+    python manage.py redrive_dead_letters --batch <uuid>      # Re-drive one batch
+    python manage.py redrive_dead_letters --drain             # Keep going until nothing is open
+    python manage.py redrive_dead_letters --dry-run           # Show what would be queued
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from extraction.services.dead_letter_service import DeadLetterService
+
+
+class Command(BaseCommand):
+    help = 'Re-drive dead-lettered extraction tasks within current worker capacity'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--clusters',
+            action='store_true',
+            help='List open failures grouped by signature and exit'
+        )
+        parser.add_argument(
+            '--signature',
+            type=str,
+            help='Only re-drive this failure signature (prefix allowed)'
+        )
+        parser.add_argument(
+            '--batch',
+            type=str,
+            help='Only re-drive failures from this batch UUID'
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            help='Maximum number of documents to queue'
+        )
+        parser.add_argument(
+            '--drain',
+            action='store_true',
+            help='Repeat rounds as capacity frees up until nothing is left'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=10.0,
+            help='Seconds between drain rounds (default: 10)'
+        )
+        parser.add_argument(
+            '--timeout',
+            type=float,
+            default=3600.0,
+            help='Give up draining after this many seconds (default: 3600)'
+        )
+        parser.add_argument(
+            '--ignore-capacity',
+            action='store_true',
+            help='Queue everything at once regardless of worker capacity'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Show what would be re-driven without queuing'
+        )
+
+    def handle(self, *args, **options):
+        service = DeadLetterService()
+
+        if options['clusters']:
+            self.print_clusters(service)
+            return
+
+        signature = self.resolve_signature(service, options['signature'])
+        remaining = options['limit']
+        deadline = time.monotonic() + options['timeout']
+        totals = {'requeued': 0, 'failed': 0}
+
+        while True:
+            result = service.redrive(
+                signature=signature,
+                batch_id=options['batch'],
+                limit=remaining,
+                respect_capacity=not options['ignore_capacity'],
+                dry_run=options['dry_run'],
+            )
+            totals['requeued'] += result['requeued']
+            totals['failed'] += result['failed']
+
+            self.stdout.write(
+                f"Open: {result['selected']}, capacity: {result['capacity']}, "
+                f"requeued: {result['requeued']}, failed: {result['failed']}, "
+                f"deferred: {result['deferred']}"
+            )
+
+            if remaining is not None:
+                remaining -= result['requeued']
+            if options['dry_run'] or not options['drain']:
+                break
+            if result['deferred'] == 0 or (remaining is not None and remaining <= 0):
+                break
+            if time.monotonic() >= deadline:
+                self.stdout.write(self.style.WARNING('Timeout reached, stopping drain'))
+                break
+
+            time.sleep(options['interval'])
+
+        style = self.style.SUCCESS if totals['failed'] == 0 else self.style.WARNING
+        self.stdout.write(style(
+            f"Done: {totals['requeued']} requeued, {totals['failed']} failed to queue"
+        ))
+
+    def resolve_signature(self, service, prefix):
+        """Expand a signature prefix to a full signature."""
+        if not prefix:
+            return None
+
+        matches = {
+            cluster['signature'] for cluster in service.clusters()
+            if cluster['signature'].startswith(prefix)
+        }
+        if len(matches) != 1:
+            raise CommandError(
+                f"Signature prefix '{prefix}' matches {len(matches)} open clusters"
+            )
+        return matches.pop()
+
+    def print_clusters(self, service):
+        """Print open failure clusters, largest first."""
+        clusters = service.clusters()
+        if not clusters:
+            self.stdout.write(self.style.SUCCESS('No open dead letters'))
+            return
+
+        for cluster in clusters:
+            self.stdout.write(
+                f"{cluster['signature'][:12]}  {cluster['count']:>5}x  "
+                f"{cluster['stage']:<8} {cluster['exception_class']}"
+            )
+            self.stdout.write(
+                f"              {cluster['document_count']} documents, "
+                f"last seen {cluster['last_seen']:%Y-%m-%d %H:%M}: "
+                f"{cluster['sample_message'][:120]}"
+            )
@@ -0,0 +1,42 @@
+# Generated by Django 5.0 on 2026-10-18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0009_document_idempotency'),
+        ('extraction', '0002_rename_extraction_e_document_id_entity_type_idx_extraction__documen_b44341_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExtractionDeadLetter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('batch_id', models.UUIDField(blank=True, null=True)),
+                ('task_id', models.CharField(blank=True, max_length=255)),
+                ('task_payload', models.JSONField(default=dict)),
+                ('retry_count', models.IntegerField(default=0)),
+                ('exception_class', models.CharField(max_length=255)),
+                ('exception_message', models.TextField(blank=True)),
+                ('traceback', models.TextField(blank=True)),
+                ('stage', models.CharField(choices=[('load', 'Load'), ('ocr', 'OCR'), ('ner', 'NER'), ('persist', 'Persist')], max_length=20)),
+                ('stage_timings', models.JSONField(blank=True, default=dict)),
+                ('file_hash', models.CharField(blank=True, max_length=64)),
+                ('signature', models.CharField(db_index=True, max_length=64)),
+                ('status', models.CharField(choices=[('open', 'Open'), ('redriven', 'Re-driven'), ('resolved', 'Resolved')], default='open', max_length=20)),
+                ('redrive_count', models.IntegerField(default=0)),
+                ('last_redriven_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('document', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='dead_letters', to='documents.document')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'signature'], name='extraction__status_f18bce_idx'), models.Index(fields=['document', 'status'], name='extraction__documen_759327_idx')],
+            },
+        ),
+    ]
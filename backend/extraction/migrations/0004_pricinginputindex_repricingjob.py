@@ -0,0 +1,54 @@
+# Generated by Django 5.0 on 2026-10-18
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0009_document_idempotency'),
+        ('extraction', '0003_extractiondeadletter'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RepricingJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('trigger', models.CharField(choices=[('materialliste', 'Materialliste upload'), ('holzart_kennzahl', 'Holzart factor change'), ('manual', 'Manual')], default='manual', max_length=20)),
+                ('skus', models.JSONField(blank=True, default=list)),
+                ('holzarten', models.JSONField(blank=True, default=list)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], default='queued', max_length=20)),
+                ('total_count', models.IntegerField(default=0)),
+                ('processed_count', models.IntegerField(default=0)),
+                ('failed_count', models.IntegerField(default=0)),
+                ('report', models.JSONField(blank=True, default=dict)),
+                ('error_message', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='repricing_jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['user', 'status'], name='extraction__user_id_08d830_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='PricingInputIndex',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('sku', 'Material SKU'), ('holzart', 'Holzart')], max_length=10)),
+                ('key', models.CharField(max_length=100)),
+                ('extraction_result', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pricing_inputs', to='documents.extractionresult')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pricing_inputs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'kind', 'key'], name='extraction__user_id_f5129d_idx')],
+                'constraints': [models.UniqueConstraint(fields=('extraction_result', 'kind', 'key'), name='unique_pricing_input')],
+            },
+        ),
+    ]
@@ -1,6 +1,7 @@
 """Extraction module models - OCR/NER processing."""
 from django.db import models
-from documents.models import Document
+from django.contrib.auth.models import User
+from documents.models import Document, ExtractionResult
 
 
 class ExtractionConfig(models.Model):
@@ -105,3 +106,152 @@ class MaterialExtraction(models.Model):
 
     def __str__(self):
         return f"Materials for {self.document.original_filename}"
+
+
+class ExtractionDeadLetter(models.Model):
+    """Extraction task that failed after exhausting its retries.
+
+    Keeps everything needed to triage and replay the failure: the task
+    payload, where it failed, how long the stages took and a hash of the
+    input file. Failures with the same signature (exception class, stage
+    and normalized message) are grouped for triage.
+    """
+
+    STAGE_CHOICES = [
+        ('load', 'Load'),
+        ('ocr', 'OCR'),
+        ('ner', 'NER'),
+        ('persist', 'Persist'),
+    ]
+
+    STATUS_CHOICES = [
+        ('open', 'Open'),
+        ('redriven', 'Re-driven'),
+        ('resolved', 'Resolved'),
+    ]
+
+    document = models.ForeignKey(
+        Document,
+        on_delete=models.CASCADE,
+        related_name='dead_letters'
+    )
+    batch_id = models.UUIDField(null=True, blank=True)
+
+    # Task context
+    task_id = models.CharField(max_length=255, blank=True)
+    task_payload = models.JSONField(default=dict)
+    retry_count = models.IntegerField(default=0)
+
+    # Failure details
+    exception_class = models.CharField(max_length=255)
+    exception_message = models.TextField(blank=True)
+    traceback = models.TextField(blank=True)
+    stage = models.CharField(max_length=20, choices=STAGE_CHOICES)
+    stage_timings = models.JSONField(default=dict, blank=True)  # ms per stage reached
+    file_hash = models.CharField(max_length=64, blank=True)  # SHA-256 of input file
+    signature = models.CharField(max_length=64, db_index=True)
+
+    # Re-drive tracking
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='open')
+    redrive_count = models.IntegerField(default=0)
+    last_redriven_at = models.DateTimeField(null=True, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'signature']),
+            models.Index(fields=['document', 'status']),
+        ]
+
+    def __str__(self):
+        return f"{self.exception_class} at {self.stage}: {self.document_id}"
+
+
+class PricingInputIndex(models.Model):
+    """Reverse index from pricing inputs to the extractions that use them.
+
+    One row per (extraction, SKU) and (extraction, Holzart) read by the
+    pricing workflow, so a catalog change finds the affected extractions
+    without scanning extracted_data.
+    """
+
+    KIND_CHOICES = [
+        ('sku', 'Material SKU'),
+        ('holzart', 'Holzart'),
+    ]
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='pricing_inputs'
+    )
+    extraction_result = models.ForeignKey(
+        ExtractionResult,
+        on_delete=models.CASCADE,
+        related_name='pricing_inputs'
+    )
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    key = models.CharField(max_length=100)  # SKU as given, Holzart lowercased
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'kind', 'key']),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['extraction_result', 'kind', 'key'],
+                name='unique_pricing_input'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.kind}={self.key} → {self.extraction_result_id}"
+
+
+class RepricingJob(models.Model):
+    """Background repricing after material prices or Holzart factors changed."""
+
+    TRIGGER_CHOICES = [
+        ('materialliste', 'Materialliste upload'),
+        ('holzart_kennzahl', 'Holzart factor change'),
+        ('manual', 'Manual'),
+    ]
+
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='repricing_jobs'
+    )
+    trigger = models.CharField(max_length=20, choices=TRIGGER_CHOICES, default='manual')
+    skus = models.JSONField(default=list, blank=True)
+    holzarten = models.JSONField(default=list, blank=True)
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    total_count = models.IntegerField(default=0)
+    processed_count = models.IntegerField(default=0)
+    failed_count = models.IntegerField(default=0)
+    report = models.JSONField(default=dict, blank=True)  # Per-extraction/proposal deltas
+    error_message = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', 'status']),
+        ]
+
+    def __str__(self):
+        return f"RepricingJob {self.id} ({self.trigger}, {self.status})"
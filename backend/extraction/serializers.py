@@ -1,6 +1,6 @@
 """Serializers for extraction models."""
 from rest_framework import serializers
-from .models import ExtractionConfig, ExtractedEntity, MaterialExtraction
+from .models import ExtractionConfig, ExtractedEntity, MaterialExtraction, ExtractionDeadLetter
 
 
 class ExtractedEntitySerializer(serializers.ModelSerializer):
@@ -97,3 +97,47 @@ class ExtractionSummarySerializer(serializers.Serializer):
     processing_time_ms = serializers.IntegerField()
     requires_review = serializers.BooleanField()
     created_at = serializers.DateTimeField()
+
+
+class ExtractionDeadLetterSerializer(serializers.ModelSerializer):
+    """Serializer for ExtractionDeadLetter model."""
+
+    document_name = serializers.CharField(source='document.original_filename', read_only=True)
+    stage_display = serializers.CharField(source='get_stage_display', read_only=True)
+
+    class Meta:
+        model = ExtractionDeadLetter
+        fields = (
+            'id',
+            'document',
+            'document_name',
+            'batch_id',
+            'task_id',
+            'task_payload',
+            'retry_count',
+            'exception_class',
+            'exception_message',
+            'traceback',
+            'stage',
+            'stage_display',
+            'stage_timings',
+            'file_hash',
+            'signature',
+            'status',
+            'redrive_count',
+            'last_redriven_at',
+            'created_at',
+            'updated_at',
+        )
+        read_only_fields = fields
+
+
+class DeadLetterRedriveSerializer(serializers.Serializer):
+    """Selection for a bulk re-drive of dead-lettered extractions."""
+
+    ids = serializers.ListField(child=serializers.IntegerField(), required=False)
+    signature = serializers.CharField(max_length=64, required=False)
+    batch_id = serializers.UUIDField(required=False)
+    limit = serializers.IntegerField(min_value=1, required=False)
+    respect_capacity = serializers.BooleanField(default=True)
+    dry_run = serializers.BooleanField(default=False)
@@ -1,7 +1,6 @@
 """Batch document processor for managing bulk document uploads and processing."""
 import logging
 from typing import Dict, List, Any, Optional, Tuple
-from datetime import datetime, timedelta
 from django.db import transaction
 from django.utils import timezone
 from django.contrib.auth.models import User
@@ -9,6 +8,7 @@ from django.contrib.auth.models import User
 from documents.models import Batch, BatchDocument, Document
 from extraction.async_executor import AsyncExecutor
 from extraction.services.base_service import ExtractionServiceError
+from extraction.services.eta_estimator import ETAEstimator
 
 logger = logging.getLogger(__name__)
 
@@ -194,51 +194,46 @@ class BatchProcessor:
                 status='pending'
             )
 
+            batch_docs = list(batch_docs.select_related('document'))
+
+            # Queue all documents in one call (concurrent with Cloud Tasks)
+            try:
+                task_ids = AsyncExecutor.process_documents(
+                    [batch_doc.document.id for batch_doc in batch_docs],
+                    user_id=self.user.id,
+                    batch_id=batch.id
+                )
+                queue_error = "Failed to queue task"
+            except Exception as e:
+                self.logger.error(f"Error queuing batch {batch.id}: {str(e)}")
+                task_ids = {}
+                queue_error = str(e)
+
             queued_count = 0
             for batch_doc in batch_docs:
-                try:
-                    # Queue document for processing
-                    task_id = AsyncExecutor.process_document(
-                        document_id=batch_doc.document.id,
-                        user_id=self.user.id,
-                        batch_id=batch.id
-                    )
-
-                    if task_id:
-                        # Update BatchDocument with task reference
-                        batch_doc.status = 'queued'
-                        batch_doc.cloud_task_id = task_id
-                        batch_doc.save(
-                            update_fields=['status', 'cloud_task_id']
-                        )
-                        queued_count += 1
-                    else:
-                        # Task queuing failed
-                        batch_doc.status = 'failed'
-                        batch_doc.error_message = "Failed to queue task"
-                        batch_doc.save(
-                            update_fields=['status', 'error_message']
-                        )
-                        self.logger.warning(
-                            f"Failed to queue document {batch_doc.document.id}"
-                        )
+                task_id = task_ids.get(str(batch_doc.document.id))
 
-                except Exception as e:
+                if task_id:
+                    # Update BatchDocument with task reference
+                    batch_doc.status = 'queued'
+                    batch_doc.cloud_task_id = task_id
+                    batch_doc.save(
+                        update_fields=['status', 'cloud_task_id']
+                    )
+                    queued_count += 1
+                else:
+                    # Task queuing failed
                     batch_doc.status = 'failed'
-                    batch_doc.error_message = str(e)
+                    batch_doc.error_message = queue_error
                     batch_doc.save(
                         update_fields=['status', 'error_message']
                     )
-                    self.logger.error(
-                        f"Error queuing document {batch_doc.document.id}: {str(e)}"
+                    self.logger.warning(
+                        f"Failed to queue document {batch_doc.document.id}"
                     )
 
-            # Set estimated completion time
-            avg_time_per_doc = 10  # seconds (optimistic estimate)
-            estimated_duration = queued_count * avg_time_per_doc
-            batch.estimated_completion = timezone.now() + timedelta(
-                seconds=estimated_duration
-            )
+            # Set estimated completion time from learned stage durations
+            batch.estimated_completion = ETAEstimator().estimate_batch_completion(batch)
             batch.save(update_fields=['estimated_completion'])
 
             self.logger.info(
@@ -322,9 +317,15 @@ class BatchProcessor:
                 batch.status = 'failed'
 
             batch.completed_at = timezone.now()
+        else:
+            # Refresh ETA with the latest timings and queue depth
+            batch.estimated_completion = ETAEstimator().estimate_batch_completion(batch)
 
         batch.save(
-            update_fields=['processed_count', 'error_count', 'status', 'completed_at']
+            update_fields=[
+                'processed_count', 'error_count', 'status',
+                'completed_at', 'estimated_completion',
+            ]
         )
 
     def get_batch_status(self, batch: Batch) -> Dict[str, Any]:
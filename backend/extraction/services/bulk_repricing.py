@@ -0,0 +1,357 @@
+# -*- coding: utf-8 -*-
+"""Bulk repricing after material prices or Holzart factors changed.
+
+PricingInputIndex maps every SKU and Holzart an extraction is priced with
+back to the extraction. When a Materialliste upload or a HolzartKennzahl
+change touches some of them, a RepricingJob collects the affected
+extractions through the index and reprices them in chunks with
+CalculationEngine.calculate_many, so each chunk reads the pricing snapshot
+once.
+
+The job runs in a Celery worker. Chunks are small, each is written in its
+own short transaction and the worker pauses between chunks, so a large
+catalog update does not hold locks or database connections away from
+live pricing requests.
+"""
+
+import logging
+import time
+from collections import defaultdict
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from documents.models import ExtractionResult
+from extraction.models import PricingInputIndex, RepricingJob
+from extraction.services.calculation_engine import CalculationEngine, CalculationError
+
+logger = logging.getLogger(__name__)
+
+# Proposals whose prices may still change
+OPEN_PROPOSAL_STATUSES = ('draft', 'sent')
+
+
+class PricingInputIndexService:
+    """Maintains PricingInputIndex rows for extractions."""
+
+    @staticmethod
+    def inputs_of(extracted_data: Any) -> Set[Tuple[str, str]]:
+        """(kind, key) pairs of the SKUs and Holzarten an extraction is priced with.
+
+        Reads the same keys the calculation reads: top-level ``material_sku``
+        and ``holzart`` (set by the calculation API and by review of the
+        extracted fields) and per-component ``material.holzart``. Extractions
+        straight from OCR/NER only hold entity counts, are not priced from
+        them and get no rows; they are indexed once those keys are written,
+        since every save of extracted_data re-indexes the extraction.
+
+        Args:
+            extracted_data: ExtractionResult.extracted_data
+
+        Returns:
+            Set of ('sku', sku) and ('holzart', holzart) pairs
+        """
+        if not isinstance(extracted_data, dict):
+            return set()
+
+        inputs = set()
+        sku = extracted_data.get('material_sku')
+        if sku:
+            inputs.add(('sku', str(sku)))
+        holzart = extracted_data.get('holzart')
+        if holzart:
+            inputs.add(('holzart', str(holzart).lower()))
+
+        for component in extracted_data.get('components') or []:
+            material = component.get('material') if isinstance(component, dict) else None
+            if isinstance(material, dict) and material.get('holzart'):
+                inputs.add(('holzart', str(material['holzart']).lower()))
+
+        return inputs
+
+    @classmethod
+    def index_extraction(cls, extraction_result: ExtractionResult) -> int:
+        """Replace the index rows of one extraction.
+
+        Args:
+            extraction_result: ExtractionResult instance
+
+        Returns:
+            Number of index rows written
+        """
+        user_id = extraction_result.document.user_id
+        rows = [
+            PricingInputIndex(
+                user_id=user_id,
+                extraction_result_id=extraction_result.pk,
+                kind=kind,
+                key=key,
+            )
+            for kind, key in sorted(cls.inputs_of(extraction_result.extracted_data))
+        ]
+
+        with transaction.atomic():
+            PricingInputIndex.objects.filter(extraction_result_id=extraction_result.pk).delete()
+            PricingInputIndex.objects.bulk_create(rows)
+        return len(rows)
+
+    @classmethod
+    def rebuild(cls, user: User) -> int:
+        """Re-index all extractions of a user.
+
+        Args:
+            user: Django User instance
+
+        Returns:
+            Number of index rows written
+        """
+        extractions = ExtractionResult.objects.filter(document__user=user).only('id', 'extracted_data')
+        rows = [
+            PricingInputIndex(user=user, extraction_result_id=extraction.pk, kind=kind, key=key)
+            for extraction in extractions.iterator()
+            for kind, key in sorted(cls.inputs_of(extraction.extracted_data))
+        ]
+
+        with transaction.atomic():
+            PricingInputIndex.objects.filter(user=user).delete()
+            PricingInputIndex.objects.bulk_create(rows, batch_size=1000)
+
+        logger.info(f"Rebuilt pricing input index for user {user.id}: {len(rows)} rows")
+        return len(rows)
+
+    @staticmethod
+    def find(
+        user_id: int,
+        skus: Iterable[str] = (),
+        holzarten: Iterable[str] = (),
+    ) -> List[int]:
+        """Ids of the extractions priced with any of the SKUs or Holzarten.
+
+        Args:
+            user_id: Owner of the extractions
+            skus: Changed material SKUs
+            holzarten: Changed Holzarten (any case)
+
+        Returns:
+            Sorted ExtractionResult ids
+        """
+        from django.db.models import Q
+
+        skus = [str(sku) for sku in skus]
+        holzarten = [str(holzart).lower() for holzart in holzarten]
+        if not skus and not holzarten:
+            return []
+
+        return list(
+            PricingInputIndex.objects.filter(user_id=user_id)
+            .filter(Q(kind='sku', key__in=skus) | Q(kind='holzart', key__in=holzarten))
+            .values_list('extraction_result_id', flat=True)
+            .distinct()
+            .order_by('extraction_result_id')
+        )
+
+
+class BulkRepricingService:
+    """
+    Create and run RepricingJobs.
+
+    Example:
+        >>> job = BulkRepricingService.enqueue(user, skus=['EICHE-25MM'], trigger='materialliste')
+        >>> job = BulkRepricingService().run(job)  # Normally done by the Celery task
+        >>> job.report['proposals']
+        [{'proposal_id': ..., 'old_price_eur': 1200.0, 'new_price_eur': 1254.5, ...}]
+    """
+
+    DEFAULT_CHUNK_SIZE = 100
+    DEFAULT_CHUNK_PAUSE_SECONDS = 0.5
+
+    def __init__(self, chunk_size: Optional[int] = None, pause_seconds: Optional[float] = None):
+        """Initialize with throttling limits.
+
+        Args:
+            chunk_size: Extractions per chunk (REPRICING_CHUNK_SIZE)
+            pause_seconds: Pause between chunks (REPRICING_CHUNK_PAUSE_SECONDS)
+        """
+        self.chunk_size = chunk_size or getattr(settings, 'REPRICING_CHUNK_SIZE', self.DEFAULT_CHUNK_SIZE)
+        self.pause_seconds = (
+            pause_seconds if pause_seconds is not None
+            else getattr(settings, 'REPRICING_CHUNK_PAUSE_SECONDS', self.DEFAULT_CHUNK_PAUSE_SECONDS)
+        )
+
+    # =====================
+    # JOBS
+    # =====================
+
+    @staticmethod
+    def enqueue(
+        user: User,
+        skus: Iterable[str] = (),
+        holzarten: Iterable[str] = (),
+        trigger: str = 'manual',
+    ) -> Optional[RepricingJob]:
+        """Create a RepricingJob and start it once the transaction commits.
+
+        Args:
+            user: Owner of the changed prices
+            skus: Changed material SKUs
+            holzarten: Changed Holzarten
+            trigger: What caused the job (see RepricingJob.TRIGGER_CHOICES)
+
+        Returns:
+            The queued job, or None if nothing changed
+        """
+        skus = sorted({str(sku) for sku in skus if sku})
+        holzarten = sorted({str(holzart).lower() for holzart in holzarten if holzart})
+        if not skus and not holzarten:
+            return None
+
+        job = RepricingJob.objects.create(user=user, trigger=trigger, skus=skus, holzarten=holzarten)
+
+        def dispatch():
+            from extraction.tasks import reprice_job_async
+
+            try:
+                reprice_job_async.delay(job.id)
+            except Exception as e:
+                # Job stays queued and can be run again
+                logger.error(f"Could not dispatch repricing job {job.id}: {e}")
+
+        transaction.on_commit(dispatch)
+        logger.info(
+            f"Queued repricing job {job.id} for user {user.id} "
+            f"({trigger}: {len(skus)} SKUs, {len(holzarten)} Holzarten)"
+        )
+        return job
+
+    def run(self, job: RepricingJob) -> RepricingJob:
+        """Reprice every extraction affected by the job.
+
+        Stores the new price in extracted_data['calculated_price'] and
+        reports the delta per extraction and per open proposal. Proposal
+        lines and totals are left to the user to accept.
+
+        Args:
+            job: RepricingJob to run
+
+        Returns:
+            The finished job
+        """
+        job.status = 'running'
+        job.started_at = timezone.now()
+        job.save(update_fields=['status', 'started_at'])
+
+        try:
+            engine = CalculationEngine(job.user)
+            ids = PricingInputIndexService.find(job.user_id, job.skus, job.holzarten)
+            job.total_count = len(ids)
+            job.report = {'extractions': [], 'proposals': [], 'errors': []}
+            job.save(update_fields=['total_count', 'report'])
+
+            for start in range(0, len(ids), self.chunk_size):
+                if start:
+                    time.sleep(self.pause_seconds)
+                self._run_chunk(engine, job, ids[start:start + self.chunk_size])
+                job.save(update_fields=['processed_count', 'failed_count', 'report'])
+
+        except CalculationError as e:
+            logger.error(f"Repricing job {job.id} failed: {e}")
+            job.status = 'failed'
+            job.error_message = str(e)
+        else:
+            job.status = 'completed'
+            job.report['total_delta_eur'] = round(
+                sum(
+                    item['delta_eur'] for item in job.report['extractions']
+                    if item['delta_eur'] is not None
+                ), 2
+            )
+
+        job.completed_at = timezone.now()
+        job.save(update_fields=['status', 'error_message', 'report', 'completed_at'])
+
+        logger.info(
+            f"Repricing job {job.id} {job.status}: {job.processed_count}/{job.total_count} "
+            f"repriced, {job.failed_count} failed"
+        )
+        return job
+
+    def _run_chunk(self, engine: CalculationEngine, job: RepricingJob, ids: List[int]) -> None:
+        """Reprice one chunk of extractions and record the deltas."""
+        from proposals.models import Proposal
+
+        extractions = list(
+            ExtractionResult.objects.filter(id__in=ids).select_related('document').order_by('id')
+        )
+        proposals = {
+            proposal.document_id: proposal
+            for proposal in Proposal.objects.filter(
+                document_id__in=[extraction.document_id for extraction in extractions],
+                status__in=OPEN_PROPOSAL_STATUSES,
+            )
+        }
+
+        # calculate_many applies one customer tier per batch
+        by_customer_type: Dict[str, List[ExtractionResult]] = defaultdict(list)
+        for extraction in extractions:
+            customer_type = extraction.extracted_data.get('customer_type', 'neue_kunden')
+            by_customer_type[customer_type].append(extraction)
+
+        changed = []
+        for customer_type, group in by_customer_type.items():
+            batch = engine.calculate_many(
+                [extraction.extracted_data for extraction in group],
+                customer_type=customer_type,
+            )
+            for extraction, item in zip(group, batch['items']):
+                if item['status'] != 'ok':
+                    job.failed_count += 1
+                    job.report['errors'].append({
+                        'extraction_result_id': extraction.pk,
+                        'error': item['error'],
+                    })
+                    continue
+
+                old_price = extraction.extracted_data.get('calculated_price')
+                new_price = item['result']['total_price_eur']
+                delta = self._delta(old_price, new_price)
+                job.report['extractions'].append(dict(delta, extraction_result_id=extraction.pk))
+
+                proposal = proposals.get(extraction.document_id)
+                if proposal is not None:
+                    job.report['proposals'].append(dict(
+                        delta,
+                        proposal_id=str(proposal.id),
+                        proposal_number=proposal.proposal_number,
+                        status=proposal.status,
+                        proposal_total_eur=float(proposal.total),
+                    ))
+
+                extraction.extracted_data['calculated_price'] = new_price
+                changed.append(extraction)
+                job.processed_count += 1
+
+        with transaction.atomic():
+            ExtractionResult.objects.bulk_update(changed, ['extracted_data'])
+
+    @staticmethod
+    def _delta(old_price: Any, new_price: float) -> Dict[str, Any]:
+        """Old/new price and the change in EUR and percent.
+
+        Without an old price there is no change to report: the deltas are
+        None and the row is left out of the job total.
+        """
+        new = Decimal(str(new_price))
+        if old_price is None:
+            return {'old_price_eur': None, 'new_price_eur': float(new), 'delta_eur': None, 'delta_percent': None}
+        old = Decimal(str(old_price))
+        delta = new - old
+        return {
+            'old_price_eur': float(old),
+            'new_price_eur': float(new),
+            'delta_eur': float(round(delta, 2)),
+            'delta_percent': float(round(delta / old * 100, 2)) if old else None,
+        }
@@ -11,25 +11,39 @@ Implements the 8-step pricing workflow:
 7. Apply seasonal adjustments (TIER 3)
 8. Apply customer discounts/bulk discounts (TIER 3)
 
-All calculations use Decimal for financial precision.
+Amounts are fixed-point Money ints (core.money) and are converted to
+floats only when the result is built. Configuration is read from the user's PricingSnapshot, so a calculation on a warm snapshot
+runs without database queries. Results are memoized per input fingerprint,
+snapshot version and date (PricingResultCache).
+
+Calculations can be traced (core.tracing): wall time, DB queries and cache
+hits per step, returned with the result on request and sampled into the
+'pricing' TraceHistogram (PRICING_TRACE_SAMPLE_RATE).
 """
 
 import logging
+import random
 from typing import Dict, Any, Optional, List, Tuple
 from decimal import Decimal
 from datetime import date
 
+from django.conf import settings
 from django.contrib.auth.models import User
 from django.utils import timezone
 
-from documents.betriebskennzahl_models import (
-    IndividuelleBetriebskennzahl,
-    MateriallistePosition,
-    SaisonaleMarge,
-)
+from core import money
+from core.money import Money
+from core.tracing import Trace, TraceHistogram, record_cache, span
+
+from documents.betriebskennzahl_models import IndividuelleBetriebskennzahl
+from documents.services.pricing_snapshot import PricingSnapshot, PricingSnapshotService
+from extraction.services.pricing_result_cache import PricingResultCache
 
 logger = logging.getLogger(__name__)
 
+# Material cost estimate when neither a SKU nor material_cost_eur is given
+DEFAULT_MATERIAL_COST = money.to_money(100)
+
 
 class CalculationError(Exception):
     """Exception for calculation engine errors."""
@@ -74,20 +88,40 @@ class CalculationEngine:
             raise CalculationError("User is required for calculation engine")
 
         self.user = user
+        self._config = None
 
         # Load user's configuration
-        try:
-            self.config = IndividuelleBetriebskennzahl.objects.get(user=user)
-        except IndividuelleBetriebskennzahl.DoesNotExist:
+        self.snapshot = self._load_snapshot()
+
+        logger.info(f"CalculationEngine initialized for user {user.id}")
+
+    @property
+    def config(self) -> IndividuelleBetriebskennzahl:
+        """User's Betriebskennzahl model instance (loaded on first access).
+
+        Calculations read self.snapshot instead.
+        """
+        if self._config is None:
+            self._config = IndividuelleBetriebskennzahl.objects.get(user=self.user)
+        return self._config
+
+    def _load_snapshot(self) -> PricingSnapshot:
+        """Get the user's current pricing snapshot.
+
+        Raises:
+            CalculationError: If configuration is missing or inactive
+        """
+        snapshot = PricingSnapshotService.get(self.user)
+        if snapshot is None:
             raise CalculationError(
-                f"User {user.id} has no Betriebskennzahl configuration. "
+                f"User {self.user.id} has no Betriebskennzahl configuration. "
                 "Please configure before pricing."
             )
 
-        if not self.config.is_active:
-            raise CalculationError(f"User {user.id} betriebskennzahl is inactive")
+        if not snapshot.is_active:
+            raise CalculationError(f"User {self.user.id} betriebskennzahl is inactive")
 
-        logger.info(f"CalculationEngine initialized for user {user.id}")
+        return snapshot
 
     def calculate_project_price(
         self,
@@ -96,6 +130,8 @@ class CalculationEngine:
         customer_type: str = 'neue_kunden',
         breakdown: bool = True,
         extraction_result=None,
+        trace: bool = False,
+        preview: bool = False,
     ) -> Dict[str, Any]:
         """
         Calculate complete project price through 8-step workflow.
@@ -108,9 +144,14 @@ class CalculationEngine:
                 - material_sku: Optional custom material SKU
                 - material_quantity: Quantity of material needed
                 - labor_hours: Estimated labor hours
+                - lieferdatum: Optional delivery date ('YYYY-MM-DD'); seasonal
+                  rules are applied for this date instead of today
             quantity: Override quantity from extracted_data
             customer_type: 'neue_kunden', 'bestehende_kunden'
             breakdown: Return detailed calculation breakdown
+            trace: Record per-step timings and return them as 'trace'
+            preview: Calculate Pauschalen without writing PauschaleAnwendung
+                rows (commit later with PauschaleCalculationService)
 
         Returns:
             Dict with:
@@ -119,6 +160,7 @@ class CalculationEngine:
             - breakdown: Detailed calculation steps
             - warnings: Any warnings during calculation
             - tiers_applied: Which tiers were used
+            - trace: Span tree (only if trace=True)
 
         Raises:
             CalculationError: If calculation fails
@@ -128,35 +170,207 @@ class CalculationEngine:
             f"holzart={extracted_data.get('holzart')}"
         )
 
+        if not trace and not self._sample_trace():
+            return self._price_project(
+                extracted_data, quantity, customer_type, breakdown, extraction_result, preview
+            )
+
+        with Trace('calculate_project_price', user_id=self.user.id) as active:
+            result = self._price_project(
+                extracted_data, quantity, customer_type, breakdown, extraction_result, preview
+            )
+        TraceHistogram('pricing').observe(active)
+
+        if trace:
+            # Copy: the cached result must not carry a trace
+            result = dict(result, trace=active.to_dict())
+        return result
+
+    def _price_project(
+        self,
+        extracted_data: Dict[str, Any],
+        quantity: Optional[int],
+        customer_type: str,
+        breakdown: bool,
+        extraction_result,
+        preview: bool = False,
+    ) -> Dict[str, Any]:
+        """calculate_project_price without tracing setup."""
+        # Pick up configuration changes made since the last call
+        with span('snapshot'):
+            self.snapshot = self._load_snapshot()
+
+        # Pauschalen rules live outside the snapshot, those calls always run
+        if not self._is_memoizable(extracted_data, extraction_result):
+            return self._calculate(
+                extracted_data,
+                quantity=quantity,
+                customer_type=customer_type,
+                breakdown=breakdown,
+                extraction_result=extraction_result,
+                preview=preview,
+            )
+
+        with span('result_cache'):
+            key = self._result_key(extracted_data, customer_type, quantity, breakdown)
+            cached = PricingResultCache.get(key)
+            record_cache(cached is not None)
+        if cached is not None:
+            PricingResultCache.record(self.user.id, hits=1)
+            logger.debug(f"Pricing result cache hit for user {self.user.id}")
+            return cached
+
+        result = self._calculate(
+            extracted_data,
+            quantity=quantity,
+            customer_type=customer_type,
+            breakdown=breakdown,
+        )
+        PricingResultCache.set(key, result)
+        PricingResultCache.record(self.user.id, misses=1)
+        return result
+
+    def calculate_many(
+        self,
+        items: List[Dict[str, Any]],
+        customer_type: str = 'neue_kunden',
+        breakdown: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        Calculate prices for many positions (e.g. a Leistungsverzeichnis).
+
+        The pricing snapshot is loaded once for the whole batch, so all
+        SKUs and factors are resolved with the same few queries no matter
+        how many positions are priced. A failing position does not stop
+        the batch.
+
+        Args:
+            items: extracted_data dicts, one per position
+            customer_type: Customer tier applied to all positions
+            breakdown: Include the calculation breakdown per position
+
+        Returns:
+            Dict with:
+            - items: Per position {'index', 'status', 'result' or 'error'}
+            - total_price_eur: Sum over the positions priced successfully
+            - count / succeeded / failed: Position counts
+
+        Raises:
+            CalculationError: If the user's configuration is missing or inactive
+        """
+        logger.info(f"Calculating {len(items)} positions for user {self.user.id}")
+
+        self.snapshot = self._load_snapshot()
+
+        keys = [
+            self._result_key(extracted_data, customer_type, None, breakdown)
+            if self._is_memoizable(extracted_data) else None
+            for extracted_data in items
+        ]
+        cached = PricingResultCache.get_many(key for key in keys if key)
+        computed = {}
+
+        results = []
+        total = money.ZERO
+        failed = 0
+
+        for index, (extracted_data, key) in enumerate(zip(items, keys)):
+            result = cached.get(key) if key else None
+            if result is None:
+                try:
+                    result = self._calculate(
+                        extracted_data,
+                        customer_type=customer_type,
+                        breakdown=breakdown,
+                    )
+                except CalculationError as e:
+                    failed += 1
+                    results.append({'index': index, 'status': 'error', 'error': str(e)})
+                    continue
+                if key:
+                    computed[key] = result
+
+            total += money.to_money(result['total_price_eur'])
+            results.append({'index': index, 'status': 'ok', 'result': result})
+
+        PricingResultCache.set_many(computed)
+        hits = sum(1 for key in keys if key in cached)
+        PricingResultCache.record(self.user.id, hits=hits, misses=sum(1 for key in keys if key) - hits)
+
+        return {
+            'items': results,
+            'total_price_eur': money.to_float(total),
+            'count': len(items),
+            'succeeded': len(items) - failed,
+            'failed': failed,
+            'currency': 'EUR',
+            'calculated_at': timezone.now().isoformat(),
+        }
+
+    @staticmethod
+    def _sample_trace() -> bool:
+        """Whether to trace this call for the histogram only."""
+        rate = getattr(settings, 'PRICING_TRACE_SAMPLE_RATE', 0.0)
+        return rate > 0 and random.random() < rate
+
+    def _is_memoizable(self, extracted_data: Any, extraction_result=None) -> bool:
+        """Whether a result depends only on the inputs and the snapshot."""
+        from documents.schemas.multi_material_schema import is_multi_material_extraction
+
+        if extraction_result is not None or not isinstance(extracted_data, dict):
+            return False
+        # Multi-material costs are looked up outside the snapshot
+        return not is_multi_material_extraction(extracted_data)
+
+    def _result_key(
+        self,
+        extracted_data: Dict[str, Any],
+        customer_type: str,
+        quantity: Optional[int],
+        breakdown: bool,
+    ) -> str:
+        """Result cache key for the current snapshot and date."""
+        return PricingResultCache.key(
+            self.user.id,
+            self.snapshot.version,
+            timezone.now().date(),
+            PricingResultCache.fingerprint(extracted_data, customer_type, quantity, breakdown),
+        )
+
+    def _calculate(
+        self,
+        extracted_data: Dict[str, Any],
+        quantity: Optional[int] = None,
+        customer_type: str = 'neue_kunden',
+        breakdown: bool = True,
+        extraction_result=None,
+        preview: bool = False,
+    ) -> Dict[str, Any]:
+        """Run the 8-step workflow against the loaded snapshot."""
         try:
             breakdown_data = {}
             warnings = []
-            tiers_applied = {
-                'tier_1_global': self.config.use_handwerk_standard,
-                'tier_2_company': True,  # Always apply
-                'tier_3_dynamic': (
-                    self.config.use_seasonal_adjustments or
-                    self.config.use_customer_discounts or
-                    self.config.use_bulk_discounts
-                ),
-            }
 
             # Step 1: Get base material cost
-            base_price = self._step_1_get_base_material_cost(
-                extracted_data, breakdown_data, warnings
-            )
+            with span('step_1_base_material'):
+                base_price = self._step_1_get_base_material_cost(
+                    extracted_data, breakdown_data, warnings
+                )
 
             # Step 2-4: Apply TIER 1 factors (if enabled)
-            if self.config.use_handwerk_standard:
-                base_price = self._step_2_apply_wood_type(
-                    base_price, extracted_data, breakdown_data, warnings
-                )
-                base_price = self._step_3_apply_surface_finish(
-                    base_price, extracted_data, breakdown_data, warnings
-                )
-                base_price = self._step_4_apply_complexity(
-                    base_price, extracted_data, breakdown_data, warnings
-                )
+            if self.snapshot.use_handwerk_standard:
+                with span('step_2_wood_type'):
+                    base_price = self._step_2_apply_wood_type(
+                        base_price, extracted_data, breakdown_data, warnings
+                    )
+                with span('step_3_surface_finish'):
+                    base_price = self._step_3_apply_surface_finish(
+                        base_price, extracted_data, breakdown_data, warnings
+                    )
+                with span('step_4_complexity'):
+                    base_price = self._step_4_apply_complexity(
+                        base_price, extracted_data, breakdown_data, warnings
+                    )
             else:
                 logger.debug("TIER 1 (global standards) disabled")
                 breakdown_data['step_2_wood_type'] = {
@@ -173,25 +387,29 @@ class CalculationEngine:
                 }
 
             # Step 5: Calculate labor cost
-            labor_price = self._step_5_calculate_labor(
-                extracted_data, breakdown_data, warnings
-            )
+            with span('step_5_labor'):
+                labor_price = self._step_5_calculate_labor(
+                    extracted_data, breakdown_data, warnings
+                )
 
             # Step 6: Add overhead and profit margin (TIER 2)
-            total_with_overhead = self._step_6_add_overhead_and_margin(
-                base_price + labor_price, breakdown_data, warnings
-            )
+            with span('step_6_overhead_and_margin'):
+                total_with_overhead = self._step_6_add_overhead_and_margin(
+                    base_price + labor_price, breakdown_data, warnings
+                )
 
             # Step 7: Apply seasonal adjustments (TIER 3)
-            with_seasonal = self._step_7_apply_seasonal_adjustments(
-                total_with_overhead, extracted_data, breakdown_data, warnings
-            )
+            with span('step_7_seasonal_adjustments'):
+                with_seasonal = self._step_7_apply_seasonal_adjustments(
+                    total_with_overhead, extracted_data, breakdown_data, warnings
+                )
 
             # Step 8: Apply customer discounts/bulk pricing (TIER 3)
-            final_price = self._step_8_apply_customer_discounts(
-                with_seasonal, extracted_data, customer_type,
-                breakdown_data, warnings
-            )
+            with span('step_8_customer_discounts'):
+                final_price = self._step_8_apply_customer_discounts(
+                    with_seasonal, extracted_data, customer_type,
+                    breakdown_data, warnings
+                )
 
             # Phase 4C: Multi-Material Check
             from documents.schemas.multi_material_schema import is_multi_material_extraction
@@ -199,8 +417,9 @@ class CalculationEngine:
 
             if is_multi_material_extraction(extracted_data):
                 logger.info("Multi-material extraction detected, calculating separate costs")
-                multi_result = calculate_multi_material_cost(self.user, extracted_data)
-                material_cost = Decimal(str(multi_result['total_material_cost']))
+                with span('multi_material'):
+                    multi_result = calculate_multi_material_cost(self.user, extracted_data)
+                material_cost = money.to_money(multi_result['total_material_cost'])
                 breakdown_data['multi_material_breakdown'] = multi_result
             else:
                 material_cost = base_price
@@ -210,31 +429,30 @@ class CalculationEngine:
             if extraction_result:
                 from documents.services.pauschale_calculation_service import PauschaleCalculationService
                 pauschale_service = PauschaleCalculationService(self.user, extraction_result)
-                pauschalen_result = pauschale_service.calculate_all_pauschalen(
-                    auftragswert=final_price,
-                    context={
-                        'auftragswert': final_price,
-                        'distanz_km': extracted_data.get('distanz_km', 0),
-                        'montage_stunden': extracted_data.get('labor_hours', 0),
-                        'material_menge': extracted_data.get('material_quantity', 0),
-                    }
-                )
-                final_price += Decimal(str(pauschalen_result['total']))
+                auftragswert = money.to_decimal(final_price, places=9)
+                with span('pauschalen'):
+                    pauschalen_result = pauschale_service.calculate_all_pauschalen(
+                        auftragswert=auftragswert,
+                        context={
+                            'auftragswert': auftragswert,
+                            'distanz_km': extracted_data.get('distanz_km', 0),
+                            'montage_stunden': extracted_data.get('labor_hours', 0),
+                            'material_menge': extracted_data.get('material_quantity', 0),
+                        },
+                        preview=preview,
+                    )
+                final_price += money.to_money(pauschalen_result['total'])
                 logger.info(f"Applied {len(pauschalen_result['pauschalen'])} Pauschalen, total: {pauschalen_result['total']} EUR")
 
-            return {
-                'total_price_eur': float(final_price),
-                'base_price_eur': float(base_price),
-                'material_price_eur': float(material_cost),
-                'labor_price_eur': float(labor_price),
-                'final_price_eur': float(final_price),
-                'pauschalen': pauschalen_result,
-                'breakdown': breakdown_data if breakdown else {},
-                'warnings': warnings,
-                'tiers_applied': tiers_applied,
-                'currency': 'EUR',
-                'calculated_at': timezone.now().isoformat(),
-            }
+            return self._build_result(
+                final_price=final_price,
+                base_price=base_price,
+                material_cost=material_cost,
+                labor_price=labor_price,
+                pauschalen_result=pauschalen_result,
+                breakdown_data=breakdown_data if breakdown else {},
+                warnings=warnings,
+            )
 
         except CalculationError:
             raise
@@ -242,6 +460,39 @@ class CalculationEngine:
             logger.error(f"Calculation failed for user {self.user.id}: {e}")
             raise CalculationError(f"Calculation failed: {e}")
 
+    def _build_result(
+        self,
+        final_price: Money,
+        base_price: Money,
+        material_cost: Money,
+        labor_price: Money,
+        pauschalen_result: Dict[str, Any],
+        breakdown_data: Dict[str, Any],
+        warnings: List[str],
+    ) -> Dict[str, Any]:
+        """Result dict of calculate_project_price."""
+        return {
+            'total_price_eur': money.to_float(final_price),
+            'base_price_eur': money.to_float(base_price),
+            'material_price_eur': money.to_float(material_cost),
+            'labor_price_eur': money.to_float(labor_price),
+            'final_price_eur': money.to_float(final_price),
+            'pauschalen': pauschalen_result,
+            'breakdown': breakdown_data,
+            'warnings': warnings,
+            'tiers_applied': {
+                'tier_1_global': self.snapshot.use_handwerk_standard,
+                'tier_2_company': True,  # Always apply
+                'tier_3_dynamic': (
+                    self.snapshot.use_seasonal_adjustments or
+                    self.snapshot.use_customer_discounts or
+                    self.snapshot.use_bulk_discounts
+                ),
+            },
+            'currency': 'EUR',
+            'calculated_at': timezone.now().isoformat(),
+        }
+
     # =====================
     # 8-STEP WORKFLOW
     # =====================
@@ -251,45 +502,41 @@ class CalculationEngine:
         extracted_data: Dict[str, Any],
         breakdown_data: Dict[str, Any],
         warnings: List[str],
-    ) -> Decimal:
+    ) -> Money:
         """Step 1: Get base material cost (custom or standard)."""
         material_sku = extracted_data.get('material_sku')
         material_quantity = extracted_data.get('material_quantity', 1)
 
         try:
-            if self.config.use_custom_materials and material_sku:
+            if self.snapshot.use_custom_materials and material_sku:
                 # Use custom material price
-                material = MateriallistePosition.objects.get(
-                    user=self.user,
-                    sku=material_sku,
-                    is_enabled=True
-                )
-                base_cost = material.standardkosten_eur * Decimal(str(material_quantity))
+                material = self.snapshot.materialien[material_sku]
+                base_cost = money.times(material.standardkosten, material_quantity)
 
                 breakdown_data['step_1_base_material'] = {
                     'method': 'custom_material_list',
                     'sku': material_sku,
-                    'cost_per_unit': float(material.standardkosten_eur),
+                    'cost_per_unit': money.to_float(material.standardkosten),
                     'quantity': material_quantity,
-                    'total_cost_eur': float(base_cost),
+                    'total_cost_eur': money.to_float(base_cost),
                 }
                 logger.debug(f"Using custom material: {material_sku}")
 
             else:
                 # Use extracted material cost (if provided) or standard estimate
-                extracted_cost = extracted_data.get('material_cost_eur', Decimal('0'))
-                base_cost = Decimal(str(extracted_cost)) if extracted_cost else Decimal('100.00')
+                extracted_cost = extracted_data.get('material_cost_eur', 0)
+                base_cost = money.to_money(extracted_cost) if extracted_cost else DEFAULT_MATERIAL_COST
 
                 breakdown_data['step_1_base_material'] = {
                     'method': 'extracted_or_default',
-                    'cost_eur': float(base_cost),
+                    'cost_eur': money.to_float(base_cost),
                     'source': 'extracted_data' if extracted_cost else 'default_estimate',
                 }
                 logger.debug(f"Using extracted/default material cost: {base_cost}")
 
             return base_cost
 
-        except MateriallistePosition.DoesNotExist:
+        except KeyError:
             warning = f"Custom material not found: {material_sku}. Using default estimate."
             warnings.append(warning)
             logger.warning(warning)
@@ -298,19 +545,19 @@ class CalculationEngine:
                 'cost_eur': 100.0,
                 'reason': f'Material SKU not found: {material_sku}'
             }
-            return Decimal('100.00')
+            return DEFAULT_MATERIAL_COST
 
     def _step_2_apply_wood_type(
         self,
-        price: Decimal,
+        price: Money,
         extracted_data: Dict[str, Any],
         breakdown_data: Dict[str, Any],
         warnings: List[str],
-    ) -> Decimal:
+    ) -> Money:
         """Step 2: Apply wood type (Holzart) pricing factor (TIER 1)."""
         holzart = extracted_data.get('holzart', '').lower()
 
-        if not holzart or not self.config.handwerk_template:
+        if not holzart or not self.snapshot.has_template:
             breakdown_data['step_2_wood_type'] = {
                 'applied': False,
                 'reason': 'No holzart specified or template not configured'
@@ -318,21 +565,15 @@ class CalculationEngine:
             return price
 
         try:
-            from documents.betriebskennzahl_models import HolzartKennzahl
+            factor = self.snapshot.holzarten[holzart]
 
-            factor = HolzartKennzahl.objects.get(
-                template=self.config.handwerk_template,
-                holzart=holzart,
-                is_enabled=True
-            )
-
-            adjusted_price = price * factor.preis_faktor
+            adjusted_price = money.apply(price, factor.preis_rate)
             breakdown_data['step_2_wood_type'] = {
                 'applied': True,
                 'holzart': holzart,
-                'factor': float(factor.preis_faktor),
-                'price_before_eur': float(price),
-                'price_after_eur': float(adjusted_price),
+                'factor': money.rate_to_float(factor.preis_rate),
+                'price_before_eur': money.to_float(price),
+                'price_after_eur': money.to_float(adjusted_price),
             }
             logger.debug(f"Applied holzart factor: {holzart} × {factor.preis_faktor}")
             return adjusted_price
@@ -350,15 +591,15 @@ class CalculationEngine:
 
     def _step_3_apply_surface_finish(
         self,
-        price: Decimal,
+        price: Money,
         extracted_data: Dict[str, Any],
         breakdown_data: Dict[str, Any],
         warnings: List[str],
-    ) -> Decimal:
+    ) -> Money:
         """Step 3: Apply surface finish (Oberflächenbearbeitung) factor (TIER 1)."""
         oberflaeche = extracted_data.get('oberflaeche', '').lower()
 
-        if not oberflaeche or not self.config.handwerk_template:
+        if not oberflaeche or not self.snapshot.has_template:
             breakdown_data['step_3_surface_finish'] = {
                 'applied': False,
                 'reason': 'No oberflaeche specified or template not configured'
@@ -366,22 +607,16 @@ class CalculationEngine:
             return price
 
         try:
-            from documents.betriebskennzahl_models import OberflächenbearbeitungKennzahl
-
-            factor = OberflächenbearbeitungKennzahl.objects.get(
-                template=self.config.handwerk_template,
-                bearbeitung=oberflaeche,
-                is_enabled=True
-            )
+            factor = self.snapshot.oberflaechen[oberflaeche]
 
-            adjusted_price = price * factor.preis_faktor
+            adjusted_price = money.apply(price, factor.preis_rate)
             breakdown_data['step_3_surface_finish'] = {
                 'applied': True,
                 'bearbeitung': oberflaeche,
-                'price_factor': float(factor.preis_faktor),
-                'time_factor': float(factor.zeit_faktor),
-                'price_before_eur': float(price),
-                'price_after_eur': float(adjusted_price),
+                'price_factor': money.rate_to_float(factor.preis_rate),
+                'time_factor': money.rate_to_float(factor.zeit_rate),
+                'price_before_eur': money.to_float(price),
+                'price_after_eur': money.to_float(adjusted_price),
             }
             logger.debug(f"Applied oberflaeche factor: {oberflaeche} × {factor.preis_faktor}")
             return adjusted_price
@@ -399,15 +634,15 @@ class CalculationEngine:
 
     def _step_4_apply_complexity(
         self,
-        price: Decimal,
+        price: Money,
         extracted_data: Dict[str, Any],
         breakdown_data: Dict[str, Any],
         warnings: List[str],
-    ) -> Decimal:
+    ) -> Money:
         """Step 4: Apply complexity (Komplexität) technique factor (TIER 1)."""
         komplexitaet = extracted_data.get('komplexitaet', '').lower()
 
-        if not komplexitaet or not self.config.handwerk_template:
+        if not komplexitaet or not self.snapshot.has_template:
             breakdown_data['step_4_complexity'] = {
                 'applied': False,
                 'reason': 'No komplexitaet specified or template not configured'
@@ -415,23 +650,17 @@ class CalculationEngine:
             return price
 
         try:
-            from documents.betriebskennzahl_models import KomplexitaetKennzahl
+            factor = self.snapshot.komplexitaeten[komplexitaet]
 
-            factor = KomplexitaetKennzahl.objects.get(
-                template=self.config.handwerk_template,
-                technik=komplexitaet,
-                is_enabled=True
-            )
-
-            adjusted_price = price * factor.preis_faktor
+            adjusted_price = money.apply(price, factor.preis_rate)
             breakdown_data['step_4_complexity'] = {
                 'applied': True,
                 'technik': komplexitaet,
-                'difficulty': factor.get_schwierigkeitsgrad_display(),
-                'price_factor': float(factor.preis_faktor),
-                'time_factor': float(factor.zeit_faktor),
-                'price_before_eur': float(price),
-                'price_after_eur': float(adjusted_price),
+                'difficulty': factor.schwierigkeitsgrad_display,
+                'price_factor': money.rate_to_float(factor.preis_rate),
+                'time_factor': money.rate_to_float(factor.zeit_rate),
+                'price_before_eur': money.to_float(price),
+                'price_after_eur': money.to_float(adjusted_price),
             }
             logger.debug(f"Applied komplexitaet factor: {komplexitaet} × {factor.preis_faktor}")
             return adjusted_price
@@ -452,64 +681,68 @@ class CalculationEngine:
         extracted_data: Dict[str, Any],
         breakdown_data: Dict[str, Any],
         warnings: List[str],
-    ) -> Decimal:
+    ) -> Money:
         """Step 5: Calculate labor cost from estimated hours."""
-        labor_hours = Decimal(str(extracted_data.get('labor_hours', 0)))
+        labor_hours = money.to_rate(extracted_data.get('labor_hours', 0))
+        hourly_rate = self.snapshot.stundensatz
 
         if labor_hours <= 0:
             breakdown_data['step_5_labor'] = {
                 'hours': 0,
-                'hourly_rate_eur': float(self.config.stundensatz_arbeit),
+                'hourly_rate_eur': money.to_float(hourly_rate),
                 'total_cost_eur': 0.0,
             }
-            return Decimal('0')
+            return money.ZERO
 
-        labor_cost = labor_hours * self.config.stundensatz_arbeit
+        labor_cost = money.apply(hourly_rate, labor_hours)
         breakdown_data['step_5_labor'] = {
-            'hours': float(labor_hours),
-            'hourly_rate_eur': float(self.config.stundensatz_arbeit),
-            'total_cost_eur': float(labor_cost),
+            'hours': money.rate_to_float(labor_hours),
+            'hourly_rate_eur': money.to_float(hourly_rate),
+            'total_cost_eur': money.to_float(labor_cost),
         }
-        logger.debug(f"Labor cost: {labor_hours}h × {self.config.stundensatz_arbeit}€/h = {labor_cost}€")
+        logger.debug(
+            f"Labor cost: {money.rate_to_float(labor_hours)}h × {self.snapshot.stundensatz_arbeit}€/h "
+            f"= {money.to_float(labor_cost)}€"
+        )
         return labor_cost
 
     def _step_6_add_overhead_and_margin(
         self,
-        material_and_labor_cost: Decimal,
+        material_and_labor_cost: Money,
         breakdown_data: Dict[str, Any],
         warnings: List[str],
-    ) -> Decimal:
+    ) -> Money:
         """Step 6: Add overhead and profit margin (TIER 2)."""
         # Add overhead allocation
-        cost_with_overhead = material_and_labor_cost + self.config.betriebskosten_umlage
+        cost_with_overhead = material_and_labor_cost + self.snapshot.umlage
 
         # Apply profit margin
-        margin_multiplier = 1 + (self.config.gewinnmarge_prozent / Decimal('100'))
-        final_price = cost_with_overhead * margin_multiplier
+        margin_multiplier = self.snapshot.margen_faktor
+        final_price = money.apply(cost_with_overhead, margin_multiplier)
 
         breakdown_data['step_6_overhead_and_margin'] = {
-            'material_and_labor_cost_eur': float(material_and_labor_cost),
-            'overhead_allocation_eur': float(self.config.betriebskosten_umlage),
-            'cost_with_overhead_eur': float(cost_with_overhead),
-            'profit_margin_percent': float(self.config.gewinnmarge_prozent),
-            'margin_multiplier': float(margin_multiplier),
-            'total_with_margin_eur': float(final_price),
+            'material_and_labor_cost_eur': money.to_float(material_and_labor_cost),
+            'overhead_allocation_eur': money.to_float(self.snapshot.umlage),
+            'cost_with_overhead_eur': money.to_float(cost_with_overhead),
+            'profit_margin_percent': float(self.snapshot.gewinnmarge_prozent),
+            'margin_multiplier': money.rate_to_float(margin_multiplier),
+            'total_with_margin_eur': money.to_float(final_price),
         }
         logger.debug(
-            f"Overhead: {self.config.betriebskosten_umlage}€, "
-            f"Margin: {self.config.gewinnmarge_prozent}% → {final_price}€"
+            f"Overhead: {self.snapshot.betriebskosten_umlage}€, "
+            f"Margin: {self.snapshot.gewinnmarge_prozent}% → {money.to_float(final_price)}€"
         )
         return final_price
 
     def _step_7_apply_seasonal_adjustments(
         self,
-        price: Decimal,
+        price: Money,
         extracted_data: Dict[str, Any],
         breakdown_data: Dict[str, Any],
         warnings: List[str],
-    ) -> Decimal:
+    ) -> Money:
         """Step 7: Apply seasonal/campaign adjustments (TIER 3)."""
-        if not self.config.use_seasonal_adjustments:
+        if not self.snapshot.use_seasonal_adjustments:
             breakdown_data['step_7_seasonal_adjustments'] = {
                 'applied': False,
                 'reason': 'use_seasonal_adjustments disabled'
@@ -517,37 +750,33 @@ class CalculationEngine:
             return price
 
         try:
-            today = timezone.now().date()
-            adjustments = SaisonaleMarge.objects.filter(
-                user=self.user,
-                is_active=True,
-                start_date__lte=today,
-                end_date__gte=today,
-            )
+            day = self._pricing_date(extracted_data, warnings)
+            adjustments = self.snapshot.active_seasonal_rules(day)
 
             adjusted_price = price
             adjustment_details = []
 
             for adjustment in adjustments:
                 if adjustment.adjustment_type == 'prozent':
-                    adjustment_amount = price * (adjustment.value / Decimal('100'))
+                    adjustment_amount = money.apply(price, adjustment.wert)
                 else:  # absolute
-                    adjustment_amount = adjustment.value
+                    adjustment_amount = adjustment.wert
 
                 adjusted_price -= adjustment_amount
                 adjustment_details.append({
                     'name': adjustment.name,
-                    'type': adjustment.get_adjustment_type_display(),
+                    'type': adjustment.adjustment_type_display,
                     'value': float(adjustment.value),
-                    'adjustment_amount_eur': float(adjustment_amount),
+                    'adjustment_amount_eur': money.to_float(adjustment_amount),
                 })
-                logger.debug(f"Applied seasonal adjustment: {adjustment.name} (-{adjustment_amount}€)")
+                logger.debug(f"Applied seasonal adjustment: {adjustment.name} (-{money.to_float(adjustment_amount)}€)")
 
             breakdown_data['step_7_seasonal_adjustments'] = {
                 'applied': len(adjustment_details) > 0,
+                'pricing_date': day.isoformat(),
                 'adjustments': adjustment_details,
-                'price_before_eur': float(price),
-                'price_after_eur': float(adjusted_price),
+                'price_before_eur': money.to_float(price),
+                'price_after_eur': money.to_float(adjusted_price),
             }
             return adjusted_price
 
@@ -559,16 +788,30 @@ class CalculationEngine:
             }
             return price
 
+    @staticmethod
+    def _pricing_date(extracted_data: Dict[str, Any], warnings: List[str]) -> date:
+        """Date the seasonal rules are applied for: lieferdatum or today."""
+        value = extracted_data.get('lieferdatum')
+        if not value:
+            return timezone.now().date()
+        if isinstance(value, date):
+            return value.date() if hasattr(value, 'date') else value
+        try:
+            return date.fromisoformat(str(value))
+        except ValueError:
+            warnings.append(f"Invalid lieferdatum '{value}', using today")
+            return timezone.now().date()
+
     def _step_8_apply_customer_discounts(
         self,
-        price: Decimal,
+        price: Money,
         extracted_data: Dict[str, Any],
         customer_type: str,
         breakdown_data: Dict[str, Any],
         warnings: List[str],
-    ) -> Decimal:
+    ) -> Money:
         """Step 8: Apply customer discounts and bulk pricing (TIER 3)."""
-        if not self.config.use_customer_discounts and not self.config.use_bulk_discounts:
+        if not self.snapshot.use_customer_discounts and not self.snapshot.use_bulk_discounts:
             breakdown_data['step_8_customer_discounts'] = {
                 'applied': False,
                 'reason': 'Customer and bulk discounts disabled'
@@ -579,38 +822,38 @@ class CalculationEngine:
         adjusted_price = price
 
         # Customer-specific discount
-        if self.config.use_customer_discounts:
+        if self.snapshot.use_customer_discounts:
             customer_discount = self._get_customer_discount(customer_type)
             if customer_discount > 0:
-                discount_amount = price * (customer_discount / Decimal('100'))
+                discount_amount = money.apply(price, money.percent(customer_discount))
                 adjusted_price -= discount_amount
                 discount_details.append({
                     'type': 'customer_type_discount',
                     'customer_type': customer_type,
                     'discount_percent': float(customer_discount),
-                    'discount_amount_eur': float(discount_amount),
+                    'discount_amount_eur': money.to_float(discount_amount),
                 })
                 logger.debug(f"Customer discount ({customer_type}): {customer_discount}%")
 
         # Bulk discount (if material with quantity)
-        if self.config.use_bulk_discounts:
+        if self.snapshot.use_bulk_discounts:
             bulk_discount = self._get_bulk_discount(extracted_data)
             if bulk_discount > 0:
-                discount_amount = price * (bulk_discount / Decimal('100'))
+                discount_amount = money.apply(price, money.percent(bulk_discount))
                 adjusted_price -= discount_amount
                 discount_details.append({
                     'type': 'bulk_discount',
                     'quantity': extracted_data.get('material_quantity', 0),
                     'discount_percent': float(bulk_discount),
-                    'discount_amount_eur': float(discount_amount),
+                    'discount_amount_eur': money.to_float(discount_amount),
                 })
                 logger.debug(f"Bulk discount: {bulk_discount}%")
 
         breakdown_data['step_8_customer_discounts'] = {
             'applied': len(discount_details) > 0,
             'discounts': discount_details,
-            'price_before_eur': float(price),
-            'price_after_eur': float(adjusted_price),
+            'price_before_eur': money.to_float(price),
+            'price_after_eur': money.to_float(adjusted_price),
         }
         return adjusted_price
 
@@ -629,44 +872,41 @@ class CalculationEngine:
         }
         return customer_discounts.get(customer_type, Decimal('0'))
 
-    def _get_bulk_discount(self, extracted_data: Dict[str, Any]) -> Decimal:
-        """Get bulk discount from material list or quantity."""
+    def _get_bulk_discount(self, extracted_data: Dict[str, Any]) -> int:
+        """Get bulk discount percent from material list or quantity."""
         material_sku = extracted_data.get('material_sku')
         material_quantity = extracted_data.get('material_quantity', 0)
 
         if not material_sku or material_quantity <= 0:
-            return Decimal('0')
+            return 0
 
-        try:
-            material = MateriallistePosition.objects.get(
-                user=self.user,
-                sku=material_sku,
-                is_enabled=True
-            )
-            return Decimal(str(material.get_discount_percent(material_quantity)))
-        except MateriallistePosition.DoesNotExist:
-            return Decimal('0')
+        material = self.snapshot.materialien.get(material_sku)
+        if material is None:
+            return 0
+        return material.get_discount_percent(material_quantity)
 
     def get_pricing_report(self) -> Dict[str, Any]:
         """Generate a pricing configuration report for admin."""
         return {
             'user': self.user.username,
             'configuration': {
-                'hourly_rate_eur': float(self.config.stundensatz_arbeit),
-                'profit_margin_percent': float(self.config.gewinnmarge_prozent),
-                'overhead_allocation_eur': float(self.config.betriebskosten_umlage),
+                'hourly_rate_eur': float(self.snapshot.stundensatz_arbeit),
+                'profit_margin_percent': float(self.snapshot.gewinnmarge_prozent),
+                'overhead_allocation_eur': float(self.snapshot.betriebskosten_umlage),
             },
             'tiers_enabled': {
-                'tier_1_global': self.config.use_handwerk_standard,
+                'tier_1_global': self.snapshot.use_handwerk_standard,
                 'tier_2_company': True,
                 'tier_3_dynamic': (
-                    self.config.use_seasonal_adjustments or
-                    self.config.use_customer_discounts or
-                    self.config.use_bulk_discounts
+                    self.snapshot.use_seasonal_adjustments or
+                    self.snapshot.use_customer_discounts or
+                    self.snapshot.use_bulk_discounts
                 ),
             },
             'template': {
-                'name': self.config.handwerk_template.name if self.config.handwerk_template else None,
-                'version': self.config.handwerk_template.version if self.config.handwerk_template else None,
+                'name': self.snapshot.template_name,
+                'version': self.snapshot.template_version,
             },
+            'snapshot_version': self.snapshot.version,
+            'result_cache': PricingResultCache.stats(self.user.id),
         }
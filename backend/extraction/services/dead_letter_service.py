@@ -0,0 +1,323 @@
+"""Dead-letter store and re-drive for extraction tasks."""
+import hashlib
+import logging
+import re
+import traceback as traceback_module
+from collections import defaultdict
+from typing import Dict, Any, Iterable, List, Optional
+
+from django.db.models import Count, F, Max, Min
+from django.utils import timezone
+
+from documents.models import Batch, BatchDocument, Document
+from extraction.models import ExtractionDeadLetter
+from extraction.services.eta_estimator import ETAEstimator
+
+logger = logging.getLogger(__name__)
+
+
+# Volatile parts of error messages that would split one failure mode
+# into many signatures (ids, paths, numbers)
+_UUID_RE = re.compile(r'[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}', re.I)
+_HEX_RE = re.compile(r'\b[0-9a-f]{16,}\b', re.I)
+_PATH_RE = re.compile(r'(?:[A-Za-z]:)?[\\/][^\s\'"]+')
+_NUMBER_RE = re.compile(r'\d+(?:\.\d+)?')
+
+
+class DeadLetterService:
+    """Record extraction tasks that exhausted their retries and replay them.
+
+    Failures are grouped by signature so an incident shows up as one
+    cluster instead of hundreds of rows. Re-drive only queues as many
+    documents as the workers can absorb (see available_capacity), the
+    rest stay open for the next round.
+    """
+
+    # Queued documents allowed per worker before re-drive holds back
+    QUEUE_DEPTH_PER_WORKER = 2
+    HASH_CHUNK_SIZE = 1024 * 1024
+
+    # ===== RECORDING =====
+
+    def record(
+        self,
+        document: Document,
+        exception: BaseException,
+        stage: str,
+        task_payload: Dict[str, Any],
+        stage_timings: Optional[Dict[str, int]] = None,
+        task_id: str = '',
+        retry_count: int = 0,
+    ) -> Optional[ExtractionDeadLetter]:
+        """Store a failed extraction task.
+
+        Args:
+            document: Document that failed
+            exception: Final exception
+            stage: Stage that raised ('load', 'ocr', 'ner', 'persist')
+            task_payload: Task kwargs needed to replay the task
+            stage_timings: Duration in ms of each stage reached
+            task_id: Id of the failed task
+            retry_count: Retries attempted before giving up
+
+        Returns:
+            Created dead letter, or None if it could not be stored
+        """
+        exception_class = f"{type(exception).__module__}.{type(exception).__name__}"
+        message = str(exception)
+
+        try:
+            dead_letter = ExtractionDeadLetter.objects.create(
+                document=document,
+                batch_id=task_payload.get('batch_id'),
+                task_id=task_id or '',
+                task_payload=task_payload,
+                retry_count=retry_count,
+                exception_class=exception_class,
+                exception_message=message,
+                traceback=''.join(traceback_module.format_exception(
+                    type(exception), exception, exception.__traceback__
+                )),
+                stage=stage,
+                stage_timings=stage_timings or {},
+                file_hash=self.file_hash(document),
+                signature=self.compute_signature(exception_class, stage, message),
+            )
+        except Exception:
+            # Never let triage bookkeeping mask the original failure
+            logger.exception(f"Failed to record dead letter for document {document.id}")
+            return None
+
+        logger.warning(
+            f"Dead-lettered document {document.id} at stage '{stage}': "
+            f"{exception_class} (signature {dead_letter.signature[:12]})"
+        )
+        return dead_letter
+
+    @staticmethod
+    def compute_signature(exception_class: str, stage: str, message: str) -> str:
+        """Signature grouping failures of the same kind.
+
+        Args:
+            exception_class: Fully qualified exception class
+            stage: Failed stage
+            message: Exception message
+
+        Returns:
+            Hex digest of class, stage and normalized message
+        """
+        normalized = _UUID_RE.sub('<id>', message or '')
+        normalized = _HEX_RE.sub('<hex>', normalized)
+        normalized = _PATH_RE.sub('<path>', normalized)
+        normalized = _NUMBER_RE.sub('<n>', normalized)
+        normalized = ' '.join(normalized.split())[:500]
+
+        raw = f"{exception_class}|{stage}|{normalized}"
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def file_hash(self, document: Document) -> str:
+        """SHA-256 of the document's input file.
+
+        Args:
+            document: Document whose file to hash
+
+        Returns:
+            Hex digest, or '' if the file cannot be read
+        """
+        try:
+            sha = hashlib.sha256()
+            with document.file.open('rb') as f:
+                for chunk in iter(lambda: f.read(self.HASH_CHUNK_SIZE), b''):
+                    sha.update(chunk)
+            return sha.hexdigest()
+        except Exception as e:
+            logger.debug(f"Cannot hash file of document {document.id}: {e}")
+            return ''
+
+    def resolve_for_document(self, document: Document) -> int:
+        """Mark re-driven dead letters of a now processed document as resolved.
+
+        Args:
+            document: Successfully processed document
+
+        Returns:
+            Number of dead letters resolved
+        """
+        return ExtractionDeadLetter.objects.filter(
+            document=document,
+            status__in=['open', 'redriven']
+        ).update(status='resolved', updated_at=timezone.now())
+
+    # ===== TRIAGE =====
+
+    def clusters(self, status: str = 'open') -> List[Dict[str, Any]]:
+        """Group dead letters by failure signature.
+
+        Args:
+            status: Dead letter status to include
+
+        Returns:
+            Clusters ordered by size, each with signature, exception class,
+            stage, count, affected documents, first/last seen and a sample
+            message
+        """
+        rows = ExtractionDeadLetter.objects.filter(status=status).values(
+            'signature', 'exception_class', 'stage'
+        ).annotate(
+            count=Count('id'),
+            document_count=Count('document', distinct=True),
+            first_seen=Min('created_at'),
+            last_seen=Max('created_at'),
+            sample_message=Max('exception_message'),
+        ).order_by('-count', '-last_seen')
+
+        return [
+            dict(row, sample_message=(row['sample_message'] or '')[:300])
+            for row in rows
+        ]
+
+    # ===== RE-DRIVE =====
+
+    def available_capacity(self) -> int:
+        """Documents that can be queued now without flooding the workers.
+
+        Returns:
+            Free queue slots (>= 0)
+        """
+        estimator = ETAEstimator()
+        slots = estimator.configured_workers * self.QUEUE_DEPTH_PER_WORKER
+
+        in_flight = Document.objects.filter(status='processing').count()
+        queued = BatchDocument.objects.filter(status='queued').count()
+        return max(0, slots - in_flight - queued)
+
+    def redrive(
+        self,
+        dead_letter_ids: Optional[Iterable[int]] = None,
+        signature: Optional[str] = None,
+        batch_id: Optional[str] = None,
+        limit: Optional[int] = None,
+        respect_capacity: bool = True,
+        dry_run: bool = False,
+    ) -> Dict[str, Any]:
+        """Queue open dead letters for processing again.
+
+        Oldest failures go first. With respect_capacity, at most
+        available_capacity() documents are queued; the rest stay open
+        and are reported as deferred.
+
+        Args:
+            dead_letter_ids: Only these dead letters
+            signature: Only this failure cluster
+            batch_id: Only failures from this batch
+            limit: Upper bound of documents to queue
+            respect_capacity: Cap by current worker capacity
+            dry_run: Report what would be queued without queuing
+
+        Returns:
+            Dictionary with selected, requeued, failed, deferred counts,
+            capacity and per-document task ids
+        """
+        from extraction.async_executor import AsyncExecutor
+
+        queryset = ExtractionDeadLetter.objects.filter(status='open')
+        if dead_letter_ids is not None:
+            queryset = queryset.filter(id__in=list(dead_letter_ids))
+        if signature:
+            queryset = queryset.filter(signature=signature)
+        if batch_id:
+            queryset = queryset.filter(batch_id=batch_id)
+
+        # One replay per document, even if it was dead-lettered repeatedly
+        by_document = {}
+        for dead_letter in queryset.order_by('created_at'):
+            by_document.setdefault(dead_letter.document_id, []).append(dead_letter)
+
+        capacity = self.available_capacity() if respect_capacity else len(by_document)
+        budget = min(capacity, limit) if limit is not None else capacity
+        selected = list(by_document.items())[:budget]
+
+        result = {
+            'selected': len(by_document),
+            'capacity': capacity,
+            'requeued': 0,
+            'failed': 0,
+            'deferred': len(by_document) - len(selected),
+            'tasks': {},
+        }
+        if dry_run or not selected:
+            result['dry_run'] = dry_run
+            return result
+
+        # Replay with the original user/batch so audit and batch progress line up
+        groups = defaultdict(list)
+        for document_id, dead_letters in selected:
+            payload = dead_letters[0].task_payload
+            groups[(payload.get('user_id'), payload.get('batch_id'))].append(document_id)
+
+        for (user_id, group_batch_id), document_ids in groups.items():
+            if group_batch_id:
+                self._requeue_batch_documents(group_batch_id, document_ids)
+
+            task_ids = AsyncExecutor.process_documents(
+                document_ids,
+                user_id=user_id,
+                batch_id=group_batch_id
+            )
+            for document_id in document_ids:
+                task_id = task_ids.get(str(document_id))
+                result['tasks'][str(document_id)] = task_id
+                if task_id:
+                    self._mark_redriven(by_document[document_id])
+                    result['requeued'] += 1
+                else:
+                    result['failed'] += 1
+
+            if group_batch_id:
+                self._record_batch_tasks(group_batch_id, task_ids)
+
+        logger.info(
+            f"Re-drove {result['requeued']} dead-lettered documents "
+            f"({result['failed']} failed, {result['deferred']} deferred)"
+        )
+        result['dry_run'] = False
+        return result
+
+    def _mark_redriven(self, dead_letters: List[ExtractionDeadLetter]) -> None:
+        """Flag dead letters as re-driven."""
+        ExtractionDeadLetter.objects.filter(
+            id__in=[dl.id for dl in dead_letters],
+            status='open'
+        ).update(
+            status='redriven',
+            redrive_count=F('redrive_count') + 1,
+            last_redriven_at=timezone.now(),
+            updated_at=timezone.now(),
+        )
+
+    def _record_batch_tasks(self, batch_id: str, task_ids: Dict[str, Optional[str]]) -> None:
+        """Store new task ids on batch entries; entries that failed to queue fail again."""
+        for document_id, task_id in task_ids.items():
+            entries = BatchDocument.objects.filter(batch_id=batch_id, document_id=document_id)
+            if task_id:
+                entries.update(cloud_task_id=task_id)
+            else:
+                entries.filter(status='queued').update(
+                    status='failed',
+                    error_message='Failed to queue task',
+                    processed_at=timezone.now()
+                )
+
+    def _requeue_batch_documents(self, batch_id: str, document_ids: List) -> None:
+        """Put failed batch entries back in the queue so progress is tracked."""
+        updated = BatchDocument.objects.filter(
+            batch_id=batch_id,
+            document_id__in=document_ids,
+            status='failed'
+        ).update(status='queued', error_message='', processed_at=None)
+
+        if updated:
+            Batch.objects.filter(
+                id=batch_id,
+                status__in=['completed', 'partial_failure', 'failed']
+            ).update(status='processing', completed_at=None)
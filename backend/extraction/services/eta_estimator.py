@@ -0,0 +1,338 @@
+"""Online processing-time model for batch ETA and worker autoscaling."""
+import logging
+import math
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, Any, Iterable, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from documents.models import BatchDocument, Document, ExtractionResult
+
+logger = logging.getLogger(__name__)
+
+
+class ETAEstimator:
+    """Learn per-stage processing durations and turn them into ETAs.
+
+    Each completed document feeds its per-stage timings (OCR, NER) into an
+    exponentially weighted moving average. Averages are kept per
+    (stage, file type, page bucket) with coarser fallbacks, so a cold
+    bucket borrows from the file type or global average until it has
+    seen enough samples.
+
+    Model state lives in the Django cache (Redis in production) so all
+    workers and API processes share one model.
+    """
+
+    STAGES = ('ocr', 'ner')
+
+    # Prior per stage (ms) - matches the former flat 10s/document estimate
+    DEFAULT_STAGE_MS = {'ocr': 8000.0, 'ner': 2000.0}
+
+    SMOOTHING = 0.2  # EWMA weight of the newest sample
+    MIN_SAMPLES = 3  # Samples before a bucket is trusted
+    CACHE_PREFIX = "eta:"
+    MODEL_TTL_SECONDS = 30 * 24 * 3600  # 30 days
+    BOOTSTRAP_LIMIT = 500
+    LOCK_SECONDS = 5  # Lifetime of a bucket update lock
+    LOCK_ATTEMPTS = 5
+    LOCK_WAIT_SECONDS = 0.01
+
+    # Upper bounds of page buckets; anything larger falls in the last bucket
+    PAGE_BUCKETS = (1, 5)
+
+    def __init__(self, active_workers: Optional[int] = None):
+        """Initialize estimator.
+
+        Args:
+            active_workers: Number of extraction workers draining the queue.
+                Defaults to settings.EXTRACTION_WORKER_CONCURRENCY.
+        """
+        self.configured_workers = active_workers or getattr(
+            settings, 'EXTRACTION_WORKER_CONCURRENCY', 1
+        )
+
+    # ===== LEARNING =====
+
+    def observe(
+        self,
+        stage_timings: Dict[str, int],
+        file_type: str = 'pdf',
+        page_count: int = 1
+    ) -> None:
+        """Feed one document's stage timings into the model.
+
+        Args:
+            stage_timings: Mapping stage -> duration in ms
+            file_type: Document type (pdf, png, ...)
+            page_count: Number of pages processed
+        """
+        for stage, duration_ms in stage_timings.items():
+            if stage not in self.STAGES or duration_ms is None:
+                continue
+            for key in self._keys(stage, file_type, page_count):
+                self._update(key, float(duration_ms))
+
+    def observe_result(self, extraction_result: ExtractionResult) -> None:
+        """Feed a completed ExtractionResult into the model.
+
+        Uses the per-stage timings when present. Older rows only carry
+        processing_time_ms; it is split across stages in proportion to the
+        current stage estimates.
+
+        Args:
+            extraction_result: Completed extraction
+        """
+        document = extraction_result.document
+        file_type = document.document_type
+        page_count = self._page_count(document)
+
+        stage_timings = extraction_result.stage_timings or {}
+        if not stage_timings and extraction_result.processing_time_ms:
+            estimates = {
+                stage: self.estimate_stage_ms(stage, file_type, page_count)
+                for stage in self.STAGES
+            }
+            total_estimate = sum(estimates.values()) or 1.0
+            stage_timings = {
+                stage: extraction_result.processing_time_ms * estimate / total_estimate
+                for stage, estimate in estimates.items()
+            }
+
+        self.observe(stage_timings, file_type=file_type, page_count=page_count)
+
+    def bootstrap(self, limit: Optional[int] = None) -> int:
+        """Seed the model from recent extraction history.
+
+        Args:
+            limit: Maximum number of results to replay
+
+        Returns:
+            Number of results replayed
+        """
+        results = ExtractionResult.objects.select_related('document').filter(
+            processing_time_ms__gt=0
+        ).order_by('-created_at')[:limit or self.BOOTSTRAP_LIMIT]
+
+        count = 0
+        # Replay oldest first so the newest samples carry the most weight
+        for result in reversed(list(results)):
+            self.observe_result(result)
+            count += 1
+
+        logger.info(f"Bootstrapped ETA model from {count} extraction results")
+        return count
+
+    # ===== ESTIMATION =====
+
+    def estimate_stage_ms(
+        self,
+        stage: str,
+        file_type: str = 'pdf',
+        page_count: int = 1
+    ) -> float:
+        """Estimate one stage's duration for a document.
+
+        Args:
+            stage: Stage name ('ocr', 'ner')
+            file_type: Document type
+            page_count: Number of pages
+
+        Returns:
+            Estimated duration in ms
+        """
+        try:
+            for key in self._keys(stage, file_type, page_count):
+                stat = cache.get(key)
+                if stat and stat['count'] >= self.MIN_SAMPLES:
+                    return stat['mean_ms']
+        except Exception as e:
+            # Graceful degradation - estimate from priors
+            logger.warning(f"Failed to read ETA model for {stage}: {e}")
+        return self.DEFAULT_STAGE_MS.get(stage, 0.0)
+
+    def estimate_document_ms(self, document: Document) -> float:
+        """Estimate total processing time of a single document.
+
+        Args:
+            document: Document to estimate
+
+        Returns:
+            Estimated duration in ms
+        """
+        page_count = self._page_count(document)
+        return sum(
+            self.estimate_stage_ms(stage, document.document_type, page_count)
+            for stage in self.STAGES
+        )
+
+    def estimate_documents_ms(self, documents: Iterable[Document]) -> float:
+        """Estimate total processing time of several documents.
+
+        Args:
+            documents: Documents to estimate
+
+        Returns:
+            Sum of estimated durations in ms
+        """
+        # Documents of the same type and page count share one estimate
+        groups = Counter(
+            (doc.document_type, self._page_count(doc)) for doc in documents
+        )
+        total_ms = 0.0
+        for (file_type, page_count), count in groups.items():
+            per_doc_ms = sum(
+                self.estimate_stage_ms(stage, file_type, page_count)
+                for stage in self.STAGES
+            )
+            total_ms += per_doc_ms * count
+        return total_ms
+
+    def active_workers(self) -> int:
+        """Number of workers assumed to drain the queue in parallel.
+
+        At least the configured concurrency, or the number of documents
+        currently in flight if more are running.
+
+        Returns:
+            Worker count (>= 1)
+        """
+        in_flight = Document.objects.filter(status='processing').count()
+        return max(1, self.configured_workers, in_flight)
+
+    def queue_backlog_ms(self, exclude_batch_id: Optional[str] = None) -> float:
+        """Estimated work waiting in the queue across all batches.
+
+        Args:
+            exclude_batch_id: Batch whose own documents are not counted
+
+        Returns:
+            Estimated backlog in ms
+        """
+        waiting = BatchDocument.objects.filter(
+            status__in=['queued', 'processing']
+        )
+        if exclude_batch_id:
+            waiting = waiting.exclude(batch_id=exclude_batch_id)
+
+        documents = Document.objects.filter(
+            id__in=waiting.values('document_id')
+        ).only('id', 'document_type', 'metadata')
+        return self.estimate_documents_ms(documents)
+
+    def estimate_batch_completion(self, batch) -> Optional[datetime]:
+        """Estimate when a batch's remaining documents will be done.
+
+        Work ahead of the batch in the queue is added to the batch's own
+        remaining work, and the sum is divided across active workers.
+
+        Args:
+            batch: Batch instance
+
+        Returns:
+            Estimated completion time, or None if nothing is left
+        """
+        remaining_docs = list(Document.objects.filter(
+            batch_documents__batch=batch,
+            batch_documents__status__in=['pending', 'queued', 'processing']
+        ).only('id', 'document_type', 'metadata'))
+
+        if not remaining_docs:
+            return None
+
+        own_ms = self.estimate_documents_ms(remaining_docs)
+        backlog_ms = self.queue_backlog_ms(exclude_batch_id=batch.id)
+        duration_ms = (own_ms + backlog_ms) / self.active_workers()
+
+        return timezone.now() + timedelta(milliseconds=duration_ms)
+
+    # ===== AUTOSCALING =====
+
+    def recommend_worker_replicas(
+        self,
+        target_drain_seconds: int = 300,
+        min_replicas: int = 1,
+        max_replicas: int = 10
+    ) -> Dict[str, Any]:
+        """Recommend worker replica count to drain the queue in time.
+
+        Args:
+            target_drain_seconds: Desired time to empty the queue
+            min_replicas: Lower bound
+            max_replicas: Upper bound
+
+        Returns:
+            Dictionary with backlog_seconds and recommended replicas
+        """
+        backlog_seconds = self.queue_backlog_ms() / 1000
+        needed = math.ceil(backlog_seconds / max(target_drain_seconds, 1))
+        replicas = min(max(needed, min_replicas), max_replicas)
+
+        return {
+            'backlog_seconds': round(backlog_seconds, 1),
+            'target_drain_seconds': target_drain_seconds,
+            'recommended_replicas': replicas,
+        }
+
+    # ===== HELPERS =====
+
+    def _update(self, key: str, duration_ms: float) -> None:
+        """Apply one sample to a cached EWMA bucket.
+
+        The read-modify-write runs under a short cache.add lock per bucket,
+        so workers finishing documents of the same bucket at the same time
+        do not overwrite each other's samples. If the lock stays taken the
+        sample is dropped; the average only loses one observation.
+        """
+        lock_key = f"{key}:lock"
+        try:
+            for _ in range(self.LOCK_ATTEMPTS):
+                if cache.add(lock_key, 1, timeout=self.LOCK_SECONDS):
+                    break
+                time.sleep(self.LOCK_WAIT_SECONDS)
+            else:
+                logger.debug(f"ETA model {key} busy, sample dropped")
+                return
+
+            try:
+                stat = cache.get(key) or {'mean_ms': duration_ms, 'count': 0}
+                if stat['count'] > 0:
+                    stat['mean_ms'] += self.SMOOTHING * (duration_ms - stat['mean_ms'])
+                stat['count'] += 1
+                cache.set(key, stat, timeout=self.MODEL_TTL_SECONDS)
+            finally:
+                cache.delete(lock_key)
+        except Exception as e:
+            # Graceful degradation - ETA falls back to priors
+            logger.warning(f"Failed to update ETA model {key}: {e}")
+
+    def _keys(self, stage: str, file_type: str, page_count: int) -> list:
+        """Cache keys from most to least specific."""
+        bucket = self._page_bucket(page_count)
+        file_type = (file_type or 'unknown').lower()
+        return [
+            f"{self.CACHE_PREFIX}{stage}:{file_type}:{bucket}",
+            f"{self.CACHE_PREFIX}{stage}:{file_type}:*",
+            f"{self.CACHE_PREFIX}{stage}:*:*",
+        ]
+
+    def _page_bucket(self, page_count: int) -> str:
+        """Map a page count onto a bucket label ('1', '2-5', '6+')."""
+        lower = 1
+        for upper in self.PAGE_BUCKETS:
+            if page_count <= upper:
+                return str(upper) if lower == upper else f"{lower}-{upper}"
+            lower = upper + 1
+        return f"{lower}+"
+
+    @staticmethod
+    def _page_count(document: Document) -> int:
+        """Page count recorded by OCR, defaulting to 1."""
+        try:
+            return max(1, int((document.metadata or {}).get('page_count', 1)))
+        except (TypeError, ValueError):
+            return 1
@@ -0,0 +1,342 @@
+# -*- coding: utf-8 -*-
+"""IncrementalPricingService: reprice a project when single inputs change.
+
+The 8-step workflow of CalculationEngine is modelled as a graph. Every step
+is a node that declares the extracted_data fields it reads and the nodes
+whose values it consumes:
+
+    step_1 (material_sku, material_quantity, material_cost_eur)
+      → step_2 (holzart) → step_3 (oberflaeche) → step_4 (komplexitaet) ─┐
+    step_5 (labor_hours) ────────────────────────────────────────────────┤
+      step_6 → step_7 (lieferdatum) → step_8 (customer_type, material_sku, material_quantity)
+
+A repricing session keeps every node's value, breakdown entry and warnings
+in the cache. A change to one field recomputes only the nodes downstream of
+it (changing customer_type re-runs step 8 alone); a new pricing snapshot
+version recomputes everything.
+
+Sessions price like calculate_project_price without an extraction_result.
+Pauschalen are not part of a repricing session: session prices carry an
+empty Pauschalen result, and Pauschalen are only added by the full workflow
+with an extraction_result.
+"""
+
+import logging
+import uuid
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.utils import timezone
+
+from core import money
+from core.tracing import span
+from extraction.services.calculation_engine import CalculationEngine, CalculationError
+
+logger = logging.getLogger(__name__)
+
+ANY_FIELD = '*'  # Any extracted_data field
+TODAY = '@today'  # Pseudo-input: the calculation date
+NON_DATA_INPUTS = frozenset({'customer_type', TODAY})
+
+
+class RepricingSessionNotFound(Exception):
+    """Repricing session expired or never existed."""
+    pass
+
+
+@dataclass(frozen=True)
+class PricingNode:
+    """One step of the pricing graph."""
+
+    name: str
+    fields: Tuple[str, ...] = ()
+    depends_on: Tuple[str, ...] = ()
+
+
+# In evaluation order (each node after the nodes it depends on)
+PRICING_GRAPH: Tuple[PricingNode, ...] = (
+    PricingNode(
+        'step_1_base_material',
+        fields=('material_sku', 'material_quantity', 'material_cost_eur'),
+    ),
+    PricingNode('step_2_wood_type', fields=('holzart',), depends_on=('step_1_base_material',)),
+    PricingNode('step_3_surface_finish', fields=('oberflaeche',), depends_on=('step_2_wood_type',)),
+    PricingNode('step_4_complexity', fields=('komplexitaet',), depends_on=('step_3_surface_finish',)),
+    PricingNode('step_5_labor', fields=('labor_hours',)),
+    PricingNode(
+        'step_6_overhead_and_margin',
+        depends_on=('step_4_complexity', 'step_5_labor'),
+    ),
+    PricingNode(
+        'step_7_seasonal_adjustments',
+        fields=(TODAY, 'lieferdatum'),
+        depends_on=('step_6_overhead_and_margin',),
+    ),
+    PricingNode(
+        'step_8_customer_discounts',
+        fields=('customer_type', 'material_sku', 'material_quantity'),
+        depends_on=('step_7_seasonal_adjustments',),
+    ),
+    # Components can change anywhere in a multi-material extraction
+    PricingNode('multi_material', fields=(ANY_FIELD,)),
+)
+
+PRICING_GRAPH_BY_NAME: Dict[str, PricingNode] = {node.name: node for node in PRICING_GRAPH}
+
+
+class IncrementalPricingService:
+    """
+    Repricing sessions over the CalculationEngine workflow.
+
+    Example:
+        >>> service = IncrementalPricingService(user)
+        >>> result = service.start({'holzart': 'eiche', 'labor_hours': 12})
+        >>> result = service.reprice(result['session_id'], {'holzart': 'buche'})
+        >>> result['recomputed']
+        ['step_2_wood_type', 'step_3_surface_finish', ...]
+    """
+
+    SESSION_KEY = 'pricing_session:v2:{user_id}:{session_id}'  # v2: Money node values
+    SESSION_TIMEOUT = 3600  # 1 hour since the last change
+
+    def __init__(self, user: User):
+        """Initialize repricing for a user.
+
+        Args:
+            user: Django User instance
+
+        Raises:
+            CalculationError: If user has no active Betriebskennzahl configuration
+        """
+        self.user = user
+        self.engine = CalculationEngine(user)
+
+    # =====================
+    # SESSIONS
+    # =====================
+
+    def start(
+        self,
+        extracted_data: Dict[str, Any],
+        customer_type: str = 'neue_kunden',
+        breakdown: bool = True,
+    ) -> Dict[str, Any]:
+        """
+        Price a project and open a repricing session for it.
+
+        Args:
+            extracted_data: Extracted document data
+            customer_type: Customer tier for discounts
+            breakdown: Return detailed calculation breakdown
+
+        Returns:
+            calculate_project_price result plus session_id and recomputed
+            (all nodes)
+
+        Raises:
+            CalculationError: If calculation fails
+        """
+        state = {
+            'session_id': uuid.uuid4().hex,
+            'extracted_data': dict(extracted_data),
+            'customer_type': customer_type,
+            'breakdown': breakdown,
+            'snapshot_version': None,
+            'day': None,
+            'nodes': {},
+        }
+        return self._evaluate(state, changed_fields=None)
+
+    def reprice(
+        self,
+        session_id: str,
+        changes: Optional[Dict[str, Any]] = None,
+        customer_type: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Apply field changes to a session and recompute dependent steps.
+
+        Args:
+            session_id: Id returned by start()
+            changes: extracted_data fields to set (None removes a field)
+            customer_type: New customer tier (optional)
+
+        Returns:
+            calculate_project_price result plus session_id and the names
+            of the recomputed nodes
+
+        Raises:
+            RepricingSessionNotFound: If the session expired
+            CalculationError: If calculation fails
+        """
+        state = cache.get(self._key(session_id))
+        if state is None:
+            raise RepricingSessionNotFound(f"Repricing session not found: {session_id}")
+
+        changed = set()
+        for field, value in (changes or {}).items():
+            if value is None:
+                if field in state['extracted_data']:
+                    del state['extracted_data'][field]
+                    changed.add(field)
+            elif field not in state['extracted_data'] or state['extracted_data'][field] != value:
+                state['extracted_data'][field] = value
+                changed.add(field)
+        if customer_type is not None and customer_type != state['customer_type']:
+            state['customer_type'] = customer_type
+            changed.add('customer_type')
+
+        return self._evaluate(state, changed_fields=changed)
+
+    # =====================
+    # GRAPH
+    # =====================
+
+    @staticmethod
+    def dirty_nodes(changed_fields: Iterable[str]) -> Set[str]:
+        """Nodes reading one of the fields, plus everything downstream.
+
+        Args:
+            changed_fields: Names of changed inputs
+
+        Returns:
+            Set of node names to recompute
+        """
+        changed_fields = set(changed_fields)
+        dirty: Set[str] = set()
+        for node in PRICING_GRAPH:
+            reads_changed = bool(changed_fields.intersection(node.fields)) or (
+                ANY_FIELD in node.fields and bool(changed_fields - NON_DATA_INPUTS)
+            )
+            if reads_changed or dirty.intersection(node.depends_on):
+                dirty.add(node.name)
+        return dirty
+
+    def _evaluate(self, state: Dict[str, Any], changed_fields: Optional[Set[str]]) -> Dict[str, Any]:
+        """Recompute dirty nodes, save the session and build the result."""
+        self.engine.snapshot = self.engine._load_snapshot()
+        today = timezone.now().date().isoformat()
+
+        if changed_fields is None or state['snapshot_version'] != self.engine.snapshot.version:
+            dirty = {node.name for node in PRICING_GRAPH}
+        else:
+            if state['day'] != today:
+                changed_fields = changed_fields | {TODAY}
+            dirty = self.dirty_nodes(changed_fields)
+
+        recomputed = []
+        try:
+            for node in PRICING_GRAPH:
+                if node.name not in dirty:
+                    continue
+                with span(node.name):
+                    state['nodes'][node.name] = self._compute(node.name, state)
+                recomputed.append(node.name)
+        except CalculationError:
+            raise
+        except Exception as e:
+            logger.error(f"Repricing failed for user {self.user.id}: {e}")
+            raise CalculationError(f"Calculation failed: {e}")
+
+        state['snapshot_version'] = self.engine.snapshot.version
+        state['day'] = today
+        cache.set(self._key(state['session_id']), state, timeout=self.SESSION_TIMEOUT)
+
+        logger.debug(
+            f"Repriced session {state['session_id'][:8]} for user {self.user.id}: "
+            f"{len(recomputed)} of {len(PRICING_GRAPH)} nodes"
+        )
+
+        result = self._result(state)
+        result['session_id'] = state['session_id']
+        result['recomputed'] = recomputed
+        return result
+
+    def _compute(self, name: str, state: Dict[str, Any]) -> Dict[str, Any]:
+        """Value, breakdown entries and warnings of one node."""
+        data = state['extracted_data']
+        nodes = state['nodes']
+        snapshot = self.engine.snapshot
+        breakdown_data: Dict[str, Any] = {}
+        warnings: List[str] = []
+
+        if name == 'step_1_base_material':
+            value = self.engine._step_1_get_base_material_cost(data, breakdown_data, warnings)
+
+        elif name in ('step_2_wood_type', 'step_3_surface_finish', 'step_4_complexity'):
+            previous = nodes[PRICING_GRAPH_BY_NAME[name].depends_on[0]]['value']
+            if snapshot.use_handwerk_standard:
+                step = {
+                    'step_2_wood_type': self.engine._step_2_apply_wood_type,
+                    'step_3_surface_finish': self.engine._step_3_apply_surface_finish,
+                    'step_4_complexity': self.engine._step_4_apply_complexity,
+                }[name]
+                value = step(previous, data, breakdown_data, warnings)
+            else:
+                value = previous
+                breakdown_data[name] = {
+                    'applied': False,
+                    'reason': 'use_handwerk_standard disabled'
+                }
+
+        elif name == 'step_5_labor':
+            value = self.engine._step_5_calculate_labor(data, breakdown_data, warnings)
+
+        elif name == 'step_6_overhead_and_margin':
+            value = self.engine._step_6_add_overhead_and_margin(
+                nodes['step_4_complexity']['value'] + nodes['step_5_labor']['value'],
+                breakdown_data, warnings
+            )
+
+        elif name == 'step_7_seasonal_adjustments':
+            value = self.engine._step_7_apply_seasonal_adjustments(
+                nodes['step_6_overhead_and_margin']['value'], data, breakdown_data, warnings
+            )
+
+        elif name == 'step_8_customer_discounts':
+            value = self.engine._step_8_apply_customer_discounts(
+                nodes['step_7_seasonal_adjustments']['value'], data,
+                state['customer_type'], breakdown_data, warnings
+            )
+
+        elif name == 'multi_material':
+            from documents.schemas.multi_material_schema import is_multi_material_extraction
+            from extraction.services.multi_material_calculation_service import calculate_multi_material_cost
+
+            value = None
+            if is_multi_material_extraction(data):
+                multi_result = calculate_multi_material_cost(self.user, data)
+                value = money.to_money(multi_result['total_material_cost'])
+                breakdown_data['multi_material_breakdown'] = multi_result
+
+        else:
+            raise CalculationError(f"Unknown pricing node: {name}")
+
+        return {'value': value, 'breakdown': breakdown_data, 'warnings': warnings}
+
+    def _result(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """calculate_project_price result from the node values."""
+        nodes = state['nodes']
+        breakdown_data: Dict[str, Any] = {}
+        warnings: List[str] = []
+        for node in PRICING_GRAPH:
+            breakdown_data.update(nodes[node.name]['breakdown'])
+            warnings.extend(nodes[node.name]['warnings'])
+
+        base_price = nodes['step_4_complexity']['value']
+        multi_material_cost = nodes['multi_material']['value']
+
+        return self.engine._build_result(
+            final_price=nodes['step_8_customer_discounts']['value'],
+            base_price=base_price,
+            material_cost=multi_material_cost if multi_material_cost is not None else base_price,
+            labor_price=nodes['step_5_labor']['value'],
+            pauschalen_result={'pauschalen': [], 'total': 0.0},
+            breakdown_data=breakdown_data if state['breakdown'] else {},
+            warnings=warnings,
+        )
+
+    def _key(self, session_id: str) -> str:
+        return self.SESSION_KEY.format(user_id=self.user.id, session_id=session_id)
@@ -9,12 +9,15 @@ Example:
     → Separate Faktoren pro Komponente
 """
 
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from decimal import Decimal
 import logging
 
 from django.contrib.auth.models import User
 
+from core import money
+from core.money import Money
+from core.tracing import span
 from documents.schemas.multi_material_schema import (
     MultiMaterialExtraction,
     is_multi_material_extraction,
@@ -101,16 +104,17 @@ class MultiMaterialCalculationService:
 
         # Calculate each component
         component_results = []
-        total_cost = Decimal('0')
+        total_cost = money.ZERO
 
         for component in extraction.components:
-            component_cost = self._calculate_component_cost(component)
+            with span('component', typ=component.component_typ):
+                component_cost, component_total = self._calculate_component_cost(component)
             component_results.append(component_cost)
-            total_cost += component_cost['total_material_cost']
+            total_cost += component_total
 
         return {
             'components': component_results,
-            'total_material_cost': total_cost,
+            'total_material_cost': money.to_float(total_cost),
             'component_count': len(component_results),
             'unique_materials': len(extraction.get_unique_materials())
         }
@@ -118,7 +122,7 @@ class MultiMaterialCalculationService:
     def _calculate_component_cost(
         self,
         component: ComponentSpecification
-    ) -> Dict[str, Any]:
+    ) -> Tuple[Dict[str, Any], Money]:
         """
         Calculate cost for a single component.
 
@@ -126,7 +130,7 @@ class MultiMaterialCalculationService:
             component: ComponentSpecification
 
         Returns:
-            Component cost breakdown dict
+            Tuple of (component cost breakdown dict, total cost as Money)
         """
         # Step 1: Get base material cost
         base_cost = self._get_base_material_cost(component)
@@ -137,12 +141,14 @@ class MultiMaterialCalculationService:
         komplexität_faktor = self._get_komplexität_faktor(component.komplexität)
 
         # Step 3: Calculate total
-        total = base_cost * holzart_faktor * oberfläche_faktor * komplexität_faktor
+        total = base_cost
+        for faktor in (holzart_faktor, oberfläche_faktor, komplexität_faktor):
+            total = money.apply(total, money.to_rate(faktor))
 
         logger.debug(
             f"Component '{component.component_typ}': "
-            f"Base {base_cost} × Holzart {holzart_faktor} × "
-            f"Oberfläche {oberfläche_faktor} × Komplexität {komplexität_faktor} = {total}"
+            f"Base {money.to_float(base_cost)} × Holzart {holzart_faktor} × "
+            f"Oberfläche {oberfläche_faktor} × Komplexität {komplexität_faktor} = {money.to_float(total)}"
         )
 
         return {
@@ -150,17 +156,17 @@ class MultiMaterialCalculationService:
             'material_info': component.material.to_dict(),
             'maße': component.maße,
             'anzahl': component.anzahl,
-            'base_cost': float(base_cost),
+            'base_cost': money.to_float(base_cost),
             'holzart_faktor': float(holzart_faktor),
             'oberfläche_faktor': float(oberfläche_faktor),
             'komplexität_faktor': float(komplexität_faktor),
-            'total_material_cost': float(total)
-        }
+            'total_material_cost': money.to_float(total)
+        }, total
 
     def _get_base_material_cost(
         self,
         component: ComponentSpecification
-    ) -> Decimal:
+    ) -> Money:
         """
         Get base material cost for component.
 
@@ -173,7 +179,7 @@ class MultiMaterialCalculationService:
             component: ComponentSpecification
 
         Returns:
-            Base cost in EUR
+            Base cost as Money
         """
         # Try to find material in catalog
         material_key = f"{component.material.holzart} {component.material.stärke_mm}mm" if component.material.holzart else component.material.material_typ
@@ -193,10 +199,11 @@ class MultiMaterialCalculationService:
                     material_position.einheit
                 )
 
-                base_cost = material_position.preis_pro_einheit * Decimal(str(quantity))
+                base_cost = money.times(money.to_money(material_position.preis_pro_einheit), quantity)
                 logger.debug(
                     f"Found material '{material_position.material_bezeichnung}': "
-                    f"{quantity} {material_position.einheit} × {material_position.preis_pro_einheit}€ = {base_cost}€"
+                    f"{quantity} {material_position.einheit} × {material_position.preis_pro_einheit}€ "
+                    f"= {money.to_float(base_cost)}€"
                 )
                 return base_cost
 
@@ -219,10 +226,10 @@ class MultiMaterialCalculationService:
             Decimal('60.00')  # Generic fallback
         )
 
-        base_cost = area_m2 * price_per_m2
+        base_cost = money.times(money.to_money(price_per_m2), area_m2)
 
         logger.debug(
-            f"Using fallback pricing: {area_m2:.2f} m² × {price_per_m2}€/m² = {base_cost}€"
+            f"Using fallback pricing: {area_m2:.2f} m² × {price_per_m2}€/m² = {money.to_float(base_cost)}€"
         )
 
         return base_cost
@@ -63,6 +63,7 @@ class GermanOCRService(BaseExtractionService):
                 - text: Extracted OCR text
                 - confidence: Average confidence score
                 - lines: List of recognized text lines with positions
+                - page_count: Number of pages processed
                 - processing_time_ms: Processing time
 
         Raises:
@@ -87,6 +88,7 @@ class GermanOCRService(BaseExtractionService):
                 'text': results['text'],
                 'confidence': results['confidence'],
                 'lines': results['lines'],
+                'page_count': results.get('page_count', 1),
                 'processing_time_ms': processing_time_ms,
             }
         except Exception as e:
@@ -169,6 +171,7 @@ class GermanOCRService(BaseExtractionService):
             'text': text.strip(),
             'confidence': avg_confidence,
             'lines': lines,
+            'page_count': 1,
         }
 
     def _parse_ocr_result(self, result: List) -> tuple:
@@ -286,4 +289,5 @@ class GermanOCRService(BaseExtractionService):
             'text': text.strip(),
             'confidence': avg_confidence,
             'lines': lines,
+            'page_count': len(images),
         }
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""Memoized CalculationEngine results.
+
+Results are cached under a fingerprint of the calculation inputs plus the
+user's pricing snapshot version and the calculation date:
+
+- Any Betriebskennzahl change issues a new snapshot version (see
+  PricingSnapshotService), so stale results are never read again.
+- Seasonal rules depend on today's date, so each day gets its own keys.
+
+The cached result is returned as computed, including its calculated_at.
+"""
+
+import hashlib
+import json
+import logging
+from datetime import date
+from decimal import Decimal
+from typing import Any, Dict, Iterable, Optional
+
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+
+class PricingResultCache:
+    """Result cache and hit/miss counters for price calculations."""
+
+    KEY = 'pricing_result:{user_id}:{version}:{day}:{fingerprint}'
+    STATS_KEY = 'pricing_result:stats:{user_id}:{counter}'
+    TIMEOUT = 24 * 3600
+    STATS_TIMEOUT = 30 * 24 * 3600
+
+    # ===== FINGERPRINT =====
+
+    @classmethod
+    def fingerprint(
+        cls,
+        extracted_data: Dict[str, Any],
+        customer_type: str,
+        quantity: Optional[int] = None,
+        breakdown: bool = True,
+    ) -> str:
+        """Deterministic hash of the calculation inputs.
+
+        Key order does not matter; value types do (10, 10.0 and '10'
+        hash differently because the engine echoes them back as given).
+
+        Args:
+            extracted_data: Extracted document data
+            customer_type: Customer tier
+            quantity: Quantity override
+            breakdown: Whether the breakdown is included
+
+        Returns:
+            SHA-256 hex digest
+        """
+        payload = {
+            'extracted_data': cls._canonical(extracted_data),
+            'customer_type': customer_type,
+            'quantity': cls._canonical(quantity),
+            'breakdown': bool(breakdown),
+        }
+        raw = json.dumps(payload, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    @classmethod
+    def _canonical(cls, value: Any) -> Any:
+        """JSON-safe value with explicit type tags for scalars."""
+        if isinstance(value, dict):
+            return {str(k): cls._canonical(v) for k, v in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [cls._canonical(v) for v in value]
+        if value is None or isinstance(value, (bool, str)):
+            return value
+        if isinstance(value, int):
+            return f"i:{value}"
+        if isinstance(value, float):
+            return f"f:{value!r}"
+        if isinstance(value, Decimal):
+            return f"d:{value}"
+        return f"{type(value).__name__}:{value}"
+
+    # ===== LOOKUP =====
+
+    @classmethod
+    def key(cls, user_id: int, version: str, day: date, fingerprint: str) -> str:
+        return cls.KEY.format(
+            user_id=user_id, version=version, day=day.isoformat(), fingerprint=fingerprint
+        )
+
+    @classmethod
+    def get(cls, key: str) -> Optional[Dict[str, Any]]:
+        """Cached result or None."""
+        return cache.get(key)
+
+    @classmethod
+    def get_many(cls, keys: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Cached results by key (missing keys are left out)."""
+        return cache.get_many(list(keys))
+
+    @classmethod
+    def set(cls, key: str, result: Dict[str, Any]) -> None:
+        cache.set(key, result, timeout=cls.TIMEOUT)
+
+    @classmethod
+    def set_many(cls, results: Dict[str, Dict[str, Any]]) -> None:
+        if results:
+            cache.set_many(results, timeout=cls.TIMEOUT)
+
+    # ===== METRICS =====
+
+    @classmethod
+    def record(cls, user_id: int, hits: int = 0, misses: int = 0) -> None:
+        """Add to the user's hit/miss counters."""
+        for counter, amount in (('hits', hits), ('misses', misses)):
+            if not amount:
+                continue
+            key = cls.STATS_KEY.format(user_id=user_id, counter=counter)
+            try:
+                if not cache.add(key, amount, timeout=cls.STATS_TIMEOUT):
+                    cache.incr(key, amount)
+            except ValueError:
+                # Key expired between add() and incr()
+                cache.set(key, amount, timeout=cls.STATS_TIMEOUT)
+
+        logger.debug(f"Pricing result cache for user {user_id}: {hits} hit(s), {misses} miss(es)")
+
+    @classmethod
+    def stats(cls, user_id: int) -> Dict[str, Any]:
+        """Hit/miss counters of a user.
+
+        Returns:
+            Dict with hits, misses and hit_rate (0-1, None without lookups)
+        """
+        hits = cache.get(cls.STATS_KEY.format(user_id=user_id, counter='hits')) or 0
+        misses = cache.get(cls.STATS_KEY.format(user_id=user_id, counter='misses')) or 0
+        lookups = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / lookups, 4) if lookups else None,
+        }
+
+    @classmethod
+    def reset_stats(cls, user_id: int) -> None:
+        cache.delete_many([
+            cls.STATS_KEY.format(user_id=user_id, counter=counter)
+            for counter in ('hits', 'misses')
+        ])
@@ -0,0 +1,265 @@
+# -*- coding: utf-8 -*-
+"""PricingScenarioEngine: what-if price matrices over parameter grids.
+
+Evaluates the CalculationEngine 8-step workflow for every combination of
+wood type × surface finish × complexity × material quantity in one pass
+over NumPy arrays. Factors come from the user's PricingSnapshot, so a grid
+of thousands of cells costs a few milliseconds and no database queries.
+
+Grid prices are float64 approximations for browsing. Rows the caller
+selects are re-priced with CalculationEngine (fixed-point Money) and returned as
+exact prices.
+"""
+
+import logging
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from django.contrib.auth.models import User
+from django.utils import timezone
+
+from extraction.services.calculation_engine import CalculationEngine
+
+logger = logging.getLogger(__name__)
+
+
+class PricingScenarioEngine:
+    """
+    Price matrix for parameter combinations of one project.
+
+    Example:
+        >>> engine = PricingScenarioEngine(user)
+        >>> grid = engine.evaluate_grid(
+        ...     base_data={'labor_hours': 12, 'material_sku': 'EICHE-25MM'},
+        ...     holzarten=['eiche', 'buche', 'nussbaum'],
+        ...     oberflaechen=['oelen', 'lackieren'],
+        ...     komplexitaeten=['gedrechselt', 'hand_geschnitzt'],
+        ...     material_quantities=[10, 100, 500],
+        ...     select=[0, 17],
+        ... )
+        >>> grid['rows'][17]['exact_price_eur']
+    """
+
+    MAX_CELLS = 20000
+    MAX_SELECTED = 100
+
+    def __init__(self, user: User):
+        """Initialize scenario engine for a user.
+
+        Args:
+            user: Django User instance
+
+        Raises:
+            CalculationError: If user has no active Betriebskennzahl configuration
+        """
+        self.calculator = CalculationEngine(user)
+
+    def evaluate_grid(
+        self,
+        base_data: Dict[str, Any],
+        holzarten: Optional[Sequence[str]] = None,
+        oberflaechen: Optional[Sequence[str]] = None,
+        komplexitaeten: Optional[Sequence[str]] = None,
+        material_quantities: Optional[Sequence[float]] = None,
+        customer_type: str = 'neue_kunden',
+        select: Optional[Sequence[int]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Price every parameter combination.
+
+        Axes left empty use the value from base_data. Rows are ordered with
+        material quantity varying fastest, then complexity, surface and
+        wood type (C order of the shape).
+
+        Args:
+            base_data: extracted_data shared by all cells (labor_hours,
+                material_sku, material_cost_eur, ...)
+            holzarten: Wood types
+            oberflaechen: Surface finishes
+            komplexitaeten: Complexity techniques
+            material_quantities: Material quantities
+            customer_type: Customer tier for discounts
+            select: Row indexes to re-price exactly with CalculationEngine
+
+        Returns:
+            Dict with axes, shape, rows (parameters + price_eur, plus
+            exact_price_eur for selected rows) and snapshot_version
+
+        Raises:
+            ValueError: If the grid or selection is too large or a
+                selected index is out of range
+        """
+        axes = {
+            'holzart': self._axis(holzarten, base_data.get('holzart', '')),
+            'oberflaeche': self._axis(oberflaechen, base_data.get('oberflaeche', '')),
+            'komplexitaet': self._axis(komplexitaeten, base_data.get('komplexitaet', '')),
+            'material_quantity': [
+                float(q) for q in (material_quantities or [base_data.get('material_quantity', 1)])
+            ],
+        }
+        shape = tuple(len(values) for values in axes.values())
+        cells = int(np.prod(shape))
+        if cells > self.MAX_CELLS:
+            raise ValueError(f"Grid has {cells} cells, maximum is {self.MAX_CELLS}")
+
+        select = list(select or [])
+        if len(select) > self.MAX_SELECTED:
+            raise ValueError(f"At most {self.MAX_SELECTED} rows can be selected")
+        for index in select:
+            if not 0 <= index < cells:
+                raise ValueError(f"Selected row {index} is outside the grid (0-{cells - 1})")
+
+        prices = self._vectorized_prices(base_data, axes, customer_type)
+
+        rows = []
+        for index, (h, o, k, q) in enumerate(np.ndindex(*shape)):
+            rows.append({
+                'index': index,
+                'holzart': axes['holzart'][h],
+                'oberflaeche': axes['oberflaeche'][o],
+                'komplexitaet': axes['komplexitaet'][k],
+                'material_quantity': axes['material_quantity'][q],
+                'price_eur': round(float(prices[index]), 2),
+            })
+
+        if select:
+            self._add_exact_prices(rows, select, base_data, customer_type)
+
+        return {
+            'axes': axes,
+            'shape': list(shape),
+            'rows': rows,
+            'customer_type': customer_type,
+            'snapshot_version': self.calculator.snapshot.version,
+            'currency': 'EUR',
+            'calculated_at': timezone.now().isoformat(),
+        }
+
+    # =====================
+    # VECTORIZED WORKFLOW
+    # =====================
+
+    def _vectorized_prices(
+        self,
+        base_data: Dict[str, Any],
+        axes: Dict[str, List],
+        customer_type: str,
+    ) -> np.ndarray:
+        """8-step workflow over all cells (float64, flattened in C order)."""
+        snapshot = self.calculator.snapshot
+
+        holz = np.array([
+            self._factor(snapshot.holzarten, value) for value in axes['holzart']
+        ])
+        oberflaeche = np.array([
+            self._factor(snapshot.oberflaechen, value) for value in axes['oberflaeche']
+        ])
+        komplexitaet = np.array([
+            self._factor(snapshot.komplexitaeten, value) for value in axes['komplexitaet']
+        ])
+        quantity = np.array(axes['material_quantity'], dtype=np.float64)
+
+        # Broadcast to (H, O, K, Q)
+        holz = holz[:, None, None, None]
+        oberflaeche = oberflaeche[None, :, None, None]
+        komplexitaet = komplexitaet[None, None, :, None]
+        quantity = quantity[None, None, None, :]
+
+        # Step 1: Base material cost
+        material_sku = base_data.get('material_sku')
+        material = snapshot.materialien.get(material_sku) if material_sku else None
+        if snapshot.use_custom_materials and material_sku:
+            if material is not None:
+                base = float(material.standardkosten_eur) * quantity
+            else:
+                base = np.full_like(quantity, 100.0)  # Unknown SKU: default estimate
+        else:
+            extracted_cost = base_data.get('material_cost_eur')
+            base = np.full_like(quantity, float(extracted_cost) if extracted_cost else 100.0)
+
+        # Steps 2-4: TIER 1 factors
+        if snapshot.use_handwerk_standard and snapshot.has_template:
+            base = base * holz * oberflaeche * komplexitaet
+
+        # Step 5: Labor
+        labor_hours = float(base_data.get('labor_hours', 0))
+        labor = labor_hours * float(snapshot.stundensatz_arbeit) if labor_hours > 0 else 0.0
+
+        # Step 6: Overhead and margin
+        price = (base + labor + float(snapshot.betriebskosten_umlage)) * (
+            1 + float(snapshot.gewinnmarge_prozent) / 100
+        )
+
+        # Step 7: Seasonal adjustments (all relative to the step 6 price)
+        if snapshot.use_seasonal_adjustments:
+            percent = 0.0
+            absolute = 0.0
+            day = self.calculator._pricing_date(base_data, [])
+            for rule in snapshot.active_seasonal_rules(day):
+                if rule.adjustment_type == 'prozent':
+                    percent += float(rule.value)
+                else:
+                    absolute += float(rule.value)
+            price = price * (1 - percent / 100) - absolute
+
+        # Step 8: Customer and bulk discounts (both relative to the step 7 price)
+        discount = np.zeros_like(quantity)
+        if snapshot.use_customer_discounts:
+            discount = discount + float(self.calculator._get_customer_discount(customer_type))
+        if snapshot.use_bulk_discounts and material is not None:
+            bulk = np.where(
+                quantity >= 500, material.rabatt_ab_500,
+                np.where(quantity >= 100, material.rabatt_ab_100, 0)
+            )
+            discount = discount + np.where(quantity > 0, bulk, 0)
+        price = price * (1 - discount / 100)
+
+        return np.broadcast_to(price, (
+            len(axes['holzart']), len(axes['oberflaeche']),
+            len(axes['komplexitaet']), len(axes['material_quantity']),
+        )).ravel()
+
+    def _add_exact_prices(
+        self,
+        rows: List[Dict[str, Any]],
+        select: List[int],
+        base_data: Dict[str, Any],
+        customer_type: str,
+    ) -> None:
+        """Re-price selected rows with the exact CalculationEngine workflow."""
+        items = [
+            dict(
+                base_data,
+                holzart=rows[index]['holzart'],
+                oberflaeche=rows[index]['oberflaeche'],
+                komplexitaet=rows[index]['komplexitaet'],
+                material_quantity=rows[index]['material_quantity'],
+            )
+            for index in select
+        ]
+        result = self.calculator.calculate_many(items, customer_type=customer_type)
+
+        for index, item in zip(select, result['items']):
+            if item['status'] == 'ok':
+                rows[index]['exact_price_eur'] = str(
+                    Decimal(str(item['result']['total_price_eur'])).quantize(Decimal('0.01'))
+                )
+                rows[index]['warnings'] = item['result']['warnings']
+            else:
+                rows[index]['exact_error'] = item['error']
+
+    # =====================
+    # HELPER METHODS
+    # =====================
+
+    @staticmethod
+    def _axis(values: Optional[Sequence[str]], default: str) -> List[str]:
+        """Lower-cased axis values, falling back to the base value."""
+        return [str(v).lower() for v in (values or [default])]
+
+    @staticmethod
+    def _factor(table: Dict[str, Any], key: str) -> float:
+        """Price factor, 1.0 if not configured (as in CalculationEngine)."""
+        entry = table.get(key) if key else None
+        return float(entry.preis_faktor) if entry is not None else 1.0
@@ -0,0 +1,90 @@
+"""Signal handlers for the extraction app."""
+from collections import defaultdict
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_save, pre_save
+from django.dispatch import receiver
+
+from documents.betriebskennzahl_models import HolzartKennzahl, IndividuelleBetriebskennzahl
+from documents.models import ExtractionResult
+
+
+# ===== PRICING INPUT INDEX =====
+
+@receiver(post_save, sender=ExtractionResult)
+def index_extraction_pricing_inputs(sender, instance, update_fields=None, **kwargs):
+    """Keep the SKU/Holzart → extraction index current."""
+    if update_fields is not None and 'extracted_data' not in update_fields:
+        return
+    # Imported here: extraction.services pulls in the OCR/NER stack
+    from extraction.services.bulk_repricing import PricingInputIndexService
+
+    PricingInputIndexService.index_extraction(instance)
+
+
+# ===== BULK REPRICING =====
+
+@receiver(pre_save, sender=HolzartKennzahl)
+def remember_holzart_factor(sender, instance, **kwargs):
+    """Keep the stored factor to tell price changes from other edits."""
+    instance._previous_pricing = (
+        HolzartKennzahl.objects.filter(pk=instance.pk)
+        .values_list('preis_faktor', 'is_enabled')
+        .first()
+    )
+
+
+@receiver(post_save, sender=HolzartKennzahl)
+def reprice_after_holzart_change(sender, instance, created, **kwargs):
+    """Factor changed, reprice the extractions of every user on the template.
+
+    Changes are collected per transaction, so a bulk edit of many Holzarten
+    queues one job per user instead of one per saved row.
+    """
+    previous = getattr(instance, '_previous_pricing', None)
+    if created or previous is None or previous == (instance.preis_faktor, instance.is_enabled):
+        return
+
+    connection = transaction.get_connection()
+    pending = getattr(connection, '_pending_holzart_repricing', None)
+    # First change of the transaction, or the (savepoint) block that
+    # collected the earlier ones was rolled back and dropped their flush
+    first = pending is None or not _flush_registered(connection, pending)
+    if first:
+        pending = connection._pending_holzart_repricing = defaultdict(set)
+    pending[instance.template_id].add(instance.holzart)
+    if first:
+        # Runs right away outside a transaction
+        transaction.on_commit(partial(_enqueue_holzart_repricing, pending))
+
+
+def _flush_registered(connection, pending) -> bool:
+    """Whether the on_commit flush of these pending changes is still queued."""
+    return any(
+        isinstance(hook[1], partial) and hook[1].args[0] is pending
+        for hook in connection.run_on_commit
+    )
+
+
+def _enqueue_holzart_repricing(pending):
+    """Queue one RepricingJob per user for the Holzart changes of a transaction."""
+    connection = transaction.get_connection()
+    if getattr(connection, '_pending_holzart_repricing', None) is pending:
+        connection._pending_holzart_repricing = None
+    if not pending:
+        return
+    from extraction.services.bulk_repricing import BulkRepricingService
+
+    holzarten_by_user = defaultdict(set)
+    users = {}
+    configs = IndividuelleBetriebskennzahl.objects.filter(
+        handwerk_template_id__in=list(pending),
+        is_active=True,
+    ).select_related('user')
+    for config in configs:
+        users[config.user_id] = config.user
+        holzarten_by_user[config.user_id] |= pending[config.handwerk_template_id]
+
+    for user_id, holzarten in holzarten_by_user.items():
+        BulkRepricingService.enqueue(users[user_id], holzarten=holzarten, trigger='holzart_kennzahl')
@@ -1,22 +1,47 @@
 """Celery async tasks for document extraction."""
 import logging
+import time
 from celery import shared_task
+from django.contrib.auth.models import User
+from django.db import DatabaseError
 from django.core.files.storage import default_storage
-from documents.models import Document, ExtractionResult, AuditLog
-from extraction.models import MaterialExtraction, ExtractionConfig
+from documents.models import Document, ExtractionResult, AuditLog, BatchDocument
+from extraction.models import MaterialExtraction
+from extraction.idempotency import (
+    IdempotencyLock,
+    build_idempotency_key,
+    cached_result,
+    get_extraction_config,
+)
 from extraction.services import GermanOCRService, GermanNERService
 from extraction.services.base_service import ExtractionServiceError
+from extraction.services.dead_letter_service import DeadLetterService
+from extraction.services.eta_estimator import ETAEstimator
 
 logger = logging.getLogger(__name__)
 
 
 @shared_task(bind=True, max_retries=3)
-def process_document_async(self, document_id: str, user_id: int = None) -> dict:
+def process_document_async(
+    self,
+    document_id: str,
+    user_id: int = None,
+    batch_id: str = None,
+    lock_owner: str = None
+) -> dict:
     """Async task to process document with OCR/NER.
 
+    Runs are idempotent per document, extraction config and processing
+    epoch: a duplicate of a finished run returns the stored result, and a
+    duplicate arriving while the run is in progress returns the running
+    task's id instead of repeating the work.
+
     Args:
         document_id: Document UUID
         user_id: User ID (for audit logging)
+        batch_id: Batch UUID if queued as part of a batch
+        lock_owner: Owner of the idempotency lock taken when queuing
+            (defaults to this task's id)
 
     Returns:
         Dictionary with processing results
@@ -27,36 +52,68 @@ def process_document_async(self, document_id: str, user_id: int = None) -> dict:
         logger.error(f"Document {document_id} not found")
         return {'status': 'error', 'message': 'Document not found'}
 
+    config_dict = get_extraction_config()
+    idempotency_key = build_idempotency_key(document, config_dict)
+
+    # Duplicate of a running job: attach to it instead of starting over
+    task_id = lock_owner or self.request.id or 'local'
+    lock = IdempotencyLock(idempotency_key)
+    holder = lock.acquire(task_id)
+    if holder:
+        logger.info(f"Document {document_id} already being processed by task {holder}")
+        return {
+            'status': 'in_progress',
+            'document_id': str(document_id),
+            'task_id': holder,
+            'deduplicated': True,
+        }
+
+    # Duplicate of a finished run: return the stored result
+    if document.idempotency_key == idempotency_key:
+        previous = cached_result(document)
+        if previous:
+            logger.info(f"Document {document_id} already processed with key {idempotency_key[:12]}, skipping")
+            lock.release(task_id)
+            _update_batch_documents(document, 'completed')
+            return previous
+
+    retrying = False
+    # Stage tracking for the dead-letter store
+    stage = 'load'
+    stage_started = time.monotonic()
+    stage_timings = {}
+
+    def enter_stage(name):
+        nonlocal stage, stage_started
+        stage_timings[stage] = int((time.monotonic() - stage_started) * 1000)
+        stage, stage_started = name, time.monotonic()
+
     try:
         # Update status
         document.status = 'processing'
-        document.save(update_fields=['status'])
-
-        # Get extraction config
-        try:
-            config = ExtractionConfig.objects.get(language='de')
-            config_dict = {
-                'ocr_use_cuda': config.ocr_use_cuda,
-                'ocr_confidence_threshold': config.ocr_confidence_threshold,
-                'ner_model': config.ner_model,
-                'ner_confidence_threshold': config.ner_confidence_threshold,
-                'max_file_size_mb': config.max_file_size_mb,
-            }
-        except ExtractionConfig.DoesNotExist:
-            config_dict = {'max_file_size_mb': 50}
+        document.idempotency_key = idempotency_key
+        document.save(update_fields=['status', 'idempotency_key'])
 
         # OCR processing
+        enter_stage('ocr')
         logger.info(f"Starting OCR for document {document_id}")
         ocr_service = GermanOCRService(config_dict)
         ocr_result = ocr_service.process(document.file.path)
         logger.info(f"OCR completed for {document_id}: confidence={ocr_result['confidence']:.2f}")
 
         # NER processing
+        enter_stage('ner')
         logger.info(f"Starting NER for document {document_id}")
         ner_service = GermanNERService(config_dict)
         ner_result = ner_service.process(ocr_result['text'], document)
         logger.info(f"NER completed for {document_id}: entities={len(ner_result['entities'])}")
 
+        enter_stage('persist')
+
+        # Record page count for the ETA model
+        document.metadata['page_count'] = ocr_result.get('page_count', 1)
+        document.save(update_fields=['metadata'])
+
         # Create/update ExtractionResult
         extraction_result, created = ExtractionResult.objects.update_or_create(
             document=document,
@@ -67,6 +124,10 @@ def process_document_async(self, document_id: str, user_id: int = None) -> dict:
                     'ner': ner_result['confidence'],
                 },
                 'processing_time_ms': ocr_result['processing_time_ms'] + ner_result['processing_time_ms'],
+                'stage_timings': {
+                    'ocr': ocr_result['processing_time_ms'],
+                    'ner': ner_result['processing_time_ms'],
+                },
                 'extracted_data': {
                     'entities': ner_result['summary'],
                     'entity_count': len(ner_result['entities']),
@@ -92,26 +153,14 @@ def process_document_async(self, document_id: str, user_id: int = None) -> dict:
         document.status = 'completed'
         document.save(update_fields=['status'])
 
-        # Log processing
-        if user_id:
-            try:
-                from django.contrib.auth.models import User
-                user = User.objects.get(id=user_id)
-                AuditLog.objects.create(
-                    document=document,
-                    user=user,
-                    action='processed',
-                    details={
-                        'ocr_confidence': ocr_result['confidence'],
-                        'ner_confidence': ner_result['confidence'],
-                        'entity_count': len(ner_result['entities']),
-                        'async': True,
-                    }
-                )
-            except:
-                pass
-
-        logger.info(f"Successfully processed document {document_id}")
+        _record_completion(document, extraction_result, user_id, {
+            'ocr_confidence': ocr_result['confidence'],
+            'ner_confidence': ner_result['confidence'],
+            'entity_count': len(ner_result['entities']),
+            'async': True,
+        })
+
+        logger.info(f"Successfully processed document {document_id} (batch: {batch_id})")
 
         return {
             'status': 'success',
@@ -128,26 +177,26 @@ def process_document_async(self, document_id: str, user_id: int = None) -> dict:
         document.save(update_fields=['status'])
 
         # Log error
-        if user_id:
-            try:
-                from django.contrib.auth.models import User
-                user = User.objects.get(id=user_id)
-                AuditLog.objects.create(
-                    document=document,
-                    user=user,
-                    action='processed',
-                    details={'error': str(e), 'async': True}
-                )
-            except:
-                pass
+        _log_processing(document, user_id, {
+            'error': str(e),
+            'error_class': type(e).__name__,
+            'stage': stage,
+            'attempt': self.request.retries + 1,
+            'async': True,
+        })
 
         # Retry with exponential backoff
         retry_count = self.request.retries
         if retry_count < self.max_retries:
             countdown = 60 * (2 ** retry_count)  # 60s, 120s, 240s
             logger.info(f"Retrying document {document_id} in {countdown}s (attempt {retry_count + 1}/{self.max_retries})")
+            # Keep the lock: the retry runs under the same task id
+            retrying = True
             raise self.retry(exc=e, countdown=countdown)
 
+        _dead_letter(self, document, e, stage, stage_timings, stage_started, user_id, batch_id)
+        _update_batch_documents(document, 'failed', str(e))
+
         return {
             'status': 'error',
             'document_id': str(document_id),
@@ -158,12 +207,20 @@ def process_document_async(self, document_id: str, user_id: int = None) -> dict:
         logger.exception(f"Unexpected error processing document {document_id}")
         document.status = 'error'
         document.save(update_fields=['status'])
+
+        # Unexpected errors are not retried, dead-letter right away
+        _dead_letter(self, document, e, stage, stage_timings, stage_started, user_id, batch_id)
+        _update_batch_documents(document, 'failed', str(e))
         return {
             'status': 'error',
             'document_id': str(document_id),
             'message': 'Unexpected error during processing',
         }
 
+    finally:
+        if not retrying:
+            lock.release(task_id)
+
 
 @shared_task
 def cleanup_old_documents(days: int = 90) -> dict:
@@ -210,6 +267,167 @@ def cleanup_old_documents(days: int = 90) -> dict:
         }
 
 
+@shared_task
+def reprice_job_async(job_id: int) -> dict:
+    """Task to run a bulk repricing job.
+
+    Args:
+        job_id: RepricingJob ID
+
+    Returns:
+        Dictionary with job status and counts
+    """
+    from extraction.models import RepricingJob
+    from extraction.services.bulk_repricing import BulkRepricingService
+
+    try:
+        job = RepricingJob.objects.select_related('user').get(id=job_id)
+    except RepricingJob.DoesNotExist:
+        logger.error(f"Repricing job {job_id} not found")
+        return {'status': 'error', 'message': 'Job not found'}
+
+    if job.status != 'queued':
+        return {'status': 'skipped', 'job_status': job.status}
+
+    job = BulkRepricingService().run(job)
+    return {
+        'status': job.status,
+        'total_count': job.total_count,
+        'processed_count': job.processed_count,
+        'failed_count': job.failed_count,
+    }
+
+
+def _record_completion(
+    document: Document,
+    extraction_result: ExtractionResult,
+    user_id: int,
+    details: dict
+) -> None:
+    """Bookkeeping after a document completed.
+
+    The document is already saved as completed, so a failing step is
+    logged and skipped instead of turning the run into an error.
+
+    Args:
+        document: Completed document
+        extraction_result: Its extraction result
+        user_id: User ID (for audit logging)
+        details: Audit details
+    """
+    steps = (
+        # Learn from this run, then refresh batch progress and ETA
+        ('ETA model update', lambda: ETAEstimator().observe_result(extraction_result)),
+        ('Batch update', lambda: _update_batch_documents(document, 'completed')),
+        ('Dead-letter resolution', lambda: DeadLetterService().resolve_for_document(document)),
+        ('Audit log', lambda: _log_processing(document, user_id, details)),
+    )
+    for name, step in steps:
+        try:
+            step()
+        except Exception:
+            logger.exception(f"{name} failed for completed document {document.id}")
+
+
+def _log_processing(document: Document, user_id: int, details: dict) -> None:
+    """Write a 'processed' audit log entry for the requesting user.
+
+    Audit logging must not fail the task, but failures are logged with
+    context instead of being swallowed.
+
+    Args:
+        document: Processed document
+        user_id: User ID (no entry is written without one)
+        details: Audit details
+    """
+    if not user_id:
+        return
+
+    try:
+        AuditLog.objects.create(
+            document=document,
+            user=User.objects.get(id=user_id),
+            action='processed',
+            details=details
+        )
+    except User.DoesNotExist:
+        logger.warning(f"Audit log skipped for document {document.id}: user {user_id} not found")
+    except DatabaseError:
+        logger.warning(
+            f"Failed to write audit log for document {document.id} (user {user_id})",
+            exc_info=True
+        )
+
+
+def _dead_letter(
+    task,
+    document: Document,
+    exception: BaseException,
+    stage: str,
+    stage_timings: dict,
+    stage_started: float,
+    user_id: int = None,
+    batch_id: str = None
+) -> None:
+    """Record a task that gave up in the dead-letter store.
+
+    Args:
+        task: Bound Celery task
+        document: Failed document
+        exception: Final exception
+        stage: Stage that failed
+        stage_timings: Durations (ms) of completed stages
+        stage_started: Monotonic start time of the failed stage
+        user_id: User ID from the task payload
+        batch_id: Batch UUID from the task payload
+    """
+    timings = dict(stage_timings)
+    timings[stage] = int((time.monotonic() - stage_started) * 1000)
+
+    DeadLetterService().record(
+        document=document,
+        exception=exception,
+        stage=stage,
+        task_payload={
+            'document_id': str(document.id),
+            'user_id': user_id,
+            'batch_id': str(batch_id) if batch_id else None,
+        },
+        stage_timings=timings,
+        task_id=task.request.id or '',
+        retry_count=task.request.retries or 0,
+    )
+
+
+def _update_batch_documents(
+    document: Document,
+    status: str,
+    error_message: str = None
+) -> None:
+    """Report a document's outcome to every batch waiting on it.
+
+    Duplicate requests attach to the running job instead of queuing their
+    own, so more than one batch may be waiting for the same document.
+
+    Args:
+        document: Processed document
+        status: 'completed' or 'failed'
+        error_message: Error message if failed
+    """
+    from extraction.services.batch_processor import BatchProcessor
+
+    waiting = BatchDocument.objects.select_related('batch__user').filter(
+        document=document,
+        status__in=['queued', 'processing']
+    )
+    for batch_doc in waiting:
+        BatchProcessor(batch_doc.batch.user).update_document_status(
+            str(batch_doc.id),
+            status,
+            error_message=error_message
+        )
+
+
 def _extract_material_specs(entities: list) -> dict:
     """Extract material specifications from entities.
 
@@ -1,10 +1,11 @@
 """Proposal generation and pricing calculation services."""
 import logging
-from decimal import Decimal
+from decimal import ROUND_HALF_EVEN, Decimal
 from typing import Dict, List, Tuple
 from datetime import datetime, timedelta
 
 from django.utils import timezone
+from core import money
 from documents.models import Document
 from extraction.models import MaterialExtraction
 from core.constants import (
@@ -138,7 +139,9 @@ class ProposalService:
             )
 
             # Create proposal line
-            line_total = Decimal(str(quantity)) * unit_price
+            line_total = money.to_decimal(
+                money.times(money.to_money(unit_price), quantity), rounding=ROUND_HALF_EVEN
+            )
             ProposalLine.objects.create(
                 proposal=proposal,
                 position=position,
@@ -211,7 +214,10 @@ class ProposalService:
             # Calculate material cost
             base_material_cost = material_spec['base_material_cost_per_sqm']
             surface_surcharge = surface_spec.get('material_surcharge', Decimal('0'))
-            total_material_cost = (base_material_cost + surface_surcharge) * quality_spec
+            total_material_cost = money.apply(
+                money.to_money(base_material_cost + surface_surcharge),
+                money.to_rate(quality_spec['factor'])
+            )
 
             # Calculate labor cost
             base_hours = material_spec['base_time_hours_per_sqm']
@@ -219,15 +225,17 @@ class ProposalService:
             surface_factor = surface_spec['time_factor']
             total_hours = base_hours * complexity_factor * surface_factor
 
-            labor_cost = total_hours * self.template.hourly_rate
+            labor_cost = money.times(money.to_money(self.template.hourly_rate), total_hours)
 
             # Apply profit margin and overhead
             total_cost = total_material_cost + labor_cost
-            with_margin = total_cost * (1 + self.template.profit_margin_percent / 100)
-            with_overhead = with_margin * self.template.overhead_factor
+            with_margin = money.apply(
+                total_cost, money.ONE + money.percent(self.template.profit_margin_percent)
+            )
+            with_overhead = money.apply(with_margin, money.to_rate(self.template.overhead_factor))
 
-            # Normalize to reasonable precision
-            unit_price = with_overhead.quantize(Decimal('0.01'))
+            # Normalize to cents (half-even, as Decimal.quantize did before)
+            unit_price = money.to_decimal(with_overhead, rounding=ROUND_HALF_EVEN)
 
             # Log calculation
             ProposalCalculationLog.objects.create(
@@ -237,7 +245,7 @@ class ProposalService:
                 unit=unit,
                 base_material_cost=base_material_cost,
                 base_labor_hours=total_hours,
-                labor_cost=labor_cost,
+                labor_cost=money.to_decimal(labor_cost),
                 complexity_factor=Decimal(str(complexity_factor)),
                 surface_factor=Decimal(str(surface_factor)),
                 quality_tier=quality,
@@ -3,11 +3,15 @@ API Tests for Calculation Endpoints - Phase 4D
 
 Tests for:
 - POST /api/v1/calculate/price/
+- POST /api/v1/calculate/batch/
+- POST /api/v1/calculate/scenarios/
+- POST /api/v1/calculate/reprice/, PATCH /api/v1/calculate/reprice/{session_id}/
 - POST /api/v1/calculate/multi-material/
 - GET /api/v1/pauschalen/applicable/
 """
 import pytest
 from decimal import Decimal
+from unittest.mock import patch
 from django.contrib.auth.models import User
 from django.urls import reverse
 from rest_framework import status
@@ -287,6 +291,262 @@ class TestPriceCalculationAPI:
         assert response.status_code == status.HTTP_200_OK
         assert response.data['breakdown'] == {}
 
+    def test_calculate_price_with_trace(self, api_client, test_user):
+        """Test per-step trace in the response."""
+        IndividuelleBetriebskennzahl.objects.create(
+            user=test_user,
+            stundensatz_arbeit=Decimal('65.00'),
+            gewinnmarge_prozent=Decimal('20.00'),
+            betriebskosten_umlage=Decimal('10.00'),
+            is_active=True
+        )
+        api_client.force_authenticate(user=test_user)
+
+        data = {
+            'extracted_data': {
+                'holzart': 'eiche',
+                'material_cost_eur': 100.00,
+            },
+            'trace': True
+        }
+
+        url = reverse('api-v1:calculate-price')
+        response = api_client.post(url, data, format='json')
+
+        assert response.status_code == status.HTTP_200_OK
+        trace = response.data['trace']
+        assert trace['name'] == 'calculate_project_price'
+        assert 'step_1_base_material' in [s['name'] for s in trace['spans']]
+
+        response = api_client.post(url, dict(data, trace=False), format='json')
+        assert 'trace' not in response.data
+
+    def test_calculate_price_preview(self, api_client, test_user):
+        """Test preview saves neither Pauschalen nor explanations."""
+        from documents.models_pauschalen import PauschaleAnwendung
+        from documents.transparency_models import CalculationExplanation
+
+        IndividuelleBetriebskennzahl.objects.create(
+            user=test_user,
+            stundensatz_arbeit=Decimal('65.00'),
+            gewinnmarge_prozent=Decimal('20.00'),
+            betriebskosten_umlage=Decimal('10.00'),
+            is_active=True
+        )
+        BetriebspauschaleRegel.objects.create(
+            user=test_user, name='Anfahrt', pauschale_typ='anfahrt', betrag=Decimal('50.00')
+        )
+        document = Document.objects.create(
+            user=test_user,
+            file='test.pdf',
+            original_filename='test.pdf',
+            file_size_bytes=1000,
+            status='completed'
+        )
+        extraction_result = ExtractionResult.objects.create(
+            document=document,
+            ocr_text='Test OCR text',
+            confidence_scores={'ocr': 0.95},
+            processing_time_ms=1000,
+            extracted_data={}
+        )
+        api_client.force_authenticate(user=test_user)
+
+        data = {
+            'extracted_data': {'material_cost_eur': 100.00},
+            'extraction_result_id': str(extraction_result.id),
+            'preview': True
+        }
+
+        url = reverse('api-v1:calculate-price')
+        response = api_client.post(url, data, format='json')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['preview'] is True
+        assert response.data['calculation_id'] is None
+        assert response.data['pauschalen']['total'] == 50.0
+        assert not PauschaleAnwendung.objects.exists()
+        assert not CalculationExplanation.objects.exists()
+
+
+@pytest.mark.django_db
+class TestBatchPriceCalculationAPI:
+    """Tests for POST /api/v1/calculate/batch/"""
+
+    @pytest.fixture
+    def batch_config(self, test_user):
+        """Minimal configuration without template."""
+        return IndividuelleBetriebskennzahl.objects.create(
+            user=test_user,
+            stundensatz_arbeit=Decimal('65.00'),
+            gewinnmarge_prozent=Decimal('20.00'),
+            betriebskosten_umlage=Decimal('10.00'),
+            is_active=True
+        )
+
+    def test_batch_success(self, api_client, test_user, batch_config):
+        """Test pricing many positions in one request."""
+        api_client.force_authenticate(user=test_user)
+
+        items = [{'labor_hours': i % 8, 'material_cost_eur': 50 + i} for i in range(300)]
+        url = reverse('api-v1:calculate-batch')
+        response = api_client.post(url, {'items': items}, format='json')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['count'] == 300
+        assert response.data['failed'] == 0
+        assert [item['index'] for item in response.data['items']] == list(range(300))
+        assert response.data['total_price_eur'] == pytest.approx(
+            sum(item['result']['total_price_eur'] for item in response.data['items'])
+        )
+
+    def test_batch_invalid_number(self, api_client, test_user, batch_config):
+        """Test batch rejects positions with invalid numbers."""
+        api_client.force_authenticate(user=test_user)
+
+        url = reverse('api-v1:calculate-batch')
+        response = api_client.post(
+            url, {'items': [{'labor_hours': 2}, {'labor_hours': 'zwei'}]}, format='json'
+        )
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_batch_size_limits(self, api_client, test_user, batch_config):
+        """Test empty and oversized batches are rejected."""
+        api_client.force_authenticate(user=test_user)
+
+        url = reverse('api-v1:calculate-batch')
+        assert api_client.post(url, {'items': []}, format='json').status_code == 400
+        assert api_client.post(url, {'items': [{}] * 1001}, format='json').status_code == 400
+
+    def test_batch_without_config(self, api_client, test_user):
+        """Test batch calculation fails without Betriebskennzahl config."""
+        api_client.force_authenticate(user=test_user)
+
+        url = reverse('api-v1:calculate-batch')
+        response = api_client.post(url, {'items': [{}]}, format='json')
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+@pytest.mark.django_db
+class TestPriceScenarioAPI:
+    """Tests for POST /api/v1/calculate/scenarios/"""
+
+    @pytest.fixture
+    def scenario_config(self, test_user):
+        """Minimal configuration without template."""
+        return IndividuelleBetriebskennzahl.objects.create(
+            user=test_user,
+            stundensatz_arbeit=Decimal('65.00'),
+            gewinnmarge_prozent=Decimal('20.00'),
+            betriebskosten_umlage=Decimal('10.00'),
+            is_active=True
+        )
+
+    def test_scenario_grid(self, api_client, test_user, scenario_config):
+        """Test price matrix with exact selected rows."""
+        api_client.force_authenticate(user=test_user)
+
+        data = {
+            'base_data': {'labor_hours': 4, 'material_cost_eur': 120},
+            'holzarten': ['eiche', 'buche'],
+            'oberflaechen': ['oelen', 'lackieren', 'roh'],
+            'material_quantities': [10, 100],
+            'select': [5],
+        }
+        url = reverse('api-v1:calculate-scenarios')
+        response = api_client.post(url, data, format='json')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['shape'] == [2, 3, 1, 2]
+        assert len(response.data['rows']) == 12
+        assert 'exact_price_eur' in response.data['rows'][5]
+
+    def test_scenario_selection_out_of_range(self, api_client, test_user, scenario_config):
+        """Test selecting a row outside the grid fails."""
+        api_client.force_authenticate(user=test_user)
+
+        url = reverse('api-v1:calculate-scenarios')
+        response = api_client.post(url, {'holzarten': ['eiche'], 'select': [3]}, format='json')
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.data['error_code'] == 'invalid_grid'
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures('locmem_cache')
+class TestRepricingAPI:
+    """Tests for POST /api/v1/calculate/reprice/ and PATCH .../{session_id}/"""
+
+    @pytest.fixture
+    def reprice_config(self, test_user):
+        """Minimal configuration without template."""
+        return IndividuelleBetriebskennzahl.objects.create(
+            user=test_user,
+            stundensatz_arbeit=Decimal('65.00'),
+            gewinnmarge_prozent=Decimal('20.00'),
+            betriebskosten_umlage=Decimal('10.00'),
+            use_customer_discounts=True,
+            is_active=True
+        )
+
+    def test_reprice_session(self, api_client, test_user, reprice_config):
+        """Test opening a session and changing one field."""
+        api_client.force_authenticate(user=test_user)
+
+        response = api_client.post(
+            reverse('api-v1:calculate-reprice'),
+            {'extracted_data': {'material_cost_eur': 100, 'labor_hours': 2}},
+            format='json'
+        )
+        assert response.status_code == status.HTTP_201_CREATED
+        session_id = response.data['session_id']
+
+        url = reverse('api-v1:calculate-reprice-session', kwargs={'session_id': session_id})
+        response = api_client.patch(url, {'customer_type': 'vip_kunden'}, format='json')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['recomputed'] == ['step_8_customer_discounts']
+        # (100 + 130 + 10) × 1.2 × 0.9
+        assert response.data['total_price_eur'] == pytest.approx(259.2)
+
+    def test_reprice_unknown_session(self, api_client, test_user, reprice_config):
+        """Test expired sessions return 404."""
+        api_client.force_authenticate(user=test_user)
+
+        url = reverse('api-v1:calculate-reprice-session', kwargs={'session_id': 'abc'})
+        response = api_client.patch(url, {'changes': {'labor_hours': 3}}, format='json')
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+        assert response.data['error_code'] == 'session_not_found'
+
+    def test_reprice_invalid_number(self, api_client, test_user, reprice_config):
+        """Test numeric validation of changes."""
+        api_client.force_authenticate(user=test_user)
+
+        url = reverse('api-v1:calculate-reprice-session', kwargs={'session_id': 'abc'})
+        response = api_client.patch(url, {'changes': {'labor_hours': 'viele'}}, format='json')
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_reprice_unexpected_error(self, api_client, test_user, reprice_config):
+        """Test unexpected errors return 500 like the other calculation views."""
+        api_client.force_authenticate(user=test_user)
+
+        with patch('api.v1.views.calculation_views.IncrementalPricingService.start', side_effect=RuntimeError):
+            response = api_client.post(
+                reverse('api-v1:calculate-reprice'), {'extracted_data': {'labor_hours': 2}}, format='json'
+            )
+        assert response.status_code == status.HTTP_500_INTERNAL_SERVER_ERROR
+        assert response.data['error_code'] == 'internal_error'
+
+        url = reverse('api-v1:calculate-reprice-session', kwargs={'session_id': 'abc'})
+        with patch('api.v1.views.calculation_views.IncrementalPricingService.reprice', side_effect=RuntimeError):
+            response = api_client.patch(url, {'changes': {'labor_hours': 3}}, format='json')
+        assert response.status_code == status.HTTP_500_INTERNAL_SERVER_ERROR
+        assert response.data['error_code'] == 'internal_error'
+
 
 @pytest.mark.django_db
 class TestMultiMaterialCalculationAPI:
@@ -9,9 +9,46 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings.development')
 django.setup()
 
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from rest_framework.test import APIClient
 
 
+def _clear_caches():
+    """Empty the Django cache and the process-local snapshot, index and rule caches."""
+    from documents.services.bauteil_katalog_snapshot import KatalogSnapshotService
+    from documents.services.bauteil_regel_batch import RegelBatchCache
+    from documents.services.bauteil_regel_compiler import RegelCompileCache
+    from documents.services.pauschale_index import PauschaleIndexService
+    from documents.services.pricing_snapshot import PricingSnapshotService
+
+    cache.clear()
+    PricingSnapshotService.clear_local()
+    KatalogSnapshotService.clear_local()
+    PauschaleIndexService.clear_local()
+    RegelCompileCache.clear()
+    RegelBatchCache.clear()
+
+
+@pytest.fixture
+def locmem_cache(request, settings):
+    """
+    In-process Django cache instead of Redis, empty before and after the test.
+
+    Use per module with ``pytestmark = pytest.mark.usefixtures('locmem_cache')``.
+    Parametrize indirectly with a dict to override further settings:
+
+        @pytest.mark.parametrize('locmem_cache', [{'PROCESS_WAIT_POLL_SECONDS': 0.05}], indirect=True)
+    """
+    settings.CACHES = {
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+    }
+    for name, value in getattr(request, 'param', {}).items():
+        setattr(settings, name, value)
+    _clear_caches()
+    yield cache
+    _clear_caches()
+
+
 @pytest.fixture
 def api_client():
     """DRF API client."""
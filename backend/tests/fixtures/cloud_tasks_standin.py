@@ -0,0 +1,104 @@
+"""Local stand-in for the Cloud Tasks REST API (offline tests and benchmarks)."""
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+
+
+class CloudTasksStandIn:
+    """Minimal HTTP server emulating POST .../queues/QUEUE/tasks.
+
+    Every created task is recorded. latency_seconds simulates the network
+    round trip of the real API; fail_first_n makes the first n requests
+    answer with fail_status to exercise retries.
+    """
+
+    def __init__(
+        self,
+        latency_seconds: float = 0.0,
+        fail_first_n: int = 0,
+        fail_status: int = 503
+    ):
+        self.latency_seconds = latency_seconds
+        self.fail_first_n = fail_first_n
+        self.fail_status = fail_status
+
+        self.tasks: List[Dict[str, Any]] = []
+        self.request_count = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.connections = set()
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def api_base(self) -> str:
+        """Base URL to pass as AsyncCloudTasksDispatcher(api_base=...)."""
+        host, port = self._server.server_address
+        return f"http://{host}:{port}/v2"
+
+    def start(self) -> 'CloudTasksStandIn':
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # Keep-alive
+            disable_nagle_algorithm = True
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                body = json.loads(self.rfile.read(length) or b'{}')
+                status, response = standin._handle(self.path, body, self.client_address)
+
+                data = json.dumps(response).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def _handle(self, path: str, body: Dict[str, Any], client_address) -> tuple:
+        with self._lock:
+            self.request_count += 1
+            request_number = self.request_count
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            self.connections.add(client_address)
+
+        try:
+            if self.latency_seconds:
+                time.sleep(self.latency_seconds)
+
+            if request_number <= self.fail_first_n:
+                return self.fail_status, {'error': {'code': self.fail_status}}
+
+            if not path.endswith('/tasks') or 'task' not in body:
+                return 400, {'error': {'code': 400, 'message': 'Invalid task'}}
+
+            parent = path[len('/v2/'):-len('/tasks')]
+            task = dict(body['task'])
+            task.setdefault('name', f"{parent}/tasks/{uuid.uuid4().hex}")
+            with self._lock:
+                if any(t['name'] == task['name'] for t in self.tasks):
+                    return 409, {'error': {'code': 409, 'status': 'ALREADY_EXISTS'}}
+                self.tasks.append(task)
+            return 200, task
+        finally:
+            with self._lock:
+                self.in_flight -= 1
@@ -30,6 +30,7 @@ Usage:
 import json
 import logging
 import os
+import time
 from pathlib import Path
 from typing import Optional
 
@@ -67,6 +68,12 @@ class LoadTestConfig:
 
     # Performance thresholds (milliseconds)
     RESPONSE_TIME_THRESHOLD_MS = 2000  # Alert if response > 2 seconds
+    PROCESS_ENQUEUE_P95_MS = 500  # /process/ only enqueues; OCR runs in workers
+
+    # Read latency while processing runs (see ProcessingLatencyTracker)
+    PROCESSING_ACTIVE_SECONDS = 60  # A document counts as processing this long after enqueue
+    READ_P95_MAX_DRIFT = 1.5  # Busy p95 may be at most 1.5x the quiet p95
+    MIN_SAMPLES = 20
 
     @classmethod
     def load_fixtures(cls) -> dict:
@@ -79,6 +86,76 @@ class LoadTestConfig:
             return json.load(f)
 
 
+class ProcessingLatencyTracker:
+    """
+    Collect read latencies with and without document processing in flight.
+
+    Processing used to run inside the request and tie up API workers, so
+    read p95 climbed whenever documents were being processed. With the
+    endpoint only enqueueing, read p95 during processing ("busy") should
+    stay within READ_P95_MAX_DRIFT of read p95 without it ("quiet").
+    """
+
+    def __init__(self):
+        self.last_enqueue: Optional[float] = None
+        self.busy_ms: list = []
+        self.quiet_ms: list = []
+
+    def record_enqueue(self) -> None:
+        """Mark that a document was just queued for processing."""
+        self.last_enqueue = time.monotonic()
+
+    def is_processing(self) -> bool:
+        """Whether queued documents are presumably still processing."""
+        return (
+            self.last_enqueue is not None
+            and time.monotonic() - self.last_enqueue < LoadTestConfig.PROCESSING_ACTIVE_SECONDS
+        )
+
+    def record_read(self, response_time: float) -> None:
+        """Record a read request's response time (ms)."""
+        if self.is_processing():
+            self.busy_ms.append(response_time)
+        else:
+            self.quiet_ms.append(response_time)
+
+    @staticmethod
+    def p95(samples: list) -> Optional[float]:
+        """95th percentile of samples, None if there are too few."""
+        if len(samples) < LoadTestConfig.MIN_SAMPLES:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+    def report(self) -> bool:
+        """
+        Log busy vs quiet read p95.
+
+        Returns:
+            False if read p95 drifted beyond READ_P95_MAX_DRIFT
+        """
+        busy_p95 = self.p95(self.busy_ms)
+        quiet_p95 = self.p95(self.quiet_ms)
+        logger.info(
+            f"Read p95 quiet: {quiet_p95 if quiet_p95 is not None else 'n/a'}ms "
+            f"({len(self.quiet_ms)} requests), "
+            f"during processing: {busy_p95 if busy_p95 is not None else 'n/a'}ms "
+            f"({len(self.busy_ms)} requests)"
+        )
+
+        if busy_p95 is None or quiet_p95 is None:
+            logger.warning("Not enough samples to compare read p95 (run longer or ramp up slower)")
+            return True
+
+        drift = busy_p95 / max(quiet_p95, 1.0)
+        logger.info(f"Read p95 drift during processing: {drift:.2f}x "
+                    f"(limit {LoadTestConfig.READ_P95_MAX_DRIFT}x)")
+        return drift <= LoadTestConfig.READ_P95_MAX_DRIFT
+
+
+processing_tracker = ProcessingLatencyTracker()
+
+
 class DraftCraftBaseUser(HttpUser):
     """
     Base user class with authentication.
@@ -185,6 +262,34 @@ class DraftCraftBaseUser(HttpUser):
             return None
 
 
+    def process_document(self, doc_id, name: str = "[WRITE] Process Document") -> None:
+        """
+        Queue a document for processing.
+
+        The endpoint answers 202 Accepted with a job handle; extraction runs
+        in the workers. 400 means the document was already processed.
+
+        Args:
+            doc_id: Document ID to process
+            name: Request name in the statistics
+        """
+        with self.client.post(
+            LoadTestConfig.DOCUMENTS_PROCESS.format(id=doc_id),
+            headers=self.auth_headers,
+            catch_response=True,
+            name=name,
+        ) as response:
+            if response.status_code in [200, 202]:
+                processing_tracker.record_enqueue()
+                response.success()
+            elif response.status_code == 400:
+                response.success()
+            else:
+                response.failure(
+                    f"Failed to process document: {response.status_code}"
+                )
+
+
 class ReadHeavyUserTasks(TaskSet):
     """Task set for read-heavy users (60% of load)."""
 
@@ -252,25 +357,10 @@ class WriteHeavyUserTasks(TaskSet):
 
     @task(3)
     def process_document(self) -> None:
-        """Trigger document processing."""
-        if not self.user.document_ids:
-            self.user.get_document_list()
-
-        if self.user.document_ids:
-            doc_id = self.user.document_ids[0]
-            with self.user.client.post(
-                LoadTestConfig.DOCUMENTS_PROCESS.format(id=doc_id),
-                headers=self.user.auth_headers,
-                json={"force_reprocess": False},
-                catch_response=True,
-                name="[WRITE] Process Document",
-            ) as response:
-                if response.status_code in [200, 202, 204]:
-                    response.success()
-                else:
-                    response.failure(
-                        f"Failed to process document: {response.status_code}"
-                    )
+        """Upload a document and queue it for processing."""
+        doc_id = self.user.upload_document()
+        if doc_id:
+            self.user.process_document(doc_id, name="[WRITE] Process Document")
 
     @task(2)
     def check_processing_status(self) -> None:
@@ -309,25 +399,10 @@ class MixedUserTasks(TaskSet):
 
     @task(1)
     def process_document(self) -> None:
-        """Process a document."""
-        if not self.user.document_ids:
-            self.user.get_document_list()
-
-        if self.user.document_ids:
-            doc_id = self.user.document_ids[0]
-            with self.user.client.post(
-                LoadTestConfig.DOCUMENTS_PROCESS.format(id=doc_id),
-                headers=self.user.auth_headers,
-                json={"force_reprocess": False},
-                catch_response=True,
-                name="[WRITE] Process Document (Mixed)",
-            ) as response:
-                if response.status_code in [200, 202, 204]:
-                    response.success()
-                else:
-                    response.failure(
-                        f"Failed to process document: {response.status_code}"
-                    )
+        """Upload a document and queue it for processing."""
+        doc_id = self.user.upload_document()
+        if doc_id:
+            self.user.process_document(doc_id, name="[WRITE] Process Document (Mixed)")
 
     @task(1)
     def list_proposals(self) -> None:
@@ -406,10 +481,30 @@ def on_test_stop(environment, **kwargs) -> None:
     logger.info(f"Median response time: {stats.total.median_response_time:.0f}ms")
     logger.info(f"95th percentile response time: {stats.total.get_response_time_percentile(0.95):.0f}ms")
 
+    # Processing must not slow down the rest of the API
+    if not processing_tracker.report():
+        logger.error("Read p95 degraded while documents were processing")
+        environment.process_exit_code = 1
+
+    for name in ("[WRITE] Process Document", "[WRITE] Process Document (Mixed)"):
+        entry = stats.get(name, "POST")
+        if entry.num_requests:
+            process_p95 = entry.get_response_time_percentile(0.95)
+            logger.info(f"{name} p95: {process_p95:.0f}ms")
+            if process_p95 > LoadTestConfig.PROCESS_ENQUEUE_P95_MS:
+                logger.error(
+                    f"{name} p95 {process_p95:.0f}ms exceeds "
+                    f"{LoadTestConfig.PROCESS_ENQUEUE_P95_MS}ms - is processing still synchronous?"
+                )
+                environment.process_exit_code = 1
+
 
 @events.request.add_listener
 def on_request(request_type, name, response_time, response_length, exception, **kwargs) -> None:
     """Called for each request."""
+    if name.startswith("[READ]") and exception is None:
+        processing_tracker.record_read(response_time)
+
     if response_time > LoadTestConfig.RESPONSE_TIME_THRESHOLD_MS:
         logger.warning(
             f"Slow request detected: {name} took {response_time:.0f}ms "
@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+"""Tests for catalog snapshots used by StandardbauteilIntegrationService."""
+
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from core import money
+from documents.models_bauteile import (
+    BauteilKatalog,
+    BauteilKatalogPosition,
+    BauteilRegel,
+    StandardBauteil,
+)
+from documents.services.bauteil_katalog_snapshot import KatalogSnapshotService
+from documents.services.standardbauteil_integration import StandardbauteilIntegrationService
+
+pytestmark = pytest.mark.usefixtures('locmem_cache')
+
+COMPONENTS = {'Tür': {'anzahl': 2}, 'Schublade': {'anzahl': 3}}
+
+
+def _katalog(size, version='2025.1'):
+    """Global Tischler catalog with ``size`` components, each with an active and an inactive rule."""
+    katalog = BauteilKatalog.objects.create(
+        name=f'Beschläge {version}', version=version, gewerk='tischler',
+        gueltig_ab=date(2024, 1, 1), ist_standard=True,
+    )
+    for index in range(size):
+        bauteil = StandardBauteil.objects.create(
+            artikel_nr=f'{version}-{index:04d}', name=f'Topfband {index:04d}', kategorie='beschlag',
+            gewerke=['tischler'], einheit='stk', einzelpreis=Decimal('2.50'),
+        )
+        BauteilKatalogPosition.objects.create(
+            katalog=katalog, bauteil=bauteil, position=index,
+            katalog_einzelpreis=Decimal('2.00') if index % 2 else None,
+        )
+        BauteilRegel.objects.create(
+            bauteil=bauteil, name='Pro Tür', prioritaet=10,
+            regel_definition={'operation': 'MULTIPLY', 'faktor': 3, 'komponente': 'Tür', 'attribut': 'anzahl'},
+        )
+        BauteilRegel.objects.create(
+            bauteil=bauteil, name='Alt', prioritaet=1, ist_aktiv=False,
+            regel_definition={'operation': 'FIXED', 'wert': 99},
+        )
+    return katalog
+
+
+@pytest.mark.django_db
+class TestKatalogSnapshot:
+    """Snapshot contents and caching."""
+
+    def test_contents(self):
+        katalog = _katalog(2)
+        inactive = StandardBauteil.objects.create(
+            artikel_nr='X-1', name='Ausgelaufen', kategorie='beschlag', gewerke=['tischler'],
+            einheit='stk', einzelpreis=Decimal('1.00'), ist_aktiv=False,
+        )
+        BauteilKatalogPosition.objects.create(katalog=katalog, bauteil=inactive)
+
+        snapshot = KatalogSnapshotService.get(katalog)
+
+        assert [b.name for b in snapshot.bauteile] == ['Topfband 0000', 'Topfband 0001']
+        first, second = snapshot.bauteile
+        assert [r.name for r in snapshot.regeln[str(first.id)]] == ['Pro Tür']
+        assert snapshot.preis(first) == money.to_money('2.50')
+        assert snapshot.preis(second) == money.to_money('2.00')
+        assert [b.name for b, _ in snapshot.bauteile_mit_regeln('tischler')] == ['Topfband 0000', 'Topfband 0001']
+        assert snapshot.bauteile_mit_regeln('zimmerer') == []
+        assert len(snapshot.erfuellbare_regeln(COMPONENTS, 'tischler')) == 2
+        assert snapshot.erfuellbare_regeln({'Schublade': {'anzahl': 3}}, 'tischler') == []
+
+    def test_inactive_position_uses_standard_price(self):
+        katalog = _katalog(2)
+        BauteilKatalogPosition.objects.filter(katalog=katalog).update(ist_aktiv_in_katalog=False)
+
+        snapshot = KatalogSnapshotService.build(str(katalog.id), version='test')
+
+        assert {snapshot.preis(b) for b in snapshot.bauteile} == {money.to_money('2.50')}
+
+    @pytest.mark.parametrize('size', [3, 40])
+    def test_build_is_three_queries(self, size, django_assert_num_queries):
+        katalog = _katalog(size)
+
+        with django_assert_num_queries(3):
+            snapshot = KatalogSnapshotService.build(str(katalog.id), version='test')
+
+        assert len(snapshot.bauteile) == size
+
+    def test_warm_snapshot_needs_no_query(self, django_assert_num_queries):
+        katalog = _katalog(3)
+        snapshot = KatalogSnapshotService.get(katalog)
+
+        with django_assert_num_queries(0):
+            assert KatalogSnapshotService.get(katalog) is snapshot
+
+    def test_rule_change_invalidates(self, django_capture_on_commit_callbacks):
+        katalog = _katalog(1)
+        snapshot = KatalogSnapshotService.get(katalog)
+
+        regel = BauteilRegel.objects.get(name='Alt')
+        regel.ist_aktiv = True
+        with django_capture_on_commit_callbacks(execute=True):
+            regel.save()
+
+        fresh = KatalogSnapshotService.get(katalog)
+        assert fresh.version != snapshot.version
+        assert [r.name for r in fresh.regeln[str(fresh.bauteile[0].id)]] == ['Alt', 'Pro Tür']
+
+    def test_position_price_change_invalidates(self, django_capture_on_commit_callbacks):
+        katalog = _katalog(1)
+        KatalogSnapshotService.get(katalog)
+
+        position = BauteilKatalogPosition.objects.get(katalog=katalog)
+        position.katalog_einzelpreis = Decimal('3.10')
+        with django_capture_on_commit_callbacks(execute=True):
+            position.save()
+
+        snapshot = KatalogSnapshotService.get(katalog)
+        assert snapshot.preis(snapshot.bauteile[0]) == money.to_money('3.10')
+
+    def test_invalidation_waits_for_commit(self, django_capture_on_commit_callbacks):
+        """A snapshot rebuilt before the commit cannot keep the old rows."""
+        katalog = _katalog(1)
+        version = KatalogSnapshotService.get(katalog).version
+
+        bauteil = StandardBauteil.objects.get(kataloge=katalog)
+        bauteil.einzelpreis = Decimal('2.80')
+        with django_capture_on_commit_callbacks(execute=True) as callbacks:
+            bauteil.save()
+            assert KatalogSnapshotService.get(katalog).version == version
+
+        assert len(callbacks) == 1
+        assert KatalogSnapshotService.get(katalog).version != version
+
+
+@pytest.mark.django_db
+class TestIntegrationQueries:
+    """Component calculation queries do not grow with the catalog."""
+
+    def _count_queries(self, katalog):
+        service = StandardbauteilIntegrationService(extraction_result_id='test', katalog_id=str(katalog.id))
+        with CaptureQueriesContext(connection) as context:
+            summary = service.calculate_bauteil_kosten(COMPONENTS)
+        return len(context.captured_queries), summary
+
+    def test_constant_queries(self):
+        small = _katalog(3, version='small')
+        large = _katalog(60, version='large')
+
+        small_queries, small_summary = self._count_queries(small)
+        large_queries, large_summary = self._count_queries(large)
+
+        # Catalog lookup + components + rules + positions
+        assert small_queries == large_queries == 4
+        assert len(large_summary.positionen) == 60
+        assert large_summary.positionen[1].gesamtpreis == money.to_money('12.00')  # 6 × 2.00
+
+        warm_queries, _ = self._count_queries(large)
+        assert warm_queries == 1
+        assert money.to_float(small_summary.gesamt_netto) == 6 * 2.5 + 6 * 2.0 + 6 * 2.5
@@ -0,0 +1,315 @@
+# -*- coding: utf-8 -*-
+"""Tests for the pricing input index and bulk repricing jobs."""
+
+from decimal import Decimal
+from unittest.mock import patch
+
+import pytest
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from documents.betriebskennzahl_models import (
+    BetriebskennzahlTemplate,
+    HolzartKennzahl,
+    IndividuelleBetriebskennzahl,
+    MateriallistePosition,
+)
+from documents.models import Document, ExtractionResult
+from documents.services.bulk_upload_service import BulkUploadService
+from extraction.models import PricingInputIndex, RepricingJob
+from extraction.services.bulk_repricing import BulkRepricingService, PricingInputIndexService
+from extraction.services.calculation_engine import CalculationEngine
+from proposals.models import Proposal
+
+pytestmark = pytest.mark.usefixtures('locmem_cache')
+
+
+@pytest.fixture
+def template(db):
+    template = BetriebskennzahlTemplate.objects.create(name='Standard 2024')
+    HolzartKennzahl.objects.create(
+        template=template, holzart='eiche', kategorie='hartholz', preis_faktor=Decimal('1.3')
+    )
+    HolzartKennzahl.objects.create(
+        template=template, holzart='buche', kategorie='hartholz', preis_faktor=Decimal('1.1')
+    )
+    return template
+
+
+@pytest.fixture
+def user(authenticated_user, template):
+    user = authenticated_user
+    IndividuelleBetriebskennzahl.objects.create(
+        user=user,
+        is_active=True,
+        handwerk_template=template,
+        stundensatz_arbeit=Decimal('70.00'),
+        gewinnmarge_prozent=Decimal('20.00'),
+        betriebskosten_umlage=Decimal('30.00'),
+        use_handwerk_standard=True,
+        use_custom_materials=True,
+    )
+    MateriallistePosition.objects.create(
+        user=user, material_name='Eiche 25mm', sku='EICHE-25MM',
+        lieferant='Holz Meier', standardkosten_eur=Decimal('40.00')
+    )
+    return user
+
+
+def _extraction(user, extracted_data, name='test.pdf'):
+    document = Document.objects.create(
+        user=user,
+        file=name,
+        original_filename=name,
+        file_size_bytes=1000,
+        status='completed'
+    )
+    return ExtractionResult.objects.create(
+        document=document,
+        ocr_text='Test OCR text',
+        confidence_scores={'ocr': 0.95},
+        processing_time_ms=1000,
+        extracted_data=extracted_data
+    )
+
+
+def _priced(user, extracted_data, name='test.pdf'):
+    """Extraction carrying its current calculated_price."""
+    price = CalculationEngine(user).calculate_project_price(extracted_data)['total_price_eur']
+    return _extraction(user, dict(extracted_data, calculated_price=price), name)
+
+
+OAK = {'holzart': 'Eiche', 'material_sku': 'EICHE-25MM', 'material_quantity': 10, 'labor_hours': 8}
+BEECH = {'holzart': 'buche', 'material_cost_eur': 200, 'labor_hours': 5}
+TABLE = {
+    'extraction_type': 'multi_material',
+    'components': [{'component_typ': 'Tischplatte', 'material': {'material_typ': 'Holz', 'holzart': 'Nussbaum'}}],
+}
+
+
+class TestPricingInputIndex:
+    """The index follows extracted_data."""
+
+    def test_inputs_of(self):
+        assert PricingInputIndexService.inputs_of(OAK) == {('sku', 'EICHE-25MM'), ('holzart', 'eiche')}
+        assert PricingInputIndexService.inputs_of(TABLE) == {('holzart', 'nussbaum')}
+        assert PricingInputIndexService.inputs_of(None) == set()
+        # As stored by OCR/NER processing: nothing priced yet
+        assert PricingInputIndexService.inputs_of({'entities': {'MATERIAL': 2}, 'entity_count': 2}) == set()
+
+    def test_saving_an_extraction_indexes_it(self, user):
+        extraction = _extraction(user, OAK)
+
+        assert set(extraction.pricing_inputs.values_list('kind', 'key')) == {
+            ('sku', 'EICHE-25MM'), ('holzart', 'eiche')
+        }
+
+        extraction.extracted_data = BEECH
+        extraction.save()
+
+        assert list(extraction.pricing_inputs.values_list('kind', 'key')) == [('holzart', 'buche')]
+
+    def test_find(self, user):
+        oak = _extraction(user, OAK, 'oak.pdf')
+        beech = _extraction(user, BEECH, 'beech.pdf')
+        other = User.objects.create_user(username='other')
+        _extraction(other, OAK, 'other.pdf')
+
+        assert PricingInputIndexService.find(user.id, skus=['EICHE-25MM']) == [oak.id]
+        assert PricingInputIndexService.find(user.id, holzarten=['Buche', 'Eiche']) == [oak.id, beech.id]
+        assert PricingInputIndexService.find(user.id) == []
+
+    def test_rebuild(self, user):
+        _extraction(user, OAK, 'oak.pdf')
+        _extraction(user, TABLE, 'table.pdf')
+        PricingInputIndex.objects.all().delete()
+
+        assert PricingInputIndexService.rebuild(user) == 3
+        assert PricingInputIndex.objects.filter(user=user).count() == 3
+
+
+class TestBulkRepricing:
+    """Jobs reprice affected extractions and report deltas."""
+
+    def test_material_price_change(self, user, django_capture_on_commit_callbacks):
+        oak = _priced(user, OAK, 'oak.pdf')
+        beech = _priced(user, BEECH, 'beech.pdf')
+        proposal = Proposal.objects.create(
+            document=oak.document, proposal_number='ANG-001', status='draft', total=Decimal('1500.00')
+        )
+        old_price = oak.extracted_data['calculated_price']
+
+        position = MateriallistePosition.objects.get(user=user, sku='EICHE-25MM')
+        position.standardkosten_eur = Decimal('50.00')
+        with django_capture_on_commit_callbacks(execute=True):
+            position.save()
+        job = BulkRepricingService.enqueue(user, skus=['EICHE-25MM'], trigger='materialliste')
+        job = BulkRepricingService(pause_seconds=0).run(job)
+
+        oak.refresh_from_db()
+        new_price = oak.extracted_data['calculated_price']
+        assert new_price == CalculationEngine(user).calculate_project_price(OAK)['total_price_eur']
+        assert new_price > old_price
+
+        assert job.status == 'completed'
+        assert (job.total_count, job.processed_count, job.failed_count) == (1, 1, 0)
+        assert job.report['extractions'][0]['extraction_result_id'] == oak.id
+        assert job.report['proposals'] == [{
+            'proposal_id': str(proposal.id),
+            'proposal_number': 'ANG-001',
+            'status': 'draft',
+            'proposal_total_eur': 1500.0,
+            'old_price_eur': old_price,
+            'new_price_eur': new_price,
+            'delta_eur': round(new_price - old_price, 2),
+            'delta_percent': pytest.approx((new_price - old_price) / old_price * 100, abs=0.01),
+        }]
+        # Not priced with the SKU, left alone
+        assert ExtractionResult.objects.get(id=beech.id).extracted_data == beech.extracted_data
+
+    def test_closed_proposals_are_not_reported(self, user):
+        oak = _priced(user, OAK)
+        Proposal.objects.create(document=oak.document, proposal_number='ANG-002', status='accepted')
+
+        job = BulkRepricingService(pause_seconds=0).run(
+            BulkRepricingService.enqueue(user, holzarten=['eiche'])
+        )
+
+        assert len(job.report['extractions']) == 1
+        assert job.report['proposals'] == []
+
+    def test_chunks_are_throttled(self, user):
+        for index in range(5):
+            _priced(user, dict(OAK, labor_hours=index + 1), f'oak{index}.pdf')
+
+        service = BulkRepricingService(chunk_size=2, pause_seconds=0.25)
+        with patch('extraction.services.bulk_repricing.time.sleep') as sleep:
+            job = service.run(BulkRepricingService.enqueue(user, skus=['EICHE-25MM']))
+
+        assert job.processed_count == 5
+        assert [call.args for call in sleep.call_args_list] == [(0.25,), (0.25,)]
+
+    def test_chunk_queries_do_not_grow_with_size(self, user, django_assert_max_num_queries):
+        for index in range(20):
+            _priced(user, dict(OAK, labor_hours=index + 1), f'oak{index}.pdf')
+        job = BulkRepricingService.enqueue(user, skus=['EICHE-25MM'])
+        engine = CalculationEngine(user)
+        ids = PricingInputIndexService.find(user.id, skus=['EICHE-25MM'])
+        job.report = {'extractions': [], 'proposals': [], 'errors': []}
+
+        # Extractions, proposals, snapshot check and one bulk UPDATE
+        with django_assert_max_num_queries(6):
+            BulkRepricingService()._run_chunk(engine, job, ids)
+
+        assert job.processed_count == 20
+
+    def test_unpriced_extraction_has_no_delta(self, user):
+        unpriced = _extraction(user, OAK, 'unpriced.pdf')
+        priced = _priced(user, dict(OAK, labor_hours=4), 'priced.pdf')
+        position = MateriallistePosition.objects.get(user=user, sku='EICHE-25MM')
+        position.standardkosten_eur = Decimal('50.00')
+        position.save()
+
+        job = BulkRepricingService(pause_seconds=0).run(
+            BulkRepricingService.enqueue(user, skus=['EICHE-25MM'])
+        )
+
+        rows = {row['extraction_result_id']: row for row in job.report['extractions']}
+        assert rows[unpriced.id]['old_price_eur'] is None
+        assert (rows[unpriced.id]['delta_eur'], rows[unpriced.id]['delta_percent']) == (None, None)
+        assert job.report['total_delta_eur'] == rows[priced.id]['delta_eur']
+
+    def test_nothing_to_reprice(self, user):
+        assert BulkRepricingService.enqueue(user) is None
+
+
+class TestTriggers:
+    """Catalog changes queue repricing jobs."""
+
+    def test_materialliste_upload_queues_job(self, user, django_capture_on_commit_callbacks):
+        csv_content = (
+            'material_name,sku,lieferant,standardkosten_eur\n'
+            'Eiche 25mm,EICHE-25MM,Holz Meier,"52,00"\n'
+            'Buche 20mm,BUCHE-20MM,Holz Meier,"31,00"\n'
+        ).encode('utf-8')
+
+        with patch('extraction.tasks.reprice_job_async.delay') as delay:
+            with django_capture_on_commit_callbacks(execute=True):
+                BulkUploadService(user).upload_materialliste(
+                    csv_content, user, file_format='csv', update_existing=True
+                )
+
+        job = RepricingJob.objects.get(user=user)
+        assert job.trigger == 'materialliste'
+        assert job.skus == ['BUCHE-20MM', 'EICHE-25MM']
+        delay.assert_called_once_with(job.id)
+
+    def test_dry_run_queues_nothing(self, user):
+        csv_content = b'material_name,sku,lieferant,standardkosten_eur\nEiche 25mm,EICHE-25MM,Holz Meier,52\n'
+
+        BulkUploadService(user).upload_materialliste(
+            csv_content, user, file_format='csv', dry_run=True, update_existing=True
+        )
+
+        assert not RepricingJob.objects.exists()
+
+    def test_holzart_factor_change_queues_job(self, user, template, django_capture_on_commit_callbacks):
+        eiche = HolzartKennzahl.objects.get(template=template, holzart='eiche')
+
+        with django_capture_on_commit_callbacks(execute=True):
+            eiche.save()  # Unchanged factor
+        assert not RepricingJob.objects.exists()
+
+        eiche.preis_faktor = Decimal('1.45')
+        with django_capture_on_commit_callbacks(execute=True):
+            eiche.save()
+
+        job = RepricingJob.objects.get(user=user)
+        assert (job.trigger, job.holzarten) == ('holzart_kennzahl', ['eiche'])
+
+    def test_holzart_changes_are_collected_per_transaction(self, user, template, django_capture_on_commit_callbacks):
+        other = User.objects.create_user(username='other')
+        IndividuelleBetriebskennzahl.objects.create(
+            user=other, is_active=True, handwerk_template=template, stundensatz_arbeit=Decimal('65.00'),
+            gewinnmarge_prozent=Decimal('15.00'), betriebskosten_umlage=Decimal('25.00'),
+        )
+
+        with patch('extraction.tasks.reprice_job_async.delay') as delay:
+            with django_capture_on_commit_callbacks(execute=True):
+                for holzart in HolzartKennzahl.objects.filter(template=template):
+                    holzart.preis_faktor += Decimal('0.1')
+                    holzart.save()
+                assert not RepricingJob.objects.exists()  # Nothing before commit
+
+        jobs = RepricingJob.objects.order_by('user__username')
+        assert [(job.user, job.holzarten) for job in jobs] == [
+            (other, ['buche', 'eiche']), (user, ['buche', 'eiche']),
+        ]
+        assert delay.call_count == 2
+
+    def test_rolled_back_holzart_changes_are_dropped(self, user, template, django_capture_on_commit_callbacks):
+        with patch('extraction.tasks.reprice_job_async.delay'):
+            with django_capture_on_commit_callbacks(execute=True):
+                with pytest.raises(ValueError):
+                    with transaction.atomic():
+                        buche = HolzartKennzahl.objects.get(template=template, holzart='buche')
+                        buche.preis_faktor = Decimal('1.2')
+                        buche.save()
+                        raise ValueError('rollback')
+
+                eiche = HolzartKennzahl.objects.get(template=template, holzart='eiche')
+                eiche.preis_faktor = Decimal('1.45')
+                eiche.save()
+
+        job = RepricingJob.objects.get(user=user)
+        assert job.holzarten == ['eiche']
+
+    def test_task_runs_job(self, user, settings):
+        from extraction.tasks import reprice_job_async
+
+        settings.REPRICING_CHUNK_PAUSE_SECONDS = 0
+        _priced(user, OAK)
+        job = BulkRepricingService.enqueue(user, holzarten=['eiche'])
+
+        assert reprice_job_async(job.id)['processed_count'] == 1
+        assert reprice_job_async(job.id) == {'status': 'skipped', 'job_status': 'completed'}
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""Tests for batch pricing with CalculationEngine.calculate_many."""
+
+from decimal import Decimal
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from documents.betriebskennzahl_models import (
+    BetriebskennzahlTemplate,
+    HolzartKennzahl,
+    IndividuelleBetriebskennzahl,
+    MateriallistePosition,
+)
+from documents.services.pricing_snapshot import PricingSnapshotService
+from extraction.services.calculation_engine import CalculationEngine
+
+pytestmark = pytest.mark.usefixtures('locmem_cache')
+
+
+@pytest.fixture
+def user(authenticated_user):
+    user = authenticated_user
+    template = BetriebskennzahlTemplate.objects.create(name='Standard 2024')
+    HolzartKennzahl.objects.create(
+        template=template, holzart='eiche', kategorie='hartholz', preis_faktor=Decimal('1.3')
+    )
+    IndividuelleBetriebskennzahl.objects.create(
+        user=user,
+        is_active=True,
+        handwerk_template=template,
+        stundensatz_arbeit=Decimal('75.00'),
+        gewinnmarge_prozent=Decimal('20.00'),
+        betriebskosten_umlage=Decimal('10.00'),
+        use_handwerk_standard=True,
+        use_custom_materials=True,
+        use_bulk_discounts=True,
+    )
+    for i in range(20):
+        MateriallistePosition.objects.create(
+            user=user, material_name=f'Platte {i}', sku=f'SKU-{i}',
+            standardkosten_eur=Decimal('10.00') + i, rabatt_ab_100=5, rabatt_ab_500=10
+        )
+    return user
+
+
+def _positions(n):
+    return [
+        {
+            'holzart': 'eiche' if i % 2 else 'buche',
+            'material_sku': f'SKU-{i % 25}',
+            'material_quantity': (i * 7) % 600 + 1,
+            'labor_hours': i % 5,
+        }
+        for i in range(n)
+    ]
+
+
+class TestCalculateMany:
+    """Test CalculationEngine.calculate_many."""
+
+    def test_matches_single_calculations(self, user):
+        engine = CalculationEngine(user)
+        positions = _positions(30)
+
+        batch = engine.calculate_many(positions, customer_type='bestehende_kunden')
+
+        singles = [
+            engine.calculate_project_price(p, customer_type='bestehende_kunden')
+            for p in positions
+        ]
+        assert [item['index'] for item in batch['items']] == list(range(30))
+        assert [item['result']['total_price_eur'] for item in batch['items']] == [
+            s['total_price_eur'] for s in singles
+        ]
+        assert batch['total_price_eur'] == pytest.approx(sum(s['total_price_eur'] for s in singles))
+        assert batch['count'] == batch['succeeded'] == 30
+
+    def test_breakdown_is_optional(self, user):
+        engine = CalculationEngine(user)
+
+        assert engine.calculate_many(_positions(2))['items'][0]['result']['breakdown'] == {}
+        assert engine.calculate_many(_positions(2), breakdown=True)['items'][0]['result']['breakdown']
+
+    def test_failing_position_does_not_stop_batch(self, user):
+        positions = _positions(3)
+        positions[1] = {'labor_hours': 'viele'}
+
+        result = CalculationEngine(user).calculate_many(positions)
+
+        assert [item['status'] for item in result['items']] == ['ok', 'error', 'ok']
+        assert result['failed'] == 1
+        assert result['total_price_eur'] == pytest.approx(
+            result['items'][0]['result']['total_price_eur']
+            + result['items'][2]['result']['total_price_eur']
+        )
+
+    def test_query_count_does_not_grow_with_positions(self, user):
+        engine = CalculationEngine(user)
+
+        def cold_queries(n):
+            cache.clear()
+            PricingSnapshotService.clear_local()
+            with CaptureQueriesContext(connection) as ctx:
+                engine.calculate_many(_positions(n))
+            return len(ctx.captured_queries)
+
+        assert 0 < cold_queries(5) == cold_queries(300)
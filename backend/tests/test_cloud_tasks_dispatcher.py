@@ -0,0 +1,273 @@
+"""Tests for the asyncio Cloud Tasks dispatcher (against a local stand-in server)."""
+import asyncio
+import base64
+import json
+
+import pytest
+from django.contrib.auth.models import User
+
+from core.cloud_tasks_dispatcher import AsyncCloudTasksDispatcher
+from documents.models import Document
+from extraction.async_executor import AsyncExecutor
+from extraction.idempotency import IdempotencyLock, build_idempotency_key, get_extraction_config
+from tests.fixtures.cloud_tasks_standin import CloudTasksStandIn
+
+pytestmark = pytest.mark.usefixtures('locmem_cache')
+
+
+@pytest.fixture
+def standin():
+    server = CloudTasksStandIn().start()
+    yield server
+    server.stop()
+
+
+_opened = []
+
+
+@pytest.fixture(autouse=True)
+def close_dispatchers():
+    """Stop the event loop threads of the dispatchers a test created."""
+    yield
+    while _opened:
+        _opened.pop().close()
+
+
+def _dispatcher(server, **kwargs):
+    kwargs.setdefault('backoff_base_seconds', 0.01)
+    dispatcher = AsyncCloudTasksDispatcher(
+        project_id='draftcraft-test',
+        queue='document-processing',
+        webhook_url='https://api.example.com/api/v1/tasks/process/',
+        api_base=server.api_base,
+        **kwargs
+    )
+    _opened.append(dispatcher)
+    return dispatcher
+
+
+def _payloads(n):
+    return [{'document_id': f'doc-{i}'} for i in range(n)]
+
+
+class TestDispatch:
+    """Test bulk task creation."""
+
+    def test_creates_tasks_in_payload_order(self, standin):
+        """Returned names line up with the payloads."""
+        names = _dispatcher(standin).dispatch(_payloads(20))
+
+        assert len(names) == 20
+        assert all(name.startswith(
+            'projects/draftcraft-test/locations/europe-west3/queues/document-processing/tasks/'
+        ) for name in names)
+
+        by_name = {task['name']: task for task in standin.tasks}
+        for i, name in enumerate(names):
+            body = by_name[name]['httpRequest']['body']
+            assert json.loads(base64.b64decode(body)) == {'document_id': f'doc-{i}'}
+
+    def test_task_matches_grpc_client_request(self, standin):
+        """Task resource carries the same HTTP request as CloudTasksClient."""
+        _dispatcher(standin).dispatch(_payloads(1), in_seconds=60)
+
+        task = standin.tasks[0]
+        assert task['httpRequest']['httpMethod'] == 'POST'
+        assert task['httpRequest']['url'] == 'https://api.example.com/api/v1/tasks/process/'
+        assert task['httpRequest']['headers']['X-Cloud-Task'] == 'true'
+        assert 'scheduleTime' in task
+
+    def test_empty_dispatch(self, standin):
+        """No payloads, no requests."""
+        assert _dispatcher(standin).dispatch([]) == []
+        assert standin.request_count == 0
+
+    def test_dispatch_inside_running_loop(self, standin):
+        """The blocking wrapper also works when called from async code."""
+        async def caller():
+            return _dispatcher(standin).dispatch(_payloads(3))
+
+        names = asyncio.run(caller())
+
+        assert len(names) == 3 and all(names)
+
+    def test_concurrency_is_bounded(self):
+        """No more than max_concurrency requests are in flight."""
+        server = CloudTasksStandIn(latency_seconds=0.02).start()
+        try:
+            names = _dispatcher(server, max_concurrency=4).dispatch(_payloads(30))
+        finally:
+            server.stop()
+
+        assert all(names)
+        assert 1 < server.max_in_flight <= 4
+
+    def test_connections_are_reused(self):
+        """Keep-alive pool uses at most max_concurrency connections."""
+        server = CloudTasksStandIn(latency_seconds=0.005).start()
+        try:
+            _dispatcher(server, max_concurrency=3).dispatch(_payloads(30))
+        finally:
+            server.stop()
+
+        assert len(server.connections) <= 3
+
+    def test_client_is_reused_across_dispatches(self, standin):
+        """Later dispatches, single tasks included, reuse the pooled connection."""
+        dispatcher = _dispatcher(standin, max_concurrency=2)
+
+        for i in range(5):
+            assert dispatcher.dispatch([{'document_id': f'doc-{i}'}])[0]
+
+        assert len(standin.connections) == 1
+
+    def test_awaited_from_another_loop(self, standin):
+        """create_tasks() also works awaited from the caller's own loop."""
+        names = asyncio.run(_dispatcher(standin).create_tasks(_payloads(3)))
+
+        assert len(names) == 3 and all(names)
+
+
+class TestRetries:
+    """Test retry with backoff."""
+
+    def test_retries_transient_errors(self):
+        """503 responses are retried until the task is created."""
+        server = CloudTasksStandIn(fail_first_n=3).start()
+        try:
+            names = _dispatcher(server, max_concurrency=1, max_retries=3).dispatch(_payloads(1))
+        finally:
+            server.stop()
+
+        assert names[0] is not None
+        assert server.request_count == 4
+
+    def test_gives_up_after_max_retries(self):
+        """Persistent 503s yield None for that task."""
+        server = CloudTasksStandIn(fail_first_n=100).start()
+        try:
+            names = _dispatcher(server, max_retries=2).dispatch(_payloads(1))
+        finally:
+            server.stop()
+
+        assert names == [None]
+        assert server.request_count == 3
+
+    def test_named_task_is_created_once(self, standin):
+        """Redelivering a named task returns the existing name (409)."""
+        dispatcher = _dispatcher(standin)
+        payload = {'document_id': 'doc-1', 'task_id': 'task-abc'}
+
+        first = dispatcher.dispatch([payload])
+        second = dispatcher.dispatch([payload])
+
+        assert first == second
+        assert first[0].endswith('/tasks/task-abc')
+        assert len(standin.tasks) == 1
+
+    def test_client_errors_are_not_retried(self):
+        """A 400 is final."""
+        server = CloudTasksStandIn(fail_first_n=1, fail_status=400).start()
+        try:
+            names = _dispatcher(server, max_retries=3).dispatch(_payloads(1))
+        finally:
+            server.stop()
+
+        assert names == [None]
+        assert server.request_count == 1
+
+    def test_backoff_is_capped(self, standin):
+        """Jittered sleeps stay within [0, cap]."""
+        dispatcher = _dispatcher(standin, backoff_base_seconds=1.0, backoff_cap_seconds=2.0)
+
+        for attempt in range(6):
+            assert 0 <= dispatcher._backoff(attempt) <= 2.0
+
+
+class TestExecutorIntegration:
+    """Test AsyncExecutor.process_documents with Cloud Tasks enabled."""
+
+    @pytest.fixture
+    def documents(self, db):
+        user = User.objects.create_user(username='dispatchuser', password='testpass123')
+        return [
+            Document.objects.create(
+                user=user,
+                file=f'dispatch_{i}.pdf',
+                original_filename=f'dispatch_{i}.pdf',
+                file_size_bytes=1024,
+                document_type='pdf',
+            )
+            for i in range(5)
+        ]
+
+    @pytest.fixture
+    def cloud_settings(self, settings, standin):
+        settings.CLOUD_TASKS_ENABLED = True
+        settings.GCP_PROJECT_ID = 'draftcraft-test'
+        settings.CLOUD_TASKS_WEBHOOK_URL = 'https://api.example.com/api/v1/tasks/process/'
+        settings.CLOUD_TASKS_API_BASE = standin.api_base
+        return settings
+
+    def test_process_documents_dispatches_all(self, documents, cloud_settings, standin):
+        """Every document gets its own Cloud Task."""
+        results = AsyncExecutor.process_documents([d.id for d in documents])
+
+        assert set(results) == {str(d.id) for d in documents}
+        assert all(results.values())
+        assert len(standin.tasks) == 5
+
+        payload = json.loads(base64.b64decode(standin.tasks[0]['httpRequest']['body']))
+        assert payload['idempotency_key']
+
+    def test_process_document_uses_dispatcher(self, documents, cloud_settings, standin):
+        """Single documents go through the dispatcher too."""
+        task_name = AsyncExecutor.process_document(documents[0].id)
+
+        assert len(standin.tasks) == 1
+        assert task_name == standin.tasks[0]['name']
+
+    def test_dispatcher_is_kept_per_process(self, cloud_settings, standin):
+        """Credentials and connections are set up once, not per task."""
+        dispatcher = AsyncExecutor._get_dispatcher()
+        _opened.append(dispatcher)
+
+        assert AsyncExecutor._get_dispatcher() is dispatcher
+
+        cloud_settings.CLOUD_TASKS_DISPATCH_CONCURRENCY = 3
+        assert AsyncExecutor._get_dispatcher() is not dispatcher
+        _opened.append(AsyncExecutor._get_dispatcher())
+
+    def test_process_documents_attaches_to_running(self, documents, cloud_settings, standin):
+        """Documents a worker is processing are not dispatched again."""
+        key = build_idempotency_key(documents[0], get_extraction_config())
+        IdempotencyLock(key).acquire('worker-1')
+
+        results = AsyncExecutor.process_documents([d.id for d in documents])
+
+        assert results[str(documents[0].id)] == 'worker-1'
+        assert len(standin.tasks) == 4
+        # The lock is left to the workers
+        assert IdempotencyLock(build_idempotency_key(documents[1], get_extraction_config())).holder() is None
+
+
+@pytest.mark.slow
+class TestDispatchThroughput:
+    """Offline load test against a stand-in with 20ms latency."""
+
+    LATENCY_SECONDS = 0.02
+    TASK_COUNT = 100
+
+    def test_requests_overlap_up_to_the_limit(self):
+        """A large dispatch keeps max_concurrency requests in flight on few connections."""
+        server = CloudTasksStandIn(latency_seconds=self.LATENCY_SECONDS).start()
+        try:
+            names = _dispatcher(server, max_concurrency=20).dispatch(_payloads(self.TASK_COUNT))
+        finally:
+            server.stop()
+
+        assert all(names)
+        assert len(server.tasks) == self.TASK_COUNT
+        # One blocking call per task would never overlap requests
+        assert 1 < server.max_in_flight <= 20
+        assert len(server.connections) <= 20
@@ -0,0 +1,366 @@
+"""Tests for the extraction dead-letter store and re-drive."""
+import hashlib
+import logging
+from io import StringIO
+from unittest.mock import patch
+
+import pytest
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.urls import include, path
+from rest_framework.routers import DefaultRouter
+
+from api.v1.batch_views import DeadLetterViewSet
+from documents.models import AuditLog, Batch, BatchDocument, Document
+from extraction.models import ExtractionDeadLetter
+from extraction.services.base_service import ExtractionServiceError
+from extraction.services.dead_letter_service import DeadLetterService
+from extraction.tasks import process_document_async
+
+pytestmark = [
+    pytest.mark.usefixtures('locmem_cache'),
+    # Re-drive capacity: 2 slots
+    pytest.mark.parametrize(
+        'locmem_cache', [pytest.param({'EXTRACTION_WORKER_CONCURRENCY': 1}, id='locmem')], indirect=True
+    ),
+]
+
+router = DefaultRouter()
+router.register(r'dead-letters', DeadLetterViewSet, basename='dead-letter')
+urlpatterns = [path('api/v1/', include(router.urls))]
+
+
+def _make_document(user, index=0):
+    return Document.objects.create(
+        user=user,
+        file=f'dlq_{index}.pdf',
+        original_filename=f'dlq_{index}.pdf',
+        file_size_bytes=1024,
+    )
+
+
+@pytest.fixture
+def document(authenticated_user):
+    return _make_document(authenticated_user)
+
+
+@pytest.fixture
+def mock_services():
+    """Mock OCR and NER so the task runs without ML dependencies."""
+    with patch('extraction.tasks.GermanOCRService') as ocr_cls, \
+            patch('extraction.tasks.GermanNERService') as ner_cls:
+        ocr_cls.return_value.process.return_value = {
+            'text': 'Eiche Tisch',
+            'confidence': 0.95,
+            'page_count': 1,
+            'processing_time_ms': 100,
+        }
+        ner_cls.return_value.process.return_value = {
+            'entities': [],
+            'summary': {},
+            'confidence': 0.9,
+            'processing_time_ms': 20,
+        }
+        yield ocr_cls.return_value, ner_cls.return_value
+
+
+def _run(document, user_id=None, batch_id=None, retries=0):
+    return process_document_async.apply(
+        kwargs={
+            'document_id': str(document.id),
+            'user_id': user_id,
+            'batch_id': str(batch_id) if batch_id else None,
+        },
+        task_id='task-1',
+        retries=retries
+    ).get()
+
+
+def _dead_letter(document, message='OCR failed', stage='ocr', batch_id=None):
+    return DeadLetterService().record(
+        document=document,
+        exception=ExtractionServiceError(message),
+        stage=stage,
+        task_payload={
+            'document_id': str(document.id),
+            'user_id': document.user_id,
+            'batch_id': str(batch_id) if batch_id else None,
+        },
+    )
+
+
+class TestRecording:
+    """Test dead-lettering from the extraction task."""
+
+    def test_exhausted_retries_are_dead_lettered(self, authenticated_user, document, mock_services):
+        """The last retry stores payload, class, stage and timings."""
+        ocr, _ = mock_services
+        ocr.process.side_effect = ExtractionServiceError('Empty text from page 3')
+
+        result = _run(document, user_id=authenticated_user.id, retries=3)
+
+        assert result['status'] == 'error'
+        dead_letter = ExtractionDeadLetter.objects.get(document=document)
+        assert dead_letter.stage == 'ocr'
+        assert dead_letter.exception_class == 'extraction.services.base_service.ExtractionServiceError'
+        assert dead_letter.exception_message == 'Empty text from page 3'
+        assert dead_letter.retry_count == 3
+        assert dead_letter.task_id == 'task-1'
+        assert dead_letter.task_payload == {
+            'document_id': str(document.id),
+            'user_id': authenticated_user.id,
+            'batch_id': None,
+        }
+        assert set(dead_letter.stage_timings) == {'load', 'ocr'}
+        assert 'ExtractionServiceError' in dead_letter.traceback
+        assert dead_letter.status == 'open'
+
+    def test_unexpected_error_dead_lettered_at_stage(self, document, mock_services):
+        """Unexpected errors are not retried and record the failing stage."""
+        _, ner = mock_services
+        ner.process.side_effect = RuntimeError('model crashed')
+
+        _run(document)
+
+        dead_letter = ExtractionDeadLetter.objects.get(document=document)
+        assert dead_letter.stage == 'ner'
+        assert dead_letter.exception_class == 'builtins.RuntimeError'
+        assert set(dead_letter.stage_timings) == {'load', 'ocr', 'ner'}
+
+    def test_success_records_nothing(self, document, mock_services):
+        """Successful runs leave the store empty."""
+        _run(document)
+
+        assert not ExtractionDeadLetter.objects.exists()
+
+    def test_bookkeeping_failure_keeps_document_completed(self, document, mock_services, caplog):
+        """A failing step after completion is logged, not dead-lettered."""
+        with patch('extraction.tasks.ETAEstimator.observe_result', side_effect=RuntimeError('cache down')):
+            result = _run(document)
+
+        assert result['status'] == 'success'
+        document.refresh_from_db()
+        assert document.status == 'completed'
+        assert not ExtractionDeadLetter.objects.exists()
+        assert 'ETA model update failed' in caplog.text
+
+    def test_file_hash_recorded(self, document, settings, tmp_path):
+        """The input file's SHA-256 is stored for reproduction."""
+        settings.MEDIA_ROOT = str(tmp_path)
+        document.file.save('input.pdf', ContentFile(b'%PDF-1.4 test'), save=True)
+
+        dead_letter = _dead_letter(document)
+
+        assert dead_letter.file_hash == hashlib.sha256(b'%PDF-1.4 test').hexdigest()
+
+    def test_missing_file_hash_is_empty(self, document):
+        """Unreadable input files do not prevent recording."""
+        assert _dead_letter(document).file_hash == ''
+
+
+class TestAuditLogging:
+    """Test audit logging no longer swallows errors silently."""
+
+    def test_missing_user_is_logged(self, document, mock_services, caplog):
+        """An unknown user skips the audit entry with a warning."""
+        with caplog.at_level(logging.WARNING, logger='extraction.tasks'):
+            result = _run(document, user_id=999999)
+
+        assert result['status'] == 'success'
+        assert 'user 999999 not found' in caplog.text
+        assert not AuditLog.objects.filter(document=document, action='processed').exists()
+
+    def test_failure_audit_includes_stage(self, authenticated_user, document, mock_services):
+        """Failure audit entries carry the stage and error class."""
+        ocr, _ = mock_services
+        ocr.process.side_effect = ExtractionServiceError('bad scan')
+
+        _run(document, user_id=authenticated_user.id, retries=3)
+
+        log = AuditLog.objects.get(document=document, action='processed')
+        assert log.details['stage'] == 'ocr'
+        assert log.details['error_class'] == 'ExtractionServiceError'
+
+
+class TestClustering:
+    """Test grouping failures by signature."""
+
+    def test_signature_ignores_volatile_parts(self):
+        """Ids, paths and numbers do not split a failure mode."""
+        signature = DeadLetterService.compute_signature
+        cls = 'extraction.services.base_service.ExtractionServiceError'
+
+        first = signature(cls, 'ocr', 'File not found: /media/documents/2024/a.pdf (page 3)')
+        second = signature(cls, 'ocr', 'File not found: /media/documents/2025/b.pdf (page 12)')
+
+        assert first == second
+        assert signature(cls, 'ner', 'File not found: /x.pdf (page 1)') != first
+        assert signature('builtins.ValueError', 'ocr', 'File not found: /x.pdf (page 1)') != first
+
+    def test_clusters_grouped_and_sorted(self, authenticated_user):
+        """Largest cluster first, with document counts."""
+        for i in range(3):
+            _dead_letter(_make_document(authenticated_user, i), message=f'Timeout after {30 + i}s')
+        _dead_letter(_make_document(authenticated_user, 10), message='Invalid PDF', stage='load')
+
+        clusters = DeadLetterService().clusters()
+
+        assert [c['count'] for c in clusters] == [3, 1]
+        assert clusters[0]['document_count'] == 3
+        assert clusters[0]['stage'] == 'ocr'
+        assert clusters[0]['sample_message'].startswith('Timeout after')
+
+
+@patch('extraction.async_executor.AsyncExecutor.process_documents')
+class TestRedrive:
+    """Test bulk re-drive."""
+
+    @staticmethod
+    def _queue_all(document_ids, user_id=None, batch_id=None):
+        return {str(doc_id): f'task-{doc_id}' for doc_id in document_ids}
+
+    def test_respects_worker_capacity(self, mock_queue, authenticated_user):
+        """Only free queue slots are used; the rest is deferred."""
+        mock_queue.side_effect = self._queue_all
+        for i in range(5):
+            _dead_letter(_make_document(authenticated_user, i))
+
+        result = DeadLetterService().redrive()
+
+        assert result['capacity'] == 2
+        assert result['requeued'] == 2
+        assert result['deferred'] == 3
+        assert ExtractionDeadLetter.objects.filter(status='redriven').count() == 2
+        assert ExtractionDeadLetter.objects.filter(status='open').count() == 3
+
+    def test_capacity_counts_in_flight_work(self, mock_queue, authenticated_user):
+        """Documents already processing take up slots."""
+        mock_queue.side_effect = self._queue_all
+        busy = _make_document(authenticated_user, 20)
+        busy.status = 'processing'
+        busy.save()
+        _dead_letter(_make_document(authenticated_user, 0))
+        _dead_letter(_make_document(authenticated_user, 1))
+
+        result = DeadLetterService().redrive()
+
+        assert result['capacity'] == 1
+        assert result['requeued'] == 1
+
+    def test_filter_by_signature(self, mock_queue, authenticated_user):
+        """Only the selected cluster is re-driven."""
+        mock_queue.side_effect = self._queue_all
+        target = _dead_letter(_make_document(authenticated_user, 0), message='Timeout')
+        _dead_letter(_make_document(authenticated_user, 1), message='Invalid PDF')
+
+        result = DeadLetterService().redrive(signature=target.signature)
+
+        assert result['requeued'] == 1
+        target.refresh_from_db()
+        assert target.status == 'redriven'
+        assert target.redrive_count == 1
+
+    def test_one_replay_per_document(self, mock_queue, authenticated_user, document):
+        """Repeated failures of one document are replayed once."""
+        mock_queue.side_effect = self._queue_all
+        _dead_letter(document)
+        _dead_letter(document)
+
+        result = DeadLetterService().redrive()
+
+        assert result['requeued'] == 1
+        assert mock_queue.call_args[0][0] == [document.id]
+        assert ExtractionDeadLetter.objects.filter(status='redriven').count() == 2
+
+    def test_dry_run_queues_nothing(self, mock_queue, authenticated_user, document):
+        """Dry runs only report."""
+        _dead_letter(document)
+
+        result = DeadLetterService().redrive(dry_run=True)
+
+        assert result['dry_run'] is True
+        assert result['selected'] == 1
+        mock_queue.assert_not_called()
+
+    def test_queue_failure_keeps_dead_letter_open(self, mock_queue, authenticated_user, document):
+        """Documents that cannot be queued stay open."""
+        mock_queue.return_value = {str(document.id): None}
+        _dead_letter(document)
+
+        result = DeadLetterService().redrive()
+
+        assert result['failed'] == 1
+        assert ExtractionDeadLetter.objects.get(document=document).status == 'open'
+
+    def test_batch_documents_requeued(self, mock_queue, authenticated_user, document):
+        """Failed batch entries go back to queued with the new task id."""
+        mock_queue.side_effect = self._queue_all
+        batch = Batch.objects.create(user=authenticated_user, name='Incident', status='partial_failure', file_count=1)
+        batch_doc = BatchDocument.objects.create(
+            batch=batch, document=document, status='failed', error_message='OCR failed'
+        )
+        _dead_letter(document, batch_id=batch.id)
+
+        DeadLetterService().redrive(batch_id=batch.id)
+
+        batch_doc.refresh_from_db()
+        batch.refresh_from_db()
+        assert batch_doc.status == 'queued'
+        assert batch_doc.cloud_task_id == f'task-{document.id}'
+        assert batch.status == 'processing'
+        assert mock_queue.call_args[1]['batch_id'] == str(batch.id)
+
+    def test_management_command_drains(self, mock_queue, authenticated_user):
+        """One command re-drives everything, round by round."""
+        mock_queue.side_effect = self._queue_all
+        for i in range(5):
+            _dead_letter(_make_document(authenticated_user, i))
+
+        out = StringIO()
+        call_command('redrive_dead_letters', drain=True, interval=0, stdout=out)
+
+        assert not ExtractionDeadLetter.objects.filter(status='open').exists()
+        assert mock_queue.call_count == 3
+        assert 'Done: 5 requeued' in out.getvalue()
+
+
+class TestRedriveResolution:
+    """Test dead letters resolve once the document processes."""
+
+    def test_success_resolves_dead_letters(self, document, mock_services):
+        """A successful run resolves the document's dead letters."""
+        _dead_letter(document)
+
+        _run(document)
+
+        assert ExtractionDeadLetter.objects.get(document=document).status == 'resolved'
+
+
+@pytest.mark.urls(__name__)
+class TestDeadLetterAPI:
+    """Test the admin dead-letter endpoints."""
+
+    def test_clusters(self, admin_api_client, authenticated_user):
+        _dead_letter(_make_document(authenticated_user, 0))
+
+        response = admin_api_client.get('/api/v1/dead-letters/clusters/')
+
+        assert response.status_code == 200
+        assert response.data[0]['count'] == 1
+
+    @patch('extraction.async_executor.AsyncExecutor.process_documents')
+    def test_redrive(self, mock_queue, admin_api_client, authenticated_user, document):
+        mock_queue.return_value = {str(document.id): 'task-9'}
+        dead_letter = _dead_letter(document)
+
+        response = admin_api_client.post(
+            '/api/v1/dead-letters/redrive/',
+            {'signature': dead_letter.signature},
+            format='json'
+        )
+
+        assert response.status_code == 202
+        assert response.data['requeued'] == 1
+
+    def test_requires_admin(self, authenticated_api_client):
+        assert authenticated_api_client.get('/api/v1/dead-letters/').status_code == 403
@@ -0,0 +1,204 @@
+"""Tests for the async document process endpoint (202 + job handle)."""
+import time
+from unittest.mock import patch
+
+import pytest
+from django.contrib.auth.models import User
+from django.urls import include, path
+from rest_framework.routers import DefaultRouter
+from rest_framework.test import APIClient
+
+from api.v1.document_views import DocumentViewSet
+from documents.models import Document
+from extraction.idempotency import IdempotencyLock, build_idempotency_key, get_extraction_config
+
+pytestmark = [
+    pytest.mark.urls(__name__),
+    pytest.mark.usefixtures('locmem_cache'),
+    pytest.mark.parametrize(
+        'locmem_cache', [pytest.param({'PROCESS_WAIT_POLL_SECONDS': 0.05}, id='locmem')], indirect=True
+    ),
+]
+
+# Only the document routes; keeps these tests independent of the full API URL conf
+router = DefaultRouter()
+router.register(r'documents', DocumentViewSet, basename='document')
+urlpatterns = [path('api/v1/', include(router.urls))]
+
+
+@pytest.fixture
+def document(authenticated_user):
+    return Document.objects.create(
+        user=authenticated_user,
+        file='process_test.pdf',
+        original_filename='process_test.pdf',
+        file_size_bytes=1024,
+        document_type='pdf',
+    )
+
+
+def _url(document, action='process'):
+    return f'/api/v1/documents/{document.id}/{action}/'
+
+
+@patch('api.v1.document_views.AsyncExecutor.process_document')
+class TestProcessEndpoint:
+    """Test POST /documents/{id}/process/."""
+
+    def test_returns_202_with_job_handle(self, mock_process, authenticated_api_client, document):
+        """Processing is queued, not run in the request."""
+        mock_process.return_value = 'task-123'
+
+        response = authenticated_api_client.post(_url(document))
+
+        assert response.status_code == 202
+        assert response.data['job_id'] == 'task-123'
+        assert response.data['status'] == 'queued'
+        assert response.data['status_url'].endswith(_url(document, 'processing_status'))
+        assert response['Location'] == response.data['status_url']
+        assert response.data['estimated_seconds'] > 0
+        mock_process.assert_called_once_with(document_id=document.id, user_id=document.user_id)
+
+    def test_queue_unavailable_returns_503(self, mock_process, authenticated_api_client, document):
+        """Enqueue failure is reported as 503."""
+        mock_process.return_value = None
+
+        response = authenticated_api_client.post(_url(document))
+
+        assert response.status_code == 503
+
+    def test_completed_document_rejected(self, mock_process, authenticated_api_client, document):
+        """Finished documents are not queued again."""
+        document.status = 'completed'
+        document.save()
+
+        response = authenticated_api_client.post(_url(document))
+
+        assert response.status_code == 400
+        mock_process.assert_not_called()
+
+    def test_processing_document_attaches(self, mock_process, authenticated_api_client, document):
+        """A document already processing returns its job handle."""
+        document.status = 'processing'
+        document.save()
+        mock_process.return_value = 'task-running'
+
+        response = authenticated_api_client.post(_url(document))
+
+        assert response.status_code == 202
+        assert response.data['status'] == 'processing'
+        assert response.data['job_id'] == 'task-running'
+
+    def test_wait_returns_result_when_done(self, mock_process, authenticated_api_client, document):
+        """With ?wait= the finished document is returned (200)."""
+        def finish(document_id, user_id):
+            Document.objects.filter(id=document_id).update(status='completed')
+            return 'task-123'
+        mock_process.side_effect = finish
+
+        response = authenticated_api_client.post(_url(document) + '?wait=5')
+
+        assert response.status_code == 200
+        assert response.data['status'] == 'completed'
+
+    def test_wait_reports_failure(self, mock_process, authenticated_api_client, document):
+        """A failed extraction within the wait window returns 400."""
+        def fail(document_id, user_id):
+            Document.objects.filter(id=document_id).update(status='error')
+            return 'task-123'
+        mock_process.side_effect = fail
+
+        response = authenticated_api_client.post(_url(document) + '?wait=5')
+
+        assert response.status_code == 400
+        assert response.data['job_id'] == 'task-123'
+
+    def test_wait_is_bounded(self, mock_process, authenticated_api_client, document, settings):
+        """?wait= is capped by PROCESS_WAIT_MAX_SECONDS."""
+        settings.PROCESS_WAIT_MAX_SECONDS = 0.2
+        mock_process.return_value = 'task-123'
+
+        start = time.monotonic()
+        response = authenticated_api_client.post(_url(document) + '?wait=600')
+        elapsed = time.monotonic() - start
+
+        assert response.status_code == 202
+        assert 0.2 <= elapsed < 2
+
+    def test_invalid_wait(self, mock_process, authenticated_api_client, document):
+        """Non-numeric wait is rejected before queuing."""
+        response = authenticated_api_client.post(_url(document) + '?wait=soon')
+
+        assert response.status_code == 400
+        mock_process.assert_not_called()
+
+
+@patch('api.v1.document_views.AsyncExecutor.process_document')
+class TestReprocessEndpoint:
+    """Test POST /documents/{id}/reprocess/."""
+
+    def test_queues_new_epoch(self, mock_process, authenticated_api_client, document):
+        """A finished document is queued again with force=True."""
+        document.status = 'completed'
+        document.save()
+        mock_process.return_value = 'task-456'
+
+        response = authenticated_api_client.post(_url(document, 'reprocess'))
+
+        assert response.status_code == 202
+        assert response.data['job_id'] == 'task-456'
+        assert response.data['status'] == 'queued'
+        mock_process.assert_called_once_with(document_id=document.id, user_id=document.user_id, force=True)
+
+    def test_queue_unavailable_keeps_status(self, mock_process, authenticated_api_client, document):
+        """A failed enqueue leaves the earlier result in place."""
+        document.status = 'error'
+        document.save()
+        mock_process.return_value = None
+
+        response = authenticated_api_client.post(_url(document, 'reprocess'))
+
+        assert response.status_code == 503
+        document.refresh_from_db()
+        assert document.status == 'error'
+
+    def test_unprocessed_document_rejected(self, mock_process, authenticated_api_client, document):
+        """Documents not yet processed go through process/."""
+        response = authenticated_api_client.post(_url(document, 'reprocess'))
+
+        assert response.status_code == 400
+        mock_process.assert_not_called()
+
+
+class TestProcessingStatus:
+    """Test GET /documents/{id}/processing_status/."""
+
+    def test_reports_running_job(self, authenticated_api_client, document):
+        """The job id comes from the idempotency lock holder."""
+        key = build_idempotency_key(document, get_extraction_config())
+        IdempotencyLock(key).acquire('task-abc')
+
+        response = authenticated_api_client.get(_url(document, 'processing_status'))
+
+        assert response.status_code == 202
+        assert response.data['job_id'] == 'task-abc'
+
+    def test_completed_document(self, authenticated_api_client, document):
+        """A finished document returns its details."""
+        document.status = 'completed'
+        document.save()
+
+        response = authenticated_api_client.get(_url(document, 'processing_status'))
+
+        assert response.status_code == 200
+        assert response.data['id'] == str(document.id)
+
+    def test_other_users_document_not_found(self, document, db):
+        """Job handles are scoped to the owner."""
+        other = User.objects.create_user(username='otheruser', password='testpass123')
+        client = APIClient()
+        client.force_authenticate(user=other)
+
+        response = client.get(_url(document, 'processing_status'))
+
+        assert response.status_code == 404
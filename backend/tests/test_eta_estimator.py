@@ -0,0 +1,235 @@
+"""Tests for the adaptive batch ETA estimator."""
+import pytest
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from documents.models import Batch, BatchDocument, Document, ExtractionResult
+from extraction.services.batch_processor import BatchProcessor
+from extraction.services.eta_estimator import ETAEstimator
+
+pytestmark = pytest.mark.usefixtures('locmem_cache')
+
+
+def _make_document(user, index, document_type='pdf', page_count=1):
+    return Document.objects.create(
+        user=user,
+        file=f'eta_doc_{index}.{document_type}',
+        original_filename=f'eta_doc_{index}.{document_type}',
+        file_size_bytes=1024,
+        document_type=document_type,
+        metadata={'page_count': page_count},
+    )
+
+
+@pytest.fixture
+def batch_with_documents(authenticated_user):
+    """Batch with four queued one-page PDFs."""
+    batch = Batch.objects.create(user=authenticated_user, name='ETA Batch', status='processing')
+    for i in range(4):
+        BatchDocument.objects.create(
+            batch=batch,
+            document=_make_document(authenticated_user, i),
+            status='queued'
+        )
+    batch.file_count = 4
+    batch.save()
+    return batch
+
+
+class TestStageEstimates:
+    """Test learning of per-stage durations."""
+
+    def test_cold_model_uses_priors(self):
+        """Without samples the prior (10s/document) is used."""
+        estimator = ETAEstimator()
+
+        assert estimator.estimate_stage_ms('ocr') == 8000.0
+        assert estimator.estimate_stage_ms('ner') == 2000.0
+
+    def test_cache_failure_uses_priors(self):
+        """An unreachable cache degrades to the priors instead of raising."""
+        with patch('extraction.services.eta_estimator.cache.get', side_effect=ConnectionError('down')):
+            assert ETAEstimator().estimate_stage_ms('ocr') == 8000.0
+
+    def test_concurrent_update_waits_for_lock(self):
+        """A sample arriving while another worker updates the bucket is applied after it."""
+        estimator = ETAEstimator()
+        key = estimator._keys('ocr', 'pdf', 1)[0]
+        estimator._update(key, 1000.0)
+        cache.add(f"{key}:lock", 1)
+
+        with patch('extraction.services.eta_estimator.time.sleep',
+                   side_effect=lambda seconds: cache.delete(f"{key}:lock")) as sleep:
+            estimator._update(key, 2000.0)
+
+        assert sleep.call_count == 1
+        assert cache.get(key) == {'mean_ms': 1200.0, 'count': 2}
+        assert cache.get(f"{key}:lock") is None
+
+    def test_bucket_needs_min_samples(self):
+        """A bucket is only trusted after MIN_SAMPLES observations."""
+        estimator = ETAEstimator()
+
+        for _ in range(ETAEstimator.MIN_SAMPLES - 1):
+            estimator.observe({'ocr': 1000}, file_type='pdf', page_count=1)
+        assert estimator.estimate_stage_ms('ocr', 'pdf', 1) == 8000.0
+
+        estimator.observe({'ocr': 1000}, file_type='pdf', page_count=1)
+        assert estimator.estimate_stage_ms('ocr', 'pdf', 1) == pytest.approx(1000.0)
+
+    def test_ewma_tracks_recent_samples(self):
+        """Newer samples move the estimate towards them."""
+        estimator = ETAEstimator()
+        for _ in range(5):
+            estimator.observe({'ocr': 1000})
+        for _ in range(5):
+            estimator.observe({'ocr': 3000})
+
+        estimate = estimator.estimate_stage_ms('ocr')
+        assert 2000 < estimate < 3000
+
+    def test_page_buckets_are_separate(self):
+        """Multi-page documents learn their own durations."""
+        estimator = ETAEstimator()
+        for _ in range(3):
+            estimator.observe({'ocr': 1000}, page_count=1)
+            estimator.observe({'ocr': 6000}, page_count=4)
+
+        assert estimator.estimate_stage_ms('ocr', 'pdf', 1) == pytest.approx(1000.0)
+        assert estimator.estimate_stage_ms('ocr', 'pdf', 3) == pytest.approx(6000.0)
+
+    def test_unknown_bucket_falls_back_to_file_type(self):
+        """A cold page bucket borrows the file type average."""
+        estimator = ETAEstimator()
+        for _ in range(3):
+            estimator.observe({'ocr': 2000}, file_type='png', page_count=1)
+
+        assert estimator.estimate_stage_ms('ocr', 'png', 20) == pytest.approx(2000.0)
+        # Global fallback for a never-seen file type
+        assert estimator.estimate_stage_ms('ocr', 'docx', 1) == pytest.approx(2000.0)
+
+    def test_page_bucket_labels(self):
+        """Page counts map onto '1', '2-5' and '6+'."""
+        estimator = ETAEstimator()
+
+        assert estimator._page_bucket(1) == '1'
+        assert estimator._page_bucket(2) == '2-5'
+        assert estimator._page_bucket(5) == '2-5'
+        assert estimator._page_bucket(6) == '6+'
+
+
+class TestLearningFromResults:
+    """Test learning from ExtractionResult rows."""
+
+    def test_observe_result_uses_stage_timings(self, authenticated_user):
+        """Per-stage timings feed the matching stages."""
+        doc = _make_document(authenticated_user, 0)
+        result = ExtractionResult.objects.create(
+            document=doc,
+            processing_time_ms=1500,
+            stage_timings={'ocr': 1200, 'ner': 300},
+        )
+        estimator = ETAEstimator()
+        for _ in range(3):
+            estimator.observe_result(result)
+
+        assert estimator.estimate_stage_ms('ocr') == pytest.approx(1200.0)
+        assert estimator.estimate_stage_ms('ner') == pytest.approx(300.0)
+
+    def test_observe_legacy_result_splits_total(self, authenticated_user):
+        """Rows without stage timings split processing_time_ms by the priors."""
+        doc = _make_document(authenticated_user, 0)
+        result = ExtractionResult.objects.create(document=doc, processing_time_ms=5000)
+
+        estimator = ETAEstimator()
+        for _ in range(3):
+            estimator.observe_result(result)
+
+        assert estimator.estimate_stage_ms('ocr') == pytest.approx(4000.0)
+        assert estimator.estimate_stage_ms('ner') == pytest.approx(1000.0)
+
+    def test_bootstrap_replays_history(self, authenticated_user):
+        """Bootstrap learns from stored extraction results."""
+        for i in range(3):
+            ExtractionResult.objects.create(
+                document=_make_document(authenticated_user, i),
+                processing_time_ms=2000,
+                stage_timings={'ocr': 1500, 'ner': 500},
+            )
+
+        estimator = ETAEstimator()
+        assert estimator.bootstrap() == 3
+        assert estimator.estimate_stage_ms('ocr') == pytest.approx(1500.0)
+
+
+class TestBatchCompletion:
+    """Test batch ETA and autoscaling recommendations."""
+
+    def test_eta_divides_work_across_workers(self, batch_with_documents):
+        """Four 10s documents on two workers take about 20s."""
+        before = timezone.now()
+        eta = ETAEstimator(active_workers=2).estimate_batch_completion(batch_with_documents)
+
+        assert before + timedelta(seconds=19) < eta < timezone.now() + timedelta(seconds=21)
+
+    def test_eta_includes_queue_ahead(self, authenticated_user, batch_with_documents):
+        """Documents of other batches in the queue delay the ETA."""
+        other = Batch.objects.create(user=authenticated_user, name='Other', status='processing')
+        for i in range(4):
+            BatchDocument.objects.create(
+                batch=other,
+                document=_make_document(authenticated_user, 10 + i),
+                status='queued'
+            )
+
+        before = timezone.now()
+        eta = ETAEstimator(active_workers=1).estimate_batch_completion(batch_with_documents)
+
+        assert eta > before + timedelta(seconds=79)
+
+    def test_eta_none_when_nothing_left(self, batch_with_documents):
+        """No ETA once all documents are done."""
+        BatchDocument.objects.filter(batch=batch_with_documents).update(status='completed')
+
+        assert ETAEstimator().estimate_batch_completion(batch_with_documents) is None
+
+    def test_eta_refreshed_on_document_completion(self, authenticated_user, batch_with_documents):
+        """Completing a document recomputes the batch ETA from learned timings."""
+        estimator = ETAEstimator()
+        for _ in range(3):
+            estimator.observe({'ocr': 100, 'ner': 100})
+
+        batch_doc = BatchDocument.objects.filter(batch=batch_with_documents).first()
+        BatchProcessor(authenticated_user).update_document_status(str(batch_doc.id), 'completed')
+
+        batch_with_documents.refresh_from_db()
+        # Three remaining documents at 0.2s each
+        assert batch_with_documents.estimated_completion < timezone.now() + timedelta(seconds=2)
+
+    @patch('extraction.async_executor.AsyncExecutor.process_document')
+    def test_start_processing_sets_eta(self, mock_process, authenticated_user):
+        """start_processing stores an ETA derived from the model."""
+        mock_process.return_value = 'task-id'
+        processor = BatchProcessor(authenticated_user)
+        batch = processor.create_batch(name='Start')
+        docs = [_make_document(authenticated_user, i) for i in range(2)]
+        processor.add_documents_to_batch(batch, [str(d.id) for d in docs])
+
+        processor.start_processing(batch)
+
+        batch.refresh_from_db()
+        assert batch.estimated_completion is not None
+        assert batch.estimated_completion > timezone.now()
+
+    def test_recommend_worker_replicas(self, batch_with_documents):
+        """Backlog of 40s with a 10s drain target is capped at max_replicas."""
+        recommendation = ETAEstimator().recommend_worker_replicas(
+            target_drain_seconds=10,
+            max_replicas=3
+        )
+
+        assert recommendation['backlog_seconds'] == 40.0
+        assert recommendation['recommended_replicas'] == 3
@@ -0,0 +1,245 @@
+"""Tests for idempotent document processing."""
+import pytest
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+
+from documents.models import Batch, BatchDocument, Document, ExtractionResult
+from extraction.async_executor import AsyncExecutor
+from extraction.idempotency import (
+    IdempotencyLock,
+    build_idempotency_key,
+    get_extraction_config,
+)
+from extraction.models import ExtractionConfig
+from extraction.tasks import process_document_async
+
+pytestmark = pytest.mark.usefixtures('locmem_cache')
+
+
+@pytest.fixture
+def test_document(db):
+    """Create an uploaded document."""
+    user = User.objects.create_user(username='idemuser', password='testpass123')
+    return Document.objects.create(
+        user=user,
+        file='idem.pdf',
+        original_filename='idem.pdf',
+        file_size_bytes=1024,
+    )
+
+
+@pytest.fixture
+def mock_services():
+    """Mock OCR and NER so the task runs without ML dependencies."""
+    with patch('extraction.tasks.GermanOCRService') as ocr_cls, \
+            patch('extraction.tasks.GermanNERService') as ner_cls:
+        ocr_cls.return_value.process.return_value = {
+            'text': 'Eiche Tisch',
+            'confidence': 0.95,
+            'lines': [],
+            'page_count': 1,
+            'processing_time_ms': 100,
+        }
+        ner_cls.return_value.process.return_value = {
+            'entities': [],
+            'summary': {},
+            'confidence': 0.9,
+            'processing_time_ms': 20,
+        }
+        yield ocr_cls.return_value
+
+
+def _run(document, task_id='task-1'):
+    return process_document_async.apply(
+        kwargs={'document_id': str(document.id)},
+        task_id=task_id
+    ).get()
+
+
+class TestIdempotencyKey:
+    """Test idempotency key construction."""
+
+    def test_key_is_stable(self, test_document):
+        """Same document, config and epoch give the same key."""
+        config = get_extraction_config()
+
+        assert build_idempotency_key(test_document, config) == build_idempotency_key(test_document, config)
+
+    def test_key_changes_with_epoch(self, test_document):
+        """Explicit reprocessing starts a new key."""
+        config = get_extraction_config()
+        before = build_idempotency_key(test_document, config)
+
+        test_document.processing_epoch += 1
+
+        assert build_idempotency_key(test_document, config) != before
+
+    def test_key_changes_with_config(self, test_document):
+        """A different extraction config is a different run."""
+        before = build_idempotency_key(test_document, get_extraction_config())
+        ExtractionConfig.objects.create(name='German', language='de', ocr_confidence_threshold=0.9)
+
+        assert build_idempotency_key(test_document, get_extraction_config()) != before
+
+
+class TestIdempotencyLock:
+    """Test the short-lived cache lock."""
+
+    def test_second_owner_sees_holder(self):
+        """Only the first owner acquires the lock."""
+        lock = IdempotencyLock('abc')
+
+        assert lock.acquire('task-1') is None
+        assert lock.acquire('task-2') == 'task-1'
+
+    def test_same_owner_reenters(self):
+        """A Celery retry (same task id) re-enters its own lock."""
+        lock = IdempotencyLock('abc')
+        lock.acquire('task-1')
+
+        assert lock.acquire('task-1') is None
+
+    def test_release_only_by_owner(self):
+        """Another task cannot release the lock."""
+        lock = IdempotencyLock('abc')
+        lock.acquire('task-1')
+
+        lock.release('task-2')
+        assert lock.holder() == 'task-1'
+
+        lock.release('task-1')
+        assert lock.holder() is None
+
+
+class TestTaskDeduplication:
+    """Test duplicate handling inside process_document_async."""
+
+    def test_first_run_records_key(self, test_document, mock_services):
+        """A successful run stores the key on the document and frees the lock."""
+        result = _run(test_document)
+
+        test_document.refresh_from_db()
+        key = build_idempotency_key(test_document, get_extraction_config())
+        assert result['status'] == 'success'
+        assert test_document.idempotency_key == key
+        assert IdempotencyLock(key).holder() is None
+
+    def test_duplicate_after_completion_returns_cached(self, test_document, mock_services):
+        """A redelivered task does not repeat OCR."""
+        _run(test_document, task_id='task-1')
+        updated_at = ExtractionResult.objects.get(document=test_document).updated_at
+
+        result = _run(test_document, task_id='task-2')
+
+        assert result['deduplicated'] is True
+        assert result['processing_time_ms'] == 120
+        assert mock_services.process.call_count == 1
+        assert ExtractionResult.objects.get(document=test_document).updated_at == updated_at
+
+    def test_duplicate_while_running_attaches(self, test_document, mock_services):
+        """A duplicate of a running job returns the running task id."""
+        key = build_idempotency_key(test_document, get_extraction_config())
+        IdempotencyLock(key).acquire('running-task')
+
+        result = _run(test_document, task_id='task-2')
+
+        assert result['status'] == 'in_progress'
+        assert result['task_id'] == 'running-task'
+        mock_services.process.assert_not_called()
+
+    def test_new_epoch_reprocesses(self, test_document, mock_services):
+        """Bumping the epoch runs the extraction again."""
+        _run(test_document, task_id='task-1')
+        Document.objects.filter(id=test_document.id).update(processing_epoch=1)
+
+        result = _run(test_document, task_id='task-2')
+
+        assert result['status'] == 'success'
+        assert 'deduplicated' not in result
+        assert mock_services.process.call_count == 2
+
+    def test_attached_batch_document_completed(self, test_document, mock_services):
+        """Batches waiting on the document are updated by the running job."""
+        batch = Batch.objects.create(user=test_document.user, name='B', status='processing', file_count=1)
+        batch_doc = BatchDocument.objects.create(batch=batch, document=test_document, status='queued')
+
+        _run(test_document)
+
+        batch_doc.refresh_from_db()
+        batch.refresh_from_db()
+        assert batch_doc.status == 'completed'
+        assert batch.status == 'completed'
+
+
+class TestExecutorDeduplication:
+    """Test duplicate handling when queuing through AsyncExecutor."""
+
+    @patch('extraction.async_executor.AsyncExecutor._execute_async_task')
+    def test_attaches_to_running_task(self, mock_execute, test_document):
+        """A second click while processing returns the running task id."""
+        mock_execute.side_effect = lambda task_name, payload: payload['task_id']
+        first = AsyncExecutor.process_document(test_document.id)
+
+        second = AsyncExecutor.process_document(test_document.id)
+
+        assert second == first
+        assert mock_execute.call_count == 1
+
+    @patch('extraction.async_executor.AsyncExecutor._execute_async_task')
+    def test_failed_enqueue_releases_lock(self, mock_execute, test_document):
+        """A task that could not be queued does not block later attempts."""
+        mock_execute.return_value = None
+        assert AsyncExecutor.process_document(test_document.id) is None
+
+        mock_execute.return_value = 'task-2'
+        assert AsyncExecutor.process_document(test_document.id) == 'task-2'
+
+    @patch('extraction.async_executor.AsyncExecutor._execute_async_task')
+    def test_force_starts_new_epoch(self, mock_execute, test_document):
+        """force=True bumps the epoch and queues a fresh run."""
+        mock_execute.return_value = 'task-1'
+        AsyncExecutor.process_document(test_document.id)
+
+        AsyncExecutor.process_document(test_document.id, force=True)
+
+        test_document.refresh_from_db()
+        assert test_document.processing_epoch == 1
+        assert mock_execute.call_count == 2
+        payload = mock_execute.call_args[0][1]
+        assert payload['idempotency_key'] == build_idempotency_key(test_document, get_extraction_config())
+
+    @patch('extraction.tasks.process_document_async.apply_async')
+    def test_celery_task_owns_queued_lock(self, mock_apply, test_document, mock_services):
+        """The Celery task gets the lock owner and re-enters the lock."""
+        mock_apply.side_effect = lambda kwargs, task_id: process_document_async.apply(kwargs=kwargs)
+
+        AsyncExecutor.process_document(test_document.id)
+
+        kwargs = mock_apply.call_args.kwargs['kwargs']
+        assert kwargs['lock_owner'] == mock_apply.call_args.kwargs['task_id']
+        mock_services.process.assert_called_once()
+        key = build_idempotency_key(test_document, get_extraction_config())
+        assert IdempotencyLock(key).holder() is None
+
+    @patch('extraction.async_executor.AsyncExecutor._execute_async_task')
+    def test_cloud_tasks_leaves_lock_to_worker(self, mock_execute, test_document, settings):
+        """Cloud Tasks workers take the lock themselves; reruns are not blocked."""
+        settings.CLOUD_TASKS_ENABLED = True
+        mock_execute.side_effect = lambda task_name, payload: payload['task_id']
+
+        first = AsyncExecutor.process_document(test_document.id)
+        second = AsyncExecutor.process_document(test_document.id)
+
+        assert first != second
+        key = build_idempotency_key(test_document, get_extraction_config())
+        assert IdempotencyLock(key).holder() is None
+
+    @patch('extraction.async_executor.AsyncExecutor._execute_async_task')
+    def test_cloud_tasks_attaches_to_running_worker(self, mock_execute, test_document, settings):
+        """A document a worker is processing is not queued again."""
+        settings.CLOUD_TASKS_ENABLED = True
+        IdempotencyLock(build_idempotency_key(test_document, get_extraction_config())).acquire('worker-1')
+
+        assert AsyncExecutor.process_document(test_document.id) == 'worker-1'
+        mock_execute.assert_not_called()
@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+"""Tests for incremental repricing (IncrementalPricingService)."""
+
+import time
+from datetime import timedelta
+from decimal import Decimal
+from unittest.mock import patch
+
+import pytest
+from django.contrib.auth.models import User
+from django.utils import timezone
+
+from documents.betriebskennzahl_models import (
+    BetriebskennzahlTemplate,
+    HolzartKennzahl,
+    IndividuelleBetriebskennzahl,
+    MateriallistePosition,
+    OberflächenbearbeitungKennzahl,
+    SaisonaleMarge,
+)
+from extraction.services.calculation_engine import CalculationEngine
+from extraction.services.incremental_pricing import (
+    PRICING_GRAPH,
+    IncrementalPricingService,
+    RepricingSessionNotFound,
+)
+
+pytestmark = pytest.mark.usefixtures('locmem_cache')
+
+
+@pytest.fixture
+def user(authenticated_user):
+    user = authenticated_user
+    template = BetriebskennzahlTemplate.objects.create(name='Standard 2024')
+    HolzartKennzahl.objects.create(
+        template=template, holzart='eiche', kategorie='hartholz', preis_faktor=Decimal('1.3')
+    )
+    HolzartKennzahl.objects.create(
+        template=template, holzart='buche', kategorie='hartholz', preis_faktor=Decimal('1.1')
+    )
+    OberflächenbearbeitungKennzahl.objects.create(
+        template=template, bearbeitung='lackieren',
+        preis_faktor=Decimal('1.15'), zeit_faktor=Decimal('1.2')
+    )
+    IndividuelleBetriebskennzahl.objects.create(
+        user=user,
+        is_active=True,
+        handwerk_template=template,
+        stundensatz_arbeit=Decimal('72.50'),
+        gewinnmarge_prozent=Decimal('22.00'),
+        betriebskosten_umlage=Decimal('35.00'),
+        use_handwerk_standard=True,
+        use_custom_materials=True,
+        use_seasonal_adjustments=True,
+        use_customer_discounts=True,
+        use_bulk_discounts=True,
+    )
+    MateriallistePosition.objects.create(
+        user=user, material_name='Eiche 25mm', sku='EICHE-25MM',
+        standardkosten_eur=Decimal('45.90'), rabatt_ab_100=5, rabatt_ab_500=12
+    )
+    today = timezone.now().date()
+    SaisonaleMarge.objects.create(
+        user=user, name='Winteraktion', adjustment_type='prozent', value=Decimal('7.5'),
+        start_date=today, end_date=today + timedelta(days=3),
+    )
+    return user
+
+
+DATA = {
+    'holzart': 'eiche',
+    'oberflaeche': 'lackieren',
+    'material_sku': 'EICHE-25MM',
+    'material_quantity': 10,
+    'labor_hours': 12,
+}
+
+
+def _full_price(user, data, customer_type='neue_kunden'):
+    result = CalculationEngine(user).calculate_project_price(data, customer_type=customer_type)
+    return {k: v for k, v in result.items() if k != 'calculated_at'}
+
+
+def _strip(result):
+    return {k: v for k, v in result.items() if k not in ('calculated_at', 'session_id', 'recomputed')}
+
+
+class TestDirtyNodes:
+    """Test dependency propagation."""
+
+    def test_wood_type_change_skips_labor(self):
+        dirty = IncrementalPricingService.dirty_nodes(['holzart'])
+
+        assert dirty == {
+            'step_2_wood_type', 'step_3_surface_finish', 'step_4_complexity',
+            'step_6_overhead_and_margin', 'step_7_seasonal_adjustments',
+            'step_8_customer_discounts', 'multi_material',
+        }
+
+    def test_customer_type_only_touches_step_8(self):
+        assert IncrementalPricingService.dirty_nodes(['customer_type']) == {'step_8_customer_discounts'}
+
+    def test_graph_is_in_dependency_order(self):
+        seen = set()
+        for node in PRICING_GRAPH:
+            assert set(node.depends_on) <= seen
+            seen.add(node.name)
+
+
+class TestRepricing:
+    """Test sessions against the full workflow."""
+
+    def test_start_matches_full_calculation(self, user):
+        result = IncrementalPricingService(user).start(DATA)
+
+        assert _strip(result) == _full_price(user, DATA)
+        assert result['recomputed'] == [node.name for node in PRICING_GRAPH]
+
+    @pytest.mark.parametrize('changes,customer_type', [
+        ({'holzart': 'buche'}, None),
+        ({'labor_hours': 3.5}, None),
+        ({'material_quantity': 150}, None),
+        ({'oberflaeche': None}, None),
+        ({'material_sku': 'UNBEKANNT'}, None),
+        ({'lieferdatum': '2099-01-01'}, None),
+        ({}, 'vip_kunden'),
+    ])
+    def test_reprice_matches_full_calculation(self, user, changes, customer_type):
+        service = IncrementalPricingService(user)
+        session_id = service.start(DATA)['session_id']
+
+        result = service.reprice(session_id, changes, customer_type=customer_type)
+
+        data = {k: v for k, v in dict(DATA, **changes).items() if v is not None}
+        assert _strip(result) == _full_price(user, data, customer_type or 'neue_kunden')
+
+    def test_chained_changes(self, user):
+        service = IncrementalPricingService(user)
+        session_id = service.start(DATA)['session_id']
+
+        service.reprice(session_id, {'holzart': 'buche'})
+        service.reprice(session_id, {'labor_hours': 20}, customer_type='bestehende_kunden')
+        result = service.reprice(session_id, {'material_quantity': 600})
+
+        data = dict(DATA, holzart='buche', labor_hours=20, material_quantity=600)
+        assert _strip(result) == _full_price(user, data, 'bestehende_kunden')
+
+    def test_only_dependent_steps_are_recomputed(self, user):
+        service = IncrementalPricingService(user)
+        session_id = service.start(DATA)['session_id']
+
+        assert service.reprice(session_id, customer_type='vip_kunden')['recomputed'] == [
+            'step_8_customer_discounts'
+        ]
+        assert service.reprice(session_id, {'labor_hours': 12})['recomputed'] == []
+        assert 'step_1_base_material' not in service.reprice(session_id, {'labor_hours': 2})['recomputed']
+
+    def test_configuration_change_recomputes_everything(self, user, django_capture_on_commit_callbacks):
+        service = IncrementalPricingService(user)
+        session_id = service.start(DATA)['session_id']
+
+        config = IndividuelleBetriebskennzahl.objects.get(user=user)
+        config.stundensatz_arbeit = Decimal('90.00')
+        with django_capture_on_commit_callbacks(execute=True):
+            config.save()
+
+        result = service.reprice(session_id, customer_type='vip_kunden')
+
+        assert len(result['recomputed']) == len(PRICING_GRAPH)
+        assert _strip(result) == _full_price(user, DATA, 'vip_kunden')
+
+    def test_new_day_recomputes_seasonal_steps(self, user):
+        service = IncrementalPricingService(user)
+        session_id = service.start(DATA)['session_id']
+
+        tomorrow = timezone.now() + timedelta(days=1)
+        with patch('extraction.services.incremental_pricing.timezone.now', return_value=tomorrow):
+            result = service.reprice(session_id)
+
+        assert result['recomputed'] == ['step_7_seasonal_adjustments', 'step_8_customer_discounts']
+
+    def test_unknown_session(self, user):
+        with pytest.raises(RepricingSessionNotFound):
+            IncrementalPricingService(user).reprice('nope', {'holzart': 'buche'})
+
+    def test_sessions_are_per_user(self, user):
+        session_id = IncrementalPricingService(user).start(DATA)['session_id']
+        other = User.objects.create_user(username='other')
+        IndividuelleBetriebskennzahl.objects.create(user=other, is_active=True)
+
+        with pytest.raises(RepricingSessionNotFound):
+            IncrementalPricingService(other).reprice(session_id, {'holzart': 'buche'})
+
+
+class TestPerformance:
+    """Warm repricing runs without queries in milliseconds."""
+
+    def test_reprice_without_queries(self, user, django_assert_num_queries):
+        service = IncrementalPricingService(user)
+        session_id = service.start(DATA)['session_id']
+
+        with django_assert_num_queries(0):
+            service.reprice(session_id, {'holzart': 'buche'})
+
+    def test_reprice_latency(self, user):
+        service = IncrementalPricingService(user)
+        session_id = service.start(DATA)['session_id']
+
+        start = time.perf_counter()
+        for hours in range(100):
+            service.reprice(session_id, {'labor_hours': hours})
+        elapsed_ms = (time.perf_counter() - start) * 1000 / 100
+
+        assert elapsed_ms < 5
@@ -0,0 +1,315 @@
+# -*- coding: utf-8 -*-
+"""Tests for fixed-point money arithmetic and its use in the pricing engine."""
+
+import logging
+import random
+import time
+from datetime import timedelta
+from decimal import ROUND_HALF_EVEN, ROUND_HALF_UP, Decimal
+
+import pytest
+from django.contrib.auth.models import User
+from django.utils import timezone
+
+from core import money
+from documents.betriebskennzahl_models import (
+    BetriebskennzahlTemplate,
+    HolzartKennzahl,
+    IndividuelleBetriebskennzahl,
+    KomplexitaetKennzahl,
+    MateriallistePosition,
+    OberflächenbearbeitungKennzahl,
+    SaisonaleMarge,
+)
+from extraction.services.calculation_engine import CalculationEngine
+
+pytestmark = pytest.mark.usefixtures('locmem_cache')
+
+CENT = Decimal('0.01')
+CUSTOMER_DISCOUNTS = {'neue_kunden': 0, 'bestehende_kunden': 5, 'vip_kunden': 10, 'gross_kunden': 15}
+
+
+class TestMoney:
+    """Conversions and rounding."""
+
+    @pytest.mark.parametrize('value', [0, 12, 45.9, '45.90', Decimal('45.90'), -3.5, '0.000000001'])
+    def test_round_trip(self, value):
+        assert money.to_decimal(money.to_money(value), places=9) == Decimal(str(value)).quantize(Decimal('1e-9'))
+
+    def test_large_float_uses_decimal_path(self):
+        assert money.to_money(12345678.91) == 12345678910000000
+
+    def test_rates(self):
+        assert money.to_rate(1.3) == 1_300_000
+        assert money.to_rate('0.0000005') == 0  # Half-even
+        assert money.percent(7.5) == money.to_rate('0.075')
+        assert money.ONE + money.percent(22) == money.to_rate('1.22')
+
+    def test_apply_and_times(self):
+        price = money.to_money('45.90')
+
+        assert money.apply(price, money.to_rate('1.3')) == money.to_money('59.67')
+        assert money.times(price, 3) == money.to_money('137.70')
+        assert money.times(price, 2.5) == money.to_money('114.75')
+        assert money.times(price, Decimal('0.5')) == money.to_money('22.95')
+
+    def test_apply_rounds_to_nearest_nano_euro(self):
+        assert money.apply(1, money.to_rate('0.4')) == 0
+        assert money.apply(1, money.to_rate('0.5')) == 1
+        assert money.apply(-1, money.to_rate('0.6')) == -1
+
+    def test_to_decimal_rounds_half_up(self):
+        assert money.to_decimal(money.to_money('2.345')) == Decimal('2.35')
+        assert money.to_decimal(money.to_money('-2.345')) == Decimal('-2.35')
+        assert money.to_decimal(money.to_money('2.3449')) == Decimal('2.34')
+        assert money.to_decimal(money.to_money('2.5'), places=0) == Decimal('3')
+
+    def test_to_decimal_keeps_other_rounding_modes(self):
+        assert money.to_decimal(money.to_money('2.345'), rounding=ROUND_HALF_EVEN) == Decimal('2.34')
+
+    def test_to_float(self):
+        assert money.to_float(money.to_money('596.70')) == 596.7
+        assert money.rate_to_float(money.to_rate('1.15')) == 1.15
+
+
+def _decimal(value) -> Decimal:
+    return Decimal(str(value))
+
+
+def _reference_price(config, data, customer_type):
+    """Steps 1-8 in exact Decimal arithmetic, as CalculationEngine computed them before Money."""
+    material = config['materialien'].get(data.get('material_sku'))
+    if material is not None:
+        price = material['standardkosten'] * _decimal(data['material_quantity'])
+    else:
+        price = _decimal(data['material_cost_eur']) if data.get('material_cost_eur') else Decimal('100.00')
+
+    for faktor in (
+        config['holzarten'].get(data.get('holzart')),
+        config['oberflaechen'].get(data.get('oberflaeche')),
+        config['komplexitaeten'].get(data.get('komplexitaet')),
+    ):
+        if faktor is not None:
+            price *= faktor
+
+    hours = _decimal(data.get('labor_hours', 0))
+    labor = config['stundensatz'] * hours if hours > 0 else Decimal('0')
+
+    price = (price + labor + config['umlage']) * (1 + config['marge'] / Decimal('100'))
+
+    seasonal = price
+    for typ, value in config['saisonal']:
+        seasonal -= price * (value / Decimal('100')) if typ == 'prozent' else value
+    price = seasonal
+
+    discounted = price
+    customer = Decimal(CUSTOMER_DISCOUNTS[customer_type])
+    if customer:
+        discounted -= price * customer / Decimal('100')
+    if material is not None:
+        quantity = data['material_quantity']
+        bulk = material['ab_500'] if quantity >= 500 else material['ab_100'] if quantity >= 100 else 0
+        if bulk:
+            discounted -= price * Decimal(bulk) / Decimal('100')
+    return discounted
+
+
+def _money_config(config):
+    """The configuration of _reference_price as Money and Rates."""
+    return {
+        'stundensatz': money.to_money(config['stundensatz']),
+        'umlage': money.to_money(config['umlage']),
+        'margen_faktor': money.ONE + money.percent(config['marge']),
+        'faktoren': [
+            {key: money.to_rate(value) for key, value in config[name].items()}
+            for name in ('holzarten', 'oberflaechen', 'komplexitaeten')
+        ],
+        'materialien': {
+            sku: dict(material, standardkosten=money.to_money(material['standardkosten']))
+            for sku, material in config['materialien'].items()
+        },
+        'saisonal': [
+            (typ, money.percent(value) if typ == 'prozent' else money.to_money(value))
+            for typ, value in config['saisonal']
+        ],
+    }
+
+
+def _money_price(config, data, customer_type):
+    """_reference_price in Money arithmetic, as CalculationEngine computes it now."""
+    material = config['materialien'].get(data.get('material_sku'))
+    if material is not None:
+        price = money.times(material['standardkosten'], data['material_quantity'])
+    else:
+        price = money.to_money(data['material_cost_eur']) if data.get('material_cost_eur') else money.to_money(100)
+
+    for faktoren, key in zip(config['faktoren'], ('holzart', 'oberflaeche', 'komplexitaet')):
+        faktor = faktoren.get(data.get(key))
+        if faktor is not None:
+            price = money.apply(price, faktor)
+
+    hours = money.to_rate(data.get('labor_hours', 0))
+    labor = money.apply(config['stundensatz'], hours) if hours > 0 else money.ZERO
+
+    price = money.apply(price + labor + config['umlage'], config['margen_faktor'])
+
+    seasonal = price
+    for typ, value in config['saisonal']:
+        seasonal -= money.apply(price, value) if typ == 'prozent' else value
+    price = seasonal
+
+    discounted = price
+    customer = CUSTOMER_DISCOUNTS[customer_type]
+    if customer:
+        discounted -= money.apply(price, money.percent(customer))
+    if material is not None:
+        quantity = data['material_quantity']
+        bulk = material['ab_500'] if quantity >= 500 else material['ab_100'] if quantity >= 100 else 0
+        if bulk:
+            discounted -= money.apply(price, money.percent(bulk))
+    return discounted
+
+
+def _two_places(rng, low, high):
+    return Decimal(rng.randint(int(low * 100), int(high * 100))) / 100
+
+
+def _random_user(rng, index):
+    """User with a random TIER 1-3 configuration and the same configuration as plain Decimals."""
+    user = User.objects.create_user(username=f'money{index}')
+    template = BetriebskennzahlTemplate.objects.create(name=f'Template {index}')
+    config = {
+        'stundensatz': _two_places(rng, 35, 120),
+        'umlage': _two_places(rng, 0, 80),
+        'marge': _two_places(rng, 0, 40),
+        'holzarten': {}, 'oberflaechen': {}, 'komplexitaeten': {}, 'materialien': {}, 'saisonal': [],
+    }
+
+    for holzart in ('eiche', 'buche', 'kiefer'):
+        faktor = _two_places(rng, 0.8, 2)
+        HolzartKennzahl.objects.create(template=template, holzart=holzart, kategorie='hartholz', preis_faktor=faktor)
+        config['holzarten'][holzart] = faktor
+    for bearbeitung in ('lackieren', 'oelen'):
+        faktor = _two_places(rng, 1, 1.5)
+        OberflächenbearbeitungKennzahl.objects.create(
+            template=template, bearbeitung=bearbeitung, preis_faktor=faktor, zeit_faktor=Decimal('1.2')
+        )
+        config['oberflaechen'][bearbeitung] = faktor
+    for technik in ('gedrechselt', 'geschnitzt'):
+        faktor = _two_places(rng, 1, 2.5)
+        KomplexitaetKennzahl.objects.create(template=template, technik=technik, preis_faktor=faktor)
+        config['komplexitaeten'][technik] = faktor
+
+    IndividuelleBetriebskennzahl.objects.create(
+        user=user,
+        is_active=True,
+        handwerk_template=template,
+        stundensatz_arbeit=config['stundensatz'],
+        gewinnmarge_prozent=config['marge'],
+        betriebskosten_umlage=config['umlage'],
+        use_handwerk_standard=True,
+        use_custom_materials=True,
+        use_seasonal_adjustments=True,
+        use_customer_discounts=True,
+        use_bulk_discounts=True,
+    )
+
+    for sku in ('EICHE-25', 'BUCHE-20'):
+        material = {
+            'standardkosten': _two_places(rng, 1, 250),
+            'ab_100': rng.randint(0, 10),
+            'ab_500': rng.randint(10, 20),
+        }
+        MateriallistePosition.objects.create(
+            user=user, material_name=sku, sku=sku, standardkosten_eur=material['standardkosten'],
+            rabatt_ab_100=material['ab_100'], rabatt_ab_500=material['ab_500'],
+        )
+        config['materialien'][sku] = material
+
+    today = timezone.now().date()
+    for name, typ, value in (
+        ('Aktion', 'prozent', _two_places(rng, 0, 15)),
+        ('Gutschein', 'absolut', _two_places(rng, 0, 50)),
+    ):
+        SaisonaleMarge.objects.create(
+            user=user, name=name, adjustment_type=typ, value=value,
+            start_date=today - timedelta(days=1), end_date=today + timedelta(days=1),
+        )
+        config['saisonal'].append((typ, value))
+
+    return user, config
+
+
+def _random_item(rng):
+    data = {'labor_hours': rng.choice([0, rng.randint(1, 60), round(rng.uniform(0, 60), 2)])}
+    if rng.random() < 0.6:
+        data.update(material_sku=rng.choice(['EICHE-25', 'BUCHE-20']), material_quantity=rng.randint(1, 800))
+    else:
+        data['material_cost_eur'] = rng.choice([0, rng.randint(1, 5000), round(rng.uniform(0, 5000), 2)])
+    for key, choices in (
+        ('holzart', ['eiche', 'buche', 'kiefer', 'ahorn']),
+        ('oberflaeche', ['lackieren', 'oelen', 'beizen']),
+        ('komplexitaet', ['gedrechselt', 'geschnitzt', 'intarsia']),
+    ):
+        if rng.random() < 0.7:
+            data[key] = rng.choice(choices)
+    return data
+
+
+@pytest.mark.django_db
+class TestCentExactParity:
+    """Property test: random configurations and inputs price to the same cent as Decimal arithmetic."""
+
+    @pytest.mark.parametrize('seed', range(5))
+    def test_engine_matches_decimal_reference(self, seed):
+        rng = random.Random(seed)
+        user, config = _random_user(rng, seed)
+        engine = CalculationEngine(user)
+
+        for _ in range(200):
+            data = _random_item(rng)
+            customer_type = rng.choice(list(CUSTOMER_DISCOUNTS))
+
+            expected = _reference_price(config, data, customer_type)
+            actual = engine.calculate_project_price(data, customer_type=customer_type)['total_price_eur']
+
+            assert _decimal(actual).quantize(CENT, ROUND_HALF_UP) == expected.quantize(CENT, ROUND_HALF_UP), data
+            assert abs(_decimal(actual) - expected) < Decimal('1e-6'), data
+
+
+@pytest.mark.slow
+@pytest.mark.django_db
+class TestBenchmark:
+    """10k calculations: Money against the Decimal arithmetic it replaced."""
+
+    def test_10k_calculations(self, settings):
+        settings.CACHES = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+        rng = random.Random(42)
+        user, config = _random_user(rng, 'bench')
+        items = [_random_item(rng) for _ in range(10_000)]
+        engine = CalculationEngine(user)
+
+        logging.disable(logging.CRITICAL)
+        try:
+            start = time.perf_counter()
+            batch = engine.calculate_many(items, breakdown=False)
+            engine_seconds = time.perf_counter() - start
+        finally:
+            logging.disable(logging.NOTSET)
+
+        start = time.perf_counter()
+        reference = sum(_reference_price(config, data, 'neue_kunden') for data in items)
+        decimal_seconds = time.perf_counter() - start
+
+        money_config = _money_config(config)
+        start = time.perf_counter()
+        total = sum(_money_price(money_config, data, 'neue_kunden') for data in items)
+        money_seconds = time.perf_counter() - start
+
+        print(
+            f"\n10k calculations: calculate_many {engine_seconds:.3f}s; "
+            f"arithmetic Decimal {decimal_seconds * 1000:.1f}ms, Money {money_seconds * 1000:.1f}ms"
+        )
+        assert batch['failed'] == 0
+        assert abs(_decimal(batch['total_price_eur']) - reference) < Decimal('0.01')
+        assert abs(money.to_decimal(total, places=9) - reference) < Decimal('1e-4')
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""Tests for the Pauschalen applicability index shared by service and view."""
+
+import pickle
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+
+import pytest
+from django.contrib.auth.models import User
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from documents.betriebskennzahl_models import IndividuelleBetriebskennzahl
+from documents.models_pauschalen import BetriebspauschaleRegel
+from documents.services.pauschale_calculation_service import PauschaleCalculationService
+from documents.services.pauschale_index import PauschaleIndex, PauschaleIndexService
+
+pytestmark = pytest.mark.usefixtures('locmem_cache')
+
+ANFAHRT_REGEL = {
+    'operation': 'IF_THEN_ELSE',
+    'bedingung': {'operation': 'GREATER_THAN', 'links': {'quelle': 'distanz_km'}, 'rechts': 50},
+    'dann': {'operation': 'FIXED', 'wert': 100},
+    'sonst': {'operation': 'FIXED', 'wert': 50},
+}
+
+
+@pytest.fixture
+def user(authenticated_user):
+    user = authenticated_user
+    IndividuelleBetriebskennzahl.objects.create(
+        user=user,
+        is_active=True,
+        stundensatz_arbeit=Decimal('70.00'),
+        gewinnmarge_prozent=Decimal('15.00'),
+        betriebskosten_umlage=Decimal('25.00'),
+    )
+    return user
+
+
+def _regel(user, name, **kwargs):
+    kwargs.setdefault('pauschale_typ', 'sonstiges')
+    kwargs.setdefault('betrag', Decimal('10.00'))
+    return BetriebspauschaleRegel.objects.create(user=user, name=name, **kwargs)
+
+
+class TestAnwendbare:
+    """Index lookups match is_applicable_for_order()."""
+
+    def test_random_ranges(self, user):
+        rng = random.Random(5)
+        grenzen = [None, Decimal('0'), Decimal('500'), Decimal('1000'), Decimal('2500.50'), Decimal('10000')]
+        heute = date.today()
+        for nummer in range(40):
+            minimum, maximum = rng.choice(grenzen), rng.choice(grenzen)
+            _regel(
+                user, f'Regel {nummer:02d}',
+                min_auftragswert=minimum, max_auftragswert=maximum,
+                gueltig_ab=rng.choice([None, heute - timedelta(days=1), heute + timedelta(days=1)]),
+                gueltig_bis=rng.choice([None, heute + timedelta(days=1), heute - timedelta(days=1)]),
+                ist_aktiv=rng.random() < 0.9,
+            )
+        index = PauschaleIndexService.get(user)
+        alle = list(BetriebspauschaleRegel.objects.filter(user=user))
+
+        werte = [Decimal(w) for w in ('-1', '0', '0.01', '499.99', '500', '999', '1000', '2500.50', '2500.51',
+                                      '9999.99', '10000', '10000.01', '1000000')]
+        for wert in werte:
+            expected = [r.name for r in alle if r.is_applicable_for_order(wert)]
+            assert [r.name for r in index.anwendbare(wert)] == expected, wert
+
+    def test_without_order_value_only_dates_are_checked(self, user):
+        _regel(user, 'Klein', max_auftragswert=Decimal('1000'))
+        _regel(user, 'Abgelaufen', gueltig_bis=date.today() - timedelta(days=1))
+
+        index = PauschaleIndexService.get(user)
+
+        assert [r.name for r in index.anwendbare()] == ['Klein']
+        assert [r.name for r in index.anwendbare(datum=date.today() - timedelta(days=2))] == ['Abgelaufen', 'Klein']
+
+
+class TestKonditional:
+    """Konditional rules are compiled once per index."""
+
+    def test_compiled_rule(self, user):
+        regel = _regel(user, 'Anfahrt', berechnungsart='konditional', konditional_regel=ANFAHRT_REGEL)
+        index = PauschaleIndexService.get(user)
+
+        assert index.berechne_konditional(regel, {'distanz_km': 75}) == Decimal('100')
+        assert index.berechne_konditional(regel, {'distanz_km': 20}) == Decimal('50')
+
+    def test_invalid_rule_prices_zero(self, user):
+        _regel(user, 'Kaputt', berechnungsart='konditional', konditional_regel={'operation': 'DIVIDE'})
+        _regel(user, 'Fest')
+
+        result = PauschaleCalculationService(user, None).preview_pauschalen(Decimal('1000'), {})
+
+        assert [p['name'] for p in result['pauschalen']] == ['Fest']
+        assert PauschaleIndexService.get(user).fehler
+
+    def test_pickled_index_recompiles(self, user):
+        regel = _regel(user, 'Anfahrt', berechnungsart='konditional', konditional_regel=ANFAHRT_REGEL)
+        index = pickle.loads(pickle.dumps(PauschaleIndexService.get(user)))
+
+        assert isinstance(index, PauschaleIndex)
+        assert index.berechne_konditional(regel, {'distanz_km': 75}) == Decimal('100')
+
+
+class TestCaching:
+    """One cached, versioned index per user."""
+
+    def test_warm_index_needs_no_query(self, user, django_assert_num_queries):
+        _regel(user, 'Anfahrt', pauschale_typ='anfahrt', betrag=Decimal('45.00'))
+        PauschaleCalculationService(user, None).preview_pauschalen(Decimal('1000'), {})
+
+        with django_assert_num_queries(0):
+            result = PauschaleCalculationService(user, None).preview_pauschalen(Decimal('1000'), {})
+
+        assert result['total'] == 45.0
+
+    def test_saving_a_rule_invalidates(self, user, django_capture_on_commit_callbacks):
+        regel = _regel(user, 'Kleinauftrag', max_auftragswert=Decimal('1000'))
+        assert len(PauschaleIndexService.get(user).anwendbare(Decimal('5000'))) == 0
+
+        regel.max_auftragswert = Decimal('10000')
+        with django_capture_on_commit_callbacks(execute=True):
+            regel.save()
+        assert len(PauschaleIndexService.get(user).anwendbare(Decimal('5000'))) == 1
+
+        with django_capture_on_commit_callbacks(execute=True):
+            regel.delete()
+        assert PauschaleIndexService.get(user).regeln == ()
+
+    def test_invalidation_waits_for_commit(self, user, django_capture_on_commit_callbacks):
+        """An index rebuilt before the commit cannot keep the old rows."""
+        regel = _regel(user, 'Kleinauftrag')
+        version = PauschaleIndexService.get(user).version
+
+        regel.name = 'Kleinstauftrag'
+        with django_capture_on_commit_callbacks(execute=True) as callbacks:
+            regel.save()
+            assert PauschaleIndexService.get(user).version == version
+
+        assert len(callbacks) == 1
+        assert PauschaleIndexService.get(user).version != version
+
+    def test_users_are_separate(self, user):
+        other = User.objects.create_user(username='other')
+        _regel(other, 'Fremd')
+
+        assert PauschaleIndexService.get(user).regeln == ()
+        assert len(PauschaleIndexService.get(other).regeln) == 1
+
+
+class TestApplicablePauschaleView:
+    """The view reads the same index."""
+
+    def test_applicability_by_order_value(self, user):
+        _regel(user, 'Anfahrt', pauschale_typ='anfahrt', beschreibung='Anfahrt', betrag=Decimal('50.00'))
+        _regel(user, 'Kleinauftrag', pauschale_typ='kleinauftrag', beschreibung='Zuschlag',
+               betrag=Decimal('200.00'), max_auftragswert=Decimal('1000'))
+        _regel(user, 'Anfahrt weit', pauschale_typ='anfahrt', beschreibung='DSL',
+               berechnungsart='konditional', konditional_regel=ANFAHRT_REGEL)
+        _regel(user, 'Inaktiv', beschreibung='Aus', ist_aktiv=False)
+        client = APIClient()
+        client.force_authenticate(user=user)
+
+        response = client.get(reverse('api-v1:pauschalen-applicable'), {'auftragswert': 5000, 'distanz_km': 75})
+
+        assert response.status_code == 200
+        ergebnisse = {p['name']: p for p in response.data}
+        assert set(ergebnisse) == {'Anfahrt', 'Kleinauftrag', 'Anfahrt weit'}
+        assert ergebnisse['Anfahrt']['applies'] is True
+        assert ergebnisse['Kleinauftrag']['applies'] is False
+        assert ergebnisse['Anfahrt weit']['calculated_amount_eur'] == Decimal('100.00')
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""Tests for side-effect-free Pauschalen previews and bulk commits."""
+
+from decimal import Decimal
+
+import pytest
+
+from documents.betriebskennzahl_models import IndividuelleBetriebskennzahl
+from documents.models import Document, ExtractionResult
+from documents.models_pauschalen import BetriebspauschaleRegel, PauschaleAnwendung
+from documents.services.pauschale_calculation_service import PauschaleCalculationService
+from extraction.services.calculation_engine import CalculationEngine
+
+pytestmark = pytest.mark.usefixtures('locmem_cache')
+
+
+@pytest.fixture
+def user(authenticated_user):
+    user = authenticated_user
+    IndividuelleBetriebskennzahl.objects.create(
+        user=user,
+        is_active=True,
+        stundensatz_arbeit=Decimal('70.00'),
+        gewinnmarge_prozent=Decimal('15.00'),
+        betriebskosten_umlage=Decimal('25.00'),
+    )
+    BetriebspauschaleRegel.objects.create(
+        user=user, name='Anfahrt', pauschale_typ='anfahrt', betrag=Decimal('45.00')
+    )
+    BetriebspauschaleRegel.objects.create(
+        user=user, name='Verpackung', pauschale_typ='verpackung',
+        berechnungsart='prozent', prozentsatz=Decimal('2.50')
+    )
+    return user
+
+
+@pytest.fixture
+def extraction_result(user):
+    document = Document.objects.create(
+        user=user,
+        file='test.pdf',
+        original_filename='test.pdf',
+        file_size_bytes=1000,
+        status='completed'
+    )
+    return ExtractionResult.objects.create(
+        document=document,
+        ocr_text='Test OCR text',
+        confidence_scores={'ocr': 0.95},
+        processing_time_ms=1000,
+        extracted_data={}
+    )
+
+
+DATA = {'holzart': 'eiche', 'material_cost_eur': 120, 'labor_hours': 6, 'distanz_km': 30}
+CONTEXT = {'auftragswert': Decimal('1000'), 'distanz_km': 30}
+
+
+class TestPreview:
+    """Previews calculate without writes."""
+
+    def test_preview_writes_nothing(self, user, extraction_result, django_assert_num_queries):
+        service = PauschaleCalculationService(user, extraction_result)
+
+        with django_assert_num_queries(1):  # Reading the rules
+            result = service.calculate_all_pauschalen(Decimal('1000'), CONTEXT, preview=True)
+
+        assert result['preview'] is True
+        assert result['total'] == 70.0
+        assert [p['anwendung_id'] for p in result['pauschalen']] == [None, None]
+        assert not PauschaleAnwendung.objects.exists()
+
+    def test_engine_preview(self, user, extraction_result):
+        engine = CalculationEngine(user)
+
+        preview = engine.calculate_project_price(DATA, extraction_result=extraction_result, preview=True)
+        committed = engine.calculate_project_price(DATA, extraction_result=extraction_result)
+
+        assert preview['total_price_eur'] == committed['total_price_eur']
+        assert preview['pauschalen']['preview'] is True
+        assert committed['pauschalen']['preview'] is False
+        assert PauschaleAnwendung.objects.count() == 2
+
+
+class TestCommit:
+    """Commits persist in one bulk insert and replace old rows."""
+
+    def test_commit_uses_one_insert(self, user, extraction_result, django_assert_num_queries):
+        service = PauschaleCalculationService(user, extraction_result)
+        preview = service.preview_pauschalen(Decimal('1000'), CONTEXT)
+
+        # SAVEPOINT, overrides SELECT, one DELETE, one INSERT, RELEASE
+        with django_assert_num_queries(5):
+            result = service.commit_pauschalen(preview)
+
+        rows = {str(a.id): a for a in PauschaleAnwendung.objects.all()}
+        assert [p['anwendung_id'] in rows for p in result['pauschalen']] == [True, True]
+        anfahrt = rows[result['pauschalen'][0]['anwendung_id']]
+        assert anfahrt.berechneter_betrag == Decimal('45.00')
+        assert anfahrt.berechnungsgrundlage == {'auftragswert': '1000', 'distanz_km': 30}
+
+    def test_repricing_replaces_rows(self, user, extraction_result):
+        service = PauschaleCalculationService(user, extraction_result)
+
+        first = service.calculate_all_pauschalen(Decimal('1000'), CONTEXT)
+        second = service.calculate_all_pauschalen(Decimal('2000'), dict(CONTEXT, auftragswert=Decimal('2000')))
+
+        assert PauschaleAnwendung.objects.count() == 2
+        assert not PauschaleAnwendung.objects.filter(
+            id__in=[p['anwendung_id'] for p in first['pauschalen']]
+        ).exists()
+        assert second['total'] == 95.0
+
+    def test_manual_override_survives_recalculation(self, user, extraction_result):
+        service = PauschaleCalculationService(user, extraction_result)
+        first = service.calculate_all_pauschalen(Decimal('1000'), CONTEXT)
+        anfahrt_id = first['pauschalen'][0]['anwendung_id']
+        PauschaleAnwendung.objects.filter(id=anfahrt_id).update(
+            manuell_ueberschrieben=True, manueller_betrag=Decimal('30.00')
+        )
+
+        second = service.calculate_all_pauschalen(Decimal('2000'), dict(CONTEXT, auftragswert=Decimal('2000')))
+
+        assert PauschaleAnwendung.objects.count() == 2
+        assert second['pauschalen'][0]['anwendung_id'] == anfahrt_id
+        anfahrt = PauschaleAnwendung.objects.get(id=anfahrt_id)
+        assert anfahrt.get_final_betrag() == Decimal('30.00')
+        assert anfahrt.berechnungsgrundlage['auftragswert'] == '2000'
+
+    def test_commit_stores_exact_amount(self, user, extraction_result):
+        """Amounts are rounded once from the Decimal, not via float."""
+        service = PauschaleCalculationService(user, extraction_result)
+        preview = service.preview_pauschalen(Decimal('1000.20'), dict(CONTEXT, auftragswert=Decimal('1000.20')))
+
+        result = service.commit_pauschalen(preview)
+
+        verpackung = PauschaleAnwendung.objects.get(id=result['pauschalen'][1]['anwendung_id'])
+        assert preview['pauschalen'][1]['betrag_exakt'] == '25.00500'
+        assert verpackung.berechneter_betrag == Decimal('25.00')
+
+    def test_commit_keeps_other_extractions(self, user, extraction_result):
+        document = Document.objects.create(
+            user=user, file='other.pdf', original_filename='other.pdf', file_size_bytes=1000
+        )
+        other = ExtractionResult.objects.create(
+            document=document, ocr_text='', confidence_scores={},
+            processing_time_ms=1, extracted_data={}
+        )
+        PauschaleCalculationService(user, other).calculate_all_pauschalen(Decimal('1000'), CONTEXT)
+
+        PauschaleCalculationService(user, extraction_result).calculate_all_pauschalen(Decimal('1000'), CONTEXT)
+
+        assert PauschaleAnwendung.objects.filter(extraction_result=other).count() == 2
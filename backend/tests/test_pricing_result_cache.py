@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""Tests for memoized pricing results (PricingResultCache)."""
+
+from datetime import timedelta
+from decimal import Decimal
+from unittest.mock import patch
+
+import pytest
+from django.utils import timezone
+
+from documents.betriebskennzahl_models import IndividuelleBetriebskennzahl
+from extraction.services.calculation_engine import CalculationEngine
+from extraction.services.pricing_result_cache import PricingResultCache
+
+pytestmark = pytest.mark.usefixtures('locmem_cache')
+
+
+@pytest.fixture
+def user(authenticated_user):
+    user = authenticated_user
+    IndividuelleBetriebskennzahl.objects.create(
+        user=user,
+        is_active=True,
+        stundensatz_arbeit=Decimal('70.00'),
+        gewinnmarge_prozent=Decimal('15.00'),
+        betriebskosten_umlage=Decimal('25.00'),
+        use_customer_discounts=True,
+    )
+    return user
+
+
+DATA = {'holzart': 'eiche', 'material_cost_eur': 120, 'labor_hours': 6}
+
+
+class TestFingerprint:
+    """Test input fingerprints."""
+
+    def test_key_order_does_not_matter(self):
+        a = PricingResultCache.fingerprint({'a': 1, 'b': {'x': 2, 'y': 3}}, 'neue_kunden')
+        b = PricingResultCache.fingerprint({'b': {'y': 3, 'x': 2}, 'a': 1}, 'neue_kunden')
+
+        assert a == b
+
+    def test_inputs_are_distinguished(self):
+        base = PricingResultCache.fingerprint(DATA, 'neue_kunden')
+
+        assert base != PricingResultCache.fingerprint(DATA, 'vip_kunden')
+        assert base != PricingResultCache.fingerprint(DATA, 'neue_kunden', breakdown=False)
+        assert base != PricingResultCache.fingerprint(DATA, 'neue_kunden', quantity=3)
+        assert base != PricingResultCache.fingerprint(dict(DATA, labor_hours=7), 'neue_kunden')
+
+    def test_value_types_are_distinguished(self):
+        fingerprints = {
+            PricingResultCache.fingerprint({'labor_hours': value}, 'neue_kunden')
+            for value in (10, 10.0, '10', Decimal('10'))
+        }
+
+        assert len(fingerprints) == 4
+
+
+class TestMemoization:
+    """Test result reuse in CalculationEngine."""
+
+    def test_repeated_call_returns_original_result(self, user, django_assert_num_queries):
+        first = CalculationEngine(user).calculate_project_price(DATA)
+
+        with django_assert_num_queries(0):
+            second = CalculationEngine(user).calculate_project_price(dict(reversed(list(DATA.items()))))
+
+        assert second == first
+        assert second['calculated_at'] == first['calculated_at']
+        assert PricingResultCache.stats(user.id) == {'hits': 1, 'misses': 1, 'hit_rate': 0.5}
+
+    def test_configuration_change_invalidates(self, user, django_capture_on_commit_callbacks):
+        engine = CalculationEngine(user)
+        first = engine.calculate_project_price(DATA)
+
+        config = IndividuelleBetriebskennzahl.objects.get(user=user)
+        config.stundensatz_arbeit = Decimal('90.00')
+        with django_capture_on_commit_callbacks(execute=True):
+            config.save()
+
+        second = engine.calculate_project_price(DATA)
+        assert second['labor_price_eur'] == 540.0
+        assert first['labor_price_eur'] == 420.0
+        assert PricingResultCache.stats(user.id)['misses'] == 2
+
+    def test_new_day_recalculates(self, user):
+        engine = CalculationEngine(user)
+        engine.calculate_project_price(DATA)
+
+        tomorrow = timezone.now() + timedelta(days=1)
+        with patch('extraction.services.calculation_engine.timezone.now', return_value=tomorrow):
+            result = engine.calculate_project_price(DATA)
+
+        assert result['calculated_at'] == tomorrow.isoformat()
+        assert PricingResultCache.stats(user.id)['hits'] == 0
+
+    def test_pauschalen_path_is_not_memoized(self, user):
+        engine = CalculationEngine(user)
+        extraction_result = object()
+
+        engine.calculate_project_price(DATA, extraction_result=extraction_result, preview=True)
+        engine.calculate_project_price(DATA, extraction_result=extraction_result, preview=True)
+
+        assert PricingResultCache.stats(user.id) == {'hits': 0, 'misses': 0, 'hit_rate': None}
+
+    def test_batch_reuses_results(self, user, django_assert_num_queries):
+        items = [dict(DATA, labor_hours=h) for h in range(10)]
+        engine = CalculationEngine(user)
+        first = engine.calculate_many(items)
+
+        with django_assert_num_queries(0):
+            second = engine.calculate_many(items + [dict(DATA, labor_hours=99)])
+
+        assert [i['result'] for i in second['items'][:10]] == [i['result'] for i in first['items']]
+        assert PricingResultCache.stats(user.id) == {'hits': 10, 'misses': 11, 'hit_rate': 0.4762}
+
+    def test_failed_calculations_are_not_cached(self, user):
+        engine = CalculationEngine(user)
+
+        engine.calculate_many([{'labor_hours': 'viele'}])
+        result = engine.calculate_many([{'labor_hours': 'viele'}])
+
+        assert result['failed'] == 1
+        assert PricingResultCache.stats(user.id)['hits'] == 0
+
+    def test_pricing_report_shows_metrics(self, user):
+        engine = CalculationEngine(user)
+        engine.calculate_project_price(DATA)
+        engine.calculate_project_price(DATA)
+
+        report = engine.get_pricing_report()
+
+        assert report['result_cache']['hit_rate'] == 0.5
+        assert report['snapshot_version'] == engine.snapshot.version
@@ -0,0 +1,354 @@
+# -*- coding: utf-8 -*-
+"""Tests for the per-user pricing snapshot used by CalculationEngine."""
+
+import dataclasses
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+
+import pytest
+from django.contrib.auth.models import User
+from django.utils import timezone
+
+from documents.betriebskennzahl_models import (
+    BetriebskennzahlTemplate,
+    HolzartKennzahl,
+    IndividuelleBetriebskennzahl,
+    KomplexitaetKennzahl,
+    MateriallistePosition,
+    OberflächenbearbeitungKennzahl,
+    SaisonaleMarge,
+)
+from documents.services.pricing_snapshot import PricingSnapshotService, SaisonaleIndex, SaisonaleRegel
+from extraction.services.calculation_engine import CalculationEngine, CalculationError
+
+pytestmark = pytest.mark.usefixtures('locmem_cache')
+
+
+@pytest.fixture
+def template(db):
+    template = BetriebskennzahlTemplate.objects.create(name='Standard 2024', version='1.0')
+    HolzartKennzahl.objects.create(
+        template=template, holzart='eiche', kategorie='hartholz', preis_faktor=Decimal('1.3')
+    )
+    OberflächenbearbeitungKennzahl.objects.create(
+        template=template, bearbeitung='lackieren',
+        preis_faktor=Decimal('1.15'), zeit_faktor=Decimal('1.3')
+    )
+    KomplexitaetKennzahl.objects.create(
+        template=template, technik='hand_geschnitzt',
+        preis_faktor=Decimal('2.0'), zeit_faktor=Decimal('3.0'), schwierigkeitsgrad=3
+    )
+    return template
+
+
+@pytest.fixture
+def user(authenticated_user, template):
+    user = authenticated_user
+    IndividuelleBetriebskennzahl.objects.create(
+        user=user,
+        is_active=True,
+        handwerk_template=template,
+        stundensatz_arbeit=Decimal('80.00'),
+        gewinnmarge_prozent=Decimal('20.00'),
+        betriebskosten_umlage=Decimal('40.00'),
+        use_handwerk_standard=True,
+        use_custom_materials=True,
+        use_seasonal_adjustments=True,
+        use_customer_discounts=True,
+        use_bulk_discounts=True,
+    )
+    MateriallistePosition.objects.create(
+        user=user, material_name='Eiche 25mm', sku='EICHE-25MM',
+        standardkosten_eur=Decimal('45.00'), rabatt_ab_100=5, rabatt_ab_500=10
+    )
+    today = timezone.now().date()
+    SaisonaleMarge.objects.create(
+        user=user, name='Winteraktion', adjustment_type='prozent', value=Decimal('10'),
+        start_date=today - timedelta(days=5), end_date=today + timedelta(days=5),
+    )
+    return user
+
+
+EXTRACTED = {
+    'holzart': 'eiche',
+    'oberflaeche': 'lackieren',
+    'komplexitaet': 'hand_geschnitzt',
+    'material_sku': 'EICHE-25MM',
+    'material_quantity': 120,
+    'labor_hours': 12,
+}
+
+
+class TestSnapshotContent:
+    """Test snapshot building."""
+
+    def test_build_collects_all_factors(self, user, template):
+        snapshot = PricingSnapshotService.get(user)
+
+        assert snapshot.holzarten['eiche'].preis_faktor == Decimal('1.3')
+        assert snapshot.oberflaechen['lackieren'].zeit_faktor == Decimal('1.3')
+        assert snapshot.komplexitaeten['hand_geschnitzt'].schwierigkeitsgrad_display
+        assert snapshot.materialien['EICHE-25MM'].get_discount_percent(120) == 5
+        assert snapshot.template_id == str(template.id)
+        assert len(snapshot.active_seasonal_rules(timezone.now().date())) == 1
+
+    def test_disabled_rows_are_left_out(self, user, template):
+        HolzartKennzahl.objects.create(
+            template=template, holzart='buche', kategorie='hartholz',
+            preis_faktor=Decimal('1.1'), is_enabled=False
+        )
+        SaisonaleMarge.objects.create(
+            user=user, name='Alt', adjustment_type='absolute', value=Decimal('50'),
+            start_date=timezone.now().date(), end_date=timezone.now().date(), is_active=False
+        )
+
+        snapshot = PricingSnapshotService.get(user)
+
+        assert 'buche' not in snapshot.holzarten
+        assert [r.name for r in snapshot.saisonale_regeln] == ['Winteraktion']
+
+    def test_snapshot_is_immutable(self, user):
+        snapshot = PricingSnapshotService.get(user)
+
+        with pytest.raises(dataclasses.FrozenInstanceError):
+            snapshot.stundensatz_arbeit = Decimal('1')
+
+    def test_missing_configuration(self, db):
+        other = User.objects.create_user(username='noconfig')
+
+        assert PricingSnapshotService.get(other) is None
+        with pytest.raises(CalculationError):
+            CalculationEngine(other)
+
+
+class TestWarmPath:
+    """Test that cached snapshots avoid the database."""
+
+    def test_warm_calculation_runs_without_queries(self, user, django_assert_num_queries):
+        engine = CalculationEngine(user)
+        expected = engine.calculate_project_price(EXTRACTED)
+
+        with django_assert_num_queries(0):
+            result = CalculationEngine(user).calculate_project_price(EXTRACTED)
+
+        assert result['total_price_eur'] == expected['total_price_eur']
+        assert result['breakdown'] == expected['breakdown']
+
+    def test_redis_copy_serves_other_processes(self, user, django_assert_num_queries):
+        snapshot = PricingSnapshotService.get(user)
+        PricingSnapshotService.clear_local()
+
+        with django_assert_num_queries(0):
+            reloaded = PricingSnapshotService.get(user)
+
+        assert reloaded == snapshot
+
+    def test_matches_uncached_engine(self, user, settings):
+        cached = CalculationEngine(user).calculate_project_price(EXTRACTED)
+
+        # Without a cache every call reads the database
+        settings.CACHES = {
+            'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}
+        }
+        PricingSnapshotService.clear_local()
+        uncached = CalculationEngine(user).calculate_project_price(EXTRACTED)
+
+        assert cached['total_price_eur'] == uncached['total_price_eur']
+        assert cached['breakdown'] == uncached['breakdown']
+
+
+class TestInvalidation:
+    """Test that model changes reach the next calculation."""
+
+    def _version(self, user):
+        return PricingSnapshotService.get(user).version
+
+    def test_config_save_invalidates(self, user, django_capture_on_commit_callbacks):
+        engine = CalculationEngine(user)
+        before = engine.calculate_project_price(EXTRACTED)['labor_price_eur']
+
+        config = IndividuelleBetriebskennzahl.objects.get(user=user)
+        config.stundensatz_arbeit = Decimal('100.00')
+        with django_capture_on_commit_callbacks(execute=True):
+            config.save()
+
+        assert engine.calculate_project_price(EXTRACTED)['labor_price_eur'] == 1200.0
+        assert before == 960.0
+
+    def test_deactivating_config_blocks_pricing(self, user, django_capture_on_commit_callbacks):
+        engine = CalculationEngine(user)
+        config = IndividuelleBetriebskennzahl.objects.get(user=user)
+        config.is_active = False
+        with django_capture_on_commit_callbacks(execute=True):
+            config.save()
+
+        with pytest.raises(CalculationError):
+            engine.calculate_project_price(EXTRACTED)
+
+    def test_material_change_invalidates(self, user, django_capture_on_commit_callbacks):
+        version = self._version(user)
+
+        material = MateriallistePosition.objects.get(user=user, sku='EICHE-25MM')
+        material.standardkosten_eur = Decimal('50.00')
+        with django_capture_on_commit_callbacks(execute=True):
+            material.save()
+
+        snapshot = PricingSnapshotService.get(user)
+        assert snapshot.version != version
+        assert snapshot.materialien['EICHE-25MM'].standardkosten_eur == Decimal('50.00')
+
+    def test_seasonal_rule_delete_invalidates(self, user, django_capture_on_commit_callbacks):
+        assert PricingSnapshotService.get(user).saisonale_regeln
+
+        with django_capture_on_commit_callbacks(execute=True):
+            SaisonaleMarge.objects.filter(user=user).get().delete()
+
+        assert PricingSnapshotService.get(user).saisonale_regeln == ()
+
+    def test_template_factor_change_invalidates_template_users(self, user, template,
+                                                                django_capture_on_commit_callbacks):
+        version = self._version(user)
+
+        factor = HolzartKennzahl.objects.get(template=template, holzart='eiche')
+        factor.preis_faktor = Decimal('1.5')
+        with django_capture_on_commit_callbacks(execute=True):
+            factor.save()
+
+        snapshot = PricingSnapshotService.get(user)
+        assert snapshot.version != version
+        assert snapshot.holzarten['eiche'].preis_faktor == Decimal('1.5')
+
+    def test_template_delete_invalidates(self, user, template, django_capture_on_commit_callbacks):
+        self._version(user)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            template.delete()
+
+        snapshot = PricingSnapshotService.get(user)
+        assert not snapshot.has_template
+        assert snapshot.holzarten == {}
+
+    def test_invalidation_waits_for_commit(self, user, django_capture_on_commit_callbacks):
+        """A snapshot rebuilt before the commit cannot keep the old rows."""
+        version = self._version(user)
+
+        material = MateriallistePosition.objects.get(user=user, sku='EICHE-25MM')
+        material.standardkosten_eur = Decimal('50.00')
+        with django_capture_on_commit_callbacks(execute=True) as callbacks:
+            material.save()
+            assert self._version(user) == version
+
+        assert len(callbacks) == 1
+        assert self._version(user) != version
+
+    def test_other_users_keep_their_snapshot(self, user, db):
+        other = User.objects.create_user(username='other')
+        IndividuelleBetriebskennzahl.objects.create(user=other, is_active=True)
+        other_version = self._version(other)
+
+        MateriallistePosition.objects.create(
+            user=user, material_name='Buche', sku='BUCHE-20MM', standardkosten_eur=Decimal('30.00')
+        )
+
+        assert self._version(other) == other_version
+
+
+def _regel(name, start, end):
+    return SaisonaleRegel(
+        name=name, adjustment_type='prozent', adjustment_type_display='Prozent',
+        value=Decimal('5'), start_date=start, end_date=end, applicable_to='Alle',
+    )
+
+
+class TestSaisonaleIndex:
+    """Test the seasonal interval index."""
+
+    def _names(self, index, day):
+        return [rule.name for rule in index.rules_on(day)]
+
+    def test_boundaries_are_inclusive(self):
+        index = SaisonaleIndex.build([_regel('Mai', date(2026, 5, 1), date(2026, 5, 31))])
+
+        assert self._names(index, date(2026, 4, 30)) == []
+        assert self._names(index, date(2026, 5, 1)) == ['Mai']
+        assert self._names(index, date(2026, 5, 31)) == ['Mai']
+        assert self._names(index, date(2026, 6, 1)) == []
+
+    def test_overlapping_rules_keep_their_order(self):
+        index = SaisonaleIndex.build([
+            _regel('Frühjahr', date(2026, 3, 1), date(2026, 5, 31)),
+            _regel('Ostern', date(2026, 4, 1), date(2026, 4, 10)),
+            _regel('April', date(2026, 4, 1), date(2026, 4, 30)),
+            _regel('Einzeltag', date(2026, 4, 10), date(2026, 4, 10)),
+        ])
+
+        assert self._names(index, date(2026, 3, 31)) == ['Frühjahr']
+        assert self._names(index, date(2026, 4, 1)) == ['Frühjahr', 'Ostern', 'April']
+        assert self._names(index, date(2026, 4, 10)) == ['Frühjahr', 'Ostern', 'April', 'Einzeltag']
+        assert self._names(index, date(2026, 4, 11)) == ['Frühjahr', 'April']
+        assert self._names(index, date(2026, 5, 1)) == ['Frühjahr']
+
+    def test_adjacent_rules_and_gaps(self):
+        index = SaisonaleIndex.build([
+            _regel('A', date(2026, 1, 1), date(2026, 1, 10)),
+            _regel('B', date(2026, 1, 11), date(2026, 1, 20)),
+            _regel('C', date(2026, 2, 1), date.max),
+        ])
+
+        assert self._names(index, date(2026, 1, 10)) == ['A']
+        assert self._names(index, date(2026, 1, 11)) == ['B']
+        assert self._names(index, date(2026, 1, 25)) == []
+        assert self._names(index, date(2099, 1, 1)) == ['C']
+        assert self._names(index, date.min) == []
+
+    def test_inverted_ranges_and_empty_index(self):
+        index = SaisonaleIndex.build([_regel('Falsch', date(2026, 5, 2), date(2026, 5, 1))])
+
+        assert index.breakpoints == ()
+        assert SaisonaleIndex().rules_on(date(2026, 5, 1)) == ()
+
+    def test_matches_linear_scan(self):
+        rng = random.Random(39)
+        origin = date(2026, 1, 1)
+        rules = []
+        for number in range(200):
+            start = origin + timedelta(days=rng.randrange(365))
+            rules.append(_regel(f'R{number}', start, start + timedelta(days=rng.randrange(60))))
+        index = SaisonaleIndex.build(rules)
+
+        for offset in range(-5, 440):
+            day = origin + timedelta(days=offset)
+            assert index.rules_on(day) == tuple(rule for rule in rules if rule.applies_on(day))
+
+
+class TestPricingDate:
+    """Seasonal rules for quote dates other than today."""
+
+    def _names(self, result):
+        return [a['name'] for a in result['breakdown']['step_7_seasonal_adjustments']['adjustments']]
+
+    def test_future_delivery_date(self, user):
+        today = timezone.now().date()
+        SaisonaleMarge.objects.create(
+            user=user, name='Sommeraktion', adjustment_type='absolute', value=Decimal('25'),
+            start_date=today + timedelta(days=30), end_date=today + timedelta(days=60),
+        )
+        engine = CalculationEngine(user)
+
+        now = engine.calculate_project_price(EXTRACTED)
+        later = engine.calculate_project_price(
+            dict(EXTRACTED, lieferdatum=(today + timedelta(days=30)).isoformat())
+        )
+
+        assert self._names(now) == ['Winteraktion']
+        assert self._names(later) == ['Sommeraktion']
+        assert later['breakdown']['step_7_seasonal_adjustments']['pricing_date'] == (
+            today + timedelta(days=30)
+        ).isoformat()
+
+    def test_invalid_delivery_date_uses_today(self, user):
+        result = CalculationEngine(user).calculate_project_price(dict(EXTRACTED, lieferdatum='morgen'))
+
+        assert result['breakdown']['step_7_seasonal_adjustments']['pricing_date'] == timezone.now().date().isoformat()
+        assert "Invalid lieferdatum 'morgen', using today" in result['warnings']
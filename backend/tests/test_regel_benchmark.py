@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""Tests for the rule-engine benchmark and fuzz harness."""
+
+import json
+import logging
+import random
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from documents.models_bauteile import BauteilKatalog, StandardBauteil
+from documents.models_pauschalen import BetriebspauschaleRegel
+from documents.services import regel_benchmark
+from documents.services.bauteil_katalog_snapshot import KatalogSnapshotService
+from documents.services.bauteil_regel_analyse import analysiere_regel
+
+pytestmark = pytest.mark.usefixtures('locmem_cache')
+
+
+class TestSyntheticData:
+    """Generated rules and catalogs."""
+
+    def test_random_rules_are_valid(self):
+        rng = random.Random(1)
+        for _ in range(300):
+            analyse = analysiere_regel(regel_benchmark.zufallsregel(rng))
+            assert analyse.gueltig, analyse.fehler
+
+    @pytest.mark.django_db
+    def test_catalog(self):
+        katalog = regel_benchmark.erzeuge_katalog(25, random.Random(2))
+
+        snapshot = KatalogSnapshotService.get(katalog)
+
+        assert len(snapshot.bauteile) == 25
+        assert all(1 <= len(snapshot.regeln[str(b.id)]) <= 3 for b in snapshot.bauteile)
+
+
+class TestFuzz:
+    """Interpreter, compiled and batch evaluation agree."""
+
+    def test_no_mismatches(self):
+        ergebnis = regel_benchmark.fuzz(random.Random(3), faelle=400, langsam_ms=50.0)
+
+        assert ergebnis['abweichungen'] == []
+        assert ergebnis['abweichungen_gesamt'] == 0
+        # Both evaluable and failing inputs are covered
+        assert 0 < ergebnis['fehler_faelle'] < ergebnis['faelle']
+
+    def test_missing_sources_are_not_logged(self, caplog):
+        regel_benchmark.fuzz(random.Random(4), faelle=50)
+
+        assert not [r for r in caplog.records if r.name in regel_benchmark.QUELLEN_LOGGER]
+        assert logging.getLogger(regel_benchmark.QUELLEN_LOGGER[0]).level == logging.NOTSET
+
+
+class TestVergleiche:
+    """Throughput comparison against a baseline."""
+
+    BASIS = {'execute_rule': {'kompiliert': {'pro_sekunde': 1000.0}},
+             'calculate_bauteil_kosten': {'10': {'pro_sekunde': 200.0}}}
+
+    def test_within_tolerance(self):
+        aktuell = {'execute_rule': {'kompiliert': {'pro_sekunde': 800.0}},
+                   'calculate_bauteil_kosten': {'10': {'pro_sekunde': 400.0}, '100': {'pro_sekunde': 5.0}}}
+
+        assert regel_benchmark.vergleiche(aktuell, self.BASIS) == []
+
+    def test_regression(self):
+        aktuell = {'execute_rule': {'kompiliert': {'pro_sekunde': 500.0}},
+                   'calculate_bauteil_kosten': {'10': {'pro_sekunde': 200.0}},
+                   'fuzz': {'abweichungen_gesamt': 2}}
+
+        meldungen = regel_benchmark.vergleiche(aktuell, self.BASIS)
+
+        assert len(meldungen) == 2
+        assert meldungen[0].startswith('execute_rule.kompiliert.pro_sekunde: 500.0/s')
+        assert 'fuzz' in meldungen[1]
+
+
+@pytest.mark.django_db
+class TestBenchmarkCommand:
+    """benchmark_regeln writes a JSON report and leaves no data behind."""
+
+    def test_report(self, tmp_path):
+        ausgabe = tmp_path / 'bench.json'
+
+        call_command('benchmark_regeln', '--groessen', '5', '20', '--aufrufe', '3',
+                     '--fuzz-faelle', '20', '--ausgabe', str(ausgabe))
+
+        ergebnis = json.loads(ausgabe.read_text())
+        assert set(ergebnis) == {'meta', 'execute_rule', 'calculate_bauteil_kosten',
+                                 'calculate_all_pauschalen', 'fuzz'}
+        assert set(ergebnis['calculate_bauteil_kosten']) == {'5', '20'}
+        assert ergebnis['calculate_bauteil_kosten']['20']['aufrufe'] == 3
+        assert ergebnis['calculate_all_pauschalen']['pro_sekunde'] > 0
+        assert ergebnis['fuzz']['abweichungen_gesamt'] == 0
+        assert not BauteilKatalog.objects.exists()
+        assert not StandardBauteil.objects.exists()
+        assert not BetriebspauschaleRegel.objects.exists()
+
+    def test_fails_on_regression(self, tmp_path):
+        basis = tmp_path / 'basis.json'
+        basis.write_text(json.dumps({'fuzz': {}, 'execute_rule': {'kompiliert': {'pro_sekunde': 1e12}}}))
+
+        with pytest.raises(CommandError, match='execute_rule.kompiliert'):
+            call_command('benchmark_regeln', '--nur', 'execute_rule', '--vergleich', str(basis),
+                         '--ausgabe', str(tmp_path / 'bench.json'))
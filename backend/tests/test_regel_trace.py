@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+"""Tests for sampled Bauteil rule execution traces."""
+
+import json
+from datetime import date
+from decimal import Decimal
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from documents.models_bauteile import BauteilKatalog, BauteilKatalogPosition, BauteilRegel, StandardBauteil
+from documents.services.bauteil_regel_engine import BauteilRegelEngine, ComponentNotFoundError
+from documents.services.bauteil_regel_trace import RegelTrace, RegelTraceService, verfolge_regel
+from documents.services.standardbauteil_integration import StandardbauteilIntegrationService
+
+pytestmark = [
+    pytest.mark.usefixtures('locmem_cache'),
+    pytest.mark.parametrize(
+        'locmem_cache', [pytest.param({'BAUTEIL_REGEL_TRACE_SAMPLE_RATE': 0.0}, id='locmem')], indirect=True
+    ),
+]
+
+HOHE_TUEREN = {
+    'operation': 'IF_THEN_ELSE',
+    'bedingung': {
+        'operation': 'AND',
+        'bedingungen': [
+            {'operation': 'GREATER_THAN', 'links': {'komponente': 'Tür', 'attribut': 'höhe'}, 'rechts': 2.0},
+            {'operation': 'GREATER_THAN', 'links': {'quelle': 'distanz_km'}, 'rechts': 10},
+        ],
+    },
+    'dann': {'operation': 'MULTIPLY', 'faktor': 4, 'komponente': 'Tür', 'attribut': 'anzahl'},
+    'sonst': {'operation': 'MULTIPLY', 'faktor': 3, 'komponente': 'Tür', 'attribut': 'anzahl'},
+}
+PRO_TUER = {'operation': 'MULTIPLY', 'faktor': 3, 'komponente': 'Tür', 'attribut': 'anzahl'}
+COMPONENTS = {'Tür': {'anzahl': 2, 'höhe': 2.2}}
+
+
+def _katalog(*regeln):
+    """Global Tischler catalog with one Topfband and the given (name, prioritaet, definition) rules."""
+    katalog = BauteilKatalog.objects.create(
+        name='Beschläge', version='2025.1', gewerk='tischler', gueltig_ab=date(2024, 1, 1), ist_standard=True,
+    )
+    bauteil = StandardBauteil.objects.create(
+        artikel_nr='TB-35', name='Topfband 35mm', kategorie='beschlag',
+        gewerke=['tischler'], einheit='stk', einzelpreis=Decimal('2.50'),
+    )
+    BauteilKatalogPosition.objects.create(katalog=katalog, bauteil=bauteil)
+    for name, prioritaet, definition in regeln:
+        BauteilRegel.objects.create(bauteil=bauteil, name=name, prioritaet=prioritaet, regel_definition=definition)
+    return katalog
+
+
+class TestRegelTrace:
+    """Nodes recorded by the interpreter."""
+
+    def test_nodes_values_and_depth(self):
+        ergebnis = verfolge_regel(HOHE_TUEREN, COMPONENTS, {})
+
+        assert ergebnis['menge'] == '6'
+        assert ergebnis['fehler'] is None
+        knoten = ergebnis['knoten']
+        assert [(k['op'], k['tiefe'], k['wert']) for k in knoten] == [
+            ('IF_THEN_ELSE', 0, '6'),
+            ('AND', 1, False),
+            ('GREATER_THAN', 2, True),
+            ('GREATER_THAN', 2, False),
+            ('MULTIPLY', 1, '6'),
+        ]
+        assert knoten[2]['werte'] == {'Tür.höhe': 2.2}
+        # Missing context source, read as 0
+        assert knoten[3]['werte'] == {'quelle:distanz_km': None}
+        assert knoten[4]['werte'] == {'Tür.anzahl': 2}
+        assert all(k['ms'] >= 0 for k in knoten)
+
+    def test_error_is_recorded_on_the_failing_nodes(self):
+        ergebnis = verfolge_regel(HOHE_TUEREN, {'Tür': {'anzahl': 2}})
+
+        assert ergebnis['menge'] is None
+        assert ergebnis['fehler'].startswith('ComponentNotFoundError')
+        assert [k['op'] for k in ergebnis['knoten'] if 'fehler' in k] == ['IF_THEN_ELSE', 'AND', 'GREATER_THAN']
+
+    def test_trace_does_not_change_results(self):
+        engine = BauteilRegelEngine(COMPONENTS)
+        engine.trace = RegelTrace()
+
+        assert engine.execute_rule(HOHE_TUEREN) == BauteilRegelEngine(COMPONENTS).execute_rule(HOHE_TUEREN)
+        with pytest.raises(ComponentNotFoundError):
+            engine.execute_rule({'operation': 'MULTIPLY', 'faktor': 1, 'komponente': 'Schublade', 'attribut': 'anzahl'})
+
+
+class TestRegelTraceService:
+    """Ring buffer in the cache."""
+
+    def test_store_and_get(self):
+        trace_id = RegelTraceService.speichere({'grund': 'angefordert'})
+
+        trace = RegelTraceService.get(trace_id)
+        assert trace['grund'] == 'angefordert'
+        assert trace['trace_id'] == trace_id
+        assert RegelTraceService.get('999-unknown') is None
+        assert RegelTraceService.get('kaputt') is None
+
+    def test_oldest_traces_are_overwritten(self, settings):
+        settings.BAUTEIL_REGEL_TRACE_BUFFER_SIZE = 3
+        ids = [RegelTraceService.speichere({'nummer': n}) for n in range(5)]
+
+        assert [RegelTraceService.get(i) for i in ids[:2]] == [None, None]
+        assert [t['nummer'] for t in RegelTraceService.letzte()] == [4, 3, 2]
+
+    def test_without_cache_traces_are_dropped(self, settings):
+        settings.CACHES = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+
+        assert RegelTraceService.speichere({'grund': 'fehler'}) is None
+
+
+@pytest.mark.django_db
+class TestCalculateBauteilKostenTraces:
+    """Which calls are traced, and how positions link their trace."""
+
+    def _kosten(self, katalog, **kwargs):
+        service = StandardbauteilIntegrationService(extraction_result_id='ex-1', katalog_id=str(katalog.id))
+        return service.calculate_bauteil_kosten(COMPONENTS, **kwargs)
+
+    def test_untraced_without_errors(self):
+        katalog = _katalog(('Pro Tür', 10, PRO_TUER))
+
+        (position,) = self._kosten(katalog).positionen
+
+        assert position.trace_id is None
+        assert position.berechnungsgrundlage == 'Regel: Pro Tür'
+        assert RegelTraceService.letzte() == []
+
+    def test_failing_rule_is_always_traced(self):
+        katalog = _katalog(('Kaputt', 1, {'operation': 'FIXED'}), ('Pro Tür', 10, PRO_TUER),
+                           ('Fallback', 20, {'operation': 'FIXED', 'wert': 2}))
+
+        (position,) = self._kosten(katalog).positionen
+
+        assert position.menge == Decimal('6')
+        assert position.berechnungsgrundlage == f'Regel: Pro Tür (Trace {position.trace_id})'
+        trace = RegelTraceService.get(position.trace_id)
+        assert trace['grund'] == 'fehler'
+        assert trace['katalog_id'] == str(katalog.id)
+        (bauteil,) = trace['bauteile']
+        assert bauteil['regel'] == 'Pro Tür'
+        assert [(r['name'], r['menge']) for r in bauteil['regeln']] == [('Kaputt', None), ('Pro Tür', '6')]
+        assert bauteil['regeln'][0]['fehler'] == "InvalidRuleError: FIXED requires 'wert' field"
+        assert bauteil['nicht_ausgewertet'] == 1
+
+    def test_interpreter_errors_are_recorded(self):
+        # Rejected by the compiler, but the interpreter fails on the constant itself
+        kaputt = {'operation': 'MULTIPLY', 'faktor': 'abc', 'komponente': 'Tür', 'attribut': 'anzahl'}
+        katalog = _katalog(('Kaputt', 1, kaputt), ('gut', 2, PRO_TUER))
+
+        (position,) = self._kosten(katalog).positionen
+
+        assert position.menge == Decimal('6')
+        assert position.berechnungsgrundlage == f'Regel: gut (Trace {position.trace_id})'
+        (bauteil,) = RegelTraceService.get(position.trace_id)['bauteile']
+        assert [(r['name'], r['menge']) for r in bauteil['regeln']] == [('Kaputt', None), ('gut', '6')]
+        assert bauteil['regeln'][0]['fehler'].startswith('InvalidOperation')
+
+    def test_trace_on_request(self):
+        katalog = _katalog(('Pro Tür', 10, PRO_TUER))
+
+        summary = self._kosten(katalog, trace=True)
+        export = StandardbauteilIntegrationService('ex-1').export_bauteil_kosten_for_calculation_engine(summary)
+
+        trace_id = export['positionen'][0]['trace_id']
+        assert RegelTraceService.get(trace_id)['grund'] == 'angefordert'
+
+    def test_sampled(self, settings):
+        settings.BAUTEIL_REGEL_TRACE_SAMPLE_RATE = 1.0
+        katalog = _katalog(('Pro Tür', 10, PRO_TUER))
+
+        (position,) = self._kosten(katalog).positionen
+
+        assert RegelTraceService.get(position.trace_id)['grund'] == 'stichprobe'
+
+
+class TestRegelTraceCommand:
+    """regel_trace prints stored traces."""
+
+    def test_show_trace(self):
+        trace_id = RegelTraceService.speichere({'grund': 'fehler', 'bauteile': []})
+        out = StringIO()
+
+        call_command('regel_trace', trace_id, stdout=out)
+
+        assert json.loads(out.getvalue())['trace_id'] == trace_id
+
+    def test_recent_traces(self):
+        for _ in range(3):
+            RegelTraceService.speichere({'grund': 'stichprobe'})
+        out = StringIO()
+
+        call_command('regel_trace', '--letzte', '2', stdout=out)
+
+        assert len(json.loads(out.getvalue())) == 2
+
+    def test_unknown_trace(self):
+        with pytest.raises(CommandError):
+            call_command('regel_trace', '1-00000000')
@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+"""Tests for vectorized what-if pricing (PricingScenarioEngine)."""
+
+import itertools
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+import pytest
+from django.utils import timezone
+
+from documents.betriebskennzahl_models import (
+    BetriebskennzahlTemplate,
+    HolzartKennzahl,
+    IndividuelleBetriebskennzahl,
+    KomplexitaetKennzahl,
+    MateriallistePosition,
+    OberflächenbearbeitungKennzahl,
+    SaisonaleMarge,
+)
+from extraction.services.calculation_engine import CalculationEngine
+from extraction.services.scenario_engine import PricingScenarioEngine
+
+pytestmark = pytest.mark.usefixtures('locmem_cache')
+
+
+@pytest.fixture
+def user(authenticated_user):
+    user = authenticated_user
+    template = BetriebskennzahlTemplate.objects.create(name='Standard 2024')
+    for holzart, faktor in [('eiche', '1.3'), ('buche', '1.1'), ('nussbaum', '1.8')]:
+        HolzartKennzahl.objects.create(
+            template=template, holzart=holzart, kategorie='hartholz', preis_faktor=Decimal(faktor)
+        )
+    for bearbeitung, faktor in [('oelen', '1.05'), ('lackieren', '1.15')]:
+        OberflächenbearbeitungKennzahl.objects.create(
+            template=template, bearbeitung=bearbeitung,
+            preis_faktor=Decimal(faktor), zeit_faktor=Decimal('1.2')
+        )
+    for technik, faktor in [('gedrechselt', '1.25'), ('hand_geschnitzt', '2.0')]:
+        KomplexitaetKennzahl.objects.create(
+            template=template, technik=technik, preis_faktor=Decimal(faktor), zeit_faktor=Decimal('2.0')
+        )
+    IndividuelleBetriebskennzahl.objects.create(
+        user=user,
+        is_active=True,
+        handwerk_template=template,
+        stundensatz_arbeit=Decimal('72.50'),
+        gewinnmarge_prozent=Decimal('22.00'),
+        betriebskosten_umlage=Decimal('35.00'),
+        use_handwerk_standard=True,
+        use_custom_materials=True,
+        use_seasonal_adjustments=True,
+        use_customer_discounts=True,
+        use_bulk_discounts=True,
+    )
+    MateriallistePosition.objects.create(
+        user=user, material_name='Eiche 25mm', sku='EICHE-25MM',
+        standardkosten_eur=Decimal('45.90'), rabatt_ab_100=5, rabatt_ab_500=12
+    )
+    today = timezone.now().date()
+    SaisonaleMarge.objects.create(
+        user=user, name='Winteraktion', adjustment_type='prozent', value=Decimal('7.5'),
+        start_date=today - timedelta(days=3), end_date=today + timedelta(days=3),
+    )
+    SaisonaleMarge.objects.create(
+        user=user, name='Messe', adjustment_type='absolute', value=Decimal('20'),
+        start_date=today, end_date=today,
+    )
+    return user
+
+
+GRID = {
+    'holzarten': ['eiche', 'buche', 'nussbaum', 'kirsche'],  # kirsche has no factor
+    'oberflaechen': ['oelen', 'lackieren'],
+    'komplexitaeten': ['gedrechselt', 'hand_geschnitzt'],
+    'material_quantities': [0, 10, 100, 499, 500, 1200],
+}
+
+
+def _engine_price(user, base_data, holzart, oberflaeche, komplexitaet, quantity, customer_type):
+    data = dict(
+        base_data, holzart=holzart, oberflaeche=oberflaeche,
+        komplexitaet=komplexitaet, material_quantity=quantity,
+    )
+    return CalculationEngine(user).calculate_project_price(data, customer_type=customer_type)['total_price_eur']
+
+
+class TestGridParity:
+    """Grid prices match the Decimal workflow."""
+
+    @pytest.mark.parametrize('base_data', [
+        {'material_sku': 'EICHE-25MM', 'labor_hours': 12},
+        {'material_cost_eur': 250, 'labor_hours': 0},
+        {'material_sku': 'UNBEKANNT', 'labor_hours': 3.5},
+    ])
+    def test_every_cell_matches_engine(self, user, base_data):
+        grid = PricingScenarioEngine(user).evaluate_grid(
+            base_data=base_data, customer_type='bestehende_kunden', **GRID
+        )
+
+        combos = list(itertools.product(*GRID.values()))
+        assert grid['shape'] == [4, 2, 2, 6]
+        assert len(grid['rows']) == len(combos)
+        for row, (h, o, k, q) in zip(grid['rows'], combos):
+            assert (row['holzart'], row['oberflaeche'], row['komplexitaet'], row['material_quantity']) == (h, o, k, q)
+            expected = _engine_price(user, base_data, h, o, k, q, 'bestehende_kunden')
+            assert row['price_eur'] == pytest.approx(expected, abs=0.01)
+
+    def test_tier_1_disabled(self, user):
+        config = IndividuelleBetriebskennzahl.objects.get(user=user)
+        config.use_handwerk_standard = False
+        config.save()
+
+        grid = PricingScenarioEngine(user).evaluate_grid(
+            base_data={'material_cost_eur': 100}, holzarten=['eiche', 'nussbaum']
+        )
+
+        assert grid['rows'][0]['price_eur'] == grid['rows'][1]['price_eur']
+
+    def test_empty_axes_use_base_values(self, user):
+        grid = PricingScenarioEngine(user).evaluate_grid(
+            base_data={'holzart': 'Eiche', 'material_quantity': 5, 'material_sku': 'EICHE-25MM'}
+        )
+
+        assert grid['shape'] == [1, 1, 1, 1]
+        assert grid['rows'][0]['holzart'] == 'eiche'
+        assert grid['rows'][0]['material_quantity'] == 5.0
+
+
+class TestExactRows:
+    """Selected rows are re-priced with Decimal."""
+
+    def test_selected_rows_carry_exact_price(self, user):
+        base_data = {'material_sku': 'EICHE-25MM', 'labor_hours': 12}
+        grid = PricingScenarioEngine(user).evaluate_grid(
+            base_data=base_data, select=[0, 37], **GRID
+        )
+
+        for index in (0, 37):
+            row = grid['rows'][index]
+            expected = _engine_price(
+                user, base_data, row['holzart'], row['oberflaeche'],
+                row['komplexitaet'], row['material_quantity'], 'neue_kunden'
+            )
+            assert Decimal(row['exact_price_eur']) == Decimal(str(expected)).quantize(Decimal('0.01'))
+        assert 'exact_price_eur' not in grid['rows'][1]
+
+    def test_missing_factor_warning_on_exact_row(self, user):
+        grid = PricingScenarioEngine(user).evaluate_grid(
+            base_data={'material_cost_eur': 100}, holzarten=['kirsche'], select=[0]
+        )
+
+        assert any('kirsche' in w for w in grid['rows'][0]['warnings'])
+
+
+class TestLimits:
+    """Grid size and selection limits."""
+
+    def test_rejects_oversized_grid(self, user):
+        with pytest.raises(ValueError):
+            PricingScenarioEngine(user).evaluate_grid(
+                base_data={},
+                holzarten=[f'h{i}' for i in range(100)],
+                oberflaechen=[f'o{i}' for i in range(100)],
+                material_quantities=[1, 2, 3],
+            )
+
+    def test_rejects_selection_outside_grid(self, user):
+        with pytest.raises(ValueError):
+            PricingScenarioEngine(user).evaluate_grid(base_data={}, select=[1])
+
+
+class TestPerformance:
+    """Warm grids run without queries in milliseconds."""
+
+    def test_warm_grid_runs_without_queries(self, user, django_assert_num_queries):
+        PricingScenarioEngine(user)  # Warm the snapshot
+
+        with django_assert_num_queries(0):
+            PricingScenarioEngine(user).evaluate_grid(base_data={'labor_hours': 8}, **GRID)
+
+    def test_large_grid_is_fast(self, user):
+        engine = PricingScenarioEngine(user)
+        grid = {
+            'holzarten': ['eiche', 'buche', 'nussbaum'] * 5,
+            'oberflaechen': ['oelen', 'lackieren'] * 5,
+            'komplexitaeten': ['gedrechselt', 'hand_geschnitzt'] * 5,
+            'material_quantities': list(range(0, 1000, 100)),
+        }
+
+        start = time.perf_counter()
+        result = engine.evaluate_grid(base_data={'material_sku': 'EICHE-25MM'}, **grid)
+        elapsed = time.perf_counter() - start
+
+        assert len(result['rows']) == 15 * 10 * 10 * 10
+        assert elapsed < 1.0
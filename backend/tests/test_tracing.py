@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+"""Tests for calculation tracing (core.tracing) and traced pricing."""
+
+import json
+from decimal import Decimal
+from io import StringIO
+from unittest.mock import MagicMock, patch
+
+import pytest
+from django.contrib.auth.models import User
+from django.core.management import call_command
+
+from core.tracing import Trace, TraceHistogram, active_trace, record_cache, span
+from documents.betriebskennzahl_models import IndividuelleBetriebskennzahl
+from documents.models_pauschalen import BetriebspauschaleRegel
+from extraction.services.calculation_engine import CalculationEngine
+from extraction.services.pricing_result_cache import PricingResultCache
+
+pytestmark = pytest.mark.usefixtures('locmem_cache')
+
+
+@pytest.fixture
+def user(authenticated_user):
+    user = authenticated_user
+    IndividuelleBetriebskennzahl.objects.create(
+        user=user,
+        is_active=True,
+        stundensatz_arbeit=Decimal('70.00'),
+        gewinnmarge_prozent=Decimal('15.00'),
+        betriebskosten_umlage=Decimal('25.00'),
+    )
+    return user
+
+
+DATA = {'holzart': 'eiche', 'material_cost_eur': 120, 'labor_hours': 6}
+
+
+def _span_names(node):
+    return [child['name'] for child in node.get('spans', [])]
+
+
+class TestTrace:
+    """Test span recording."""
+
+    def test_spans_nest(self):
+        with Trace('root', job='x') as trace:
+            with span('outer'):
+                with span('inner', n=1):
+                    pass
+            with span('second'):
+                pass
+
+        data = trace.to_dict()
+        assert data['attrs'] == {'job': 'x'}
+        assert _span_names(data) == ['outer', 'second']
+        assert data['spans'][0]['spans'][0] == {
+            'name': 'inner', 'duration_ms': pytest.approx(0, abs=50),
+            'queries': 0, 'cache_hits': 0, 'cache_misses': 0, 'attrs': {'n': 1},
+        }
+        assert [path for path, _ in trace.durations()] == [
+            'root', 'root/outer', 'root/outer/inner', 'root/second'
+        ]
+
+    def test_queries_and_cache_lookups_are_counted(self, db):
+        with Trace('root') as trace:
+            with span('db'):
+                User.objects.count()
+                User.objects.exists()
+            with span('cache'):
+                record_cache(True)
+                record_cache(False)
+
+        data = trace.to_dict()
+        assert data['queries'] == 2
+        assert data['spans'][0]['queries'] == 2
+        assert data['spans'][1]['queries'] == 0
+        assert (data['spans'][1]['cache_hits'], data['spans'][1]['cache_misses']) == (1, 1)
+
+    def test_instrumentation_is_noop_without_trace(self, db):
+        assert active_trace() is None
+        with span('ignored'):
+            record_cache(True)
+            User.objects.count()
+
+    def test_trace_is_deactivated_on_error(self):
+        with pytest.raises(RuntimeError):
+            with Trace('root'):
+                raise RuntimeError('boom')
+
+        assert active_trace() is None
+
+
+class TestHistogram:
+    """Test aggregated span durations."""
+
+    def test_export_has_cumulative_buckets(self):
+        histogram = TraceHistogram('test')
+        for _ in range(3):
+            with Trace('root') as trace:
+                with span('child'):
+                    pass
+            histogram.observe(trace)
+
+        exported = histogram.export()
+        assert set(exported) == {'root', 'root/child'}
+        assert exported['root/child']['count'] == 3
+        assert exported['root/child']['buckets']['+Inf'] == 3
+        counts = list(exported['root']['buckets'].values())
+        assert counts == sorted(counts)
+
+    def test_prometheus_format(self):
+        histogram = TraceHistogram('test')
+        with Trace('root') as trace:
+            pass
+        histogram.observe(trace)
+
+        text = histogram.to_prometheus()
+        assert '# TYPE trace_span_duration_ms histogram' in text
+        assert 'trace_span_duration_ms_bucket{trace="test",span="root",le="+Inf"} 1' in text
+        assert 'trace_span_duration_ms_count{trace="test",span="root"} 1' in text
+
+    def test_redis_writes_in_one_round_trip(self):
+        """On Redis a trace is one pipeline; paths go to a set."""
+        with Trace('root') as trace:
+            for _ in range(2):
+                with span('child'):
+                    pass
+        client = MagicMock()
+        pipe = client.pipeline.return_value
+
+        with patch.object(TraceHistogram, '_redis', return_value=client):
+            TraceHistogram('test').observe(trace)
+
+        pipe.execute.assert_called_once()
+        (paths_key, *paths), _ = pipe.sadd.call_args
+        assert paths_key.endswith('trace_histogram:test:paths')
+        assert sorted(paths) == ['root', 'root/child']
+        # Same path summed: le_<bucket>, count and sum_us per path
+        assert pipe.incrby.call_count == 6
+        increments = {call.args[0].split(':', 2)[-1]: call.args[1] for call in pipe.incrby.call_args_list}
+        assert increments['trace_histogram:test:root/child:count'] == 2
+
+    def test_reset(self):
+        histogram = TraceHistogram('test')
+        with Trace('root') as trace:
+            pass
+        histogram.observe(trace)
+
+        histogram.reset()
+
+        assert histogram.export() == {}
+
+
+class TestTracedCalculation:
+    """Test traces of CalculationEngine."""
+
+    def test_trace_lists_steps(self, user):
+        result = CalculationEngine(user).calculate_project_price(DATA, trace=True)
+
+        trace = result['trace']
+        assert trace['name'] == 'calculate_project_price'
+        assert _span_names(trace) == [
+            'snapshot', 'result_cache', 'step_1_base_material', 'step_2_wood_type',
+            'step_3_surface_finish', 'step_4_complexity', 'step_5_labor',
+            'step_6_overhead_and_margin', 'step_7_seasonal_adjustments',
+            'step_8_customer_discounts',
+        ]
+        assert trace['spans'][0]['cache_hits'] == 1  # Snapshot warmed by __init__
+        assert trace['spans'][1]['cache_misses'] == 1
+
+    def test_trace_is_not_cached(self, user, django_assert_num_queries):
+        engine = CalculationEngine(user)
+        engine.calculate_project_price(DATA, trace=True)
+
+        untraced = engine.calculate_project_price(DATA)
+        with django_assert_num_queries(0):
+            traced = engine.calculate_project_price(DATA, trace=True)
+
+        assert 'trace' not in untraced
+        assert _span_names(traced['trace']) == ['snapshot', 'result_cache']
+        assert traced['trace']['spans'][1]['cache_hits'] == 1
+        assert PricingResultCache.stats(user.id)['hits'] == 2
+
+    def test_pauschalen_appear_as_sub_spans(self, user):
+        BetriebspauschaleRegel.objects.create(
+            user=user, name='Anfahrt', pauschale_typ='anfahrt', betrag=Decimal('45.00')
+        )
+
+        # Preview: no PauschaleAnwendung is written for the sentinel
+        result = CalculationEngine(user).calculate_project_price(
+            DATA, extraction_result=object(), trace=True, preview=True
+        )
+
+        pauschalen = result['trace']['spans'][-1]
+        assert pauschalen['name'] == 'pauschalen'
+        assert pauschalen['spans'][0]['attrs'] == {'regel': 'Anfahrt'}
+        assert pauschalen['queries'] >= 1
+
+    def test_traced_calls_feed_histogram(self, user):
+        CalculationEngine(user).calculate_project_price(DATA, trace=True)
+
+        exported = TraceHistogram('pricing').export()
+
+        assert exported['calculate_project_price']['count'] == 1
+        assert exported['calculate_project_price/step_5_labor']['count'] == 1
+
+    def test_sampled_calls_trace_without_returning_it(self, user, settings):
+        settings.PRICING_TRACE_SAMPLE_RATE = 1.0
+
+        result = CalculationEngine(user).calculate_project_price(DATA)
+
+        assert 'trace' not in result
+        assert TraceHistogram('pricing').export()['calculate_project_price']['count'] == 1
+
+    def test_export_command(self, user):
+        CalculationEngine(user).calculate_project_price(DATA, trace=True)
+
+        out = StringIO()
+        call_command('pricing_trace_histogram', stdout=out)
+        assert 'calculate_project_price/snapshot' in json.loads(out.getvalue())
+
+        out = StringIO()
+        call_command('pricing_trace_histogram', '--format', 'prometheus', '--reset', stdout=out, stderr=StringIO())
+        assert 'span="calculate_project_price"' in out.getvalue()
+        assert TraceHistogram('pricing').export() == {}
@@ -0,0 +1,191 @@
+"""
+Unit tests for static rule analysis, rule budgets and constant folding.
+"""
+
+import random
+from decimal import Decimal
+
+import pytest
+
+from documents.forms import BauteilRegelAdminForm
+from documents.models_bauteile import StandardBauteil
+from documents.services.bauteil_regel_analyse import (
+    analysiere_regel,
+    falte_konstanten,
+    messe_auswertungszeit,
+    regel_struktur,
+)
+from documents.services.bauteil_regel_compiler import compile_regel
+from documents.services.bauteil_regel_engine import BauteilRegelEngine, RuleBudgetError
+
+TUER_ANZAHL = {'operation': 'MULTIPLY', 'faktor': 3, 'komponente': 'Tür', 'attribut': 'anzahl'}
+TUER_HOCH = {'operation': 'GREATER_THAN', 'links': {'komponente': 'Tür', 'attribut': 'höhe'}, 'rechts': 2.0}
+IMMER = {'operation': 'GREATER_THAN', 'links': 3, 'rechts': '2.5'}
+COMPONENTS = {'Tür': {'anzahl': 2, 'höhe': 2.2}, 'Schublade': {'anzahl': 3}}
+
+
+def _verschachtelt(tiefe):
+    """ADD chain nested ``tiefe`` levels deep."""
+    regel = {'operation': 'FIXED', 'wert': 1}
+    for _ in range(tiefe - 1):
+        regel = {'operation': 'ADD', 'terme': [regel, TUER_ANZAHL]}
+    return regel
+
+
+class TestStruktur:
+    """Depth, node count and inputs."""
+
+    def test_measures_rule(self):
+        regel = {
+            'operation': 'IF_THEN_ELSE',
+            'bedingung': {'operation': 'AND', 'bedingungen': [
+                TUER_HOCH, {'operation': 'LESS_THAN', 'links': {'quelle': 'distanz_km'}, 'rechts': 50}]},
+            'dann': {'operation': 'ADD', 'terme': [TUER_ANZAHL, {'operation': 'FIXED', 'wert': 1}]},
+            'sonst': TUER_ANZAHL,
+        }
+
+        analyse = analysiere_regel(regel)
+
+        assert analyse.gueltig
+        assert (analyse.tiefe, analyse.knoten) == (3, 8)
+        assert analyse.eingaben == {('Tür', 'höhe'), ('Tür', 'anzahl')}
+        assert analyse.quellen == {'distanz_km'}
+
+    def test_deep_rule_is_measured_without_recursion(self):
+        tiefe, knoten, _, _ = regel_struktur(_verschachtelt(5000))
+
+        assert tiefe == 5000
+        assert knoten == 2 * 5000 - 1
+
+    def test_over_budget_rules_are_rejected(self):
+        zu_tief = analysiere_regel(_verschachtelt(BauteilRegelEngine.MAX_DEPTH + 1))
+        zu_gross = analysiere_regel({'operation': 'ADD', 'terme': [TUER_ANZAHL] * BauteilRegelEngine.MAX_NODES})
+
+        assert not zu_tief.gueltig and 'nested' in zu_tief.fehler[0]
+        assert not zu_gross.gueltig and 'operations' in zu_gross.fehler[0]
+        assert analysiere_regel(_verschachtelt(BauteilRegelEngine.MAX_DEPTH)).gueltig
+
+    def test_invalid_rule_is_reported(self):
+        analyse = analysiere_regel({'operation': 'ADD', 'terme': [{'operation': 'DIVIDE'}]})
+
+        assert not analyse.gueltig
+        assert 'DIVIDE' in analyse.fehler[0]
+
+
+class TestFaltung:
+    """Constant folding of literal subtrees."""
+
+    @pytest.mark.parametrize('regel, expected', [
+        ({'operation': 'ADD', 'terme': [{'operation': 'FIXED', 'wert': 1}, {'operation': 'FIXED', 'wert': '0.1'}]},
+         {'operation': 'FIXED', 'wert': '1.1'}),
+        ({'operation': 'SUBTRACT', 'minuend': {'operation': 'FIXED', 'wert': 0.3},
+          'subtrahend': {'operation': 'FIXED', 'wert': 0.1}},
+         {'operation': 'FIXED', 'wert': '0.2'}),
+        ({'operation': 'IF_THEN_ELSE', 'bedingung': IMMER, 'dann': TUER_ANZAHL,
+          'sonst': {'operation': 'FIXED', 'wert': 0}},
+         TUER_ANZAHL),
+        ({'operation': 'OR', 'bedingungen': [IMMER, dict(IMMER, links=1)]}, {'operation': 'FIXED', 'wert': '1'}),
+        ({'operation': 'ADD', 'terme': [TUER_ANZAHL, {'operation': 'ADD', 'terme': [
+            {'operation': 'FIXED', 'wert': 2}, {'operation': 'FIXED', 'wert': 3}]}]},
+         {'operation': 'ADD', 'terme': [TUER_ANZAHL, {'operation': 'FIXED', 'wert': '5'}]}),
+    ])
+    def test_folds(self, regel, expected):
+        assert falte_konstanten(regel) == expected
+
+    def test_references_are_not_folded(self):
+        regel = {'operation': 'IF_THEN_ELSE', 'bedingung': TUER_HOCH, 'dann': TUER_ANZAHL,
+                 'sonst': {'operation': 'FIXED', 'wert': 0}}
+
+        assert falte_konstanten(regel) is regel
+        assert falte_konstanten({'operation': 'AND', 'bedingungen': [IMMER, TUER_HOCH]})['operation'] == 'AND'
+
+    def test_invalid_folded_branch_is_still_rejected(self):
+        regel = {'operation': 'IF_THEN_ELSE', 'bedingung': IMMER, 'dann': TUER_ANZAHL,
+                 'sonst': {'operation': 'DIVIDE'}}
+
+        assert not analysiere_regel(regel).gueltig
+
+    @pytest.mark.parametrize('seed', range(3))
+    def test_folded_rules_give_same_results(self, seed):
+        rng = random.Random(seed)
+
+        def zufall(depth=0):
+            choice = rng.random()
+            if depth >= 3 or choice < 0.3:
+                return rng.choice([TUER_ANZAHL, {'operation': 'FIXED', 'wert': rng.choice([1, 0.5, '2.25'])}])
+            if choice < 0.6:
+                return {'operation': 'ADD', 'terme': [zufall(depth + 1) for _ in range(rng.randint(1, 3))]}
+            if choice < 0.75:
+                return {'operation': 'SUBTRACT', 'minuend': zufall(depth + 1), 'subtrahend': zufall(depth + 1)}
+            return {'operation': 'IF_THEN_ELSE', 'bedingung': rng.choice([IMMER, TUER_HOCH, dict(IMMER, links=1)]),
+                    'dann': zufall(depth + 1), 'sonst': zufall(depth + 1)}
+
+        for _ in range(100):
+            regel = zufall()
+            assert BauteilRegelEngine(COMPONENTS).execute_rule(falte_konstanten(regel)) == \
+                BauteilRegelEngine(COMPONENTS).execute_rule(regel)
+            assert compile_regel(regel)(COMPONENTS, {}) == BauteilRegelEngine(COMPONENTS).execute_rule(regel)
+
+
+class TestBudgets:
+    """Compile-time and per-call budgets."""
+
+    def test_compiler_rejects_over_budget_rule(self):
+        with pytest.raises(RuleBudgetError):
+            compile_regel(_verschachtelt(BauteilRegelEngine.MAX_DEPTH + 1))
+
+    def test_interpreter_depth_limit(self):
+        with pytest.raises(RuleBudgetError, match='nested deeper'):
+            BauteilRegelEngine(COMPONENTS).execute_rule(_verschachtelt(5000))
+
+    def test_interpreter_step_budget(self):
+        breit = {'operation': 'ADD', 'terme': [TUER_ANZAHL] * BauteilRegelEngine.MAX_STEPS}
+
+        with pytest.raises(RuleBudgetError, match='steps'):
+            BauteilRegelEngine(COMPONENTS).execute_rule(breit)
+
+    def test_step_budget_is_per_call(self):
+        engine = BauteilRegelEngine(COMPONENTS)
+        regel = {'operation': 'ADD', 'terme': [TUER_ANZAHL] * (BauteilRegelEngine.MAX_STEPS // 2)}
+
+        for _ in range(3):
+            assert engine.execute_rule(regel) == Decimal(6 * (BauteilRegelEngine.MAX_STEPS // 2))
+
+    def test_conditions_count_as_steps(self):
+        engine = BauteilRegelEngine(COMPONENTS)
+        engine.execute_rule({'operation': 'IF_THEN_ELSE', 'bedingung': {
+            'operation': 'AND', 'bedingungen': [TUER_HOCH, TUER_HOCH]}, 'dann': TUER_ANZAHL, 'sonst': TUER_ANZAHL})
+
+        assert engine._steps == 5
+
+    def test_measured_time(self):
+        assert messe_auswertungszeit(TUER_ANZAHL, wiederholungen=10) > 0
+        assert messe_auswertungszeit({'operation': 'DIVIDE'}) is None
+
+
+@pytest.mark.django_db
+class TestAdminForm:
+    """Rules are validated when saved in the admin."""
+
+    @pytest.fixture
+    def bauteil(self):
+        return StandardBauteil.objects.create(
+            artikel_nr='HF-35', name='Topfband 35mm', kategorie='beschlag',
+            gewerke=['tischler'], einheit='stk', einzelpreis=Decimal('2.50'),
+        )
+
+    def _form(self, bauteil, regel):
+        import json
+        return BauteilRegelAdminForm(data={
+            'bauteil': bauteil.id, 'name': 'Topfbänder', 'regel_definition': json.dumps(regel),
+            'prioritaet': 100, 'ist_aktiv': True,
+        })
+
+    def test_valid_rule(self, bauteil):
+        assert self._form(bauteil, TUER_ANZAHL).is_valid()
+
+    def test_over_budget_rule_is_rejected(self, bauteil):
+        form = self._form(bauteil, _verschachtelt(BauteilRegelEngine.MAX_DEPTH + 1))
+
+        assert not form.is_valid()
+        assert 'regel_definition' in form.errors
@@ -0,0 +1,230 @@
+"""
+Unit tests for columnar rule evaluation.
+
+Batch results must match the scalar compiled rules row by row, including
+which rows fail for missing inputs.
+"""
+
+import random
+import time
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from documents.models_bauteile import BauteilKatalog, BauteilKatalogPosition, BauteilRegel, StandardBauteil
+from documents.services.bauteil_regel_batch import (
+    RegelBatchCache,
+    RegelSpalten,
+    als_decimal,
+    berechne_mengen,
+    compile_regel_batch,
+)
+from documents.services.bauteil_regel_compiler import compile_regel
+from documents.services.bauteil_regel_engine import RegelEngineError
+from documents.services.standardbauteil_integration import StandardbauteilIntegrationService
+
+TUER_ANZAHL = {'operation': 'MULTIPLY', 'faktor': 3, 'komponente': 'Tür', 'attribut': 'anzahl'}
+SCHUBLADE_ANZAHL = {'operation': 'MULTIPLY', 'faktor': 2, 'komponente': 'Schublade', 'attribut': 'anzahl'}
+TUER_HOCH = {'operation': 'GREATER_THAN', 'links': {'komponente': 'Tür', 'attribut': 'höhe'}, 'rechts': 2.0}
+
+ATTRIBUTE = {
+    'Tür': ['anzahl', 'höhe', 'breite'],
+    'Schublade': ['anzahl', 'breite'],
+    'Einlegeboden': ['anzahl', 'breite', 'tiefe'],
+}
+
+
+def _random_rule(rng, depth=0):
+    komponente = rng.choice(list(ATTRIBUTE))
+    multiply = {'operation': 'MULTIPLY', 'faktor': rng.choice([1, 2, 3, 0.5, 1.5, '2.25']),
+                'komponente': komponente, 'attribut': rng.choice(ATTRIBUTE[komponente])}
+    choice = rng.random()
+    if depth >= 2 or choice < 0.3:
+        return multiply
+    if choice < 0.4:
+        return {'operation': 'FIXED', 'wert': rng.choice([1, '0.5', 2.5])}
+    if choice < 0.6:
+        return {'operation': 'ADD', 'terme': [_random_rule(rng, depth + 1) for _ in range(rng.randint(1, 3))]}
+    if choice < 0.7:
+        return {'operation': 'SUBTRACT', 'minuend': _random_rule(rng, depth + 1),
+                'subtrahend': {'operation': 'FIXED', 'wert': rng.randint(0, 2)}}
+    other = rng.choice(list(ATTRIBUTE))
+    vergleich = {'operation': rng.choice(['GREATER_THAN', 'LESS_EQUAL', 'EQUALS']),
+                 'links': {'komponente': other, 'attribut': rng.choice(ATTRIBUTE[other])},
+                 'rechts': rng.choice([1, 2, 0.8, {'quelle': 'distanz_km'}])}
+    if choice < 0.8:
+        vergleich = {'operation': rng.choice(['AND', 'OR']),
+                     'bedingungen': [vergleich, dict(vergleich, operation='LESS_THAN')]}
+    return {'operation': 'IF_THEN_ELSE', 'bedingung': vergleich,
+            'dann': _random_rule(rng, depth + 1), 'sonst': _random_rule(rng, depth + 1)}
+
+
+def _random_extraction(rng):
+    return {
+        komponente: {attribut: rng.choice([0, 1, 2, 3, 4, 0.8, 1.2, '2.4', None])
+                     for attribut in attribute if rng.random() < 0.8}
+        for komponente, attribute in ATTRIBUTE.items() if rng.random() < 0.7
+    }
+
+
+def _scalar(function, components, context):
+    try:
+        return function(components, context)
+    except RegelEngineError:
+        return None
+
+
+class TestRegelSpalten:
+    """Columns of extracted attributes."""
+
+    def test_columns(self):
+        spalten = RegelSpalten(
+            [{'Tür': {'anzahl': 2, 'höhe': None}}, {'Tür': {'anzahl': '3'}}, {'Tür': 'kaputt'}, {}],
+            contexts=[{'distanz_km': 10}, {}, {}, {'distanz_km': '5'}],
+        )
+
+        werte, vorhanden = spalten.attribut('Tür', 'anzahl')
+        assert werte.tolist() == [2.0, 3.0, 0.0, 0.0]
+        assert vorhanden.tolist() == [True, True, False, False]
+        assert not spalten.attribut('Tür', 'höhe')[1].any()
+        assert spalten.quelle('distanz_km').tolist() == [10.0, 0.0, 0.0, 5.0]
+        assert spalten.eingaben() == {'Tür': {'anzahl': 1}}
+
+    def test_contexts_must_match(self):
+        with pytest.raises(ValueError):
+            RegelSpalten([{}, {}], contexts=[{}])
+
+    @pytest.mark.parametrize('wert, expected', [
+        (6.0, Decimal('6')), (0.3, Decimal('0.3')), (600.0, Decimal('600')), (2.25, Decimal('2.25')),
+    ])
+    def test_als_decimal(self, wert, expected):
+        result = als_decimal(wert)
+        assert result == expected
+        assert str(result) == str(expected)
+
+
+class TestParity:
+    """Batch evaluation gives the scalar results row by row."""
+
+    @pytest.mark.parametrize('seed', range(5))
+    def test_random_rules(self, seed):
+        rng = random.Random(seed)
+        extractions = [_random_extraction(rng) for _ in range(60)]
+        contexts = [{'distanz_km': rng.choice([0, 1, 3])} if rng.random() < 0.5 else {} for _ in extractions]
+        spalten = RegelSpalten(extractions, contexts)
+
+        for _ in range(60):
+            regel = _random_rule(rng)
+            werte, ok = compile_regel_batch(regel)(spalten)
+            scalar = compile_regel(regel)
+            for zeile, (components, context) in enumerate(zip(extractions, contexts)):
+                expected = _scalar(scalar, components, context)
+                assert bool(ok[zeile]) == (expected is not None), (regel, components)
+                if expected is not None:
+                    assert als_decimal(round(werte[zeile], 9)) == expected
+
+    def test_untaken_branch_does_not_fail_row(self):
+        regel = {'operation': 'IF_THEN_ELSE', 'bedingung': TUER_HOCH, 'dann': TUER_ANZAHL, 'sonst': SCHUBLADE_ANZAHL}
+        spalten = RegelSpalten([{'Tür': {'höhe': 2.2, 'anzahl': 2}}, {'Tür': {'höhe': 1.8, 'anzahl': 2}}])
+
+        werte, ok = compile_regel_batch(regel)(spalten)
+
+        assert ok.tolist() == [True, False]
+        assert werte[0] == 6.0
+
+
+@pytest.mark.django_db
+class TestBerechneMengen:
+    """Priority fallback per row."""
+
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        RegelBatchCache.clear()
+        yield
+        RegelBatchCache.clear()
+
+    @pytest.fixture
+    def bauteil(self):
+        return StandardBauteil.objects.create(
+            artikel_nr='HF-35', name='Topfband 35mm', kategorie='beschlag',
+            gewerke=['tischler'], einheit='stk', einzelpreis=Decimal('2.50'),
+        )
+
+    def test_first_successful_rule_per_row(self, bauteil):
+        pro_tuer = BauteilRegel.objects.create(bauteil=bauteil, name='Pro Tür', prioritaet=1,
+                                               regel_definition=TUER_ANZAHL)
+        kaputt = BauteilRegel.objects.create(bauteil=bauteil, name='Kaputt', prioritaet=2,
+                                             regel_definition={'operation': 'DIVIDE'})
+        pro_schublade = BauteilRegel.objects.create(bauteil=bauteil, name='Pro Schublade', prioritaet=3,
+                                                    regel_definition=SCHUBLADE_ANZAHL)
+        spalten = RegelSpalten([{'Tür': {'anzahl': 2}}, {'Schublade': {'anzahl': 3}}, {}])
+
+        mengen, gefunden, regeln = berechne_mengen([pro_tuer, kaputt, pro_schublade], spalten)
+
+        assert mengen.tolist() == [6.0, 6.0, 0.0]
+        assert gefunden.tolist() == [True, True, False]
+        assert regeln == [pro_tuer, pro_schublade, None]
+
+
+def _katalog(rng, size):
+    katalog = BauteilKatalog.objects.create(
+        name='Beschläge', version='2025.1', gewerk='tischler', gueltig_ab=date(2024, 1, 1), ist_standard=True,
+    )
+    for index in range(size):
+        bauteil = StandardBauteil.objects.create(
+            artikel_nr=f'B-{index:04d}', name=f'Bauteil {index:04d}', kategorie='beschlag',
+            gewerke=['tischler'], einheit='stk', einzelpreis=Decimal('1.25'),
+        )
+        BauteilKatalogPosition.objects.create(katalog=katalog, bauteil=bauteil, position=index)
+        for prioritaet in range(rng.randint(1, 3)):
+            BauteilRegel.objects.create(bauteil=bauteil, name=f'Regel {prioritaet}', prioritaet=prioritaet,
+                                        regel_definition=_random_rule(rng))
+    return katalog
+
+
+def _positionen(summary):
+    return [(p.bauteil.id, p.menge, p.gesamtpreis, p.regel_name) for p in summary.positionen]
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures('locmem_cache')
+class TestIntegrationBatch:
+    """calculate_bauteil_kosten_batch() matches calculate_bauteil_kosten()."""
+
+    def test_same_summaries(self):
+        rng = random.Random(11)
+        katalog = _katalog(rng, 40)
+        extractions = [_random_extraction(rng) for _ in range(30)]
+        service = StandardbauteilIntegrationService(extraction_result_id='batch', katalog_id=str(katalog.id))
+
+        batch = service.calculate_bauteil_kosten_batch(extractions)
+        einzeln = [service.calculate_bauteil_kosten(components) for components in extractions]
+
+        assert len(batch) == len(extractions)
+        assert any(summary.positionen for summary in batch)
+        for batch_summary, summary in zip(batch, einzeln):
+            assert _positionen(batch_summary) == _positionen(summary)
+            assert batch_summary.gesamt_netto == summary.gesamt_netto
+
+    @pytest.mark.slow
+    def test_benchmark(self):
+        rng = random.Random(3)
+        katalog = _katalog(rng, 300)
+        extractions = [_random_extraction(rng) for _ in range(1000)]
+        service = StandardbauteilIntegrationService(extraction_result_id='batch', katalog_id=str(katalog.id))
+        service.calculate_bauteil_kosten(extractions[0])
+
+        start = time.perf_counter()
+        einzeln = [service.calculate_bauteil_kosten(components) for components in extractions]
+        scalar_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        batch = service.calculate_bauteil_kosten_batch(extractions)
+        batch_seconds = time.perf_counter() - start
+
+        print(
+            f"\n{len(extractions)} extractions × 300 components: "
+            f"per extraction {scalar_seconds * 1000:.0f}ms, batch {batch_seconds * 1000:.0f}ms"
+        )
+        assert [s.gesamt_netto for s in batch] == [s.gesamt_netto for s in einzeln]
@@ -0,0 +1,199 @@
+"""
+Unit tests for the BauteilRegel compiler.
+
+Compiled rules must give the interpreter's results and errors; the cache
+recompiles a rule when it is saved.
+"""
+
+import random
+import time
+from decimal import Decimal
+
+import pytest
+
+from documents.models_bauteile import BauteilRegel, StandardBauteil
+from documents.services.bauteil_regel_compiler import RegelCompileCache, compile_regel
+from documents.services.bauteil_regel_engine import (
+    BauteilRegelEngine,
+    ComponentNotFoundError,
+    InvalidRuleError,
+)
+
+COMPONENTS = {
+    'Tür': {'anzahl': 2, 'höhe': 2.2, 'breite': 1.0},
+    'Schublade': {'anzahl': 3, 'höhe': 0.2, 'breite': 0.8},
+    'Einlegeboden': {'anzahl': 4, 'breite': Decimal('2.0'), 'tiefe': 0.8},
+}
+
+TUER_HOCH = {'operation': 'GREATER_THAN', 'links': {'komponente': 'Tür', 'attribut': 'höhe'}, 'rechts': 2.0}
+
+RULES = [
+    {'operation': 'MULTIPLY', 'faktor': 3, 'komponente': 'Tür', 'attribut': 'anzahl'},
+    {'operation': 'MULTIPLY', 'faktor': 2.5, 'komponente': 'Einlegeboden', 'attribut': 'breite'},
+    {'operation': 'FIXED', 'wert': '10.5'},
+    {'operation': 'ADD', 'terme': [
+        {'operation': 'MULTIPLY', 'faktor': 3, 'komponente': 'Tür', 'attribut': 'anzahl'},
+        {'operation': 'MULTIPLY', 'faktor': 2, 'komponente': 'Schublade', 'attribut': 'anzahl'},
+        {'operation': 'FIXED', 'wert': 1},
+    ]},
+    {'operation': 'SUBTRACT',
+     'minuend': {'operation': 'MULTIPLY', 'faktor': 4, 'komponente': 'Einlegeboden', 'attribut': 'anzahl'},
+     'subtrahend': {'operation': 'FIXED', 'wert': 20}},
+    {'operation': 'IF_THEN_ELSE', 'bedingung': TUER_HOCH,
+     'dann': {'operation': 'MULTIPLY', 'faktor': 4, 'komponente': 'Tür', 'attribut': 'anzahl'},
+     'sonst': {'operation': 'MULTIPLY', 'faktor': 3, 'komponente': 'Tür', 'attribut': 'anzahl'}},
+    {'operation': 'IF_THEN_ELSE',
+     'bedingung': {'operation': 'AND', 'bedingungen': [
+         TUER_HOCH,
+         {'operation': 'LESS_EQUAL', 'links': {'komponente': 'Schublade', 'attribut': 'anzahl'}, 'rechts': '3'},
+     ]},
+     'dann': {'operation': 'FIXED', 'wert': 1},
+     'sonst': {'operation': 'FIXED', 'wert': 0}},
+    {'operation': 'OR', 'bedingungen': [
+        {'operation': 'EQUALS', 'links': {'komponente': 'Tür', 'attribut': 'anzahl'}, 'rechts': 5},
+        {'operation': 'LESS_THAN', 'links': {'komponente': 'Tür', 'attribut': 'breite'}, 'rechts': 1.5},
+    ]},
+    {'operation': 'GREATER_EQUAL', 'links': {'quelle': 'distanz_km'}, 'rechts': 50},
+]
+
+
+class TestCompileRegel:
+    """Compiled rules match the interpreter."""
+
+    @pytest.mark.parametrize('regel', RULES)
+    def test_same_result_as_interpreter(self, regel):
+        engine = BauteilRegelEngine(COMPONENTS)
+        engine.context = {'distanz_km': 80}
+
+        assert compile_regel(regel)(COMPONENTS, engine.context) == engine.execute_rule(regel)
+
+    def test_missing_component(self):
+        compiled = compile_regel(RULES[0])
+
+        with pytest.raises(ComponentNotFoundError, match="Component 'Tür' not found"):
+            compiled({}, {})
+        with pytest.raises(ComponentNotFoundError, match="Attribute 'anzahl' not found"):
+            compiled({'Tür': {'höhe': 2}}, {})
+
+    def test_missing_context_source_is_zero(self):
+        assert compile_regel(RULES[-1])(COMPONENTS, {}) == Decimal('0')
+
+    @pytest.mark.parametrize('regel, message', [
+        ({'operation': 'DIVIDE'}, "Unsupported operation 'DIVIDE'"),
+        ({'operation': 'MULTIPLY', 'komponente': 'Tür', 'attribut': 'anzahl'}, "requires 'faktor'"),
+        ({'operation': 'ADD', 'terme': []}, 'at least one term'),
+        ({'operation': 'FIXED', 'wert': 'viel'}, "Invalid number for 'wert'"),
+        ({'operation': 'IF_THEN_ELSE', 'bedingung': TUER_HOCH, 'dann': {'operation': 'FIXED', 'wert': 1}},
+         "requires 'bedingung', 'dann', 'sonst'"),
+    ])
+    def test_invalid_rules_fail_at_compile_time(self, regel, message):
+        with pytest.raises(InvalidRuleError, match=message):
+            compile_regel(regel)
+
+    def test_invalid_branch_is_rejected_even_if_unreachable(self):
+        regel = dict(RULES[5], sonst={'operation': 'DIVIDE'})
+
+        with pytest.raises(InvalidRuleError):
+            compile_regel(regel)
+
+
+@pytest.mark.django_db
+class TestRegelCompileCache:
+    """Rules are compiled once per id and aktualisiert_am."""
+
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        RegelCompileCache.clear()
+        yield
+        RegelCompileCache.clear()
+
+    @pytest.fixture
+    def regel(self):
+        bauteil = StandardBauteil.objects.create(
+            artikel_nr='HF-35', name='Topfband 35mm', kategorie='beschlag',
+            gewerke=['tischler'], einheit='stk', einzelpreis=Decimal('2.50'),
+        )
+        return BauteilRegel.objects.create(bauteil=bauteil, name='Topfbänder pro Tür', regel_definition=RULES[0])
+
+    def test_compiled_once(self, regel):
+        compiled = RegelCompileCache.get(regel)
+
+        assert RegelCompileCache.get(BauteilRegel.objects.get(id=regel.id)) is compiled
+        assert RegelCompileCache.execute(regel, COMPONENTS) == Decimal('6')
+
+    def test_recompiled_after_save(self, regel):
+        RegelCompileCache.get(regel)
+
+        regel.regel_definition = dict(RULES[0], faktor=4)
+        regel.save()
+
+        assert RegelCompileCache.execute(regel, COMPONENTS) == Decimal('8')
+
+    def test_invalid_rule_raises_on_execute(self, regel):
+        regel.regel_definition = {'operation': 'DIVIDE'}
+        regel.save()
+
+        with pytest.raises(InvalidRuleError):
+            RegelCompileCache.execute(regel, COMPONENTS)
+        with pytest.raises(InvalidRuleError):
+            RegelCompileCache.execute(regel, COMPONENTS)
+
+
+def _random_rule(rng, depth=0):
+    """Random rule tree over COMPONENTS, as found in large Beschlag catalogs."""
+    komponente = rng.choice(list(COMPONENTS))
+    multiply = {
+        'operation': 'MULTIPLY', 'faktor': rng.choice([1, 2, 3, 4, 0.5, 1.5]),
+        'komponente': komponente, 'attribut': rng.choice(['anzahl', 'breite']),
+    }
+    if depth >= 2:
+        return multiply
+    choice = rng.random()
+    if choice < 0.3:
+        return multiply
+    if choice < 0.6:
+        return {'operation': 'ADD', 'terme': [_random_rule(rng, depth + 1) for _ in range(rng.randint(2, 4))]}
+    if choice < 0.75:
+        return {'operation': 'SUBTRACT', 'minuend': _random_rule(rng, depth + 1),
+                'subtrahend': {'operation': 'FIXED', 'wert': rng.randint(0, 3)}}
+    return {
+        'operation': 'IF_THEN_ELSE',
+        'bedingung': {'operation': 'GREATER_THAN', 'links': {'komponente': komponente, 'attribut': 'breite'},
+                      'rechts': rng.choice([0.5, 1.0, 2.0])},
+        'dann': _random_rule(rng, depth + 1),
+        'sonst': _random_rule(rng, depth + 1),
+    }
+
+
+@pytest.mark.slow
+class TestBenchmark:
+    """Compiled rules against the interpreter on a large catalog."""
+
+    def test_large_catalog(self):
+        rng = random.Random(7)
+        rules = [_random_rule(rng) for _ in range(2000)]
+        projects = [
+            {name: dict(attrs, anzahl=rng.randint(1, 12)) for name, attrs in COMPONENTS.items()}
+            for _ in range(25)
+        ]
+
+        start = time.perf_counter()
+        compiled = [compile_regel(regel) for regel in rules]
+        compile_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        interpreted = [
+            [BauteilRegelEngine(components).execute_rule(regel) for regel in rules] for components in projects
+        ]
+        interpreter_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        results = [[function(components, {}) for function in compiled] for components in projects]
+        compiled_seconds = time.perf_counter() - start
+
+        print(
+            f"\n{len(rules)} rules × {len(projects)} projects: interpreter {interpreter_seconds * 1000:.0f}ms, "
+            f"compiled {compiled_seconds * 1000:.0f}ms (+{compile_seconds * 1000:.0f}ms compile, once)"
+        )
+        assert results == interpreted
+        assert compiled_seconds < interpreter_seconds
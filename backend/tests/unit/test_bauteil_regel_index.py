@@ -0,0 +1,176 @@
+"""
+Unit tests for the rule dependency index.
+
+Selecting rules through RegelIndex and falling back in priority order must
+give the quantities of trying every rule.
+"""
+
+import random
+from decimal import Decimal
+
+import pytest
+
+from documents.models_bauteile import BauteilRegel, StandardBauteil
+from documents.services.bauteil_regel_compiler import RegelCompileCache
+from documents.services.bauteil_regel_engine import BauteilRegelEngine, RegelEngineError
+from documents.services.bauteil_regel_index import RegelIndex
+
+TUER_ANZAHL = {'operation': 'MULTIPLY', 'faktor': 3, 'komponente': 'Tür', 'attribut': 'anzahl'}
+SCHUBLADE_ANZAHL = {'operation': 'MULTIPLY', 'faktor': 2, 'komponente': 'Schublade', 'attribut': 'anzahl'}
+TUER_HOCH = {'operation': 'GREATER_THAN', 'links': {'komponente': 'Tür', 'attribut': 'höhe'}, 'rechts': 2.0}
+
+
+def _bauteil(name, gewerke=('tischler',)):
+    return StandardBauteil(
+        artikel_nr=name, name=name, kategorie='beschlag', gewerke=list(gewerke),
+        einheit='stk', einzelpreis=Decimal('1.00'),
+    )
+
+
+def _regel(bauteil, definition, name='Regel'):
+    return BauteilRegel(bauteil=bauteil, name=name, regel_definition=definition)
+
+
+class TestRequiredInputs:
+    """Inputs every evaluation of a rule reads."""
+
+    @pytest.mark.parametrize('regel, expected', [
+        (TUER_ANZAHL, {('Tür', 'anzahl')}),
+        ({'operation': 'FIXED', 'wert': 4}, set()),
+        ({'operation': 'ADD', 'terme': [TUER_ANZAHL, SCHUBLADE_ANZAHL]}, {('Tür', 'anzahl'), ('Schublade', 'anzahl')}),
+        ({'operation': 'SUBTRACT', 'minuend': TUER_ANZAHL, 'subtrahend': {'operation': 'FIXED', 'wert': 1}},
+         {('Tür', 'anzahl')}),
+        ({'operation': 'IF_THEN_ELSE', 'bedingung': TUER_HOCH, 'dann': TUER_ANZAHL, 'sonst': SCHUBLADE_ANZAHL},
+         {('Tür', 'höhe')}),
+        ({'operation': 'IF_THEN_ELSE', 'bedingung': TUER_HOCH, 'dann': TUER_ANZAHL,
+          'sonst': dict(TUER_ANZAHL, faktor=4)},
+         {('Tür', 'höhe'), ('Tür', 'anzahl')}),
+        ({'operation': 'OR', 'bedingungen': [
+            TUER_HOCH, {'operation': 'LESS_THAN', 'links': {'quelle': 'distanz_km'}, 'rechts': 50}]},
+         {('Tür', 'höhe')}),
+        ({'operation': 'DIVIDE'}, set()),
+    ])
+    def test_required_inputs(self, regel, expected):
+        assert BauteilRegelEngine.required_inputs(regel) == expected
+
+    def test_validate_rule_lists_condition_components(self):
+        regel = {'operation': 'IF_THEN_ELSE', 'bedingung': TUER_HOCH,
+                 'dann': SCHUBLADE_ANZAHL, 'sonst': {'operation': 'FIXED', 'wert': 0}}
+
+        result = BauteilRegelEngine({}).validate_rule(regel)
+
+        assert set(result['referenced_components']) == {'Tür', 'Schublade'}
+
+
+class TestRegelIndex:
+    """Selection of satisfiable rules."""
+
+    def test_selects_rules_with_all_inputs(self):
+        tuer, schublade, pauschal = _bauteil('Topfband'), _bauteil('Auszug'), _bauteil('Kleinteile')
+        index = RegelIndex.build([
+            (tuer, [_regel(tuer, TUER_ANZAHL, 'Pro Tür')]),
+            (schublade, [_regel(schublade, {'operation': 'ADD', 'terme': [TUER_ANZAHL, SCHUBLADE_ANZAHL]}, 'Beide'),
+                         _regel(schublade, SCHUBLADE_ANZAHL, 'Pro Schublade')]),
+            (pauschal, [_regel(pauschal, {'operation': 'FIXED', 'wert': 1}, 'Pauschal')]),
+        ])
+
+        result = index.erfuellbare_regeln({'Schublade': {'anzahl': 3}}, 'tischler')
+
+        assert [(b.name, [r.name for r in regeln]) for b, regeln in result] == [
+            ('Auszug', ['Pro Schublade']),
+            ('Kleinteile', ['Pauschal']),
+        ]
+
+    def test_none_values_count_as_missing(self):
+        tuer = _bauteil('Topfband')
+        index = RegelIndex.build([(tuer, [_regel(tuer, TUER_ANZAHL)])])
+
+        assert index.erfuellbare_regeln({'Tür': {'anzahl': None}}, 'tischler') == []
+        assert len(index.erfuellbare_regeln({'Tür': {'anzahl': 2}}, 'tischler')) == 1
+
+    def test_filters_gewerk(self):
+        tuer = _bauteil('Topfband', gewerke=['zimmerer'])
+        index = RegelIndex.build([(tuer, [_regel(tuer, TUER_ANZAHL)])])
+
+        assert index.erfuellbare_regeln({'Tür': {'anzahl': 2}}, 'tischler') == []
+        assert len(index.erfuellbare_regeln({'Tür': {'anzahl': 2}}, 'zimmerer')) == 1
+
+
+COMPONENTS = {
+    'Tür': ['anzahl', 'höhe', 'breite'],
+    'Schublade': ['anzahl', 'breite'],
+    'Einlegeboden': ['anzahl', 'breite', 'tiefe'],
+    'Sockel': ['laenge'],
+}
+
+
+def _random_rule(rng, depth=0):
+    komponente = rng.choice(list(COMPONENTS))
+    multiply = {'operation': 'MULTIPLY', 'faktor': rng.randint(1, 4),
+                'komponente': komponente, 'attribut': rng.choice(COMPONENTS[komponente])}
+    choice = rng.random()
+    if depth >= 2 or choice < 0.35:
+        return multiply
+    if choice < 0.45:
+        return {'operation': 'FIXED', 'wert': rng.randint(1, 3)}
+    if choice < 0.7:
+        return {'operation': 'ADD', 'terme': [_random_rule(rng, depth + 1) for _ in range(rng.randint(1, 3))]}
+    other = rng.choice(list(COMPONENTS))
+    return {
+        'operation': 'IF_THEN_ELSE',
+        'bedingung': {'operation': 'GREATER_THAN',
+                      'links': {'komponente': other, 'attribut': rng.choice(COMPONENTS[other])}, 'rechts': 1},
+        'dann': _random_rule(rng, depth + 1),
+        'sonst': _random_rule(rng, depth + 1),
+    }
+
+
+def _random_extraction(rng):
+    return {
+        name: {attribut: rng.randint(0, 4) for attribut in attribute if rng.random() < 0.7}
+        for name, attribute in COMPONENTS.items() if rng.random() < 0.5
+    }
+
+
+def _first_quantity(regeln, components):
+    for regel in regeln:
+        try:
+            return RegelCompileCache.execute(regel, components)
+        except RegelEngineError:
+            continue
+    return None
+
+
+class TestParity:
+    """Index selection gives the quantities of trying every rule."""
+
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        RegelCompileCache.clear()
+        yield
+        RegelCompileCache.clear()
+
+    @pytest.mark.parametrize('seed', range(5))
+    def test_same_quantities(self, seed):
+        rng = random.Random(seed)
+        katalog = []
+        for number in range(150):
+            bauteil = _bauteil(f'B{number}')
+            katalog.append((bauteil, [_regel(bauteil, _random_rule(rng)) for _ in range(rng.randint(1, 3))]))
+        index = RegelIndex.build(katalog)
+
+        for _ in range(20):
+            components = _random_extraction(rng)
+            expected = {}
+            for bauteil, regeln in katalog:
+                menge = _first_quantity(regeln, components)
+                if menge is not None:
+                    expected[bauteil.name] = menge
+
+            selected = {}
+            for bauteil, regeln in index.erfuellbare_regeln(components, 'tischler'):
+                menge = _first_quantity(regeln, components)
+                if menge is not None:
+                    selected[bauteil.name] = menge
+
+            assert selected == expected
@@ -354,3 +354,145 @@ class TestGeometrieService:
         assert kanten_dict['einlegeboden_vorder'] == Decimal('8.0')
         assert kanten_dict['einlegeboden_seite'] == Decimal('6.4')
         assert kanten_dict['korpus_innen'] == Decimal('1.6')
+
+
+# =========================================================================
+# VECTORIZED PATH
+# =========================================================================
+
+import random
+import time
+
+from django.contrib.auth.models import User
+
+from documents.models import Document, ExtractionResult
+from documents.models_bauteile import GeometrieBerechnung, StandardBauteil
+from documents.services.geometrie_service import InvalidComponentError
+
+
+def _random_komponente(rng):
+    typ = rng.choice(['Korpus', 'Tür', 'tuer', 'Einlegeboden', 'Schublade', 'Blende', 'Sockel'])
+    felder = [feld for feld in ['höhe', 'breite', 'tiefe', 'länge'] if rng.random() < 0.8]
+    return {
+        'typ': typ,
+        'maße': {feld: rng.choice([0.2, 0.6, 0.8, 1.0, 2.0, 2.35, '0.45']) for feld in felder},
+        'anzahl': rng.randint(1, 6),
+    }
+
+
+class TestGeometrieServiceVectorized:
+    """The vectorized path gives the per-object results."""
+
+    @pytest.fixture
+    def service(self):
+        return GeometrieService(extraction_result_id='test-123')
+
+    @pytest.mark.parametrize('seed', range(5))
+    @pytest.mark.parametrize('apply_defaults', [True, False])
+    def test_same_edges_as_per_object_path(self, service, seed, apply_defaults):
+        rng = random.Random(seed)
+        komponenten = [_random_komponente(rng) for _ in range(200)]
+
+        erwartet = service.calculate_abs_kanten(komponenten, apply_visibility_defaults=apply_defaults)
+        kanten = service.calculate_abs_kanten_array(komponenten, apply_visibility_defaults=apply_defaults)
+
+        assert service.als_kanten_berechnungen(kanten, komponenten) == erwartet
+        assert kanten.gesamt_laenge() == service.calculate_total_kanten_länge(erwartet)
+        assert kanten.gesamt_laenge(nur_aktivierte=False) == \
+            service.calculate_total_kanten_länge(erwartet, nur_aktivierte=False)
+
+    def test_empty_list(self, service):
+        kanten = service.calculate_abs_kanten_array([])
+
+        assert len(kanten) == 0
+        assert kanten.gesamt_laenge() == 0
+
+    def test_invalid_dimension(self, service):
+        with pytest.raises(InvalidComponentError, match='höhe'):
+            service.calculate_abs_kanten_array([{'typ': 'Tür', 'maße': {'höhe': 'hoch', 'breite': 1}}])
+
+    def test_edge_mask_from_caller(self, service):
+        komponenten = [{'typ': 'Korpus', 'maße': {'höhe': 2.0, 'breite': 1.0, 'tiefe': 0.5}, 'anzahl': 1}]
+        array = service.komponenten_array(komponenten)
+        array['kanten_maske'] = 0b10  # inner edges only
+
+        kanten = service.berechne_kanten(array)
+
+        assert kanten.ist_aktiviert.tolist() == [False, True]
+        assert kanten.gesamt_laenge() == Decimal('1.0')
+
+
+@pytest.mark.django_db
+class TestSpeichereGeometrieBerechnungen:
+    """Edges are stored with bulk_create."""
+
+    @pytest.fixture
+    def extraction_result(self):
+        user = User.objects.create_user(username='geometrie', password='x')
+        document = Document.objects.create(
+            user=user, file='test.pdf', original_filename='test.pdf', file_size_bytes=1000, status='completed'
+        )
+        return ExtractionResult.objects.create(document=document, extracted_data={})
+
+    @pytest.fixture
+    def kante(self):
+        return StandardBauteil.objects.create(
+            artikel_nr='ABS-22', name='ABS-Kante 22mm', kategorie='kante',
+            gewerke=['tischler'], einheit='lfm', einzelpreis=Decimal('0.85'),
+        )
+
+    def test_bulk_create(self, extraction_result, kante, django_assert_max_num_queries):
+        rng = random.Random(1)
+        komponenten = [_random_komponente(rng) for _ in range(300)]
+        service = GeometrieService(extraction_result_id=extraction_result.id)
+        kanten = service.calculate_abs_kanten_array(komponenten)
+
+        with django_assert_max_num_queries(3):
+            erstellt = service.speichere_geometrie_berechnungen(kanten, komponenten, kante)
+
+        assert len(erstellt) == len(kanten)
+        gespeichert = GeometrieBerechnung.objects.filter(extraction_result=extraction_result)
+        assert gespeichert.count() == len(kanten)
+        assert gespeichert.filter(ist_aktiviert=True).count() == int(kanten.ist_aktiviert.sum())
+        gesamt = sum(b.berechnete_laenge for b in gespeichert if b.ist_aktiviert)
+        assert abs(gesamt - kanten.gesamt_laenge()) < Decimal('0.01') * len(kanten)
+
+    def test_requires_extraction(self, kante):
+        service = GeometrieService()
+        kanten = service.calculate_abs_kanten_array([{'typ': 'Tür', 'maße': {'höhe': 2, 'breite': 1}}])
+
+        with pytest.raises(GeometrieServiceError):
+            service.speichere_geometrie_berechnungen(kanten, [], kante)
+
+    @pytest.mark.slow
+    def test_benchmark(self, extraction_result, kante):
+        rng = random.Random(2)
+        komponenten = [_random_komponente(rng) for _ in range(2000)]
+        service = GeometrieService(extraction_result_id=extraction_result.id)
+
+        start = time.perf_counter()
+        berechnungen = service.calculate_abs_kanten(komponenten)
+        for berechnung in berechnungen:
+            GeometrieBerechnung.objects.create(
+                extraction_result=extraction_result, bauteil=kante, kanten_typ=berechnung.kanten_typ,
+                formel=berechnung.formel, berechnete_laenge=berechnung.berechnete_laenge,
+                ist_aktiviert=berechnung.ist_aktiviert, komponenten_daten=berechnung.komponenten_daten,
+            )
+        per_object_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        kanten = service.calculate_abs_kanten_array(komponenten)
+        compute_seconds = time.perf_counter() - start
+        service.speichere_geometrie_berechnungen(kanten, komponenten, kante)
+        vectorized_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        service.calculate_total_kanten_länge(service.calculate_abs_kanten(komponenten))
+        scalar_total_seconds = time.perf_counter() - start
+
+        print(
+            f"\n{len(komponenten)} components, {len(kanten)} edges: per-object calculate+save "
+            f"{per_object_seconds * 1000:.0f}ms, vectorized+bulk_create {vectorized_seconds * 1000:.0f}ms; "
+            f"total only: per-object {scalar_total_seconds * 1000:.1f}ms, vectorized {compute_seconds * 1000:.1f}ms"
+        )
+        assert GeometrieBerechnung.objects.count() == 2 * len(kanten)
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""Tests for the shared versioned cache."""
+
+import pytest
+
+from core.versioned_cache import LocalLRU, VersionedCache
+
+pytestmark = pytest.mark.usefixtures('locmem_cache')
+
+
+class TestLocalLRU:
+    """Process memory of the latest version per key."""
+
+    def test_only_the_stored_version_is_returned(self):
+        lru = LocalLRU(4)
+        lru.set('a', 1, 'eins')
+
+        assert lru.get('a', 1) == 'eins'
+        assert lru.get('a', 2) is None
+        assert lru.get('b', 1) is None
+
+    def test_least_recently_used_is_evicted(self):
+        lru = LocalLRU(2)
+        lru.set('a', 1, 'a1')
+        lru.set('b', 1, 'b1')
+        lru.get('a', 1)
+        lru.set('c', 1, 'c1')
+
+        assert (lru.get('a', 1), lru.get('b', 1), lru.get('c', 1)) == ('a1', None, 'c1')
+        assert len(lru) == 2
+
+
+class TestVersionedCache:
+    """Values under a per-key version token."""
+
+    @pytest.fixture
+    def werte(self):
+        return VersionedCache('test:version:{key}', 'test:v1:{key}:{version}', max_entries=8)
+
+    def test_built_once_until_invalidated(self, werte):
+        builds = []
+
+        def build(version):
+            builds.append(version)
+            return {'version': version}
+
+        first = werte.get(1, build)
+        assert werte.get(1, build) is first
+        werte.clear_local()
+        assert werte.get(1, build) == first  # From the Django cache
+        assert len(builds) == 1
+
+        werte.invalidate([1])
+
+        assert werte.get(1, build)['version'] != first['version']
+        assert len(builds) == 2
+
+    def test_none_is_not_cached(self, werte):
+        lookups = []
+
+        assert werte.get(1, lambda version: None, on_lookup=lookups.append) is None
+        assert werte.get(1, lambda version: 'neu', on_lookup=lookups.append) == 'neu'
+        assert lookups == [False, False]
+
+    def test_without_cache_every_read_builds(self, werte, settings):
+        settings.CACHES = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+        versions = {werte.get(1, lambda version: version) for _ in range(3)}
+
+        assert len(versions) == 3
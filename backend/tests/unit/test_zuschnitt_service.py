@@ -0,0 +1,207 @@
+"""
+Unit tests for the cut-list optimization.
+
+Every plan must be a valid guillotine layout: parts inside the trimmed
+sheet, kerf between parts, each part placed exactly once.
+"""
+
+import math
+import random
+from decimal import Decimal
+
+import pytest
+from django.contrib.auth.models import User
+
+from documents.betriebskennzahl_models import IndividuelleBetriebskennzahl, MateriallistePosition
+from documents.services.geometrie_service import InvalidComponentError
+from documents.services.zuschnitt_service import (
+    ZuschnittError,
+    ZuschnittService,
+    Zuschnittteil,
+    material_schluessel,
+)
+from extraction.services.calculation_engine import CalculationEngine
+
+KORPUS = {'typ': 'Korpus', 'maße': {'höhe': 0.72, 'breite': 0.6, 'tiefe': 0.56}, 'anzahl': 2}
+
+
+def _random_teile(rng, anzahl, material='Spanplatte 19mm'):
+    teile = []
+    for index in range(anzahl):
+        teile.append(Zuschnittteil(
+            bezeichnung=f'Teil {index}',
+            laenge_mm=float(rng.randrange(100, 1800, 5)),
+            breite_mm=float(rng.randrange(80, 900, 5)),
+            material=material,
+            drehbar=rng.random() < 0.8,
+        ))
+    return teile
+
+
+def _assert_gueltig(service, plan, teile):
+    rand, kerf = service.besaeumung_mm, service.schnittbreite_mm
+    laenge, breite = plan.plattenformat
+    platziert = []
+
+    for platte in plan.platten:
+        rechtecke = []
+        for p in platte.platzierungen:
+            assert p.x_mm >= rand and p.y_mm >= rand
+            assert p.x_mm + p.laenge_mm <= laenge - rand + 1e-6
+            assert p.y_mm + p.breite_mm <= breite - rand + 1e-6
+            if p.gedreht:
+                assert p.teil.drehbar
+                assert (p.laenge_mm, p.breite_mm) == (p.teil.breite_mm, p.teil.laenge_mm)
+            else:
+                assert (p.laenge_mm, p.breite_mm) == (p.teil.laenge_mm, p.teil.breite_mm)
+            rechtecke.append((p.x_mm, p.y_mm, p.x_mm + p.laenge_mm, p.y_mm + p.breite_mm))
+            platziert.append(p.teil)
+
+        for i, a in enumerate(rechtecke):
+            for b in rechtecke[i + 1:]:
+                getrennt = (a[2] + kerf <= b[0] + 1e-6 or b[2] + kerf <= a[0] + 1e-6
+                            or a[3] + kerf <= b[1] + 1e-6 or b[3] + kerf <= a[1] + 1e-6)
+                assert getrennt, (a, b)
+
+    assert sorted(map(id, platziert + plan.nicht_platzierbar)) == sorted(map(id, teile))
+
+
+class TestTeile:
+    """Panels from GeometrieService components."""
+
+    def test_component_types(self):
+        teile = ZuschnittService().teile_aus_komponenten([
+            KORPUS,
+            {'typ': 'Tür', 'maße': {'höhe': 0.7, 'breite': 0.4}, 'anzahl': 3, 'drehbar': False},
+            {'typ': 'Einlegeboden', 'maße': {'breite': 0.56, 'tiefe': 0.5}},
+            {'typ': 'Regalbrett', 'maße': {'höhe': 0.019, 'breite': 0.3, 'tiefe': 0.9}},
+            {'component_typ': 'Tischplatte', 'maße': {'länge': 2.0, 'breite': 1.0, 'höhe': 0.04},
+             'material': {'material_typ': 'Holz', 'holzart': 'Eiche', 'stärke_mm': 40}},
+            {'typ': 'Tür', 'maße': {'höhe': 0.7}},
+        ])
+
+        abmessungen = [(t.bezeichnung, t.laenge_mm, t.breite_mm) for t in teile]
+        assert abmessungen.count(('Korpus Seite', 720.0, 560.0)) == 4
+        assert abmessungen.count(('Korpus Boden', 600.0, 560.0)) == 2
+        assert abmessungen.count(('Tür', 700.0, 400.0)) == 3
+        assert ('Einlegeboden', 560.0, 500.0) in abmessungen
+        assert ('Regalbrett', 900.0, 300.0) in abmessungen
+        assert teile[-1].material == 'Eiche 40mm'
+        assert not any(t.drehbar for t in teile if t.bezeichnung == 'Tür')
+        assert len(teile) == 8 + 3 + 1 + 1 + 1
+
+    def test_invalid_dimension(self):
+        with pytest.raises(InvalidComponentError):
+            ZuschnittService().teile_aus_komponenten([{'typ': 'Tür', 'maße': {'höhe': 'hoch', 'breite': 1}}])
+
+    @pytest.mark.parametrize('material, expected', [
+        (None, 'Standard'),
+        ('MDF 19mm', 'MDF 19mm'),
+        ({'material_typ': 'Spanplatte', 'stärke_mm': 19.0}, 'Spanplatte 19mm'),
+        ({'material_typ': 'Holz', 'holzart': 'Buche'}, 'Buche'),
+    ])
+    def test_material_key(self, material, expected):
+        assert material_schluessel(material) == expected
+
+
+class TestOptimiere:
+    """Packing, waste and cut plans."""
+
+    def test_four_quarters_fill_one_sheet(self):
+        service = ZuschnittService()
+        teile = [Zuschnittteil(f'Viertel {i}', 1388.0, 1023.0) for i in range(4)]
+
+        plan = service.optimiere(teile).plaene['Standard']
+
+        assert plan.anzahl_platten == 1
+        _assert_gueltig(service, plan, teile)
+        # 2800×2070 sheet, 4 × 1388×1023 mm parts
+        assert plan.verschnitt_prozent == Decimal('2.01')
+        assert {s.richtung for s in plan.platten[0].schnitte} == {'horizontal', 'vertikal'}
+
+    def test_materials_are_packed_separately(self):
+        service = ZuschnittService(plattenformate={'MDF': (2440.0, 1220.0)})
+        ergebnis = service.optimiere([
+            Zuschnittteil('A', 1000.0, 500.0, material='MDF'),
+            Zuschnittteil('B', 1000.0, 500.0, material='Eiche 19mm'),
+        ])
+
+        assert ergebnis.platten_gesamt == 2
+        assert ergebnis.plaene['MDF'].plattenformat == (2440.0, 1220.0)
+        assert ergebnis.to_dict()['materialien']['Eiche 19mm']['anzahl_platten'] == 1
+
+    def test_oversized_part_is_reported(self):
+        teile = [Zuschnittteil('Zu lang', 3000.0, 500.0), Zuschnittteil('Passt', 500.0, 500.0)]
+
+        plan = ZuschnittService().optimiere(teile).plaene['Standard']
+
+        assert [t.bezeichnung for t in plan.nicht_platzierbar] == ['Zu lang']
+        assert plan.anzahl_platten == 1
+
+    def test_grain_direction_is_kept(self):
+        # Only fits rotated, and rotation is not allowed
+        teile = [Zuschnittteil('Seite', 2000.0, 2500.0, drehbar=False)]
+
+        assert ZuschnittService().optimiere(teile).plaene['Standard'].nicht_platzierbar == teile
+
+    @pytest.mark.parametrize('seed', range(5))
+    def test_random_plans_are_valid(self, seed):
+        rng = random.Random(seed)
+        service = ZuschnittService()
+        teile = _random_teile(rng, 120)
+
+        heuristik = service.optimiere(teile).plaene['Spanplatte 19mm']
+        verbessert = service.optimiere(teile, zeitlimit_s=10, max_versuche=60, seed=seed).plaene['Spanplatte 19mm']
+
+        for plan in (heuristik, verbessert):
+            _assert_gueltig(service, plan, teile)
+            nutzflaeche = (2800 - 20) * (2070 - 20)
+            assert plan.anzahl_platten >= math.ceil(sum(t.flaeche_mm2 for t in teile) / nutzflaeche)
+        assert verbessert.anzahl_platten <= heuristik.anzahl_platten
+
+    def test_time_box(self):
+        teile = _random_teile(random.Random(7), 200)
+
+        ergebnis = ZuschnittService().optimiere(teile, zeitlimit_s=0.3)
+
+        assert ergebnis.optimierungsdauer_ms < 2000
+
+
+@pytest.mark.django_db
+class TestStep1Eingabe:
+    """Sheet counts as step 1 input."""
+
+    def test_step1_eingabe(self):
+        ergebnis = ZuschnittService().optimiere_komponenten([dict(KORPUS, material='Spanplatte 19mm')])
+
+        assert ergebnis.step1_eingabe() == {'material_quantity': 1}
+        assert ergebnis.step1_eingabe('Spanplatte 19mm', 'SP-19') == {'material_quantity': 1, 'material_sku': 'SP-19'}
+        with pytest.raises(ZuschnittError):
+            ergebnis.step1_eingabe('MDF')
+
+    def test_unplaced_parts_are_not_priced(self):
+        teile = [Zuschnittteil('Zu lang', 3000.0, 500.0), Zuschnittteil('Passt', 500.0, 500.0)]
+        ergebnis = ZuschnittService().optimiere(teile)
+
+        with pytest.raises(ZuschnittError, match='Zu lang'):
+            ergebnis.step1_eingabe()
+
+    def test_prices_sheets_in_step_1(self):
+        user = User.objects.create_user(username='zuschnitt')
+        IndividuelleBetriebskennzahl.objects.create(
+            user=user, is_active=True, stundensatz_arbeit=Decimal('60.00'), gewinnmarge_prozent=Decimal('0'),
+            betriebskosten_umlage=Decimal('0'), use_handwerk_standard=False, use_custom_materials=True,
+        )
+        MateriallistePosition.objects.create(
+            user=user, material_name='Spanplatte 19mm 2800×2070', sku='SP-19', lieferant='Holzhandel',
+            standardkosten_eur=Decimal('48.00'), is_enabled=True,
+        )
+        komponenten = [dict(KORPUS, anzahl=6), {'typ': 'Tür', 'maße': {'höhe': 0.7, 'breite': 0.6}, 'anzahl': 6}]
+        ergebnis = ZuschnittService().optimiere_komponenten(komponenten)
+
+        extracted_data = {'labor_hours': Decimal('0'), **ergebnis.step1_eingabe(material_sku='SP-19')}
+        result = CalculationEngine(user).calculate_project_price(extracted_data)
+
+        schritt_1 = result['breakdown']['step_1_base_material']
+        assert schritt_1['quantity'] == ergebnis.platten_gesamt
+        assert Decimal(str(schritt_1['total_cost_eur'])) == Decimal('48.00') * ergebnis.platten_gesamt